@@ -44,14 +44,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'webpos.middleware.PerformanceMiddleware',
+    'webpos.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'webpos.middleware.RoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
 ]
@@ -85,6 +88,13 @@ DATABASES = {
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+# Replicas and tenant shards are extra aliases (see webpos.routing); locally e.g.
+#   'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'db.sqlite3'},
+#   'shard1': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'db_shard1.sqlite3'},
+# with DATABASE_REPLICAS = {'default': ['replica']}, then
+#   manage.py migrate --database shard1 && manage.py move_tenant <tenant id> shard1
+DATABASE_ROUTERS = ['webpos.routing.TenantRouter']
+DATABASE_REPLICAS = {}
 
 
 # Password validation
@@ -122,6 +132,14 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# collectstatic writes .gz (and .br with brotli installed) next to each hashed file;
+# WhiteNoiseMiddleware serves the variant the client accepts with far-future caching
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -134,6 +152,34 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # orjson by default; ?format=json selects DRF's stdlib renderer
+    'DEFAULT_RENDERER_CLASSES': (
+        'webpos.renderers.ORJSONRenderer',
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'webpos.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # Token buckets per tenant, user and till (webpos.throttling); '<kind>.<budget>'
+    'DEFAULT_THROTTLE_CLASSES': (
+        'webpos.throttling.TenantRateThrottle',
+        'webpos.throttling.UserRateThrottle',
+        'webpos.throttling.TillRateThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'tenant.read': '3000/min',
+        'tenant.write': '600/min',
+        'tenant.bulk': '20/min',
+        'user.read': '600/min',
+        'user.write': '240/min',
+        'user.bulk': '10/min',
+        'till.read': '300/min',
+        'till.write': '120/min',
+        'till.bulk': '5/min',
+    },
 }
 
 SIMPLE_JWT = {
@@ -145,4 +191,85 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
-CORS_ALLOW_ALL_ORIGINS = True
\ No newline at end of file
+CORS_ALLOW_ALL_ORIGINS = True
+
+# Cached reference endpoints (webpos.caching). Payloads live in each process's memory;
+# the generation counters used for invalidation must be shared between processes, e.g.
+#   'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/var/tmp/webpos_cache'}
+#   'shared': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'}
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'webpos-responses',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_VERSION_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 600
+
+# Request instrumentation (webpos.middleware): share of requests measured, the
+# wall time above which a request is logged with its slowest query, and who may
+# scrape /metrics
+PERF_SAMPLE_RATE = 0.1
+PERF_SLOW_REQUEST_MS = 500
+METRICS_ALLOWED_IPS = ('127.0.0.1',)
+
+# Fernet key for stored virtual-product PINs; derived from SECRET_KEY when unset
+PIN_ENCRYPTION_KEY = None
+
+# Content-addressed store for receipt PDFs
+RECEIPT_STORAGE_ROOT = BASE_DIR / 'receipts'
+
+# Background jobs (manage.py run_jobs): running jobs per tenant, how often a worker
+# refreshes the lock of the job it is running, and seconds without a refresh before
+# the job is taken to be abandoned and handed to another worker
+JOB_TENANT_CONCURRENCY = 2
+JOB_HEARTBEAT_SECONDS = 60
+JOB_LOCK_TIMEOUT = 900
+
+# Response compression (webpos.middleware.CompressionMiddleware): smallest body worth
+# compressing, and the brotli level used for dynamic responses (0-11)
+COMPRESSION_MIN_BYTES = 1024
+COMPRESSION_BROTLI_QUALITY = 4
+
+# Throttling (webpos.throttling): shared cache for the buckets when several processes
+# serve the API (None keeps them per process), the header tills identify themselves
+# with, and how often request counters are written to TenantUsage
+THROTTLE_CACHE_ALIAS = None
+THROTTLE_TILL_HEADER = 'X-Till-ID'
+THROTTLE_USAGE_FLUSH_SECONDS = 60
+
+# Limits per Tenant.subscription_plan; 'default' applies to plans not listed.
+# requests_per_day is a quota over all budgets (None for unlimited) and
+# rate_multiplier scales the tenant.* throttle rates
+SUBSCRIPTION_PLAN_LIMITS = {
+    'default': {'requests_per_day': None, 'rate_multiplier': 1},
+    'free': {'requests_per_day': 20_000, 'rate_multiplier': 0.5},
+    'pro': {'requests_per_day': None, 'rate_multiplier': 4},
+}
+
+# Database routing (webpos.routing): how long each process trusts its copy of the
+# tenant shard map, and how long a user's reads stay on the primary after a write
+SHARD_MAP_CACHE_SECONDS = 30
+REPLICA_STICKY_SECONDS = 5
+
+# Top-up providers (webpos.services.providers), keyed by VirtualProduct.provider_name:
+# endpoint, bearer token, timeout in seconds and the most calls kept in flight per process, e.g.
+# 'mock': {'url': 'http://127.0.0.1:8900/topup', 'token': '', 'timeout': 10, 'concurrency': 20}
+# ('manage.py mock_provider' serves that URL for local testing)
+VIRTUAL_PRODUCT_PROVIDERS = {}
+
+# Webhook delivery (manage.py dispatch_webhooks): attempts before a delivery is marked
+# failed, seconds to wait for an endpoint, and seconds before a batch whose
+# dispatcher went away is sent again
+WEBHOOK_MAX_ATTEMPTS = 12
+WEBHOOK_TIMEOUT = 10
+WEBHOOK_LOCK_TIMEOUT = 300
+
+# Admin changelists of large tables count filtered results up to this many rows,
+# and take the total of an unfiltered one from table statistics beyond it
+ADMIN_COUNT_LIMIT = 10000
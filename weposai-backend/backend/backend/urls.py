@@ -16,6 +16,7 @@ Including another URLconf
 """
 from django.contrib import admin # type: ignore
 from django.urls import path, include # type: ignore
+from webpos.views import metrics_view
 from rest_framework_simplejwt.views import ( # type: ignore
     TokenObtainPairView,
     TokenRefreshView,
@@ -24,6 +25,7 @@ from rest_framework_simplejwt.views import ( # type: ignore
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('webpos.urls')),
+    path('metrics', metrics_view, name='metrics'),
 
     # JWT Authentication endpoints
     path('auth/jwt/create/', TokenObtainPairView.as_view(), name='jwt-create'),
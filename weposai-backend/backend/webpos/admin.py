@@ -1,17 +1,118 @@
+from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
 from .models import (
     Tenant, User, Store, Category,
-    Product, VirtualProduct, Service,
+    Product, VirtualProduct, PinCode, PinAllocation, TopUp, Service,
     Customer, Contract, Vendor,
-    Purchase, Inventory, InventoryTransaction,
+    Purchase, CostLayer, ProductValuation, SaleLineCost,
+    Inventory, InventoryTransaction, InventoryBatch, InventorySnapshot,
+    StockTransfer, StockTransferLine,
     SurplusSupply, Sale, OrderItem,
-    Payment, Refund, GiftCard,
-    Promotion, Tax, Delivery,
-    LoyaltyPoint, JournalEntry,
-    Shift, Commission, KPI,
-    ActionLog,
+    Payment, Refund, RefundItem, Receipt, GiftCard,
+    Promotion, PriceChange, PriceHistory, Tax, Delivery,
+    LoyaltyPoint, LoyaltyRule, LoyaltyEntry, Account, JournalEntry, JournalLine, PostingQueue,
+    Shift, ShiftTotals, Commission, CommissionRule, CommissionTier,
+    CommissionSettlement, KPI,
+    ActionLog, Job, TenantUsage, TenantShard,
+    WebhookEndpoint, OutboxEvent, WebhookDelivery, ProductAffinity, DemandClass, DemandForecast,
 )
 
+
+# --- LARGE TABLE CHANGELISTS ---
+# Ledgers and logs with millions of rows: no exact COUNT(*) per page, and foreign
+# key filters that search through the autocomplete view instead of listing every row.
+
+def _estimated_rows(model, using):
+    """The table's row count from the database's statistics, or None if it has none."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [connection.ops.quote_name(table)])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+                [table],
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f"SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}")
+        else:
+            return None
+        row = cursor.fetchone()
+    # reltuples is -1 for a table that was never analysed
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Counts an unfiltered changelist from table statistics and a filtered one only up to ADMIN_COUNT_LIMIT rows.
+
+    Past the limit the changelist shows the limit as its total and pages up to it.
+    """
+
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_COUNT_LIMIT
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = _estimated_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate >= limit:
+                return estimate
+        return queryset.order_by()[:limit].count()
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """Filter on a foreign key with a select2 search box backed by the admin's autocomplete view.
+
+    The related model's admin needs ``search_fields``, as for ``autocomplete_fields``.
+    """
+    template = 'admin/webpos/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        self.admin_site = model_admin.admin_site
+        super().__init__(field, request, params, model, model_admin, field_path)
+        value = self.used_parameters.get(self.lookup_kwarg)
+        self.lookup_val = value[-1] if isinstance(value, list) else value
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.lookup_val is None,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            'display': _('All'),
+        }
+
+    def rendered_widget(self):
+        widget = AutocompleteSelect(
+            self.field, self.admin_site, attrs={'data-autocomplete-filter': self.lookup_kwarg},
+        )
+        # The form field gives the widget a queryset, from which it loads only the selected row.
+        formfield = self.field.formfield(widget=widget, required=False)
+        return formfield.widget.render(self.lookup_kwarg, self.lookup_val)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+    @property
+    def media(self):
+        return (
+            super().media
+            + AutocompleteSelect(None, self.admin_site).media
+            + forms.Media(js=['webpos/admin/autocomplete_filter.js'])
+        )
+
+
 # --- TENANT ---
 @admin.register(Tenant)
 class TenantAdmin(admin.ModelAdmin):
@@ -28,6 +129,7 @@ class UserAdmin(admin.ModelAdmin):
     search_fields = ('username', 'email')
     autocomplete_fields = ['tenant']
     readonly_fields = ('last_login',)
+    list_select_related = ('tenant',)
 
 
 # --- STORE ---
@@ -38,6 +140,7 @@ class StoreAdmin(admin.ModelAdmin):
     search_fields = ('name', 'location')
     autocomplete_fields = ['tenant']
     readonly_fields = ('created_at',)
+    list_select_related = ('tenant',)
 
 
 # --- CATEGORY ---
@@ -47,6 +150,7 @@ class CategoryAdmin(admin.ModelAdmin):
     list_filter = ('tenant',)
     search_fields = ('name', 'description')
     autocomplete_fields = ['tenant']
+    list_select_related = ('tenant',)
 
 
 # --- PRODUCT ---
@@ -74,6 +178,41 @@ class VirtualProductAdmin(admin.ModelAdmin):
     list_display = ('product', 'virtual_type', 'provider_name', 'denomination', 'validity_period_days')
     search_fields = ('product__name', 'provider_name')
     autocomplete_fields = ['product']
+    list_select_related = ('product',)
+
+
+# --- PIN INVENTORY ---
+@admin.register(PinCode)
+class PinCodeAdmin(admin.ModelAdmin):
+    list_display = ('serial', 'virtual_product', 'tenant', 'status', 'redemptions', 'expires_at', 'batch_reference', 'imported_at')
+    list_filter = ('tenant', 'status')
+    search_fields = ('serial', 'batch_reference')
+    autocomplete_fields = ['tenant', 'virtual_product']
+    # The code itself never leaves the database through the admin
+    exclude = ('encrypted_code', 'code_digest')
+    readonly_fields = ('redemptions', 'imported_at')
+    list_select_related = ('tenant', 'virtual_product__product')
+
+
+@admin.register(PinAllocation)
+class PinAllocationAdmin(admin.ModelAdmin):
+    list_display = ('pin', 'sale', 'allocated_by', 'allocated_at')
+    raw_id_fields = ('pin', 'sale')
+    autocomplete_fields = ['allocated_by']
+    readonly_fields = ('allocated_at',)
+    list_select_related = ('pin', 'allocated_by')
+
+
+# --- PROVIDER TOP-UPS ---
+@admin.register(TopUp)
+class TopUpAdmin(admin.ModelAdmin):
+    list_display = ('reference', 'tenant', 'virtual_product', 'recipient', 'amount', 'status', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('reference', 'recipient', 'provider_reference')
+    autocomplete_fields = ['tenant', 'virtual_product', 'created_by']
+    raw_id_fields = ('sale',)
+    readonly_fields = ('provider_reference', 'error', 'created_at', 'completed_at')
+    list_select_related = ('tenant', 'virtual_product__product')
 
 
 # --- SERVICE ---
@@ -84,16 +223,18 @@ class ServiceAdmin(admin.ModelAdmin):
     search_fields = ('name',)
     autocomplete_fields = ['tenant', 'category']
     readonly_fields = ('created_at',)
+    list_select_related = ('category', 'tenant')
 
 
 # --- CUSTOMER ---
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
-    list_display = ('name', 'email', 'phone', 'tenant', 'created_at')
+    list_display = ('name', 'email', 'phone', 'tenant', 'loyalty_balance', 'created_at')
     search_fields = ('name', 'email', 'phone')
     list_filter = ('tenant',)
     autocomplete_fields = ['tenant', 'user']
-    readonly_fields = ('created_at',)
+    readonly_fields = ('created_at', 'loyalty_balance')
+    list_select_related = ('tenant',)
 
 
 # --- CONTRACT ---
@@ -104,6 +245,7 @@ class ContractAdmin(admin.ModelAdmin):
     search_fields = ('user__username',)
     autocomplete_fields = ['tenant', 'user']
     readonly_fields = ('created_at',)
+    list_select_related = ('user', 'tenant')
 
 
 # --- VENDOR ---
@@ -114,6 +256,7 @@ class VendorAdmin(admin.ModelAdmin):
     list_filter = ('tenant',)
     autocomplete_fields = ['tenant']
     readonly_fields = ('created_at',)
+    list_select_related = ('tenant',)
 
 
 # --- PURCHASE ---
@@ -124,26 +267,110 @@ class PurchaseAdmin(admin.ModelAdmin):
     list_filter = ('tenant',)
     autocomplete_fields = ['tenant', 'product', 'vendor']
     readonly_fields = ('purchased_at',)
+    list_select_related = ('product', 'vendor', 'tenant')
+
+
+# --- STOCK VALUATION ---
+@admin.register(CostLayer)
+class CostLayerAdmin(admin.ModelAdmin):
+    list_display = ('product', 'tenant', 'received_at', 'quantity', 'remaining_quantity', 'unit_cost')
+    list_filter = ('tenant',)
+    search_fields = ('product__name', 'product__sku')
+    autocomplete_fields = ['tenant', 'product', 'purchase']
+    list_select_related = ('tenant', 'product')
+
+
+@admin.register(ProductValuation)
+class ProductValuationAdmin(admin.ModelAdmin):
+    list_display = ('product', 'tenant', 'on_hand', 'average_cost', 'updated_at')
+    list_filter = ('tenant',)
+    search_fields = ('product__name', 'product__sku')
+    autocomplete_fields = ['tenant', 'product']
+    list_select_related = ('tenant', 'product')
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(SaleLineCost)
+class SaleLineCostAdmin(admin.ModelAdmin):
+    list_display = ('order_item', 'product', 'tenant', 'sold_at', 'quantity', 'revenue', 'cost', 'method')
+    list_filter = ('tenant', 'method')
+    search_fields = ('product__name', 'order_item__sale__id')
+    autocomplete_fields = ['tenant', 'product']
+    raw_id_fields = ('order_item',)
+    list_select_related = ('tenant', 'product', 'order_item__product', 'order_item__service')
 
 
 # --- INVENTORY ---
 @admin.register(Inventory)
-class InventoryAdmin(admin.ModelAdmin):
+class InventoryAdmin(LargeTableAdmin):
     list_display = ('product', 'store', 'tenant', 'quantity', 'minimum_stock_level', 'last_updated', 'created_by', 'updated_by')
-    list_filter = ('tenant', 'store', 'product')
+    list_filter = (('tenant', AutocompleteFilter), ('store', AutocompleteFilter), ('product', AutocompleteFilter))
     search_fields = ('product__name',)
     autocomplete_fields = ['tenant', 'product', 'store', 'created_by', 'updated_by']
     readonly_fields = ('last_updated', 'created_at', 'updated_at')
+    list_select_related = ('product', 'store', 'tenant', 'created_by', 'updated_by')
 
 
 # --- INVENTORY TRANSACTION ---
 @admin.register(InventoryTransaction)
-class InventoryTransactionAdmin(admin.ModelAdmin):
+class InventoryTransactionAdmin(LargeTableAdmin):
     list_display = ('inventory', 'transaction_type', 'quantity', 'timestamp', 'tenant', 'created_by')
-    list_filter = ('tenant', 'transaction_type')
+    list_filter = (
+        ('tenant', AutocompleteFilter), ('inventory__store', AutocompleteFilter),
+        ('inventory__product', AutocompleteFilter), 'transaction_type',
+    )
     search_fields = ('inventory__product__name',)
     autocomplete_fields = ['tenant', 'inventory', 'created_by']
     readonly_fields = ('timestamp',)
+    list_select_related = ('inventory__product', 'inventory__store', 'tenant', 'created_by')
+
+
+# --- INVENTORY SNAPSHOT ---
+@admin.register(InventorySnapshot)
+class InventorySnapshotAdmin(admin.ModelAdmin):
+    list_display = ('inventory', 'snapshot_date', 'quantity', 'as_of', 'tenant')
+    list_filter = ('tenant', 'snapshot_date')
+    autocomplete_fields = ['tenant', 'inventory']
+    readonly_fields = ('created_at',)
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        return qs.select_related('tenant', 'inventory__product', 'inventory__store')
+
+
+# --- INVENTORY BATCH ---
+@admin.register(InventoryBatch)
+class InventoryBatchAdmin(admin.ModelAdmin):
+    list_display = ('inventory', 'lot_number', 'quantity', 'expiry_date', 'received_at', 'tenant')
+    list_filter = ('tenant', 'expiry_date')
+    search_fields = ('lot_number', 'inventory__product__name')
+    autocomplete_fields = ['tenant', 'inventory']
+    readonly_fields = ('created_at',)
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        return qs.select_related('tenant', 'inventory__product', 'inventory__store')
+
+
+# --- STOCK TRANSFER ---
+
+class StockTransferLineInline(admin.TabularInline):
+    model = StockTransferLine
+    extra = 0
+    autocomplete_fields = ['product']
+
+@admin.register(StockTransfer)
+class StockTransferAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tenant', 'source_store', 'destination_store', 'status', 'created_at', 'dispatched_at', 'received_at')
+    list_filter = ('tenant', 'status')
+    search_fields = ('id', 'notes')
+    autocomplete_fields = ['tenant', 'source_store', 'destination_store', 'created_by', 'received_by']
+    readonly_fields = ('status', 'created_at', 'dispatched_at', 'received_at')
+    inlines = [StockTransferLineInline]
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        return qs.select_related('tenant', 'source_store', 'destination_store')
 
 
 # --- SURPLUS SUPPLY ---
@@ -154,6 +381,7 @@ class SurplusSupplyAdmin(admin.ModelAdmin):
     search_fields = ('product__name',)
     autocomplete_fields = ['tenant', 'product', 'store']
     readonly_fields = ('recorded_at',)
+    list_select_related = ('product', 'store', 'tenant')
 
 
 # --- SALE ---
@@ -164,36 +392,55 @@ class OrderItemInline(admin.TabularInline):
     autocomplete_fields = ['product', 'service']
 
 @admin.register(Sale)
-class SaleAdmin(admin.ModelAdmin):
+class SaleAdmin(LargeTableAdmin):
     list_display = ('id', 'tenant', 'store', 'user', 'customer', 'total_amount', 'date')
-    list_filter = ('tenant', 'store')
+    list_filter = (('tenant', AutocompleteFilter), ('store', AutocompleteFilter))
     search_fields = ('id', 'user__username', 'customer__name')
-    autocomplete_fields = ['tenant', 'store', 'user', 'customer']
+    autocomplete_fields = ['tenant', 'store', 'user', 'customer', 'shift']
     inlines = [OrderItemInline]
-
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        return qs.select_related('tenant', 'store', 'user', 'customer')
+    list_select_related = ('tenant', 'store', 'user', 'customer')
 
 
 # --- PAYMENT ---
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(LargeTableAdmin):
     list_display = ('sale', 'method', 'amount', 'tenant', 'date', 'created_by', 'updated_by')
-    list_filter = ('tenant', 'method')
+    list_filter = (('tenant', AutocompleteFilter), 'method')
     search_fields = ('sale__id',)
     autocomplete_fields = ['tenant', 'sale', 'created_by', 'updated_by']
     readonly_fields = ('date', 'created_at', 'updated_at')
+    list_select_related = ('sale', 'tenant', 'created_by', 'updated_by')
 
 
 # --- REFUND ---
+class RefundItemInline(admin.TabularInline):
+    model = RefundItem
+    extra = 0
+    raw_id_fields = ('order_item',)
+    readonly_fields = ('quantity', 'amount', 'restocked')
+
+
 @admin.register(Refund)
 class RefundAdmin(admin.ModelAdmin):
-    list_display = ('sale', 'tenant', 'amount', 'reason', 'created_at')
+    list_display = ('sale', 'tenant', 'amount', 'reason', 'created_at', 'created_by')
     list_filter = ('tenant',)
     search_fields = ('sale__id',)
-    autocomplete_fields = ['tenant', 'sale']
+    autocomplete_fields = ['tenant', 'sale', 'created_by']
     readonly_fields = ('created_at',)
+    inlines = [RefundItemInline]
+    list_select_related = ('sale', 'tenant', 'created_by')
+
+
+# --- RECEIPT ---
+@admin.register(Receipt)
+class ReceiptAdmin(admin.ModelAdmin):
+    list_display = ('sale', 'tenant', 'pdf_status', 'generated_at', 'pdf_generated_at')
+    list_filter = ('tenant', 'pdf_status')
+    search_fields = ('sale__id', 'pdf_digest')
+    raw_id_fields = ('sale',)
+    autocomplete_fields = ['tenant']
+    readonly_fields = ('generated_at', 'pdf_file', 'pdf_digest', 'pdf_generated_at')
+    list_select_related = ('tenant',)
 
 
 # --- GIFT CARD ---
@@ -204,6 +451,7 @@ class GiftCardAdmin(admin.ModelAdmin):
     list_filter = ('tenant', 'is_active')
     autocomplete_fields = ['tenant', 'issued_to', 'issued_by']
     readonly_fields = ('issued_at',)
+    list_select_related = ('tenant', 'issued_to', 'issued_by')
 
 
 # --- PROMOTION ---
@@ -213,6 +461,35 @@ class PromotionAdmin(admin.ModelAdmin):
     list_filter = ('tenant', 'active')
     search_fields = ('code',)
     autocomplete_fields = ['tenant']
+    list_select_related = ('tenant',)
+
+
+# --- PRICE CHANGES ---
+@admin.register(PriceChange)
+class PriceChangeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'tenant', 'operation', 'value', 'status', 'activate_at', 'rollback_at', 'products_changed')
+    list_filter = ('status', 'operation')
+    search_fields = ('name',)
+    autocomplete_fields = ['tenant', 'category', 'store', 'promotions', 'created_by']
+    readonly_fields = ('status', 'products_changed', 'products_restored', 'created_at', 'applied_at', 'rolled_back_at')
+    list_select_related = ('tenant',)
+
+    def has_add_permission(self, request):
+        # Created through the API, which queues the activation and rollback jobs
+        return False
+
+
+@admin.register(PriceHistory)
+class PriceHistoryAdmin(LargeTableAdmin):
+    list_display = ('product', 'price', 'cost_price', 'is_discounted', 'discount_percent', 'previous_price', 'source', 'effective_from')
+    list_filter = (('tenant', AutocompleteFilter), ('product', AutocompleteFilter), 'source')
+    list_select_related = ('product',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 # --- TAX ---
@@ -222,6 +499,7 @@ class TaxAdmin(admin.ModelAdmin):
     list_filter = ('tenant', 'is_active')
     search_fields = ('name',)
     autocomplete_fields = ['tenant']
+    list_select_related = ('tenant',)
 
 
 # --- DELIVERY ---
@@ -232,6 +510,7 @@ class DeliveryAdmin(admin.ModelAdmin):
     search_fields = ('sale__id', 'delivered_by__username')
     autocomplete_fields = ['tenant', 'sale', 'delivered_by']
     readonly_fields = ('delivery_date',)
+    list_select_related = ('sale', 'tenant', 'delivered_by')
 
 
 # --- LOYALTY POINT ---
@@ -241,33 +520,119 @@ class LoyaltyPointAdmin(admin.ModelAdmin):
     search_fields = ('user__username',)
     autocomplete_fields = ['user']
     readonly_fields = ('updated_at',)
+    list_select_related = ('user',)
+
+
+# --- ACCOUNT ---
+@admin.register(Account)
+class AccountAdmin(admin.ModelAdmin):
+    list_display = ('code', 'name', 'account_type', 'balance', 'tenant')
+    list_filter = ('tenant', 'account_type')
+    search_fields = ('code', 'name')
+    autocomplete_fields = ['tenant']
+    readonly_fields = ('balance',)
+    list_select_related = ('tenant',)
+
+
+# --- LOYALTY RULE ---
+@admin.register(LoyaltyRule)
+class LoyaltyRuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'tenant', 'category', 'points_per_unit', 'expiry_days', 'is_active')
+    list_filter = ('tenant', 'is_active')
+    search_fields = ('name',)
+    autocomplete_fields = ['tenant', 'category']
+    list_select_related = ('tenant', 'category')
+
+
+# --- LOYALTY ENTRY ---
+@admin.register(LoyaltyEntry)
+class LoyaltyEntryAdmin(admin.ModelAdmin):
+    list_display = ('customer', 'entry_type', 'points', 'remaining', 'expires_at', 'sale', 'created_at')
+    list_filter = ('tenant', 'entry_type')
+    search_fields = ('customer__name', 'sale__id')
+    autocomplete_fields = ['tenant', 'customer', 'sale']
+    list_select_related = ('customer',)
+    readonly_fields = ('created_at',)
 
 
 # --- JOURNAL ENTRY ---
+
+class JournalLineInline(admin.TabularInline):
+    model = JournalLine
+    extra = 0
+    autocomplete_fields = ['account']
+
 @admin.register(JournalEntry)
 class JournalEntryAdmin(admin.ModelAdmin):
-    list_display = ('tenant', 'description', 'amount', 'entry_date')
-    list_filter = ('tenant',)
+    list_display = ('tenant', 'description', 'amount', 'entry_date', 'source_type', 'source_id')
+    list_filter = ('tenant', 'source_type')
     search_fields = ('description',)
     autocomplete_fields = ['tenant']
+    inlines = [JournalLineInline]
+    list_select_related = ('tenant',)
+
+
+# --- POSTING QUEUE ---
+@admin.register(PostingQueue)
+class PostingQueueAdmin(admin.ModelAdmin):
+    list_display = ('source_type', 'source_id', 'tenant', 'enqueued_at')
+    list_filter = ('tenant', 'source_type')
+    readonly_fields = ('enqueued_at',)
+    list_select_related = ('tenant',)
 
 
 # --- SHIFT ---
+class ShiftTotalsInline(admin.StackedInline):
+    model = ShiftTotals
+    can_delete = False
+    readonly_fields = [
+        'sale_count', 'sales_amount', 'cash_total', 'card_total', 'mobile_total',
+        'bank_transfer_total', 'credit_total', 'refund_count', 'refund_total',
+        'giftcard_total', 'closed',
+    ]
+
 @admin.register(Shift)
 class ShiftAdmin(admin.ModelAdmin):
     list_display = ('user', 'store', 'start_time', 'end_time', 'created_at')
     search_fields = ('user__username', 'store__name')
     autocomplete_fields = ['user', 'store']
     readonly_fields = ('created_at',)
+    inlines = [ShiftTotalsInline]
+    list_select_related = ('user', 'store')
 
 
 # --- COMMISSION ---
 @admin.register(Commission)
 class CommissionAdmin(admin.ModelAdmin):
-    list_display = ('user', 'sale', 'amount', 'created_at')
+    list_display = ('user', 'sale', 'amount', 'rule', 'settlement', 'created_at')
     search_fields = ('user__username', 'sale__id')
-    autocomplete_fields = ['user', 'sale']
-    readonly_fields = ('created_at',)
+    autocomplete_fields = ['user', 'sale', 'rule']
+    readonly_fields = ('created_at', 'settlement')
+    list_select_related = ('user', 'sale', 'rule', 'settlement')
+
+
+class CommissionTierInline(admin.TabularInline):
+    model = CommissionTier
+    extra = 1
+
+@admin.register(CommissionRule)
+class CommissionRuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'tenant', 'rule_type', 'category', 'service', 'percent', 'flat_amount', 'is_active')
+    list_filter = ('tenant', 'rule_type', 'is_active')
+    search_fields = ('name',)
+    autocomplete_fields = ['tenant', 'category', 'service']
+    inlines = [CommissionTierInline]
+    list_select_related = ('tenant', 'category', 'service')
+
+
+@admin.register(CommissionSettlement)
+class CommissionSettlementAdmin(admin.ModelAdmin):
+    list_display = ('user', 'tenant', 'period_start', 'period_end', 'total', 'settled_at')
+    list_filter = ('tenant',)
+    search_fields = ('user__username',)
+    autocomplete_fields = ['tenant', 'user']
+    readonly_fields = ('settled_at',)
+    list_select_related = ('user', 'tenant')
 
 
 # --- KPI ---
@@ -278,16 +643,107 @@ class KPIAdmin(admin.ModelAdmin):
     search_fields = ('name',)
     autocomplete_fields = ['tenant']
     readonly_fields = ('calculated_at',)
+    list_select_related = ('tenant',)
 
 
 # --- ACTION LOG ---
 @admin.register(ActionLog)
-class ActionLogAdmin(admin.ModelAdmin):
+class ActionLogAdmin(LargeTableAdmin):
     list_display = ('timestamp', 'user', 'action_type', 'model_name', 'object_id', 'ip_address')
-    list_filter = ('tenant', 'action_type')
+    list_filter = (('tenant', AutocompleteFilter), ('user', AutocompleteFilter), 'action_type')
     search_fields = ('user__username', 'model_name', 'object_id', 'details')
     autocomplete_fields = ['tenant', 'user']
     readonly_fields = ('timestamp',)
+    list_select_related = ('user', 'tenant')
+
+
+# --- BACKGROUND JOB ---
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'tenant', 'status', 'priority', 'attempts', 'run_after', 'finished_at')
+    list_filter = ('status', 'task')
+    search_fields = ('task', 'locked_by')
+    autocomplete_fields = ['tenant', 'created_by']
+    readonly_fields = ('attempts', 'locked_by', 'locked_at', 'started_at', 'finished_at', 'result', 'last_error', 'created_at')
+    list_select_related = ('tenant',)
+
+
+# --- API USAGE ---
+@admin.register(TenantUsage)
+class TenantUsageAdmin(admin.ModelAdmin):
+    list_display = ('tenant', 'day', 'budget', 'requests', 'throttled')
+    list_filter = ('budget', 'day')
+    autocomplete_fields = ['tenant']
+    list_select_related = ('tenant',)
+
+
+# --- TENANT SHARD ---
+@admin.register(TenantShard)
+class TenantShardAdmin(admin.ModelAdmin):
+    list_display = ('tenant', 'alias', 'status', 'updated_at')
+    list_filter = ('alias', 'status')
+    autocomplete_fields = ['tenant']
+    list_select_related = ('tenant',)
+
+
+# --- WEBHOOKS ---
+@admin.register(WebhookEndpoint)
+class WebhookEndpointAdmin(admin.ModelAdmin):
+    list_display = ('url', 'tenant', 'is_active', 'batch_size', 'max_concurrency', 'created_at')
+    list_filter = ('is_active',)
+    search_fields = ('url',)
+    autocomplete_fields = ['tenant']
+    readonly_fields = ('secret', 'created_at')
+    list_select_related = ('tenant',)
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'event_type', 'object_id', 'tenant', 'created_at', 'dispatched_at')
+    list_filter = ('event_type',)
+    search_fields = ('object_id',)
+    autocomplete_fields = ['tenant']
+    readonly_fields = ('payload', 'created_at', 'dispatched_at')
+    list_select_related = ('tenant',)
+
+
+@admin.register(WebhookDelivery)
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'endpoint', 'event', 'status', 'attempts', 'next_attempt_at', 'response_status')
+    list_filter = ('status',)
+    raw_id_fields = ('endpoint', 'event')
+    readonly_fields = ('batch_id', 'locked_at', 'response_status', 'last_error', 'delivered_at')
+    list_select_related = ('endpoint', 'event')
+
+
+# --- PRODUCT AFFINITY ---
+@admin.register(ProductAffinity)
+class ProductAffinityAdmin(admin.ModelAdmin):
+    list_display = ('product', 'related_product', 'rank', 'baskets', 'confidence', 'lift', 'computed_at')
+    search_fields = ('product__name', 'product__sku')
+    raw_id_fields = ('product', 'related_product')
+    autocomplete_fields = ['tenant']
+    list_select_related = ('product', 'related_product')
+
+
+# --- DEMAND ANALYTICS ---
+@admin.register(DemandClass)
+class DemandClassAdmin(admin.ModelAdmin):
+    list_display = ('product', 'store', 'abc', 'xyz', 'revenue', 'mean_daily_units', 'demand_cv', 'computed_at')
+    list_filter = ('abc', 'xyz')
+    search_fields = ('product__name', 'product__sku')
+    raw_id_fields = ('product',)
+    autocomplete_fields = ['tenant', 'store']
+    list_select_related = ('product', 'store')
+
+
+@admin.register(DemandForecast)
+class DemandForecastAdmin(admin.ModelAdmin):
+    list_display = ('product', 'store', 'day', 'units', 'computed_at')
+    search_fields = ('product__name', 'product__sku')
+    raw_id_fields = ('product',)
+    autocomplete_fields = ['tenant', 'store']
+    list_select_related = ('product', 'store')
 
 
 # Optional: Customize admin site header and titles for clarity
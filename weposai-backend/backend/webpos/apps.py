@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class WebposConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'webpos'
+
+    def ready(self):
+        from . import signals, tasks  # noqa: F401
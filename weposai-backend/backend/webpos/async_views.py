@@ -0,0 +1,259 @@
+"""
+Async endpoints for I/O-bound work.
+
+DRF's views are synchronous, so under ASGI each of them still occupies a
+thread for as long as it waits on the database or a remote service. The
+views here are plain Django coroutines that query through the async ORM
+(``afirst``, ``async for``, ``aiterator``) and call top-up providers through
+``services.providers``: the hot lookups a till makes at the counter, a
+long-poll on a background job, a streamed ledger export and provider top-ups
+(single and fanned out). Authentication and throttling are the API's own
+classes, run in a worker thread before the view body.
+
+Run them under ``uvicorn backend.asgi:application``; they work under WSGI
+too, one thread each, which is the baseline ``bench_concurrency`` compares
+against.
+"""
+import asyncio
+import csv
+import functools
+import io
+import math
+from decimal import Decimal
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, NotAuthenticated, NotFound, Throttled, ValidationError
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .models import Inventory, InventoryTransaction, Job, OrderItem, Payment, Product, Sale, VirtualProduct
+from .renderers import ORJSONParser, ORJSONRenderer
+from .serializers import TopUpBatchSerializer, TopUpRequestSerializer, TopUpSerializer
+from .services import providers
+
+JOB_POLL_SECONDS = 0.5
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+_renderer = ORJSONRenderer()
+
+
+def _json(data, status=200):
+    return HttpResponse(_renderer.render(data), status=status, content_type='application/json')
+
+
+def _authenticate_and_throttle(request, action, budgets):
+    drf_request = Request(request, authenticators=[cls() for cls in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    if not drf_request.user.is_authenticated:
+        raise NotAuthenticated()
+    view = SimpleNamespace(action=action, throttle_budgets=budgets)
+    waits = [
+        throttle.wait()
+        for throttle in (cls() for cls in api_settings.DEFAULT_THROTTLE_CLASSES)
+        if not throttle.allow_request(drf_request, view)
+    ]
+    if waits:
+        raise Throttled(max((wait for wait in waits if wait is not None), default=None))
+    return drf_request.user
+
+
+def endpoint(methods, budgets=None):
+    """Authenticate, throttle and turn API errors into JSON responses, as DRF would."""
+    def decorate(func):
+        @csrf_exempt
+        @functools.wraps(func)
+        async def view(request, *args, **kwargs):
+            if request.method not in methods:
+                return _json({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+            try:
+                request.user = await sync_to_async(_authenticate_and_throttle)(request, func.__name__, budgets or {})
+                return await func(request, *args, **kwargs)
+            except APIException as exc:
+                response = _json(exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail},
+                                 status=exc.status_code)
+                if getattr(exc, 'wait', None):
+                    response['Retry-After'] = str(math.ceil(exc.wait))
+                return response
+            except DjangoValidationError as exc:
+                return _json({'detail': exc.messages}, status=400)
+        return view
+    return decorate
+
+
+def _row(values):
+    # Money as strings, the way the API's DecimalFields render it
+    return {key: str(value) if isinstance(value, Decimal) else value for key, value in values.items()}
+
+
+def _body(request):
+    return ORJSONParser().parse(io.BytesIO(request.body)) if request.body else {}
+
+
+# ----------------------------
+# Hot reads
+# ----------------------------
+
+@endpoint(('GET',))
+async def product_lookup(request):
+    """A product by ``barcode`` or ``sku`` with its stock per store."""
+    lookup = {field: request.GET[field] for field in ('barcode', 'sku') if request.GET.get(field)}
+    if not lookup:
+        raise ValidationError({'detail': "Pass barcode or sku."})
+    tenant_id = request.user.tenant_id
+    product = await Product.objects.filter(tenant_id=tenant_id, **lookup).values(
+        'id', 'name', 'sku', 'barcode', 'price', 'is_discounted', 'discount_percent',
+    ).afirst()
+    if product is None:
+        raise NotFound()
+    product = _row(product)
+    product['stock'] = [
+        row async for row in Inventory.objects.filter(tenant_id=tenant_id, product_id=product['id'])
+        .order_by('store_id').values('store_id', 'quantity')
+    ]
+    return _json(product)
+
+
+@endpoint(('GET',))
+async def sale_detail(request, pk):
+    sale = await Sale.objects.filter(pk=pk, tenant_id=request.user.tenant_id).values(
+        'id', 'store_id', 'user_id', 'customer_id', 'shift_id', 'total_amount', 'date',
+    ).afirst()
+    if sale is None:
+        raise NotFound()
+    sale = _row(sale)
+    items, payments = await asyncio.gather(
+        _collect(OrderItem.objects.filter(sale_id=pk).order_by('pk').values(
+            'id', 'product_id', 'service_id', 'quantity', 'refunded_quantity', 'price',
+        )),
+        _collect(Payment.objects.filter(sale_id=pk).order_by('pk').values('id', 'method', 'amount', 'reference', 'date')),
+    )
+    sale['items'] = items
+    sale['payments'] = payments
+    return _json(sale)
+
+
+async def _collect(queryset):
+    return [_row(row) async for row in queryset]
+
+
+@endpoint(('GET',))
+async def job_wait(request, pk):
+    """Long-poll: answer once the job has finished, or after ``timeout`` seconds (at most 60)."""
+    try:
+        timeout = min(max(float(request.GET.get('timeout', 25)), 0), 60)
+    except ValueError:
+        raise ValidationError({'timeout': "A number of seconds."})
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    jobs = Job.objects.filter(pk=pk, tenant_id=request.user.tenant_id).values(
+        'id', 'task', 'status', 'attempts', 'result', 'last_error', 'finished_at',
+    )
+    while True:
+        job = await jobs.afirst()
+        if job is None:
+            raise NotFound()
+        if job['status'] not in ('queued', 'running') or loop.time() >= deadline:
+            return _json(job)
+        await asyncio.sleep(JOB_POLL_SECONDS)
+
+
+@endpoint(('GET',))
+async def inventory_export(request):
+    """The tenant's stock ledger as CSV, streamed in chunks (``start``, ``end``, ``store`` filters)."""
+    rows = InventoryTransaction.objects.filter(tenant_id=request.user.tenant_id)
+    for param, lookup in (('start', 'timestamp__gte'), ('end', 'timestamp__lt'), ('store', 'inventory__store_id')):
+        if request.GET.get(param):
+            rows = rows.filter(**{lookup: request.GET[param]})
+    columns = ('id', 'timestamp', 'inventory__store_id', 'inventory__product__sku', 'transaction_type', 'quantity', 'notes')
+    # values() rather than values_list(): the latter's iterator opens its cursor on the event loop
+    rows = rows.order_by('pk').values(*columns)
+
+    async def content():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['id', 'timestamp', 'store', 'sku', 'type', 'quantity', 'notes'])
+        async for row in rows.aiterator(chunk_size=2000):
+            writer.writerow(row.values())
+            if buffer.tell() >= EXPORT_CHUNK_BYTES:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    response = StreamingHttpResponse(content(), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="inventory-transactions.csv"'
+    return response
+
+
+# ----------------------------
+# Provider top-ups
+# ----------------------------
+
+async def _virtual_products(tenant_id, pks):
+    found = {
+        vp.pk: vp async for vp in VirtualProduct.objects.select_related('product').filter(
+            pk__in=set(pks), product__tenant_id=tenant_id,
+        )
+    }
+    missing = set(pks) - set(found)
+    if missing:
+        raise NotFound(f"Unknown virtual product(s): {', '.join(map(str, sorted(missing)))}.")
+    return found
+
+
+async def _sales(tenant_id, pks):
+    pks = {pk for pk in pks if pk is not None}
+    if not pks:
+        return {}
+    found = {sale.pk: sale async for sale in Sale.objects.filter(pk__in=pks, tenant_id=tenant_id)}
+    if pks - set(found):
+        raise NotFound("Unknown sale.")
+    return found
+
+
+@endpoint(('POST',))
+async def top_up(request):
+    params = TopUpRequestSerializer(data=_body(request))
+    params.is_valid(raise_exception=True)
+    data = params.validated_data
+    virtual_products = await _virtual_products(request.user.tenant_id, [data['virtual_product']])
+    sales = await _sales(request.user.tenant_id, [data.get('sale')])
+    result = await providers.top_up(
+        virtual_products[data['virtual_product']],
+        data['recipient'],
+        amount=data.get('amount'),
+        user=request.user,
+        sale=sales.get(data.get('sale')),
+        reference=data.get('reference'),
+    )
+    return _json(TopUpSerializer(result).data, status=201 if result.status != 'failed' else 502)
+
+
+@endpoint(('POST',), budgets={'top_up_batch': 'bulk'})
+async def top_up_batch(request):
+    """Several top-ups at once, sent concurrently within each provider's limit."""
+    params = TopUpBatchSerializer(data=_body(request))
+    params.is_valid(raise_exception=True)
+    entries = params.validated_data['top_ups']
+    virtual_products = await _virtual_products(request.user.tenant_id, [entry['virtual_product'] for entry in entries])
+    sales = await _sales(request.user.tenant_id, [entry.get('sale') for entry in entries])
+    results = await providers.fan_out(
+        [
+            {
+                'virtual_product': virtual_products[entry['virtual_product']],
+                'recipient': entry['recipient'],
+                'amount': entry.get('amount'),
+                'sale': sales.get(entry.get('sale')),
+                'reference': entry.get('reference'),
+            }
+            for entry in entries
+        ],
+        user=request.user,
+    )
+    return _json([
+        {'error': result.messages} if isinstance(result, DjangoValidationError) else TopUpSerializer(result).data
+        for result in results
+    ])
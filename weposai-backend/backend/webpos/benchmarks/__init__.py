@@ -0,0 +1,8 @@
+"""
+Benchmark suite for the API hot paths.
+
+``data`` generates a synthetic dataset (``manage.py bench_seed``);
+``scenarios`` describes the workloads; ``runner`` drives them through the
+Django test client or against a running server and writes JSON results
+(``manage.py bench_run``) that can be compared between runs.
+"""
@@ -0,0 +1,70 @@
+"""
+Load a running server at increasing concurrency levels.
+
+Where ``runner`` measures the cost of each endpoint, this measures how a
+deployment holds up as connections pile up: for every level, that many
+clients on one asyncio loop send requests back to back for ``duration``
+seconds. Run it against the same code served both ways to see what the async
+endpoints buy for I/O-bound work, e.g. a top-up batch against a slow
+``mock_provider``::
+
+    gunicorn backend.wsgi -w 4 --threads 8 -b :8000
+    uvicorn backend.asgi:application --workers 4 --port 8001
+
+    manage.py bench_concurrency --url http://127.0.0.1:8000 --path /api/api/v1/async/top-ups/batch/ ...
+    manage.py bench_concurrency --url http://127.0.0.1:8001 --path /api/api/v1/async/top-ups/batch/ ...
+
+Each level reports p50/p95/p99 latency, requests per second and errors
+(HTTP status 400 and above, timeouts and refused connections).
+"""
+import asyncio
+import time
+
+import numpy as np
+
+from ..services.providers import ProviderError, http_json
+
+
+async def _level(url, method, body, headers, clients, duration, timeout):
+    durations, errors = [], 0
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+
+    async def client():
+        nonlocal errors
+        while loop.time() < deadline:
+            start = time.perf_counter()
+            try:
+                status, _ = await http_json(method, url, body, headers, timeout=timeout)
+            except (asyncio.TimeoutError, OSError, ProviderError):
+                status = None
+            durations.append(time.perf_counter() - start)
+            if status is None or status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    wall = time.perf_counter() - started
+    ms = np.array(durations) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]).tolist() if len(ms) else (None, None, None)
+    return {
+        'concurrency': clients,
+        'requests': len(durations),
+        'errors': errors,
+        'p50_ms': round(p50, 3) if p50 is not None else None,
+        'p95_ms': round(p95, 3) if p95 is not None else None,
+        'p99_ms': round(p99, 3) if p99 is not None else None,
+        'requests_per_s': round(len(durations) / wall, 2) if wall else None,
+    }
+
+
+def run(url, method='GET', body=None, token=None, levels=(1, 10, 50, 100), duration=10.0, timeout=30.0, log=print):
+    """Load ``url`` at each concurrency in ``levels``; returns one result per level."""
+    headers = {'Authorization': f"Bearer {token}"} if token else {}
+    results = []
+    for clients in levels:
+        result = asyncio.run(_level(url, method, body, headers, clients, duration, timeout))
+        results.append(result)
+        log(f"{clients} clients: p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, "
+            f"{result['requests_per_s']}/s, {result['errors']} errors")
+    return results
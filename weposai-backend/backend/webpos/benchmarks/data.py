@@ -0,0 +1,148 @@
+"""
+Synthetic dataset for benchmarks.
+
+Everything is written with ``bulk_create`` in chunks, so signals do not fire
+and memory stays flat however many sales are requested; the generator is
+seeded, so the same arguments always produce the same data. Rows are tagged
+with the ``bench-`` name prefix so ``clear`` can remove them again.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import (
+    Category, Customer, Inventory, InventoryTransaction, OrderItem,
+    Payment, Product, Sale, Store, Tenant, User,
+)
+
+PREFIX = 'bench-'
+BENCH_PASSWORD = 'bench-password'
+METHODS = ('cash', 'cash', 'cash', 'mobile', 'card')
+
+
+def _chunks(total, size):
+    done = 0
+    while done < total:
+        yield min(size, total - done)
+        done += size
+
+
+def seed(tenants=1, stores=3, products=100_000, customers=5_000, sales=1_000_000, days=365,
+         chunk_size=5_000, seed_value=42, log=print):
+    """Create the dataset and return the row counts written."""
+    rng = random.Random(seed_value)
+    now = timezone.now()
+    counts = dict.fromkeys(('tenants', 'stores', 'products', 'customers', 'sales', 'order_items', 'ledger_rows'), 0)
+
+    for t in range(tenants):
+        with transaction.atomic():
+            tenant = Tenant.objects.create(name=f"{PREFIX}tenant-{t}")
+            store_objs = Store.objects.bulk_create([
+                Store(tenant=tenant, name=f"{PREFIX}store-{t}-{s}", location='Synthetic') for s in range(stores)
+            ])
+            cashiers = []
+            for store in store_objs:
+                cashier = User(username=f"{PREFIX}cashier-{t}-{store.pk}", tenant=tenant, role='cashier', is_staff=True)
+                cashier.set_password(BENCH_PASSWORD)
+                cashiers.append(cashier)
+            User.objects.bulk_create(cashiers)
+            cashiers = list(User.objects.filter(tenant=tenant).order_by('pk'))
+            categories = Category.objects.bulk_create([
+                Category(tenant=tenant, name=f"{PREFIX}category-{c}") for c in range(50)
+            ])
+        counts['tenants'] += 1
+        counts['stores'] += len(store_objs)
+
+        product_rows = []
+        for size in _chunks(products, chunk_size):
+            batch = []
+            for _ in range(size):
+                n = counts['products'] + len(batch)
+                price = Decimal(rng.randint(50, 50_000)) / 100
+                batch.append(Product(
+                    tenant=tenant,
+                    store=store_objs[n % len(store_objs)],
+                    category=categories[n % len(categories)],
+                    name=f"{PREFIX}product-{t}-{n}",
+                    sku=f"{PREFIX}{t}-{n}",
+                    barcode=f"{t:02d}{n:012d}",
+                    price=price,
+                    cost_price=(price * Decimal('0.7')).quantize(Decimal('0.01')),
+                ))
+            with transaction.atomic():
+                Product.objects.bulk_create(batch)
+                Inventory.objects.bulk_create([
+                    Inventory(tenant=tenant, product=p, store_id=p.store_id, quantity=rng.randint(0, 500))
+                    for p in batch
+                ])
+            product_rows.extend(
+                Inventory.objects.filter(product__in=batch).values_list('product_id', 'pk', 'store_id', 'product__price')
+            )
+            counts['products'] += size
+            log(f"tenant {t}: {counts['products']} products")
+
+        customer_ids = []
+        for size in _chunks(customers, chunk_size):
+            created = Customer.objects.bulk_create([
+                Customer(tenant=tenant, name=f"{PREFIX}customer-{t}-{len(customer_ids) + i}") for i in range(size)
+            ])
+            customer_ids.extend(c.pk for c in created)
+            counts['customers'] += size
+
+        by_store = {}
+        for product_id, inventory_id, store_id, price in product_rows:
+            by_store.setdefault(store_id, []).append((product_id, inventory_id, price))
+        cashier_by_store = {store.pk: cashiers[i % len(cashiers)] for i, store in enumerate(store_objs)}
+
+        written = 0
+        for size in _chunks(sales, chunk_size):
+            sale_objs, lines = [], []
+            for _ in range(size):
+                store = store_objs[rng.randrange(len(store_objs))]
+                picks = rng.sample(by_store[store.pk], k=min(rng.randint(1, 5), len(by_store[store.pk])))
+                quantities = [rng.randint(1, 3) for _ in picks]
+                sale_objs.append(Sale(
+                    tenant=tenant,
+                    store=store,
+                    user=cashier_by_store[store.pk],
+                    customer_id=rng.choice(customer_ids) if customer_ids and rng.random() < 0.3 else None,
+                    total_amount=sum((price * q for (_, _, price), q in zip(picks, quantities)), Decimal(0)),
+                    date=now - timedelta(seconds=rng.randint(0, days * 86400)),
+                ))
+                lines.append(list(zip(picks, quantities)))
+            with transaction.atomic():
+                Sale.objects.bulk_create(sale_objs)
+                items, payments, ledger = [], [], []
+                for sale, sale_lines in zip(sale_objs, lines):
+                    for (product_id, inventory_id, price), quantity in sale_lines:
+                        items.append(OrderItem(sale=sale, product_id=product_id, quantity=quantity, price=price))
+                        ledger.append(InventoryTransaction(
+                            tenant=tenant, inventory_id=inventory_id, transaction_type='sale',
+                            quantity=-quantity, notes=f"Sale #{sale.pk}",
+                        ))
+                    payments.append(Payment(
+                        tenant=tenant, sale=sale, method=rng.choice(METHODS), amount=sale.total_amount,
+                    ))
+                OrderItem.objects.bulk_create(items)
+                Payment.objects.bulk_create(payments)
+                created = InventoryTransaction.objects.bulk_create(ledger)
+                # auto_now_add stamps "now"; spread the chunk over the sales' period instead.
+                InventoryTransaction.objects.filter(pk__in=[row.pk for row in created]).update(
+                    timestamp=sale_objs[len(sale_objs) // 2].date,
+                )
+            written += size
+            counts['sales'] += size
+            counts['order_items'] += len(items)
+            counts['ledger_rows'] += len(ledger)
+            log(f"tenant {t}: {written} sales")
+    return counts
+
+
+def clear(log=print):
+    """Delete every benchmark tenant and all of its rows."""
+    for tenant in Tenant.objects.filter(name__startswith=PREFIX):
+        log(f"deleting {tenant.name}")
+        tenant.delete()
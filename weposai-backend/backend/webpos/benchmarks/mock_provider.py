@@ -0,0 +1,109 @@
+"""
+A local stand-in for a top-up provider.
+
+Answers ``POST`` requests with ``{"status": "ok", "reference": ...}`` after
+``latency`` seconds, or with a 502 ``{"status": "error"}`` for a
+``failure_rate`` share of them. A reference it has already accepted gets
+the same answer again, as a real provider's idempotency would. Run it with
+``manage.py mock_provider`` for load tests, or in process with
+``MockProvider`` (a background thread) in scripts; ``max_in_flight`` shows
+how many calls overlapped, which is what the per-provider concurrency limit
+is meant to bound.
+"""
+import asyncio
+import json
+import random
+import threading
+
+
+class MockProvider:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.2, failure_rate=0.0, seed=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.accepted = {}
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/topup"
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.strip().lower() == 'content-length':
+                    length = int(value)
+            body = json.loads(await reader.readexactly(length) or b'{}')
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                await asyncio.sleep(self.latency)
+            finally:
+                self.in_flight -= 1
+
+            reference = body.get('reference')
+            if reference in self.accepted:
+                status, answer = 200, self.accepted[reference]
+            elif self.rng.random() < self.failure_rate:
+                status, answer = 502, {'status': 'error', 'error': 'Provider declined the top-up'}
+            else:
+                status, answer = 200, {'status': 'ok', 'reference': f"MOCK-{len(self.accepted) + 1:08d}"}
+                self.accepted[reference] = answer
+            payload = json.dumps(answer).encode()
+            writer.write(
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Bad Gateway'}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+                f"Connection: close\r\n\r\n".encode() + payload
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self):
+        self._server = await asyncio.start_server(self.handle, self.host, self.port, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+
+    def serve_forever(self):
+        async def main():
+            server = await self.serve()
+            async with server:
+                await server.serve_forever()
+
+        asyncio.run(main())
+
+    # In-process use: ``with MockProvider(latency=0.05) as provider: ... provider.url``
+    def __enter__(self):
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.serve())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._loop.call_soon_threadsafe(self._server.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
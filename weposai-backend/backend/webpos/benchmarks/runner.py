@@ -0,0 +1,213 @@
+"""
+Run benchmark scenarios and record the results.
+
+Two transports:
+
+* ``ClientTransport`` calls the API in process through DRF's ``APIClient``
+  (authenticated with ``force_authenticate``) and counts the SQL each
+  request issues, reading streamed bodies to the end.
+* ``HttpTransport`` talks to a running server over HTTP with a JWT for the
+  benchmark cashier; query counts are not visible from outside and are
+  reported as ``null``. ``concurrency`` threads share the load.
+
+Both return the status code and the decoded JSON body (``None`` for other
+content). Each scenario is warmed up, then timed call by call. Results carry the
+p50/p95/p99 and mean latency in milliseconds, throughput, error count and
+queries per request, plus enough metadata (git revision, dataset size) to
+compare runs; ``compare`` flags scenarios whose p95 got worse.
+"""
+import gzip
+import json
+import platform
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..models import InventoryTransaction, Product, Sale
+from .scenarios import SCENARIOS, Context
+
+
+async def _drain(chunks):
+    return b''.join([chunk async for chunk in chunks])
+
+
+def _decode(content_type, body):
+    return json.loads(body) if content_type.startswith('application/json') and body else None
+
+
+class ClientTransport:
+    name = 'client'
+
+    def __init__(self, user):
+        from rest_framework.test import APIClient
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+        self.queries = 0
+        self.errors = 0
+
+    def request(self, method, path, data=None):
+        response = self.client.generic(
+            method, path, json.dumps(data) if data is not None else '', content_type='application/json',
+        )
+        if response.status_code >= 400:
+            self.errors += 1
+        if not response.streaming:
+            body = response.content
+        elif response.is_async:
+            body = async_to_sync(_drain)(response.streaming_content)
+        else:
+            body = b''.join(response.streaming_content)
+        return response.status_code, _decode(response.get('Content-Type', ''), body)
+
+    def measure_queries(self, func):
+        """Run one scenario step, counting every statement it issues."""
+        with CaptureQueriesContext(connection) as captured:
+            func()
+        self.queries += len(captured.captured_queries)
+
+
+class HttpTransport:
+    name = 'http'
+
+    def __init__(self, base_url, username, password, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.queries = None
+        self.errors = 0
+        self._lock = threading.Lock()
+        body = json.dumps({'username': username, 'password': password}).encode()
+        request = urllib.request.Request(
+            f"{self.base_url}/auth/jwt/create/", data=body, headers={'Content-Type': 'application/json'},
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            self.token = json.loads(response.read())['access']
+
+    def request(self, method, path, data=None):
+        request = urllib.request.Request(
+            f"{self.base_url}{path}",
+            data=json.dumps(data).encode() if data is not None else None,
+            method=method,
+            headers={
+                'Authorization': f"Bearer {self.token}",
+                'Content-Type': 'application/json',
+                'Accept-Encoding': 'gzip',
+            },
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = response.read()
+                if response.headers.get('Content-Encoding') == 'gzip':
+                    body = gzip.decompress(body)
+                return response.status, _decode(response.headers.get('Content-Type', ''), body)
+        except urllib.error.HTTPError as exc:
+            with self._lock:
+                self.errors += 1
+            return exc.code, None
+
+    def measure_queries(self, func):
+        func()
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _summarise(durations, wall, transport, errors_before, queries_before, calls):
+    ms = np.array(durations) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]).tolist()
+    queries = None if transport.queries is None else (transport.queries - queries_before) / calls
+    return {
+        'calls': calls,
+        'errors': transport.errors - errors_before,
+        'p50_ms': round(p50, 3),
+        'p95_ms': round(p95, 3),
+        'p99_ms': round(p99, 3),
+        'mean_ms': round(float(ms.mean()), 3),
+        'throughput_per_s': round(calls / wall, 2) if wall else None,
+        'queries_per_call': round(queries, 2) if queries is not None else None,
+    }
+
+
+def run_scenario(ctx, name, iterations, warmup=5, concurrency=1):
+    step, transports = SCENARIOS[name]
+    transport = ctx.transport
+    if transport.name not in transports:
+        return None
+    for _ in range(warmup):
+        transport.measure_queries(lambda: step(ctx))
+
+    errors_before = transport.errors
+    queries_before = transport.queries
+    durations = []
+
+    def timed(_):
+        start = time.perf_counter()
+        transport.measure_queries(lambda: step(ctx))
+        return time.perf_counter() - start
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            durations = list(pool.map(timed, range(iterations)))
+    else:
+        durations = [timed(i) for i in range(iterations)]
+    wall = time.perf_counter() - started
+    return _summarise(durations, wall, transport, errors_before, queries_before, iterations)
+
+
+def run(transport, tenant, user, scenarios=None, iterations=200, warmup=5, concurrency=1, log=print):
+    """Run ``scenarios`` (all by default) and return the result document."""
+    ctx = Context(transport, tenant, user)
+    results = {}
+    for name in scenarios or SCENARIOS:
+        summary = run_scenario(ctx, name, iterations, warmup=warmup, concurrency=concurrency)
+        if summary is None:
+            log(f"{name}: skipped on the {transport.name} transport")
+            continue
+        results[name] = summary
+        log(f"{name}: p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, "
+            f"{summary['throughput_per_s']}/s, {summary['queries_per_call']} queries/call")
+    return {
+        'meta': {
+            'started_at': timezone.now().isoformat(),
+            'revision': _git_revision(),
+            'transport': transport.name,
+            'iterations': iterations,
+            'concurrency': concurrency,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'dataset': {
+                'products': Product.objects.filter(tenant=tenant).count(),
+                'sales': Sale.objects.filter(tenant=tenant).count(),
+                'ledger_rows': InventoryTransaction.objects.filter(tenant=tenant).count(),
+            },
+        },
+        'scenarios': results,
+    }
+
+
+def compare(current, baseline, tolerance=0.10):
+    """Scenarios whose p95 grew by more than ``tolerance`` against ``baseline``."""
+    regressions = {}
+    for name, result in current['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if before and before['p95_ms'] and result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions[name] = {'baseline_p95_ms': before['p95_ms'], 'p95_ms': result['p95_ms']}
+    return regressions
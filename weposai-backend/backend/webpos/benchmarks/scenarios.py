@@ -0,0 +1,93 @@
+"""
+Benchmark workloads.
+
+A scenario is a callable ``step(ctx)`` that issues one logical operation and
+returns nothing; the runner times each call. Scenarios go through
+``ctx.request`` and therefore run on either transport. ``checkout`` rings up
+a sale and pays it the way a till does, restocking the line first when the
+store has run out.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from ..models import Inventory, Sale
+
+
+class Context:
+    """What a scenario can use: the transport, the tenant's ids and a seeded RNG."""
+
+    def __init__(self, transport, tenant, user, seed=7):
+        self.transport = transport
+        self.tenant = tenant
+        self.user = user
+        self.rng = random.Random(seed)
+        self.inventory = list(
+            Inventory.objects.filter(tenant=tenant).order_by('pk').values_list('pk', 'product_id', 'store_id')[:20_000]
+        )
+        self.sale_ids = list(Sale.objects.filter(tenant=tenant).order_by('-pk').values_list('pk', flat=True)[:5_000])
+
+    def request(self, method, path, data=None):
+        return self.transport.request(method, path, data)
+
+
+def scan(ctx):
+    _, product_id, _ = ctx.rng.choice(ctx.inventory)
+    ctx.request('GET', f'/api/api/v1/products/{product_id}/')
+
+
+def list_sales(ctx):
+    ctx.request('GET', f'/api/api/v1/sales/?page={ctx.rng.randint(1, 20)}')
+
+
+def sale_detail(ctx):
+    ctx.request('GET', f'/api/api/v1/sales/{ctx.rng.choice(ctx.sale_ids)}/')
+
+
+def dashboard(ctx):
+    end = timezone.now()
+    start = end - timedelta(days=30)
+    ctx.request('GET', f'/api/api/v1/valuation/gross-margin/?start={start:%Y-%m-%dT%H:%M:%S}&end={end:%Y-%m-%dT%H:%M:%S}&group_by=day')
+    ctx.request('GET', '/api/api/v1/accounts/trial-balance/')
+
+
+def reference_data(ctx):
+    for path in ('/api/api/v1/stores/', '/api/api/v1/taxes/', '/api/api/v1/promotions/'):
+        ctx.request('GET', path)
+
+
+def export(ctx):
+    start = timezone.now() - timedelta(days=ctx.rng.randint(1, 30))
+    ctx.request('GET', f'/api/api/v1/async/inventory-transactions/export/?start={start:%Y-%m-%dT%H:%M:%SZ}')
+
+
+def checkout(ctx):
+    inventory_id, product_id, store_id = ctx.rng.choice(ctx.inventory)
+    sale = {'store': store_id, 'lines': [{'product': product_id, 'quantity': ctx.rng.randint(1, 3)}]}
+    status, body = ctx.request('POST', '/api/api/v1/sales/', sale)
+    if status == 400:
+        # Out of stock: take a delivery and ring it up again
+        ctx.request('POST', '/api/api/v1/inventory-batches/', {'inventory': inventory_id, 'quantity': 100})
+        status, body = ctx.request('POST', '/api/api/v1/sales/', sale)
+    if status != 201:
+        return
+    ctx.request('POST', '/api/api/v1/payments/', {
+        'tenant': ctx.tenant.pk,
+        'sale': body['id'],
+        'method': 'cash',
+        'amount': str(Decimal(body['total_amount']) or Decimal('0.01')),
+        'created_by': ctx.user.pk,
+    })
+
+
+SCENARIOS = {
+    'scan': (scan, {'client', 'http'}),
+    'checkout': (checkout, {'client', 'http'}),
+    'list_sales': (list_sales, {'client', 'http'}),
+    'sale_detail': (sale_detail, {'client', 'http'}),
+    'dashboard': (dashboard, {'client', 'http'}),
+    'reference_data': (reference_data, {'client', 'http'}),
+    'export': (export, {'client', 'http'}),
+}
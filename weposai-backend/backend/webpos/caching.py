@@ -0,0 +1,131 @@
+"""
+Per-tenant response cache for read-mostly reference endpoints.
+
+``CachedResponseMixin`` keeps the serialized ``list`` / ``retrieve`` payload
+of a viewset in the ``RESPONSE_CACHE_ALIAS`` cache (local memory by default,
+see ``CACHES`` in settings), keyed by resource, tenant, path, query string
+and response format, so a hit skips both the queries and the serializer.
+
+Invalidation is by generation: every key embeds the current generation of
+its ``(resource, tenant)`` pair, read from ``RESPONSE_CACHE_VERSION_ALIAS``,
+and saving or deleting a row of a cached model bumps only that pair (see
+``webpos.signals``). Old entries are never read again and age out. With
+several server processes the version alias must point at a shared store
+(file or Redis) so that a write in one process is seen by the others; the
+payloads themselves can stay in each process's memory.
+
+Hits and misses are counted per resource in process; ``stats()`` reports
+them with the hit rate.
+"""
+import hashlib
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+# Tenant slot of resources cached once for all tenants
+GLOBAL = '*'
+
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_stats_lock = threading.Lock()
+
+
+def _data_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _version_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_VERSION_ALIAS', 'default')]
+
+
+def _generation_key(resource, tenant_id):
+    return f"rc:gen:{resource}:{tenant_id}"
+
+
+def generation(resource, tenant_id):
+    cache = _version_cache()
+    key = _generation_key(resource, tenant_id)
+    value = cache.get(key)
+    if value is None:
+        # Seeded from the clock, so a generation lost to eviction never repeats an old one.
+        cache.add(key, time.time_ns(), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+def invalidate(resource, tenant_id):
+    """Drop every cached response of ``resource`` for one tenant."""
+    cache = _version_cache()
+    key = _generation_key(resource, tenant_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def _record(resource, hit):
+    with _stats_lock:
+        _stats[resource]['hits' if hit else 'misses'] += 1
+
+
+def stats():
+    """Hits, misses and hit rate per resource since the process started."""
+    with _stats_lock:
+        snapshot = {resource: dict(counts) for resource, counts in _stats.items()}
+    for counts in snapshot.values():
+        total = counts['hits'] + counts['misses']
+        counts['hit_rate'] = round(counts['hits'] / total, 4) if total else None
+    return snapshot
+
+
+class CachedResponseMixin:
+    """
+    Serve ``list`` and ``retrieve`` from the response cache.
+
+    Set ``cache_resource`` to the name the invalidation signals use for the
+    viewset's model. Per-tenant resources are also limited to the requesting
+    user's tenant, which is what makes caching them per tenant correct, and
+    are empty for requests without one. ``cache_per_tenant = False`` caches
+    one copy for everybody.
+    """
+    cache_resource = None
+    cache_timeout = None
+    cache_per_tenant = True
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.cache_per_tenant:
+            tenant_id = getattr(self.request.user, 'tenant_id', None)
+            # Anonymous users and users without a tenant see nothing
+            qs = qs.filter(tenant_id=tenant_id) if tenant_id is not None else qs.none()
+        return qs
+
+    def _cache_key(self, request):
+        tenant_id = getattr(request.user, 'tenant_id', None) if self.cache_per_tenant else GLOBAL
+        query = '&'.join(f"{key}={value}" for key, value in sorted(request.query_params.lists()))
+        fmt = getattr(getattr(request, 'accepted_renderer', None), 'format', '')
+        digest = hashlib.sha1(f"{request.path}?{query}|{fmt}".encode()).hexdigest()
+        return f"rc:{self.cache_resource}:{tenant_id}:{generation(self.cache_resource, tenant_id)}:{digest}"
+
+    def _cached(self, request, action, *args, **kwargs):
+        key = self._cache_key(request)
+        cache = _data_cache()
+        data = cache.get(key)
+        if data is not None:
+            _record(self.cache_resource, True)
+            return Response(data)
+        _record(self.cache_resource, False)
+        response = action(request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = self.cache_timeout or getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 600)
+            cache.set(key, response.data, timeout)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(request, super().retrieve, *args, **kwargs)
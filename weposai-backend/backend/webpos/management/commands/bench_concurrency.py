@@ -0,0 +1,60 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from webpos.benchmarks import concurrency, data, runner
+from webpos.models import Tenant
+
+
+class Command(BaseCommand):
+    help = (
+        "Load one endpoint of a running server at increasing concurrency as the benchmark cashier; "
+        "compare a WSGI and an ASGI deployment by running it against each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--path', default='/api/api/v1/async/products/lookup/?sku=bench-0-0')
+        parser.add_argument('--method', default='GET')
+        parser.add_argument('--body', help="JSON request body.")
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50, 100])
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds per concurrency level.")
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        tenant = Tenant.objects.filter(name__startswith=data.PREFIX).order_by('pk').first()
+        if tenant is None:
+            raise CommandError("No benchmark data; run bench_seed first.")
+        user = tenant.users.order_by('pk').first()
+        token = runner.HttpTransport(options['url'], user.username, data.BENCH_PASSWORD).token
+        try:
+            body = json.loads(options['body']) if options['body'] else None
+        except ValueError as exc:
+            raise CommandError(f"--body is not valid JSON: {exc}")
+
+        url = options['url'].rstrip('/') + options['path']
+        levels = concurrency.run(
+            url,
+            method=options['method'].upper(),
+            body=body,
+            token=token,
+            levels=options['concurrency'],
+            duration=options['duration'],
+            timeout=options['timeout'],
+            log=self.stdout.write,
+        )
+        if options['output']:
+            results = {
+                'meta': {
+                    'started_at': timezone.now().isoformat(),
+                    'url': url,
+                    'method': options['method'].upper(),
+                    'duration_s': options['duration'],
+                },
+                'levels': levels,
+            }
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Ran {len(levels)} concurrency level(s)."))
@@ -0,0 +1,60 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from webpos.benchmarks import data, runner
+from webpos.benchmarks.scenarios import SCENARIOS
+from webpos.models import Tenant
+
+
+class Command(BaseCommand):
+    help = (
+        "Run benchmark scenarios against the bench_seed dataset, in process (--transport client) "
+        "or against a running server (--transport http --url ...), and write the results as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transport', choices=('client', 'http'), default='client')
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=None)
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--concurrency', type=int, default=1, help="Threads issuing requests (http transport).")
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+        parser.add_argument('--compare', help="Results of an earlier run to compare against.")
+        parser.add_argument('--tolerance', type=float, default=0.10, help="Allowed p95 growth before failing.")
+
+    def handle(self, *args, **options):
+        tenant = Tenant.objects.filter(name__startswith=data.PREFIX).order_by('pk').first()
+        if tenant is None:
+            raise CommandError("No benchmark data; run bench_seed first.")
+        user = tenant.users.order_by('pk').first()
+
+        if options['transport'] == 'http':
+            transport = runner.HttpTransport(options['url'], user.username, data.BENCH_PASSWORD)
+            concurrency = options['concurrency']
+        else:
+            transport = runner.ClientTransport(user)
+            concurrency = 1
+
+        results = runner.run(
+            transport, tenant, user,
+            scenarios=options['scenarios'],
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+            concurrency=concurrency,
+            log=self.stdout.write,
+        )
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+        if options['compare']:
+            with open(options['compare']) as fh:
+                baseline = json.load(fh)
+            regressions = runner.compare(results, baseline, tolerance=options['tolerance'])
+            for name, change in regressions.items():
+                self.stderr.write(f"{name}: p95 {change['baseline_p95_ms']} ms -> {change['p95_ms']} ms")
+            if regressions:
+                raise CommandError(f"{len(regressions)} scenario(s) regressed.")
+        self.stdout.write(self.style.SUCCESS(f"Ran {len(results['scenarios'])} scenario(s)."))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from webpos.benchmarks import data
+
+
+class Command(BaseCommand):
+    help = "Generate (or with --clear, remove) the synthetic benchmark dataset."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenants', type=int, default=1)
+        parser.add_argument('--stores', type=int, default=3)
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--customers', type=int, default=5_000)
+        parser.add_argument('--sales', type=int, default=1_000_000)
+        parser.add_argument('--days', type=int, default=365, help="Spread sales over this many days.")
+        parser.add_argument('--chunk-size', type=int, default=5_000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true', help="Delete the benchmark tenants instead.")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            data.clear(log=self.stdout.write)
+            self.stdout.write(self.style.SUCCESS("Benchmark data removed."))
+            return
+        counts = data.seed(
+            tenants=options['tenants'],
+            stores=options['stores'],
+            products=options['products'],
+            customers=options['customers'],
+            sales=options['sales'],
+            days=options['days'],
+            chunk_size=options['chunk_size'],
+            seed_value=options['seed'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(', '.join(f"{value} {key}" for key, value in counts.items())))
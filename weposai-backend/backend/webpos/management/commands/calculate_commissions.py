@@ -0,0 +1,33 @@
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from webpos.models import Tenant
+from webpos.services.commissions import calculate_commissions, settle_period
+
+
+class Command(BaseCommand):
+    help = "Evaluate commission rules over a pay period and optionally settle it."
+
+    def add_arguments(self, parser):
+        parser.add_argument('start', type=date.fromisoformat, help="First day of the period (YYYY-MM-DD).")
+        parser.add_argument('end', type=date.fromisoformat, help="Last day of the period (YYYY-MM-DD).")
+        parser.add_argument('--tenant', type=int, help="Only run for this tenant id.")
+        parser.add_argument('--settle', action='store_true', help="Settle the period after calculating.")
+
+    def handle(self, *args, **options):
+        if options['end'] < options['start']:
+            raise CommandError("The period must end on or after its start.")
+        tenants = Tenant.objects.order_by('pk')
+        if options['tenant']:
+            tenants = tenants.filter(pk=options['tenant'])
+        for tenant in tenants:
+            written = calculate_commissions(tenant, options['start'], options['end'])
+            self.stdout.write(f"{tenant}: {written} commission(s) calculated.")
+            if options['settle']:
+                try:
+                    settlements = settle_period(tenant, options['start'], options['end'])
+                except ValidationError as exc:
+                    raise CommandError(exc.messages[0])
+                self.stdout.write(f"{tenant}: settled {len(settlements)} user(s).")
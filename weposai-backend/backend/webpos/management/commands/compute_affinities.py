@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from webpos import routing
+from webpos.models import Tenant
+from webpos.services.affinity import compute_affinities
+
+
+class Command(BaseCommand):
+    help = "Recompute the products bought together with each product, per tenant (run nightly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help="Only this tenant id.")
+        parser.add_argument('--since-days', type=int, default=365, help="Baskets of the last N days (0 for all).")
+        parser.add_argument('--top-k', type=int, default=10)
+        parser.add_argument('--min-baskets', type=int, default=3)
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.order_by('pk')
+        if options['tenant']:
+            tenants = tenants.filter(pk=options['tenant'])
+        for tenant in tenants:
+            with routing.tenant(tenant.pk):
+                written = compute_affinities(
+                    tenant.pk,
+                    since_days=options['since_days'],
+                    top_k=options['top_k'],
+                    min_baskets=options['min_baskets'],
+                )
+            self.stdout.write(f"{tenant}: {written} affinities.")
+        self.stdout.write(self.style.SUCCESS("Product affinities updated."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from webpos.services import outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver outbox events to webhook endpoints, in signed batches with retries."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit when nothing is left to send.")
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        try:
+            outbox.work(once=options['once'], poll_interval=options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("Dispatcher stopped."))
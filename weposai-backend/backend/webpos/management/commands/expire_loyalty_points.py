@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from webpos.services.loyalty import expire_points
+
+
+class Command(BaseCommand):
+    help = "Expire unredeemed loyalty points whose lots have passed their expiry date."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        expired = expire_points(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} point(s)."))
@@ -0,0 +1,35 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from webpos.models import VirtualProduct
+from webpos.services.pins import expire_pins, import_codes
+
+
+class Command(BaseCommand):
+    help = (
+        "Import PINs for a virtual product from a CSV file with a 'code' column "
+        "and an optional 'serial' column, then retire expired PINs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('virtual_product', type=int)
+        parser.add_argument('path')
+        parser.add_argument('--batch-reference', default='')
+
+    def handle(self, *args, **options):
+        try:
+            virtual_product = VirtualProduct.objects.select_related('product').get(pk=options['virtual_product'])
+        except VirtualProduct.DoesNotExist:
+            raise CommandError(f"Virtual product #{options['virtual_product']} does not exist.")
+        with open(options['path'], newline='') as fh:
+            reader = csv.DictReader(fh)
+            if 'code' not in (reader.fieldnames or []):
+                raise CommandError("The file needs a 'code' column.")
+            imported = import_codes(
+                virtual_product,
+                ((row.get('serial') or '', row['code']) for row in reader),
+                batch_reference=options['batch_reference'] or options['path'],
+            )
+        expired = expire_pins()
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} PIN(s); retired {expired} expired PIN(s)."))
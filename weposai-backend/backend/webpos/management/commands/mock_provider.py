@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from webpos.benchmarks.mock_provider import MockProvider
+
+
+class Command(BaseCommand):
+    help = "Serve a mock top-up provider for local testing and load tests."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8900)
+        parser.add_argument('--latency-ms', type=float, default=200)
+        parser.add_argument('--failure-rate', type=float, default=0.0)
+
+    def handle(self, *args, **options):
+        provider = MockProvider(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency_ms'] / 1000,
+            failure_rate=options['failure_rate'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Mock provider on {provider.url}"))
+        try:
+            provider.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,35 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from webpos.services import shards
+
+
+class Command(BaseCommand):
+    help = (
+        "Move a tenant's rows to another database in chunks and point the shard map at it. "
+        "The tenant's writes are refused while the copy runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('tenant', type=int)
+        parser.add_argument('target', help="Database alias to move the tenant to.")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--delete-source', action='store_true', help="Delete the rows from the old shard afterwards.")
+        parser.add_argument(
+            '--settle-seconds', type=float, default=None,
+            help="Wait for other processes to reload the shard map (default SHARD_MAP_CACHE_SECONDS).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            copied = shards.move_tenant(
+                options['tenant'],
+                options['target'],
+                chunk_size=options['chunk_size'],
+                delete_source=options['delete_source'],
+                settle_seconds=options['settle_seconds'],
+                log=self.stdout.write,
+            )
+        except ValidationError as exc:
+            raise CommandError(' '.join(exc.messages))
+        self.stdout.write(self.style.SUCCESS(f"Copied {sum(copied.values())} rows in {len(copied)} tables."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from webpos.services.accounting import post_all
+
+
+class Command(BaseCommand):
+    help = "Post queued sales, payments, refunds, purchases and delivery fees to the journal."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        posted = post_all(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Posted {posted} document(s)."))
@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from webpos.services.transfers import find_orphaned_legs
+
+
+class Command(BaseCommand):
+    help = "Report transfer ledger legs that are unpaired, incomplete or stuck in transit."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help="Only check this tenant id.")
+        parser.add_argument('--stale-days', type=int, default=3, help="Days in transit before a transfer is reported.")
+
+    def handle(self, *args, **options):
+        report = find_orphaned_legs(
+            tenant=options['tenant'],
+            stale_after=timedelta(days=options['stale_days']),
+        )
+        problems = 0
+        for leg in report['unpaired'].only('pk', 'inventory_id', 'transaction_type', 'quantity', 'timestamp'):
+            problems += 1
+            self.stdout.write(
+                f"unpaired {leg.transaction_type} #{leg.pk}: inventory {leg.inventory_id}, "
+                f"qty {leg.quantity} at {leg.timestamp:%Y-%m-%d %H:%M}"
+            )
+        for transfer in report['incomplete']:
+            problems += 1
+            self.stdout.write(
+                f"incomplete transfer #{transfer.pk} ({transfer.status}): {transfer.line_count} lines, "
+                f"{transfer.out_legs} out legs, {transfer.in_legs} in legs"
+            )
+        for transfer in report['stale']:
+            problems += 1
+            self.stdout.write(f"stale transfer #{transfer.pk}: in transit since {transfer.dispatched_at:%Y-%m-%d}")
+
+        if problems:
+            self.stdout.write(self.style.WARNING(f"{problems} problem(s) found."))
+        else:
+            self.stdout.write(self.style.SUCCESS("All transfer legs reconcile."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from webpos.services.receipts import render_pending
+
+
+class Command(BaseCommand):
+    help = "Build receipt PDFs that are still pending (e.g. left queued when a worker process exited)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500)
+
+    def handle(self, *args, **options):
+        built = render_pending(limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f"Built {built} receipt PDF(s)."))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from webpos.models import Tenant
+from webpos.services import forecasting
+
+
+class Command(BaseCommand):
+    help = "Classify SKUs per store (ABC/XYZ) and forecast their daily demand, for every tenant (run nightly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help="Only this tenant id.")
+        parser.add_argument('--workers', type=int, default=1, help="Processes; each takes one tenant at a time.")
+        parser.add_argument('--history-days', type=int, default=91)
+        parser.add_argument('--horizon', type=int, default=14, help="Days ahead to forecast.")
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.order_by('pk')
+        if options['tenant']:
+            tenants = tenants.filter(pk=options['tenant'])
+        tenant_ids = list(tenants.values_list('pk', flat=True))
+        forecasting.run_all(
+            tenant_ids,
+            workers=options['workers'],
+            log=self.stdout.write,
+            history_days=options['history_days'],
+            horizon=options['horizon'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Forecasts updated for {len(tenant_ids)} tenant(s)."))
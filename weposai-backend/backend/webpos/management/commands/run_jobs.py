@@ -0,0 +1,51 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from webpos.services import jobs
+
+
+def _worker(index, once, poll_interval, max_jobs):
+    connections.close_all()
+    jobs.work(worker=f"{jobs.worker_name()}/{index}", once=once, poll_interval=poll_interval, max_jobs=max_jobs)
+
+
+class Command(BaseCommand):
+    help = "Run background job workers. With --workers above 1, each worker is a separate process."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty.")
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--max-jobs', type=int, default=None, help="Exit after running this many jobs.")
+
+    def handle(self, *args, **options):
+        if options['workers'] <= 1:
+            ran = jobs.work(
+                once=options['once'], poll_interval=options['poll_interval'], max_jobs=options['max_jobs'],
+            )
+            self.stdout.write(self.style.SUCCESS(f"Ran {ran} job(s)."))
+            return
+
+        # Workers are forked from this already configured process and must not
+        # inherit its database connections.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(
+                target=_worker,
+                args=(index, options['once'], options['poll_interval'], options['max_jobs']),
+                daemon=True,
+            )
+            for index in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+        self.stdout.write(self.style.SUCCESS(f"{len(processes)} worker(s) stopped."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from webpos.models import Tenant
+from webpos.services.valuation import run_valuation
+
+
+class Command(BaseCommand):
+    help = "Cost new sale lines from purchase history (FIFO or weighted average, per tenant)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help="Only value this tenant id.")
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.order_by('pk')
+        if options['tenant']:
+            tenants = tenants.filter(pk=options['tenant'])
+        for tenant in tenants:
+            costed = run_valuation(tenant)
+            self.stdout.write(f"{tenant}: costed {costed} sale line(s) ({tenant.valuation_method}).")
@@ -0,0 +1,20 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from webpos.services.ledger import take_snapshots
+
+
+class Command(BaseCommand):
+    help = "Record closing inventory quantities for a day (yesterday by default)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help="Day to snapshot, as YYYY-MM-DD.")
+        parser.add_argument('--tenant', type=int, help="Only snapshot this tenant id.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        day = options['date'] or timezone.localdate() - timedelta(days=1)
+        written = take_snapshots(day, tenant=options['tenant'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} snapshot(s) for {day}."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from webpos.services.ledger import ledger_drift
+
+
+class Command(BaseCommand):
+    help = "Recompute inventory quantities from the ledger and report lines that have drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help="Only check this tenant id.")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for inventory_id, quantity, ledger_total in ledger_drift(options['tenant'], options['chunk_size']):
+            drifted += 1
+            self.stdout.write(
+                f"inventory #{inventory_id}: stored {quantity}, ledger {ledger_total} "
+                f"(drift {quantity - ledger_total:+d})"
+            )
+        if drifted:
+            self.stdout.write(self.style.WARNING(f"{drifted} inventory line(s) drifted from the ledger."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Inventory quantities match the ledger."))
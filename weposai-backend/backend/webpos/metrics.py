@@ -0,0 +1,95 @@
+"""
+In-process request metrics in the Prometheus text format.
+
+``PerformanceMiddleware`` feeds one observation per sampled request into
+fixed-bucket histograms labelled by view and method; ``render()`` writes
+them out for the ``/metrics`` endpoint together with the response-cache
+counters. Everything lives in the memory of the serving process, so each
+worker reports its own numbers and the scraper sums them.
+"""
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from . import caching
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HISTOGRAMS = {
+    'webpos_request_duration_seconds': ('Wall time spent in the view stack.', SECONDS_BUCKETS),
+    'webpos_request_db_seconds': ('Time spent executing SQL.', SECONDS_BUCKETS),
+    'webpos_request_queries': ('SQL queries issued.', COUNT_BUCKETS),
+    'webpos_request_duplicate_queries': ('Queries repeating an earlier statement of the same request.', COUNT_BUCKETS),
+    'webpos_response_bytes': ('Response body size.', BYTES_BUCKETS),
+}
+
+_lock = threading.Lock()
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+_histograms = {name: {} for name in HISTOGRAMS}
+_requests = defaultdict(int)
+
+
+def observe(view, method, status, **values):
+    """Record one request; ``values`` are keyed by the histogram names above."""
+    labels = (view, method)
+    with _lock:
+        _requests[(view, method, status)] += 1
+        for name, value in values.items():
+            series = _histograms[name]
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = Histogram(HISTOGRAMS[name][1])
+            histogram.observe(value)
+
+
+def _label_text(**labels):
+    body = ','.join(f'{key}="{str(value).replace(chr(34), chr(39))}"' for key, value in labels.items())
+    return '{' + body + '}'
+
+
+def render():
+    lines = []
+    with _lock:
+        lines.append('# HELP webpos_requests_total Sampled requests.')
+        lines.append('# TYPE webpos_requests_total counter')
+        for (view, method, status), count in sorted(_requests.items()):
+            lines.append(f"webpos_requests_total{_label_text(view=view, method=method, status=status)} {count}")
+
+        for name, (help_text, buckets) in HISTOGRAMS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for (view, method), histogram in sorted(_histograms[name].items()):
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    labels = _label_text(view=view, method=method, le=bound)
+                    lines.append(f"{name}_bucket{labels} {cumulative}")
+                labels = _label_text(view=view, method=method)
+                lines.append(f"{name}_sum{labels} {histogram.total}")
+                lines.append(f"{name}_count{labels} {histogram.count}")
+
+    cache_stats = caching.stats()
+    for kind in ('hits', 'misses'):
+        lines.append(f'# HELP webpos_response_cache_{kind}_total Response cache {kind}.')
+        lines.append(f'# TYPE webpos_response_cache_{kind}_total counter')
+        for resource, counts in sorted(cache_stats.items()):
+            lines.append(f"webpos_response_cache_{kind}_total{_label_text(resource=resource)} {counts[kind]}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,283 @@
+"""
+Request performance instrumentation, database routing scope and response
+compression.
+
+``PerformanceMiddleware`` samples ``PERF_SAMPLE_RATE`` of requests. For a
+sampled request it wraps every database connection with
+``execute_wrapper`` to time each statement and count repeats of the same SQL
+text (the N+1 signature), then records wall time, DB time, query count,
+duplicate count and response size under the view and action that handled
+it (``StoreViewSet.list``). Requests slower than ``PERF_SLOW_REQUEST_MS``
+are logged with their slowest statement and the stack that issued it.
+Unsampled requests pay for one ``random()`` call. Under ASGI the ORM runs
+in a worker thread, out of reach of the wrappers, so async requests record
+wall time and size only.
+
+``RoutingMiddleware`` exposes the request to ``webpos.routing`` so queries
+reach the user's tenant shard, and replicas serve safe requests; streaming
+bodies are produced inside the same scope.
+
+``CompressionMiddleware`` compresses text and JSON responses of at least
+``COMPRESSION_MIN_BYTES`` with brotli or gzip, whichever the client prefers
+in ``Accept-Encoding`` (brotli needs the ``brotli`` package). Smaller bodies
+are sent as they are: below a kilobyte or so the saving does not pay for the
+CPU. Responses that already carry a ``Content-Encoding`` pass through, which
+is how WhiteNoise's precompressed static files are served.
+"""
+import logging
+import random
+import re
+import time
+import traceback
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+from . import metrics, routing
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+logger = logging.getLogger('webpos.performance')
+
+
+class _QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+        self.slowest = (0.0, None, None)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            self.statements[sql] += 1
+            if elapsed > self.slowest[0]:
+                self.slowest = (elapsed, sql, traceback.extract_stack(limit=80)[:-2])
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.statements.values())
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    func = match.func
+    cls = getattr(func, 'cls', None)
+    if cls is not None:
+        actions = getattr(func, 'actions', None) or {}
+        action = actions.get(request.method.lower(), request.method.lower())
+        return f"{cls.__name__}.{action}"
+    return match.view_name or f"{func.__module__}.{getattr(func, '__name__', type(func).__name__)}"
+
+
+def _project_frames(stack):
+    base = str(settings.BASE_DIR)
+    stack = [frame for frame in stack if frame.filename != __file__]
+    frames = (
+        [frame for frame in stack if frame.filename.startswith(base)]
+        or [frame for frame in stack if 'site-packages' not in frame.filename]
+        or stack[-5:]
+    )
+    return ''.join(traceback.format_list(frames[-8:]))
+
+
+class _DualMiddleware:
+    """Runs natively in both stacks, so async views are not pushed onto a thread."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.handle(request)
+
+
+class PerformanceMiddleware(_DualMiddleware):
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.sample_rate = getattr(settings, 'PERF_SAMPLE_RATE', 1.0)
+        self.slow_request = getattr(settings, 'PERF_SLOW_REQUEST_MS', 500) / 1000
+        self.excluded = tuple(getattr(settings, 'PERF_EXCLUDED_PATHS', ('/metrics',)))
+
+    def _sampled(self, request):
+        return random.random() < self.sample_rate and not request.path.startswith(self.excluded)
+
+    async def __acall__(self, request):
+        if not self._sampled(request):
+            return await self.get_response(request)
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        elapsed = time.perf_counter() - start
+        metrics.observe(
+            _view_name(request),
+            request.method,
+            response.status_code,
+            webpos_request_duration_seconds=elapsed,
+            webpos_response_bytes=len(response.content) if not response.streaming else 0,
+        )
+        response['Server-Timing'] = f"app;dur={elapsed * 1000:.1f}"
+        return response
+
+    def handle(self, request):
+        if not self._sampled(request):
+            return self.get_response(request)
+
+        recorder = _QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        view = _view_name(request)
+        size = len(response.content) if not response.streaming else 0
+        metrics.observe(
+            view,
+            request.method,
+            response.status_code,
+            webpos_request_duration_seconds=elapsed,
+            webpos_request_db_seconds=recorder.seconds,
+            webpos_request_queries=recorder.count,
+            webpos_request_duplicate_queries=recorder.duplicates,
+            webpos_response_bytes=size,
+        )
+        response['Server-Timing'] = f"app;dur={elapsed * 1000:.1f}, db;dur={recorder.seconds * 1000:.1f}"
+
+        if elapsed >= self.slow_request:
+            seconds, sql, frames = recorder.slowest
+            logger.warning(
+                "Slow request %s %s (%s): %.0f ms, %d queries (%d duplicate), %.0f ms in SQL; "
+                "slowest statement %.0f ms: %s\n%s",
+                request.method, request.path, view, elapsed * 1000, recorder.count, recorder.duplicates,
+                recorder.seconds * 1000, seconds * 1000, sql, _project_frames(frames) if frames else '',
+            )
+        return response
+
+
+class RoutingMiddleware(_DualMiddleware):
+    def handle(self, request):
+        with routing.request_scope(request):
+            response = self.get_response(request)
+        return self._scope_stream(request, response)
+
+    async def __acall__(self, request):
+        with routing.request_scope(request):
+            response = await self.get_response(request)
+        return self._scope_stream(request, response)
+
+    def _scope_stream(self, request, response):
+        if response.streaming:
+            content = response.streaming_content
+            scoped = self._ascoped if response.is_async else self._scoped
+            response.streaming_content = scoped(request, content)
+        return response
+
+    @staticmethod
+    def _scoped(request, content):
+        with routing.request_scope(request):
+            yield from content
+
+    @staticmethod
+    async def _ascoped(request, content):
+        with routing.request_scope(request):
+            async for chunk in content:
+                yield chunk
+
+
+_encoding_re = re.compile(r'\s*([a-z*]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*', re.I)
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'application/xml', 'image/svg+xml')
+
+
+def _accepted_encodings(header):
+    """``Accept-Encoding`` as {coding: q}, dropping codings refused with q=0."""
+    accepted = {}
+    for part in header.split(','):
+        match = _encoding_re.fullmatch(part)
+        if not match:
+            continue
+        try:
+            quality = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+        accepted[match.group(1).lower()] = quality
+    return {coding: q for coding, q in accepted.items() if q > 0}
+
+
+def _choose_encoding(header):
+    accepted = _accepted_encodings(header)
+    offered = (['br'] if brotli is not None else []) + ['gzip']
+    ranked = [(accepted.get(coding, accepted.get('*', 0)), -i, coding) for i, coding in enumerate(offered)]
+    quality, _, coding = max(ranked)
+    return coding if quality > 0 else None
+
+
+class CompressionMiddleware(_DualMiddleware):
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_bytes = getattr(settings, 'COMPRESSION_MIN_BYTES', 1024)
+        self.brotli_quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4)
+
+    def handle(self, request):
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request, response):
+        if response.has_header('Content-Encoding') or response.status_code == 206:
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+        if not response.streaming and len(response.content) < self.min_bytes:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = _choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if coding is None:
+            return response
+
+        if response.streaming:
+            # Stream with gzip only; brotli would have to buffer the whole body.
+            if coding != 'gzip' or response.is_async:
+                return response
+            response.streaming_content = compress_sequence(response.streaming_content, max_random_bytes=100)
+            del response['Content-Length']
+        else:
+            if coding == 'br':
+                body = brotli.compress(response.content, quality=self.brotli_quality)
+            else:
+                # Random-length filename padding, as in Django's GZipMiddleware, against BREACH.
+                body = compress_string(response.content, max_random_bytes=100)
+            if len(body) >= len(response.content):
+                return response
+            response.content = body
+            response['Content-Length'] = str(len(body))
+
+        # The representation changed, so a strong ETag no longer matches it.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = coding
+        return response
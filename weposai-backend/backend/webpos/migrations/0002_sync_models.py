@@ -0,0 +1,657 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_default_tenant(apps, schema_editor):
+    # Rows written before tenants existed go to one tenant of their own; the
+    # tenant columns added below default to its id.
+    Tenant = apps.get_model('webpos', 'Tenant')
+    if any(
+        apps.get_model('webpos', name).objects.exists()
+        for name in ('User', 'Store', 'Category', 'Customer', 'Product', 'Sale', 'Payment')
+    ):
+        Tenant.objects.create(name='Default')
+
+
+def make_barcodes_unique(apps, schema_editor):
+    # Barcodes become unique below; products sharing or missing one keep the
+    # first holder's and get their id appended.
+    Product = apps.get_model('webpos', 'Product')
+    seen = set()
+    for product in Product.objects.order_by('pk'):
+        if product.barcode and product.barcode not in seen:
+            seen.add(product.barcode)
+            continue
+        product.barcode = f'{product.barcode or product.sku}-{product.pk}'
+        product.save(update_fields=['barcode'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('webpos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tenant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('address', models.TextField(blank=True)),
+                ('phone', models.CharField(blank=True, max_length=20)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('tax_certificate', models.FileField(blank=True, null=True, upload_to='tenant_docs/')),
+                ('business_license', models.FileField(blank=True, null=True, upload_to='tenant_docs/')),
+                ('subscription_plan', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_default_tenant, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='markettill',
+            name='store',
+        ),
+        migrations.RemoveField(
+            model_name='order',
+            name='customer',
+        ),
+        migrations.RemoveField(
+            model_name='order',
+            name='store',
+        ),
+        migrations.RemoveField(
+            model_name='sale',
+            name='order',
+        ),
+        migrations.RemoveField(
+            model_name='receipt',
+            name='sale',
+        ),
+        migrations.RemoveField(
+            model_name='saleitem',
+            name='product',
+        ),
+        migrations.RemoveField(
+            model_name='saleitem',
+            name='sale',
+        ),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='sale',
+        ),
+        migrations.RemoveField(
+            model_name='payment',
+            name='transaction',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='alert_threshold',
+        ),
+        migrations.RemoveField(
+            model_name='sale',
+            name='cashier',
+        ),
+        migrations.RemoveField(
+            model_name='sale',
+            name='payment_method',
+        ),
+        migrations.RemoveField(
+            model_name='sale',
+            name='timestamp',
+        ),
+        migrations.RemoveField(
+            model_name='sale',
+            name='total',
+        ),
+        migrations.RemoveField(
+            model_name='store',
+            name='store_type',
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='address',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='user',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='customer_profile', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_payments', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='date',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='sale',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='webpos.sale'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='updated_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='updated_payments', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='cost_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='damaged_quantity',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='description',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='discount_percent',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=5),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='expiry_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='is_damaged',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='is_discounted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='is_virtual',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='max_redemptions',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='supply_pcu',
+            field=models.PositiveIntegerField(default=1, help_text='Units per counting unit (e.g., pack size)'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='surplus_quantity',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='validity_days',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='date',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sales', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='store',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, upload_to='profiles/'),
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='description',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='customer',
+            name='name',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='method',
+            field=models.CharField(choices=[('cash', 'Cash'), ('card', 'Card'), ('mobile', 'Mobile Money'), ('bank_transfer', 'Bank Transfer'), ('credit', 'Credit')], max_length=20),
+        ),
+        migrations.RunPython(make_barcodes_unique, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='product',
+            name='barcode',
+            field=models.CharField(max_length=50, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='category',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='products', to='webpos.category'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='name',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='quantity',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(max_length=50, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='store',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='products', to='webpos.store'),
+        ),
+        migrations.AlterField(
+            model_name='sale',
+            name='customer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sales', to='webpos.customer'),
+        ),
+        migrations.AlterField(
+            model_name='sale',
+            name='store',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales', to='webpos.store'),
+        ),
+        migrations.AlterField(
+            model_name='store',
+            name='location',
+            field=models.TextField(),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='groups',
+            field=models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.group', verbose_name='groups'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='last_login',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='role',
+            field=models.CharField(choices=[('cashier', 'Cashier'), ('manager', 'Manager'), ('admin', 'Admin'), ('customer', 'Customer'), ('supplier', 'Supplier'), ('employee', 'Employee')], default='employee', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='user_permissions',
+            field=models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.permission', verbose_name='user permissions'),
+        ),
+        migrations.CreateModel(
+            name='Commission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='commissions', to='webpos.sale')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='commissions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Inventory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(default=0)),
+                ('minimum_stock_level', models.PositiveIntegerField(default=5)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_inventories', to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventories', to='webpos.product')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventories', to='webpos.store')),
+                ('updated_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='updated_inventories', to=settings.AUTH_USER_MODEL)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventories', to='webpos.tenant')),
+            ],
+            options={
+                'unique_together': {('tenant', 'product', 'store')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LoyaltyPoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('points', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loyalty_points', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Service',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('description', models.TextField(blank=True)),
+                ('duration_minutes', models.PositiveIntegerField(default=30)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='services', to='webpos.category')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='services', to='webpos.tenant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='webpos.product')),
+                ('sale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='webpos.sale')),
+                ('service', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='webpos.service')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Shift',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shifts', to='webpos.store')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shifts', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Tax',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('percentage', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('description', models.TextField(blank=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='taxes', to='webpos.tenant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SurplusSupply',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('recorded_at', models.DateTimeField(auto_now_add=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='surplus_supplies', to='webpos.product')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='surplus_supplies', to='webpos.store')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='surplus_supplies', to='webpos.tenant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Refund',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.TextField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='refunds', to='webpos.sale')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='refunds', to='webpos.tenant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=50, unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('discount_percent', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('active', models.BooleanField(default=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='promotions', to='webpos.tenant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='KPI',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('value', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('calculated_at', models.DateTimeField(auto_now_add=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kpis', to='webpos.tenant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='JournalEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.TextField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('entry_date', models.DateField(default=django.utils.timezone.now)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='journal_entries', to='webpos.tenant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='InventoryTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_type', models.CharField(choices=[('restock', 'Restock'), ('sale', 'Sale'), ('adjustment', 'Adjustment'), ('transfer_in', 'Transfer In'), ('transfer_out', 'Transfer Out'), ('damage', 'Damage'), ('surplus', 'Surplus')], max_length=20)),
+                ('quantity', models.IntegerField()),
+                ('timestamp', models.DateTimeField(auto_now_add=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_inventory_transactions', to=settings.AUTH_USER_MODEL)),
+                ('inventory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='webpos.inventory')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_transactions', to='webpos.tenant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GiftCard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=100, unique=True)),
+                ('initial_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('current_balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('issued_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('issued_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='issued_giftcards', to=settings.AUTH_USER_MODEL)),
+                ('issued_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='giftcards', to='webpos.customer')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='giftcards', to='webpos.tenant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Delivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delivery_type', models.CharField(choices=[('local', 'Local'), ('remote', 'Remote')], max_length=20)),
+                ('delivery_date', models.DateTimeField(blank=True, null=True)),
+                ('tracking_number', models.CharField(blank=True, max_length=100, null=True)),
+                ('delivery_fee', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('delivered_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='deliveries', to=settings.AUTH_USER_MODEL)),
+                ('sale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='webpos.sale')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='webpos.tenant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Contract',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contract_file', models.FileField(upload_to='contracts/')),
+                ('contract_type', models.CharField(choices=[('employee', 'Employee'), ('supplier', 'Supplier'), ('customer', 'Customer')], max_length=20)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='contracts', to=settings.AUTH_USER_MODEL)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contracts', to='webpos.tenant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ActionLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=100)),
+                ('object_id', models.CharField(max_length=100)),
+                ('action_type', models.CharField(max_length=50)),
+                ('timestamp', models.DateTimeField(auto_now_add=True)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('details', models.TextField(blank=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='action_logs', to=settings.AUTH_USER_MODEL)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='action_logs', to='webpos.tenant')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='tenant',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, related_name='categories', to='webpos.tenant'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='tenant',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, related_name='customers', to='webpos.tenant'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='tenant',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='webpos.tenant'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='tenant',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, related_name='products', to='webpos.tenant'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='tenant',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, related_name='sales', to='webpos.tenant'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='store',
+            name='tenant',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, related_name='stores', to='webpos.tenant'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='tenant',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, related_name='users', to='webpos.tenant'),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='Vendor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('contact_person', models.CharField(blank=True, max_length=255)),
+                ('phone', models.CharField(max_length=20)),
+                ('email', models.EmailField(max_length=254)),
+                ('address', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vendors', to='webpos.tenant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Purchase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('total_cost', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('purchased_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchases', to='webpos.product')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchases', to='webpos.tenant')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchases', to='webpos.vendor')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VirtualProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('virtual_type', models.CharField(choices=[('airtime', 'Airtime'), ('voucher', 'Voucher'), ('electricity', 'Electricity'), ('data_bundle', 'Data Bundle'), ('subscription', 'Subscription'), ('other', 'Other')], max_length=50)),
+                ('provider_name', models.CharField(blank=True, max_length=255)),
+                ('denomination', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('validity_period_days', models.PositiveIntegerField(blank=True, null=True)),
+                ('terms_and_conditions', models.TextField(blank=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='virtual_details', to='webpos.product')),
+            ],
+        ),
+        migrations.DeleteModel(
+            name='InventoryAlert',
+        ),
+        migrations.DeleteModel(
+            name='MarketTill',
+        ),
+        migrations.DeleteModel(
+            name='Order',
+        ),
+        migrations.DeleteModel(
+            name='Receipt',
+        ),
+        migrations.DeleteModel(
+            name='SaleItem',
+        ),
+        migrations.DeleteModel(
+            name='Transaction',
+        ),
+    ]
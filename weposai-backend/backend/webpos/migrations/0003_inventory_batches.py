@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpos', '0002_sync_models'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lot_number', models.CharField(blank=True, max_length=100)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('expiry_date', models.DateField(blank=True, null=True)),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('inventory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batches', to='webpos.inventory')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_batches', to='webpos.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('quantity__gt', 0)), fields=['tenant', 'expiry_date'], name='batch_tenant_expiry_idx'), models.Index(fields=['inventory', 'expiry_date', 'received_at'], name='batch_fefo_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpos', '0004_stock_transfers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField()),
+                ('as_of', models.DateTimeField()),
+                ('quantity', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(fields=['inventory', 'timestamp'], name='invtx_inventory_ts_idx'),
+        ),
+        migrations.AddField(
+            model_name='inventorysnapshot',
+            name='inventory',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='webpos.inventory'),
+        ),
+        migrations.AddField(
+            model_name='inventorysnapshot',
+            name='tenant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_snapshots', to='webpos.tenant'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorysnapshot',
+            index=models.Index(fields=['inventory', 'as_of'], name='snapshot_inventory_asof_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorysnapshot',
+            index=models.Index(fields=['tenant', 'snapshot_date'], name='snapshot_tenant_date_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='inventorysnapshot',
+            unique_together={('inventory', 'snapshot_date')},
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpos', '0005_inventory_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='valuation_method',
+            field=models.CharField(choices=[('weighted_average', 'Weighted Average'), ('fifo', 'FIFO')], default='weighted_average', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='ProductValuation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('on_hand', models.IntegerField(default=0)),
+                ('average_cost', models.DecimalField(blank=True, decimal_places=4, max_digits=14, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='valuation', to='webpos.product')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_valuations', to='webpos.tenant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ValuationCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_purchase_id', models.BigIntegerField(default=0)),
+                ('last_order_item_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='valuation_cursor', to='webpos.tenant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CostLayer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('received_at', models.DateTimeField()),
+                ('quantity', models.PositiveIntegerField()),
+                ('remaining_quantity', models.PositiveIntegerField()),
+                ('unit_cost', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_layers', to='webpos.product')),
+                ('purchase', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cost_layer', to='webpos.purchase')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_layers', to='webpos.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('remaining_quantity__gt', 0)), fields=['tenant', 'product', 'received_at'], name='costlayer_open_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaleLineCost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sold_at', models.DateTimeField()),
+                ('quantity', models.PositiveIntegerField()),
+                ('revenue', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('cost', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('method', models.CharField(choices=[('weighted_average', 'Weighted Average'), ('fifo', 'FIFO')], max_length=20)),
+                ('order_item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cost', to='webpos.orderitem')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sale_line_costs', to='webpos.product')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sale_line_costs', to='webpos.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tenant', 'sold_at'], name='salecost_tenant_sold_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpos', '0006_cost_valuation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Account',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=20)),
+                ('name', models.CharField(max_length=100)),
+                ('account_type', models.CharField(choices=[('asset', 'Asset'), ('liability', 'Liability'), ('equity', 'Equity'), ('revenue', 'Revenue'), ('expense', 'Expense')], max_length=20)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='JournalLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('debit', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostingQueue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_type', models.CharField(choices=[('sale', 'Sale'), ('payment', 'Payment'), ('refund', 'Refund'), ('purchase', 'Purchase'), ('delivery', 'Delivery')], max_length=20)),
+                ('source_id', models.PositiveBigIntegerField()),
+                ('enqueued_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='source_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='source_type',
+            field=models.CharField(blank=True, choices=[('sale', 'Sale'), ('payment', 'Payment'), ('refund', 'Refund'), ('purchase', 'Purchase'), ('delivery', 'Delivery')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['tenant', 'entry_date'], name='journal_tenant_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='journalentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('source_id__isnull', False)), fields=('tenant', 'source_type', 'source_id'), name='journal_entry_unique_source'),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='tenant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='accounts', to='webpos.tenant'),
+        ),
+        migrations.AddField(
+            model_name='journalline',
+            name='account',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='lines', to='webpos.account'),
+        ),
+        migrations.AddField(
+            model_name='journalline',
+            name='entry',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='webpos.journalentry'),
+        ),
+        migrations.AddField(
+            model_name='postingqueue',
+            name='tenant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='posting_queue', to='webpos.tenant'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='account',
+            unique_together={('tenant', 'code')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='postingqueue',
+            unique_together={('source_type', 'source_id')},
+        ),
+    ]
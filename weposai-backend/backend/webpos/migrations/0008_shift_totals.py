@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpos', '0007_double_entry_accounts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShiftTotals',
+            fields=[
+                ('shift', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='totals', serialize=False, to='webpos.shift')),
+                ('sale_count', models.PositiveIntegerField(default=0)),
+                ('sales_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cash_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('card_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('mobile_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('bank_transfer_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('credit_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('refund_count', models.PositiveIntegerField(default=0)),
+                ('refund_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('giftcard_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('closed', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='refund',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_refunds', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='shift',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sales', to='webpos.shift'),
+        ),
+        migrations.AddIndex(
+            model_name='shift',
+            index=models.Index(condition=models.Q(('end_time__isnull', True)), fields=['user', 'store'], name='shift_open_idx'),
+        ),
+    ]
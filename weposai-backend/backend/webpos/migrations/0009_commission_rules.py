@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpos', '0008_shift_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommissionTier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('min_volume', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('percent', models.DecimalField(decimal_places=2, max_digits=5)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CommissionRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('rule_type', models.CharField(choices=[('category_percent', 'Percentage by Category'), ('service_flat', 'Flat Fee per Service'), ('volume_tier', 'Tiered by Period Volume')], max_length=20)),
+                ('percent', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('flat_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='commission_rules', to='webpos.category')),
+                ('service', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='commission_rules', to='webpos.service')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='commission_rules', to='webpos.tenant')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='commission',
+            name='rule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='commissions', to='webpos.commissionrule'),
+        ),
+        migrations.CreateModel(
+            name='CommissionSettlement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('settled_at', models.DateTimeField(auto_now_add=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='commission_settlements', to='webpos.tenant')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='commission_settlements', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='commission',
+            name='settlement',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='commissions', to='webpos.commissionsettlement'),
+        ),
+        migrations.AddIndex(
+            model_name='commission',
+            index=models.Index(fields=['user', 'settlement'], name='commission_user_settle_idx'),
+        ),
+        migrations.AddField(
+            model_name='commissiontier',
+            name='rule',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tiers', to='webpos.commissionrule'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='commissionsettlement',
+            unique_together={('tenant', 'user', 'period_start', 'period_end')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='commissiontier',
+            unique_together={('rule', 'min_volume')},
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpos', '0009_commission_rules'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='loyalty_balance',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='LoyaltyRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('points_per_unit', models.DecimalField(decimal_places=4, help_text='Points earned per unit of currency spent', max_digits=8)),
+                ('expiry_days', models.PositiveIntegerField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='loyalty_rules', to='webpos.category')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loyalty_rules', to='webpos.tenant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LoyaltyEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('accrual', 'Accrual'), ('redemption', 'Redemption'), ('expiry', 'Expiry'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('points', models.IntegerField()),
+                ('remaining', models.PositiveIntegerField(default=0)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loyalty_entries', to='webpos.customer')),
+                ('sale', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='loyalty_entries', to='webpos.sale')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loyalty_entries', to='webpos.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['customer', 'created_at'], name='loyalty_customer_idx'), models.Index(condition=models.Q(('remaining__gt', 0)), fields=['expires_at'], name='loyalty_open_expiry_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('entry_type', 'accrual')), fields=('sale',), name='loyalty_one_accrual_per_sale')],
+            },
+        ),
+    ]
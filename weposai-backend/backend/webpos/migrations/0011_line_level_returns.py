@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpos', '0010_loyalty_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='refunded_quantity',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='inventorytransaction',
+            name='transaction_type',
+            field=models.CharField(choices=[('restock', 'Restock'), ('sale', 'Sale'), ('adjustment', 'Adjustment'), ('transfer_in', 'Transfer In'), ('transfer_out', 'Transfer Out'), ('damage', 'Damage'), ('surplus', 'Surplus'), ('return', 'Customer Return')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='RefundItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('restocked', models.BooleanField(default=True)),
+                ('order_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='refund_items', to='webpos.orderitem')),
+                ('refund', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='webpos.refund')),
+            ],
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpos', '0011_line_level_returns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PinCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('serial', models.CharField(blank=True, max_length=100)),
+                ('encrypted_code', models.TextField()),
+                ('code_digest', models.CharField(max_length=64)),
+                ('batch_reference', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(choices=[('available', 'Available'), ('exhausted', 'Exhausted'), ('expired', 'Expired'), ('void', 'Void')], default='available', max_length=20)),
+                ('redemptions', models.PositiveIntegerField(default=0)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('imported_at', models.DateTimeField(auto_now_add=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pin_codes', to='webpos.tenant')),
+                ('virtual_product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pins', to='webpos.virtualproduct')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PinAllocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('allocated_at', models.DateTimeField(auto_now_add=True)),
+                ('allocated_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pin_allocations', to=settings.AUTH_USER_MODEL)),
+                ('sale', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pin_allocations', to='webpos.sale')),
+                ('pin', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='allocations', to='webpos.pincode')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='pincode',
+            index=models.Index(condition=models.Q(('status', 'available')), fields=['virtual_product', 'expires_at'], name='pin_available_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='pincode',
+            constraint=models.UniqueConstraint(fields=('virtual_product', 'code_digest'), name='pin_unique_code'),
+        ),
+    ]
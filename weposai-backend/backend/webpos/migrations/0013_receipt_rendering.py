@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:25
+
+import django.db.models.deletion
+import webpos.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpos', '0012_pin_inventory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Receipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('generated_at', models.DateTimeField(auto_now_add=True)),
+                ('pdf_file', models.FileField(blank=True, storage=webpos.models.receipt_storage, upload_to='')),
+                ('pdf_digest', models.CharField(blank=True, max_length=64)),
+                ('pdf_status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('pdf_generated_at', models.DateTimeField(blank=True, null=True)),
+                ('sale', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='receipt', to='webpos.sale')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipts', to='webpos.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('pdf_status', 'pending')), fields=['pdf_status'], name='receipt_pdf_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpos', '0014_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('budget', models.CharField(choices=[('read', 'Read'), ('write', 'Write'), ('bulk', 'Bulk')], max_length=10)),
+                ('requests', models.PositiveBigIntegerField(default=0)),
+                ('throttled', models.PositiveBigIntegerField(default=0)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage', to='webpos.tenant')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tenant', 'day', 'budget'), name='tenant_usage_unique_day')],
+            },
+        ),
+    ]
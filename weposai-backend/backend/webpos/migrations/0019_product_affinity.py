@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpos', '0018_webhooks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductAffinity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('baskets', models.PositiveIntegerField()),
+                ('support', models.FloatField()),
+                ('confidence', models.FloatField()),
+                ('lift', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='affinities', to='webpos.product')),
+                ('related_product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='webpos.product')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_affinities', to='webpos.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'rank'], name='product_affinity_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'related_product'), name='product_affinity_unique_pair')],
+            },
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpos', '0019_product_affinity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandClass',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('revenue', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('revenue_share', models.FloatField()),
+                ('abc', models.CharField(choices=[('A', 'A'), ('B', 'B'), ('C', 'C')], max_length=1)),
+                ('mean_daily_units', models.FloatField()),
+                ('demand_cv', models.FloatField(blank=True, null=True)),
+                ('xyz', models.CharField(choices=[('X', 'X'), ('Y', 'Y'), ('Z', 'Z')], max_length=1)),
+                ('computed_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('units', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(fields=['tenant', 'timestamp'], name='invtx_tenant_ts_idx'),
+        ),
+        migrations.AddField(
+            model_name='demandclass',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_classes', to='webpos.product'),
+        ),
+        migrations.AddField(
+            model_name='demandclass',
+            name='store',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_classes', to='webpos.store'),
+        ),
+        migrations.AddField(
+            model_name='demandclass',
+            name='tenant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_classes', to='webpos.tenant'),
+        ),
+        migrations.AddField(
+            model_name='demandforecast',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecasts', to='webpos.product'),
+        ),
+        migrations.AddField(
+            model_name='demandforecast',
+            name='store',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecasts', to='webpos.store'),
+        ),
+        migrations.AddField(
+            model_name='demandforecast',
+            name='tenant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecasts', to='webpos.tenant'),
+        ),
+        migrations.AddIndex(
+            model_name='demandclass',
+            index=models.Index(fields=['tenant', 'store', 'abc', 'xyz'], name='demand_class_matrix_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='demandclass',
+            constraint=models.UniqueConstraint(fields=('store', 'product'), name='demand_class_unique_store_product'),
+        ),
+        migrations.AddIndex(
+            model_name='demandforecast',
+            index=models.Index(fields=['tenant', 'store', 'day'], name='demand_forecast_store_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='demandforecast',
+            constraint=models.UniqueConstraint(fields=('store', 'product', 'day'), name='demand_forecast_unique_day'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:26
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpos', '0020_demand_forecasts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('operation', models.CharField(blank=True, choices=[('percent', 'Change Price by Percent'), ('set_price', 'Set Price'), ('discount', 'Start Discount'), ('end_discount', 'End Discount')], max_length=20)),
+                ('value', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('skus', models.JSONField(blank=True, default=list)),
+                ('activate_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('rollback_at', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('scheduled', 'Scheduled'), ('applied', 'Applied'), ('rolled_back', 'Rolled Back'), ('cancelled', 'Cancelled')], default='scheduled', max_length=20)),
+                ('products_changed', models.PositiveIntegerField(default=0)),
+                ('products_restored', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+                ('rolled_back_at', models.DateTimeField(blank=True, null=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='price_changes', to='webpos.category')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='price_changes', to=settings.AUTH_USER_MODEL)),
+                ('promotions', models.ManyToManyField(blank=True, related_name='price_changes', to='webpos.promotion')),
+                ('store', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='price_changes', to='webpos.store')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_changes', to='webpos.tenant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('apply', 'Price Change Applied'), ('rollback', 'Price Change Rolled Back')], max_length=20)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('is_discounted', models.BooleanField(default=False)),
+                ('discount_percent', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('previous_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('previous_is_discounted', models.BooleanField(blank=True, null=True)),
+                ('previous_discount_percent', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('effective_from', models.DateTimeField(default=django.utils.timezone.now)),
+                ('price_change', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='history', to='webpos.pricechange')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='webpos.product')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='webpos.tenant')),
+            ],
+            options={
+                'verbose_name_plural': 'price history',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='pricechange',
+            index=models.Index(fields=['tenant', 'status', 'activate_at'], name='price_change_status_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:26
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_cost_prices(apps, schema_editor):
+    # Rows written before costs were tracked take the product's cost.
+    PriceHistory = apps.get_model('webpos', 'PriceHistory')
+    Product = apps.get_model('webpos', 'Product')
+    PriceHistory.objects.update(
+        cost_price=Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('cost_price')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpos', '0021_price_changes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricehistory',
+            name='cost_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='pricehistory',
+            name='previous_cost_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.RunPython(copy_cost_prices, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='pricehistory',
+            name='source',
+            field=models.CharField(choices=[('created', 'Product Created'), ('edit', 'Product Edited'), ('apply', 'Price Change Applied'), ('rollback', 'Price Change Rolled Back')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='pricehistory',
+            index=models.Index(fields=['product', 'effective_from'], name='price_history_product_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpos', '0022_price_history_tracking'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pricehistory',
+            name='source',
+            field=models.CharField(choices=[('created', 'Product Created'), ('edit', 'Product Edited'), ('apply', 'Price Change Applied'), ('rollback', 'Price Change Rolled Back'), ('markdown', 'Expiry Markdown')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:59
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpos', '0023_pricehistory_markdown_source'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stocktransferline',
+            name='lots',
+            field=models.JSONField(blank=True, default=list, encoder=django.core.serializers.json.DjangoJSONEncoder),
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 
@@ -13,6 +14,11 @@ class Tenant(models.Model):
     tax_certificate = models.FileField(upload_to='tenant_docs/', blank=True, null=True)
     business_license = models.FileField(upload_to='tenant_docs/', blank=True, null=True)
     subscription_plan = models.CharField(max_length=100, blank=True)
+    VALUATION_METHODS = (
+        ('weighted_average', 'Weighted Average'),
+        ('fifo', 'FIFO'),
+    )
+    valuation_method = models.CharField(max_length=20, choices=VALUATION_METHODS, default='weighted_average')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -125,6 +131,87 @@ class VirtualProduct(models.Model):
         return f"{self.virtual_type.capitalize()} for {self.product.name}"
 
 
+# ===== PIN INVENTORY =====
+# Codes are stored encrypted; tills claim them with SELECT ... FOR UPDATE SKIP LOCKED
+# (see services.pins), so there is no shared counter row to contend on.
+
+class PinCode(models.Model):
+    STATUS_CHOICES = (
+        ('available', 'Available'),
+        ('exhausted', 'Exhausted'),
+        ('expired', 'Expired'),
+        ('void', 'Void'),
+    )
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='pin_codes')
+    virtual_product = models.ForeignKey(VirtualProduct, on_delete=models.CASCADE, related_name='pins')
+    serial = models.CharField(max_length=100, blank=True)
+    encrypted_code = models.TextField()
+    # SHA-256 of the clear code, so re-imported files cannot load a PIN twice
+    code_digest = models.CharField(max_length=64)
+    batch_reference = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='available')
+    redemptions = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(blank=True, null=True)
+    imported_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['virtual_product', 'code_digest'], name='pin_unique_code'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['virtual_product', 'expires_at'],
+                condition=models.Q(status='available'),
+                name='pin_available_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"PIN {self.serial or self.pk} ({self.status})"
+
+
+class PinAllocation(models.Model):
+    pin = models.ForeignKey(PinCode, on_delete=models.PROTECT, related_name='allocations')
+    sale = models.ForeignKey('Sale', on_delete=models.SET_NULL, null=True, blank=True, related_name='pin_allocations')
+    allocated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='pin_allocations')
+    allocated_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"PIN #{self.pin_id} for Sale #{self.sale_id}"
+
+
+# ===== PROVIDER TOP-UPS =====
+# Airtime/data/electricity bought from the product's provider at the till (see
+# services.providers). ``reference`` is sent to the provider as the idempotency key.
+
+class TopUp(models.Model):
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    )
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='top_ups')
+    virtual_product = models.ForeignKey(VirtualProduct, on_delete=models.PROTECT, related_name='top_ups')
+    sale = models.ForeignKey('Sale', on_delete=models.SET_NULL, null=True, blank=True, related_name='top_ups')
+    recipient = models.CharField(max_length=50)  # phone number or meter number
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    reference = models.CharField(max_length=64, unique=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    provider_reference = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='top_ups')
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'created_at'], name='topup_tenant_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Top-up {self.amount} to {self.recipient} ({self.status})"
+
+
 # ===== SERVICE =====
 
 class Service(models.Model):
@@ -150,6 +237,8 @@ class Customer(models.Model):
     phone = models.CharField(max_length=20, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Cached sum of the customer's LoyaltyEntry rows, only ever changed with F() in services.loyalty
+    loyalty_balance = models.IntegerField(default=0)
 
     def __str__(self):
         return self.name
@@ -205,6 +294,71 @@ class Purchase(models.Model):
         return f"Purchase {self.quantity} of {self.product.name} from {self.vendor.name}"
 
 
+# ===== STOCK VALUATION =====
+# Cost layers, per-product running cost and per-line COGS kept by services.valuation
+
+class CostLayer(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='cost_layers')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='cost_layers')
+    purchase = models.OneToOneField(Purchase, on_delete=models.SET_NULL, null=True, blank=True, related_name='cost_layer')
+    received_at = models.DateTimeField()
+    quantity = models.PositiveIntegerField()
+    remaining_quantity = models.PositiveIntegerField()
+    unit_cost = models.DecimalField(max_digits=14, decimal_places=4)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['tenant', 'product', 'received_at'],
+                condition=models.Q(remaining_quantity__gt=0),
+                name='costlayer_open_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.remaining_quantity}/{self.quantity} of product #{self.product_id} @ {self.unit_cost}"
+
+
+class ProductValuation(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='product_valuations')
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='valuation')
+    on_hand = models.IntegerField(default=0)
+    average_cost = models.DecimalField(max_digits=14, decimal_places=4, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Product #{self.product_id}: {self.on_hand} @ {self.average_cost}"
+
+
+class ValuationCursor(models.Model):
+    tenant = models.OneToOneField(Tenant, on_delete=models.CASCADE, related_name='valuation_cursor')
+    last_purchase_id = models.BigIntegerField(default=0)
+    last_order_item_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Valuation cursor for tenant #{self.tenant_id}"
+
+
+class SaleLineCost(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='sale_line_costs')
+    order_item = models.OneToOneField('OrderItem', on_delete=models.CASCADE, related_name='cost')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sale_line_costs')
+    sold_at = models.DateTimeField()
+    quantity = models.PositiveIntegerField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2)
+    cost = models.DecimalField(max_digits=14, decimal_places=2)
+    method = models.CharField(max_length=20, choices=Tenant.VALUATION_METHODS)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'sold_at'], name='salecost_tenant_sold_idx'),
+        ]
+
+    def __str__(self):
+        return f"COGS {self.cost} for order item #{self.order_item_id}"
+
+
 # ===== INVENTORY =====
 
 class Inventory(models.Model):
@@ -236,6 +390,7 @@ class InventoryTransaction(models.Model):
         ('transfer_out', 'Transfer Out'),
         ('damage', 'Damage'),
         ('surplus', 'Surplus'),
+        ('return', 'Customer Return'),
     )
     tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='inventory_transactions')
     inventory = models.ForeignKey(Inventory, on_delete=models.CASCADE, related_name='transactions')
@@ -245,9 +400,111 @@ class InventoryTransaction(models.Model):
     notes = models.TextField(blank=True, null=True)
 
     created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='created_inventory_transactions')
+    transfer = models.ForeignKey('StockTransfer', null=True, blank=True, on_delete=models.PROTECT, related_name='ledger_entries')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['inventory', 'timestamp'], name='invtx_inventory_ts_idx'),
+            models.Index(fields=['tenant', 'timestamp'], name='invtx_tenant_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.transaction_type} {self.quantity} on inventory #{self.inventory_id}"
+
+
+# ===== INVENTORY SNAPSHOT =====
+# Closing quantity of an inventory line: the sum of its ledger rows timestamped before as_of
+
+class InventorySnapshot(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='inventory_snapshots')
+    inventory = models.ForeignKey(Inventory, on_delete=models.CASCADE, related_name='snapshots')
+    snapshot_date = models.DateField()
+    as_of = models.DateTimeField()
+    quantity = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('inventory', 'snapshot_date')
+        indexes = [
+            models.Index(fields=['inventory', 'as_of'], name='snapshot_inventory_asof_idx'),
+            models.Index(fields=['tenant', 'snapshot_date'], name='snapshot_tenant_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Inventory #{self.inventory_id} on {self.snapshot_date}: {self.quantity}"
+
+
+# ===== INVENTORY BATCH =====
+# One delivered lot of an inventory line; sales draw from the earliest expiry first (FEFO)
+
+class InventoryBatch(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='inventory_batches')
+    inventory = models.ForeignKey(Inventory, on_delete=models.CASCADE, related_name='batches')
+    lot_number = models.CharField(max_length=100, blank=True)
+    quantity = models.PositiveIntegerField(default=0)
+    expiry_date = models.DateField(blank=True, null=True)
+    received_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Range scans for "expiring within N days" only ever look at lots still on the shelf
+            models.Index(
+                fields=['tenant', 'expiry_date'],
+                condition=models.Q(quantity__gt=0),
+                name='batch_tenant_expiry_idx',
+            ),
+            models.Index(fields=['inventory', 'expiry_date', 'received_at'], name='batch_fefo_idx'),
+        ]
+
+    def __str__(self):
+        return f"Lot {self.lot_number or self.pk} — {self.quantity} (expires {self.expiry_date})"
+
+
+# ===== STOCK TRANSFER =====
+# Moves stock between two stores: the transfer_out legs are written on dispatch,
+# the transfer_in legs on receipt, and the document is in transit in between
+
+class StockTransfer(models.Model):
+    STATUS_CHOICES = (
+        ('draft', 'Draft'),
+        ('in_transit', 'In Transit'),
+        ('received', 'Received'),
+        ('cancelled', 'Cancelled'),
+    )
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='stock_transfers')
+    source_store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='outgoing_transfers')
+    destination_store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='incoming_transfers')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
+    notes = models.TextField(blank=True)
+
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='created_transfers')
+    received_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='received_transfers')
+    created_at = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(blank=True, null=True)
+    received_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'status', 'dispatched_at'], name='transfer_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Transfer #{self.id} ({self.status})"
+
+
+class StockTransferLine(models.Model):
+    transfer = models.ForeignKey(StockTransfer, on_delete=models.CASCADE, related_name='lines')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='transfer_lines')
+    quantity = models.PositiveIntegerField()
+    # Batches taken at dispatch ({lot_number, expiry_date, quantity}), re-created on receipt
+    lots = models.JSONField(default=list, blank=True, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        unique_together = ('transfer', 'product')
 
     def __str__(self):
-        return f"{self.transaction_type} {self.quantity} of {self.inventory.product.name} at {self.inventory.store.name}"
+        return f"{self.quantity} x product #{self.product_id}"
 
 
 # ===== SURPLUS SUPPLY =====
@@ -273,6 +530,7 @@ class Sale(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True, related_name='sales')
     total_amount = models.DecimalField(max_digits=12, decimal_places=2)
     date = models.DateTimeField(default=timezone.now)
+    shift = models.ForeignKey('Shift', on_delete=models.SET_NULL, null=True, blank=True, related_name='sales')
 
     def __str__(self):
         return f"Sale #{self.id} - {self.total_amount}"
@@ -284,6 +542,8 @@ class OrderItem(models.Model):
     service = models.ForeignKey(Service, on_delete=models.SET_NULL, null=True, blank=True)
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=12, decimal_places=2)
+    # Units already returned; kept in step with RefundItem rows by services.returns
+    refunded_quantity = models.PositiveIntegerField(default=0)
 
     def clean(self):
         from django.core.exceptions import ValidationError
@@ -333,9 +593,54 @@ class Refund(models.Model):
     reason = models.TextField()
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='created_refunds')
+
+    def __str__(self):
+        return f"Refund {self.amount} for Sale #{self.sale_id}"
+
+
+class RefundItem(models.Model):
+    refund = models.ForeignKey(Refund, on_delete=models.CASCADE, related_name='items')
+    order_item = models.ForeignKey(OrderItem, on_delete=models.CASCADE, related_name='refund_items')
+    quantity = models.PositiveIntegerField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    restocked = models.BooleanField(default=True)
 
     def __str__(self):
-        return f"Refund {self.amount} for Sale #{self.sale.id}"
+        return f"{self.quantity} x order item #{self.order_item_id}"
+
+
+# ===== RECEIPT =====
+# Text and HTML receipts are rendered on request; the PDF is produced off the request
+# path and stored under the SHA-256 of its bytes (see services.receipts).
+
+def receipt_storage():
+    from django.core.files.storage import FileSystemStorage
+    from django.conf import settings
+    return FileSystemStorage(location=settings.RECEIPT_STORAGE_ROOT)
+
+
+class Receipt(models.Model):
+    PDF_STATUS = (
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    )
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='receipts')
+    sale = models.OneToOneField(Sale, on_delete=models.CASCADE, related_name='receipt')
+    generated_at = models.DateTimeField(auto_now_add=True)
+    pdf_file = models.FileField(storage=receipt_storage, blank=True)
+    pdf_digest = models.CharField(max_length=64, blank=True)
+    pdf_status = models.CharField(max_length=20, choices=PDF_STATUS, default='pending')
+    pdf_generated_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['pdf_status'], condition=models.Q(pdf_status='pending'), name='receipt_pdf_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"Receipt for Sale #{self.sale_id}"
 
 
 # ===== GIFT CARD =====
@@ -351,12 +656,19 @@ class GiftCard(models.Model):
     expires_at = models.DateTimeField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
 
-    def redeem(self, amount):
-        if amount <= self.current_balance:
-            self.current_balance -= amount
-            self.save()
-            return True
-        return False
+    def redeem(self, amount, shift=None):
+        from .services.shifts import record_giftcard_redemption
+        # The balance and the shift's counter move together or not at all
+        with transaction.atomic():
+            updated = GiftCard.objects.filter(pk=self.pk, current_balance__gte=amount).update(
+                current_balance=models.F('current_balance') - amount
+            )
+            if not updated:
+                return False
+            if shift is not None:
+                record_giftcard_redemption(shift, amount)
+        self.refresh_from_db(fields=['current_balance'])
+        return True
 
     def __str__(self):
         return f"GiftCard {self.code} - Balance: {self.current_balance}"
@@ -377,6 +689,92 @@ class Promotion(models.Model):
         return f"Promo {self.code} ({self.discount_percent}%)"
 
 
+# ===== PRICE CHANGES =====
+# A price or discount change over many products at once, applied at activate_at
+# and undone at rollback_at by the job runner (see services.pricing). PriceHistory
+# is append-only: a row per product whenever its price, cost or discount changes.
+
+class PriceChange(models.Model):
+    OPERATION_CHOICES = (
+        ('percent', 'Change Price by Percent'),
+        ('set_price', 'Set Price'),
+        ('discount', 'Start Discount'),
+        ('end_discount', 'End Discount'),
+    )
+    STATUS_CHOICES = (
+        ('scheduled', 'Scheduled'),
+        ('applied', 'Applied'),
+        ('rolled_back', 'Rolled Back'),
+        ('cancelled', 'Cancelled'),
+    )
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='price_changes')
+    name = models.CharField(max_length=100, blank=True)
+    # Blank when the change only switches promotions on and off
+    operation = models.CharField(max_length=20, choices=OPERATION_CHOICES, blank=True)
+    # Percent change, new price or discount percent, depending on the operation
+    value = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+
+    # Products covered: every condition given must hold
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='price_changes')
+    store = models.ForeignKey(Store, on_delete=models.SET_NULL, null=True, blank=True, related_name='price_changes')
+    skus = models.JSONField(default=list, blank=True)
+    # Activated with the change and deactivated by its rollback
+    promotions = models.ManyToManyField(Promotion, blank=True, related_name='price_changes')
+
+    activate_at = models.DateTimeField(default=timezone.now)
+    rollback_at = models.DateTimeField(blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='scheduled')
+    products_changed = models.PositiveIntegerField(default=0)
+    products_restored = models.PositiveIntegerField(default=0)
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='price_changes')
+    created_at = models.DateTimeField(auto_now_add=True)
+    applied_at = models.DateTimeField(blank=True, null=True)
+    rolled_back_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'status', 'activate_at'], name='price_change_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Price change #{self.id} {self.name} ({self.status})"
+
+
+class PriceHistory(models.Model):
+    SOURCE_CHOICES = (
+        ('created', 'Product Created'),
+        ('edit', 'Product Edited'),
+        ('apply', 'Price Change Applied'),
+        ('rollback', 'Price Change Rolled Back'),
+        ('markdown', 'Expiry Markdown'),
+    )
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='price_history')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='price_history')
+    price_change = models.ForeignKey(PriceChange, on_delete=models.SET_NULL, null=True, blank=True, related_name='history')
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+
+    # Values from effective_from on, and the ones they replaced
+    price = models.DecimalField(max_digits=12, decimal_places=2)
+    cost_price = models.DecimalField(max_digits=12, decimal_places=2)
+    is_discounted = models.BooleanField(default=False)
+    discount_percent = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    previous_price = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+    previous_cost_price = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+    previous_is_discounted = models.BooleanField(blank=True, null=True)
+    previous_discount_percent = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
+    effective_from = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = 'price history'
+        indexes = [
+            models.Index(fields=['product', 'effective_from'], name='price_history_product_idx'),
+        ]
+
+    def __str__(self):
+        return f"Product #{self.product_id} at {self.price} from {self.effective_from}"
+
+
 # ===== TAX =====
 
 class Tax(models.Model):
@@ -402,7 +800,7 @@ class Delivery(models.Model):
     delivery_fee = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
     def __str__(self):
-        return f"Delivery #{self.id} for Sale #{self.sale.id}"
+        return f"Delivery #{self.id} for Sale #{self.sale_id}"
 
 
 # ===== LOYALTY POINTS =====
@@ -416,18 +814,136 @@ class LoyaltyPoint(models.Model):
         return f"{self.user.username} - {self.points} pts"
 
 
+class LoyaltyRule(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='loyalty_rules')
+    name = models.CharField(max_length=100)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name='loyalty_rules')
+    points_per_unit = models.DecimalField(max_digits=8, decimal_places=4, help_text="Points earned per unit of currency spent")
+    expiry_days = models.PositiveIntegerField(blank=True, null=True)
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.points_per_unit} pts)"
+
+
+class LoyaltyEntry(models.Model):
+    ENTRY_TYPES = (
+        ('accrual', 'Accrual'),
+        ('redemption', 'Redemption'),
+        ('expiry', 'Expiry'),
+        ('adjustment', 'Adjustment'),
+    )
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='loyalty_entries')
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='loyalty_entries')
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPES)
+    points = models.IntegerField()
+    # Unredeemed, unexpired points of an accrual; redemptions draw down the oldest first
+    remaining = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(blank=True, null=True)
+    sale = models.ForeignKey(Sale, on_delete=models.SET_NULL, null=True, blank=True, related_name='loyalty_entries')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['sale'],
+                condition=models.Q(entry_type='accrual'),
+                name='loyalty_one_accrual_per_sale',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['customer', 'created_at'], name='loyalty_customer_idx'),
+            models.Index(
+                fields=['expires_at'],
+                condition=models.Q(remaining__gt=0),
+                name='loyalty_open_expiry_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.entry_type} {self.points} pts for customer #{self.customer_id}"
+
+
+# ===== CHART OF ACCOUNTS =====
+# balance is the running debit-minus-credit total, maintained by services.accounting on every posting
+
+class Account(models.Model):
+    ACCOUNT_TYPES = (
+        ('asset', 'Asset'),
+        ('liability', 'Liability'),
+        ('equity', 'Equity'),
+        ('revenue', 'Revenue'),
+        ('expense', 'Expense'),
+    )
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='accounts')
+    code = models.CharField(max_length=20)
+    name = models.CharField(max_length=100)
+    account_type = models.CharField(max_length=20, choices=ACCOUNT_TYPES)
+    balance = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('tenant', 'code')
+
+    def __str__(self):
+        return f"{self.code} {self.name}"
+
+
 # ===== JOURNAL ENTRY =====
 
 class JournalEntry(models.Model):
+    SOURCE_TYPES = (
+        ('sale', 'Sale'),
+        ('payment', 'Payment'),
+        ('refund', 'Refund'),
+        ('purchase', 'Purchase'),
+        ('delivery', 'Delivery'),
+    )
     tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='journal_entries')
     description = models.TextField()
     amount = models.DecimalField(max_digits=14, decimal_places=2)
     entry_date = models.DateField(default=timezone.now)
+    source_type = models.CharField(max_length=20, choices=SOURCE_TYPES, blank=True)
+    source_id = models.PositiveBigIntegerField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tenant', 'source_type', 'source_id'],
+                condition=models.Q(source_id__isnull=False),
+                name='journal_entry_unique_source',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['tenant', 'entry_date'], name='journal_tenant_date_idx'),
+        ]
 
     def __str__(self):
         return f"JournalEntry on {self.entry_date} - {self.amount}"
 
 
+class JournalLine(models.Model):
+    entry = models.ForeignKey(JournalEntry, on_delete=models.CASCADE, related_name='lines')
+    account = models.ForeignKey(Account, on_delete=models.PROTECT, related_name='lines')
+    debit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.account_id}: Dr {self.debit} / Cr {self.credit}"
+
+
+class PostingQueue(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='posting_queue')
+    source_type = models.CharField(max_length=20, choices=JournalEntry.SOURCE_TYPES)
+    source_id = models.PositiveBigIntegerField()
+    enqueued_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('source_type', 'source_id')
+
+    def __str__(self):
+        return f"Pending {self.source_type} #{self.source_id}"
+
+
 # ===== SHIFT =====
 
 class Shift(models.Model):
@@ -437,17 +953,108 @@ class Shift(models.Model):
     end_time = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'store'],
+                condition=models.Q(end_time__isnull=True),
+                name='shift_open_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.user.username} Shift at {self.store.name}"
 
 
+class ShiftTotals(models.Model):
+    # Running counters for the Z-report, bumped with F() expressions as sales,
+    # payments, refunds and gift card redemptions are recorded; frozen on close
+    shift = models.OneToOneField(Shift, on_delete=models.CASCADE, primary_key=True, related_name='totals')
+    sale_count = models.PositiveIntegerField(default=0)
+    sales_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cash_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    card_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    mobile_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    bank_transfer_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    credit_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    refund_count = models.PositiveIntegerField(default=0)
+    refund_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    giftcard_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    closed = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"Totals for shift #{self.shift_id}"
+
+
 # ===== COMMISSION =====
 
+class CommissionRule(models.Model):
+    RULE_TYPES = (
+        ('category_percent', 'Percentage by Category'),
+        ('service_flat', 'Flat Fee per Service'),
+        ('volume_tier', 'Tiered by Period Volume'),
+    )
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='commission_rules')
+    name = models.CharField(max_length=100)
+    rule_type = models.CharField(max_length=20, choices=RULE_TYPES)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name='commission_rules')
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, null=True, blank=True, related_name='commission_rules')
+    percent = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
+    flat_amount = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+    is_active = models.BooleanField(default=True)
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        if self.rule_type == 'category_percent' and (self.category_id is None or self.percent is None):
+            raise ValidationError("A category rule needs a category and a percentage.")
+        if self.rule_type == 'service_flat' and (self.service_id is None or self.flat_amount is None):
+            raise ValidationError("A service rule needs a service and a flat amount.")
+
+    def __str__(self):
+        return f"{self.name} ({self.get_rule_type_display()})"
+
+
+class CommissionTier(models.Model):
+    # A volume_tier rule pays the percent of the highest tier whose min_volume the
+    # user's period sales reach, on all of that user's matching sales in the period
+    rule = models.ForeignKey(CommissionRule, on_delete=models.CASCADE, related_name='tiers')
+    min_volume = models.DecimalField(max_digits=14, decimal_places=2)
+    percent = models.DecimalField(max_digits=5, decimal_places=2)
+
+    class Meta:
+        unique_together = ('rule', 'min_volume')
+
+    def __str__(self):
+        return f"{self.percent}% from {self.min_volume}"
+
+
+class CommissionSettlement(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='commission_settlements')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='commission_settlements')
+    period_start = models.DateField()
+    period_end = models.DateField()
+    total = models.DecimalField(max_digits=14, decimal_places=2)
+    settled_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('tenant', 'user', 'period_start', 'period_end')
+
+    def __str__(self):
+        return f"Settlement {self.total} for user #{self.user_id} ({self.period_start} - {self.period_end})"
+
+
 class Commission(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='commissions')
     sale = models.ForeignKey(Sale, on_delete=models.CASCADE, related_name='commissions')
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
+    rule = models.ForeignKey(CommissionRule, on_delete=models.SET_NULL, null=True, blank=True, related_name='commissions')
+    settlement = models.ForeignKey(CommissionSettlement, on_delete=models.SET_NULL, null=True, blank=True, related_name='commissions')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'settlement'], name='commission_user_settle_idx'),
+        ]
 
     def __str__(self):
         return f"Commission {self.amount} for {self.user.username}"
@@ -479,4 +1086,256 @@ class ActionLog(models.Model):
     details = models.TextField(blank=True)
 
     def __str__(self):
-        return f"{self.timestamp} - {self.user} performed {self.action_type} on {self.model_name} ({self.object_id})"
+        return f"{self.timestamp} - user #{self.user_id} performed {self.action_type} on {self.model_name} ({self.object_id})"
+
+
+# ===== BACKGROUND JOB =====
+# Work queued for the run_jobs worker processes (see services.jobs)
+
+class Job(models.Model):
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    )
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    # Higher runs first
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    result = models.JSONField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-priority', 'run_after'],
+                condition=models.Q(status='queued'),
+                name='job_ready_idx',
+            ),
+            models.Index(
+                fields=['tenant'],
+                condition=models.Q(status='running'),
+                name='job_running_tenant_idx',
+            ),
+            models.Index(fields=['tenant', 'created_at'], name='job_tenant_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job #{self.pk} {self.task} ({self.status})"
+
+
+# ===== API USAGE =====
+# Requests per tenant per day and throttle budget, flushed from each process's
+# counters (see webpos.throttling); read to enforce subscription plan quotas
+
+class TenantUsage(models.Model):
+    BUDGET_CHOICES = (
+        ('read', 'Read'),
+        ('write', 'Write'),
+        ('bulk', 'Bulk'),
+    )
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='usage')
+    day = models.DateField()
+    budget = models.CharField(max_length=10, choices=BUDGET_CHOICES)
+    requests = models.PositiveBigIntegerField(default=0)
+    throttled = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'day', 'budget'], name='tenant_usage_unique_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.tenant_id} {self.day} {self.budget}: {self.requests}"
+
+
+# ===== TENANT SHARD =====
+# Which database holds a tenant's rows (see webpos.routing); tenants without a
+# row live on 'default'. Kept on 'default' with the other directory tables.
+
+class TenantShard(models.Model):
+    STATUS_CHOICES = (
+        ('active', 'Active'),
+        ('moving', 'Moving'),
+    )
+    tenant = models.OneToOneField(Tenant, on_delete=models.CASCADE, related_name='shard')
+    alias = models.CharField(max_length=100)
+    # Writes are refused while the tenant is being copied to another shard
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.tenant_id} on {self.alias} ({self.status})"
+
+
+# ===== WEBHOOKS =====
+# Domain events written to the outbox in the transaction that caused them, and
+# their delivery to each subscribed endpoint (see services.outbox)
+
+class WebhookEndpoint(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='webhook_endpoints')
+    url = models.URLField(max_length=500)
+    # Shared key for the HMAC-SHA256 signature of each request body
+    secret = models.CharField(max_length=64)
+    # Event types to deliver, e.g. ["sale.created"]; empty for all of them
+    events = models.JSONField(default=list, blank=True)
+    is_active = models.BooleanField(default=True)
+    batch_size = models.PositiveIntegerField(default=100)
+    # Batches in flight to this endpoint at once, over all dispatchers
+    max_concurrency = models.PositiveIntegerField(default=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def subscribes_to(self, event_type):
+        return not self.events or event_type in self.events
+
+    def __str__(self):
+        return self.url
+
+
+class OutboxEvent(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='outbox_events')
+    event_type = models.CharField(max_length=50)
+    object_id = models.PositiveBigIntegerField()
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    # Set once deliveries have been created for every subscribed endpoint
+    dispatched_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(dispatched_at__isnull=True), name='outbox_pending_idx'),
+            models.Index(fields=['tenant', 'created_at'], name='outbox_tenant_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.object_id}"
+
+
+class WebhookDelivery(models.Model):
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('delivered', 'Delivered'),
+        ('failed', 'Failed'),
+    )
+    endpoint = models.ForeignKey(WebhookEndpoint, on_delete=models.CASCADE, related_name='deliveries')
+    event = models.ForeignKey(OutboxEvent, on_delete=models.CASCADE, related_name='deliveries')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # Deliveries sent together share a batch id while they are in flight
+    batch_id = models.CharField(max_length=32, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    response_status = models.PositiveSmallIntegerField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    delivered_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['endpoint', 'event'], name='webhook_delivery_unique'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['endpoint', 'next_attempt_at'],
+                condition=models.Q(status='pending'),
+                name='webhook_delivery_due_idx',
+            ),
+            models.Index(
+                fields=['endpoint', 'batch_id'],
+                condition=models.Q(status='sending'),
+                name='webhook_delivery_sending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event} to endpoint {self.endpoint_id} ({self.status})"
+
+
+# ===== ANALYTICS =====
+# Nightly results the dashboard and tills read directly, replaced on every run
+
+class ProductAffinity(models.Model):
+    # Products bought together (see services.affinity); rank 0 is the strongest
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='product_affinities')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='affinities')
+    related_product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    # Baskets holding both products, that share of all baskets, P(related | product)
+    # and how much more often they meet than by chance
+    baskets = models.PositiveIntegerField()
+    support = models.FloatField()
+    confidence = models.FloatField()
+    lift = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'related_product'], name='product_affinity_unique_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'rank'], name='product_affinity_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_product_id} (lift {self.lift:.2f})"
+
+
+class DemandClass(models.Model):
+    # ABC by share of the store's revenue, XYZ by variability of daily demand (see services.forecasting)
+    ABC_CHOICES = (('A', 'A'), ('B', 'B'), ('C', 'C'))
+    XYZ_CHOICES = (('X', 'X'), ('Y', 'Y'), ('Z', 'Z'))
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='demand_classes')
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='demand_classes')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='demand_classes')
+    revenue = models.DecimalField(max_digits=14, decimal_places=2)
+    revenue_share = models.FloatField()
+    abc = models.CharField(max_length=1, choices=ABC_CHOICES)
+    # Mean and coefficient of variation of units sold per day over the history window
+    mean_daily_units = models.FloatField()
+    demand_cv = models.FloatField(blank=True, null=True)
+    xyz = models.CharField(max_length=1, choices=XYZ_CHOICES)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['store', 'product'], name='demand_class_unique_store_product'),
+        ]
+        indexes = [
+            models.Index(fields=['tenant', 'store', 'abc', 'xyz'], name='demand_class_matrix_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} at {self.store_id}: {self.abc}{self.xyz}"
+
+
+class DemandForecast(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='demand_forecasts')
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='demand_forecasts')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='demand_forecasts')
+    day = models.DateField()
+    units = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['store', 'product', 'day'], name='demand_forecast_unique_day'),
+        ]
+        indexes = [
+            models.Index(fields=['tenant', 'store', 'day'], name='demand_forecast_store_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} at {self.store_id} on {self.day}: {self.units:.1f}"
@@ -0,0 +1,47 @@
+"""
+orjson-backed JSON renderer and parser.
+
+``ORJSONRenderer`` produces the same documents as DRF's ``JSONRenderer``:
+datetimes are ISO 8601 with ``Z`` for UTC and anything orjson does not know
+natively (raw ``Decimal``s from aggregates, lazy strings, querysets) goes
+through DRF's own encoder. It is listed first in
+``DEFAULT_RENDERER_CLASSES``, so ``Accept: application/json`` gets it; a
+client can still ask for the stdlib renderer with ``?format=json`` (or force
+orjson with ``?format=orjson``). Without orjson installed both classes fall
+back to DRF's implementation.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    format = 'orjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_default, option=options)
+
+
+class ORJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
@@ -0,0 +1,274 @@
+"""
+Database routing: tenant shards and read replicas.
+
+Tables split in two groups. Directory tables (tenants, users, the shard map,
+jobs, API usage and every non-webpos app) always live on ``default``. All
+other webpos tables are tenant data and live on the tenant's shard, taken
+from ``TenantShard`` (cached per process for ``SHARD_MAP_CACHE_SECONDS``);
+tenants without an entry stay on ``default``. Every shard carries the full
+schema, and the tenant's own ``Tenant`` and ``User`` rows are mirrored onto
+it (see ``mirror``) so foreign keys hold inside each database. Shards must
+hand out primary keys from disjoint ranges for tenants to be movable between
+them; ``manage.py move_tenant`` refuses to overwrite another tenant's row.
+
+The tenant comes from, in order: the instance being read or written (its
+database, or its ``tenant_id`` when unsaved), the ``tenant()`` context
+manager used by jobs and commands, and the authenticated user of the current
+request (``RoutingMiddleware`` makes the request visible to the router; the
+user is only looked at once DRF has authenticated it).
+
+``DATABASE_REPLICAS`` maps a primary alias to replica aliases. Reads go to a
+replica only inside safe requests (GET/HEAD/OPTIONS) or ``replica_reads()``
+blocks, never inside a transaction on the primary, and not after the
+request wrote anything. A request that wrote also marks its user sticky for
+``REPLICA_STICKY_SECONDS`` in the default cache, so the user's next reads see
+their own writes while the replicas catch up.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import LazyObject, empty
+from rest_framework.exceptions import APIException
+
+from .models import Tenant, TenantShard
+
+DIRECTORY_MODELS = {'webpos.tenant', 'webpos.user', 'webpos.tenantshard', 'webpos.tenantusage', 'webpos.job'}
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class TenantMoving(APIException):
+    status_code = 503
+    default_detail = "This tenant's data is being moved to another database; try again shortly."
+    default_code = 'tenant_moving'
+
+
+def is_sharded(model):
+    return model._meta.app_label == 'webpos' and model._meta.label_lower not in DIRECTORY_MODELS
+
+
+def sharded_models():
+    return [model for model in apps.get_app_config('webpos').get_models() if is_sharded(model)]
+
+
+# ----------------------------
+# Routing state
+# ----------------------------
+
+class _State:
+    __slots__ = ('request', 'tenant_id', 'replica', 'wrote', 'sticky')
+
+    def __init__(self, request=None, tenant_id=None, replica=False):
+        self.request = request
+        self.tenant_id = tenant_id
+        self.replica = replica
+        self.wrote = False
+        self.sticky = None
+
+
+_state = ContextVar('webpos_db_routing', default=None)
+
+
+def _request_user(request):
+    # AuthenticationMiddleware leaves a lazy user; evaluating it here would query
+    # from inside the router, so only a user that has already been resolved counts.
+    user = request.__dict__.get('user')
+    if isinstance(user, LazyObject):
+        user = None if user._wrapped is empty else user._wrapped
+    return user if user is not None and user.is_authenticated else None
+
+
+def current_tenant_id():
+    state = _state.get()
+    if state is None:
+        return None
+    if state.tenant_id is not None:
+        return state.tenant_id
+    if state.request is not None:
+        user = _request_user(state.request)
+        return getattr(user, 'tenant_id', None)
+    return None
+
+
+def _sticky_key(user_pk):
+    return f"db:sticky:{user_pk}"
+
+
+@contextmanager
+def request_scope(request):
+    """Route the work of one request; used by ``RoutingMiddleware``."""
+    state = _State(request=request, replica=request.method in SAFE_METHODS)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+        if state.wrote:
+            user = _request_user(request)
+            if user is not None:
+                cache.set(_sticky_key(user.pk), True, getattr(settings, 'REPLICA_STICKY_SECONDS', 5))
+
+
+@contextmanager
+def tenant(tenant_id):
+    """Route unqualified queries of tenant data to ``tenant_id``'s shard."""
+    current = _state.get()
+    state = _State(tenant_id=tenant_id, replica=bool(current and current.replica))
+    state.wrote = bool(current and current.wrote)
+    token = _state.set(state)
+    try:
+        yield
+    finally:
+        _state.reset(token)
+        if current is not None and state.wrote:
+            current.wrote = True
+
+
+@contextmanager
+def replica_reads():
+    """Allow replica reads outside a request, e.g. for reports run by a job."""
+    current = _state.get()
+    state = _State(tenant_id=current.tenant_id if current else None, replica=True)
+    token = _state.set(state)
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+# ----------------------------
+# Shard map and replicas
+# ----------------------------
+
+_shards = {'loaded_at': None, 'entries': {}}
+
+
+def _shard_entries():
+    ttl = getattr(settings, 'SHARD_MAP_CACHE_SECONDS', 30)
+    now = time.monotonic()
+    if _shards['loaded_at'] is None or now - _shards['loaded_at'] > ttl:
+        _shards['entries'] = {
+            tenant_id: (alias, status)
+            for tenant_id, alias, status in TenantShard.objects.using(DEFAULT_DB_ALIAS).values_list(
+                'tenant_id', 'alias', 'status',
+            )
+        }
+        _shards['loaded_at'] = now
+    return _shards['entries']
+
+
+def reload_shard_map():
+    _shards['loaded_at'] = None
+
+
+def _replica_aliases():
+    return {alias for aliases in getattr(settings, 'DATABASE_REPLICAS', {}).values() for alias in aliases}
+
+
+def primary_aliases():
+    """Every database that holds tenant data of its own: the shards, including ``default``."""
+    replicas = _replica_aliases()
+    return [alias for alias in settings.DATABASES if alias not in replicas]
+
+
+def _sharding_enabled():
+    return len(primary_aliases()) > 1
+
+
+def shard_for(tenant_id):
+    if tenant_id is None or not _sharding_enabled():
+        return DEFAULT_DB_ALIAS
+    entry = _shard_entries().get(tenant_id)
+    return entry[0] if entry else DEFAULT_DB_ALIAS
+
+
+def is_moving(tenant_id):
+    if tenant_id is None or not _sharding_enabled():
+        return False
+    entry = _shard_entries().get(tenant_id)
+    return bool(entry and entry[1] == 'moving')
+
+
+def primary_of(alias):
+    for primary, replicas in getattr(settings, 'DATABASE_REPLICAS', {}).items():
+        if alias in replicas:
+            return primary
+    return alias
+
+
+def _replica_for(primary):
+    replicas = getattr(settings, 'DATABASE_REPLICAS', {}).get(primary)
+    state = _state.get()
+    if not replicas or state is None or not state.replica or state.wrote:
+        return None
+    if connections[primary].in_atomic_block:
+        return None
+    if state.sticky is None and state.request is not None:
+        user = _request_user(state.request)
+        if user is not None:
+            state.sticky = bool(cache.get(_sticky_key(user.pk)))
+    if state.sticky:
+        return None
+    return random.choice(replicas)
+
+
+def mirror(instance, alias=None):
+    """Copy a ``Tenant`` or ``User`` saved on ``default`` onto its tenant's shard (or ``alias``)."""
+    if (instance._state.db or DEFAULT_DB_ALIAS) != DEFAULT_DB_ALIAS:
+        return
+    tenant_id = instance.pk if isinstance(instance, Tenant) else instance.tenant_id
+    alias = alias or shard_for(tenant_id)
+    if alias == DEFAULT_DB_ALIAS:
+        return
+    values = {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields if not field.primary_key}
+    type(instance)._base_manager.using(alias).update_or_create(pk=instance.pk, defaults=values)
+
+
+# ----------------------------
+# Router
+# ----------------------------
+
+class TenantRouter:
+    def _primary(self, model, hints):
+        if not is_sharded(model):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None:
+            if is_sharded(instance._meta.model) and instance._state.db:
+                return primary_of(instance._state.db)
+            # Unsaved tenant data, or a tenant/user being assigned to it
+            tenant_id = instance.pk if isinstance(instance, Tenant) else getattr(instance, 'tenant_id', None)
+            if tenant_id is not None:
+                return shard_for(tenant_id)
+        return shard_for(current_tenant_id())
+
+    def db_for_read(self, model, **hints):
+        primary = self._primary(model, hints)
+        return _replica_for(primary) or primary
+
+    def db_for_write(self, model, **hints):
+        primary = self._primary(model, hints)
+        if is_sharded(model):
+            instance = hints.get('instance')
+            tenant_id = getattr(instance, 'tenant_id', None) if instance is not None else None
+            if is_moving(tenant_id if tenant_id is not None else current_tenant_id()):
+                raise TenantMoving()
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return primary
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # _meta.model rather than type(): request.user may still be a SimpleLazyObject
+        if not (is_sharded(obj1._meta.model) and is_sharded(obj2._meta.model)):
+            return True
+        return primary_of(obj1._state.db or DEFAULT_DB_ALIAS) == primary_of(obj2._state.db or DEFAULT_DB_ALIAS)
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive their schema from the primary.
+        return db not in _replica_aliases()
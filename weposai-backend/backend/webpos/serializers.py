@@ -1,12 +1,19 @@
+from decimal import Decimal
+
 from rest_framework import serializers
+from .services import outbox, pricing, sales, stock, transfers
 from .models import (
     Tenant, User, Store,
-    ProductCategory, ServiceCategory, Product, Service,
-    Customer, Order, Sale, SaleItem,
-    Inventory, InventoryTransaction,
-    MarketTill, Transaction, Payment, Commission,
-    Delivery, Promotion, Tax,
-    InventoryAlert, Receipt
+    Category, Product, Service, PinCode, TopUp,
+    Customer, Sale, OrderItem,
+    Inventory, InventoryTransaction, InventoryBatch,
+    StockTransfer, StockTransferLine, Account,
+    Shift, CommissionRule, CommissionTier, CommissionSettlement,
+    LoyaltyRule, LoyaltyEntry, Refund, RefundItem, Job, TenantUsage,
+    WebhookEndpoint, WebhookDelivery, ProductAffinity, DemandClass, DemandForecast,
+    Payment, Commission,
+    Delivery, Promotion, PriceChange, PriceHistory, Tax,
+    Receipt, GiftCard
 )
 
 # ----------------------------
@@ -16,7 +23,7 @@ from .models import (
 class TenantSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tenant
-        fields = ['id', 'name', 'domain', 'created_at']
+        fields = ['id', 'name', 'address', 'phone', 'email', 'subscription_plan', 'valuation_method', 'created_at']
 
 
 # ----------------------------
@@ -38,57 +45,125 @@ class StoreSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Store
-        fields = ['id', 'name', 'location', 'store_type', 'tenant']
+        fields = ['id', 'name', 'location', 'created_at', 'tenant']
 
 
 # ----------------------------
-# Product Category Serializer
+# Category Serializer
 # ----------------------------
 
-class ProductCategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(serializers.ModelSerializer):
     class Meta:
-        model = ProductCategory
+        model = Category
         fields = ['id', 'name', 'description', 'tenant']
 
 
 # ----------------------------
-# Service Category Serializer
+# Product Serializer
 # ----------------------------
 
-class ServiceCategorySerializer(serializers.ModelSerializer):
+class ProductSerializer(serializers.ModelSerializer):
+    category = CategorySerializer(read_only=True)
+    store = StoreSerializer(read_only=True)
+
     class Meta:
-        model = ServiceCategory
-        fields = ['id', 'name', 'description', 'tenant']
+        model = Product
+        fields = [
+            'id', 'name', 'sku', 'barcode', 'description', 'price', 'cost_price',
+            'is_discounted', 'discount_percent', 'quantity', 'expiry_date', 'is_virtual',
+            'category', 'store', 'tenant'
+        ]
 
 
 # ----------------------------
-# Product Serializer
+# Tenant-scoped related fields
 # ----------------------------
 
-class ProductSerializer(serializers.ModelSerializer):
-    category = ProductCategorySerializer(read_only=True)
-    store = StoreSerializer(read_only=True)
+class TenantSaleField(serializers.PrimaryKeyRelatedField):
+    """A sale of the requesting user's tenant, by primary key."""
 
+    def get_queryset(self):
+        return Sale.objects.filter(tenant_id=self.context['request'].user.tenant_id)
+
+
+class TenantStoreField(serializers.PrimaryKeyRelatedField):
+    """A store of the requesting user's tenant, by primary key."""
+
+    def get_queryset(self):
+        return Store.objects.filter(tenant_id=self.context['request'].user.tenant_id)
+
+
+class TenantOrderItemField(serializers.PrimaryKeyRelatedField):
+    """A sale line of the requesting user's tenant, by primary key."""
+
+    def get_queryset(self):
+        return OrderItem.objects.filter(sale__tenant_id=self.context['request'].user.tenant_id)
+
+
+# ----------------------------
+# PIN Serializers
+# ----------------------------
+
+class PinCodeSerializer(serializers.ModelSerializer):
     class Meta:
-        model = Product
+        model = PinCode
         fields = [
-            'id', 'name', 'sku', 'barcode', 'price', 'discount',
-            'quantity', 'alert_threshold', 'unit_type',
-            'category', 'store', 'tenant'
+            'id', 'virtual_product', 'serial', 'batch_reference', 'status',
+            'redemptions', 'expires_at', 'imported_at',
         ]
 
 
+class PinEntrySerializer(serializers.Serializer):
+    serial = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    code = serializers.CharField()
+
+
+class PinImportSerializer(serializers.Serializer):
+    virtual_product = serializers.IntegerField()
+    codes = PinEntrySerializer(many=True, allow_empty=False)
+    batch_reference = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    expires_at = serializers.DateTimeField(required=False)
+
+
+class PinAllocateSerializer(serializers.Serializer):
+    virtual_product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, max_value=100, default=1)
+    sale = TenantSaleField(required=False)
+
+
+class TopUpRequestSerializer(serializers.Serializer):
+    virtual_product = serializers.IntegerField()
+    recipient = serializers.CharField(max_length=50)
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0, required=False)
+    sale = serializers.IntegerField(required=False)
+    reference = serializers.CharField(max_length=64, required=False)
+
+
+class TopUpBatchSerializer(serializers.Serializer):
+    top_ups = serializers.ListField(child=TopUpRequestSerializer(), min_length=1, max_length=100)
+
+
+class TopUpSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TopUp
+        fields = [
+            'id', 'virtual_product', 'sale', 'recipient', 'amount', 'reference', 'status',
+            'provider_reference', 'error', 'created_at', 'completed_at',
+        ]
+        read_only_fields = fields
+
+
 # ----------------------------
 # Service Serializer
 # ----------------------------
 
 class ServiceSerializer(serializers.ModelSerializer):
-    category = ServiceCategorySerializer(read_only=True)
+    category = CategorySerializer(read_only=True)
 
     class Meta:
         model = Service
         fields = [
-            'id', 'name', 'description', 'price',
+            'id', 'name', 'description', 'price', 'duration_minutes',
             'category', 'tenant'
         ]
 
@@ -104,33 +179,141 @@ class CustomerSerializer(serializers.ModelSerializer):
 
 
 # ----------------------------
-# Order Serializer
+# Job Serializers
 # ----------------------------
 
-class OrderSerializer(serializers.ModelSerializer):
-    customer = CustomerSerializer(read_only=True)
-    store = StoreSerializer(read_only=True)
-    created_by = UserSerializer(read_only=True)
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'task', 'payload', 'priority', 'status', 'attempts', 'max_attempts',
+            'run_after', 'started_at', 'finished_at', 'result', 'last_error', 'created_at',
+        ]
+        read_only_fields = fields
+
+
+# ----------------------------
+# API Usage Serializer
+# ----------------------------
 
+class TenantUsageSerializer(serializers.ModelSerializer):
     class Meta:
-        model = Order
+        model = TenantUsage
+        fields = ['id', 'day', 'budget', 'requests', 'throttled']
+        read_only_fields = fields
+
+
+# ----------------------------
+# Analytics Serializers
+# ----------------------------
+
+class ProductAffinitySerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source='related_product.name', read_only=True)
+    sku = serializers.CharField(source='related_product.sku', read_only=True)
+    price = serializers.DecimalField(source='related_product.price', max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = ProductAffinity
+        fields = ['related_product', 'name', 'sku', 'price', 'rank', 'baskets', 'support', 'confidence', 'lift', 'computed_at']
+        read_only_fields = fields
+
+
+class DemandClassSerializer(serializers.ModelSerializer):
+    sku = serializers.CharField(source='product.sku', read_only=True)
+    name = serializers.CharField(source='product.name', read_only=True)
+
+    class Meta:
+        model = DemandClass
         fields = [
-            'id', 'customer', 'store', 'status',
-            'created_at', 'updated_at', 'created_by', 'tenant'
+            'store', 'product', 'sku', 'name', 'revenue', 'revenue_share', 'abc',
+            'mean_daily_units', 'demand_cv', 'xyz', 'computed_at',
         ]
+        read_only_fields = fields
+
+
+class DemandForecastSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DemandForecast
+        fields = ['store', 'product', 'day', 'units', 'computed_at']
+        read_only_fields = fields
 
 
 # ----------------------------
-# Sale Item Serializer
+# Webhook Serializers
 # ----------------------------
 
-class SaleItemSerializer(serializers.ModelSerializer):
+class WebhookEndpointSerializer(serializers.ModelSerializer):
+    events = serializers.ListField(
+        child=serializers.ChoiceField(choices=outbox.EVENT_TYPES), required=False, allow_empty=True,
+    )
+
+    class Meta:
+        model = WebhookEndpoint
+        fields = ['id', 'url', 'secret', 'events', 'is_active', 'batch_size', 'max_concurrency', 'created_at']
+        read_only_fields = ['secret', 'created_at']
+        extra_kwargs = {
+            'batch_size': {'min_value': 1, 'max_value': 1000},
+            'max_concurrency': {'min_value': 1, 'max_value': 20},
+        }
+
+    def validate_url(self, value):
+        # DRF reports the service's ValidationError against the field
+        outbox.validate_endpoint_url(value)
+        return value
+
+
+class WebhookDeliverySerializer(serializers.ModelSerializer):
+    event_type = serializers.CharField(source='event.event_type', read_only=True)
+
+    class Meta:
+        model = WebhookDelivery
+        fields = [
+            'id', 'event', 'event_type', 'status', 'attempts', 'next_attempt_at', 'response_status',
+            'last_error', 'delivered_at',
+        ]
+        read_only_fields = fields
+
+
+class WebhookReplaySerializer(serializers.Serializer):
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+    event_types = serializers.ListField(child=serializers.ChoiceField(choices=outbox.EVENT_TYPES), required=False)
+    events = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=10000)
+
+
+# ----------------------------
+# Loyalty Serializers
+# ----------------------------
+
+class LoyaltyRuleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LoyaltyRule
+        fields = ['id', 'name', 'category', 'points_per_unit', 'expiry_days', 'is_active', 'tenant']
+        read_only_fields = ['tenant']
+
+
+class LoyaltyEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LoyaltyEntry
+        fields = ['id', 'customer', 'entry_type', 'points', 'remaining', 'expires_at', 'sale', 'created_at']
+
+
+class LoyaltyRedeemSerializer(serializers.Serializer):
+    points = serializers.IntegerField(min_value=1)
+    sale = TenantSaleField(required=False)
+
+
+# ----------------------------
+# Order Item Serializer
+# ----------------------------
+
+class OrderItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     service = ServiceSerializer(read_only=True)
 
     class Meta:
-        model = SaleItem
-        fields = ['id', 'product', 'service', 'quantity', 'price_at_sale', 'subtotal', 'tenant']
+        model = OrderItem
+        fields = ['id', 'sale', 'product', 'service', 'quantity', 'price', 'refunded_quantity']
 
 
 # ----------------------------
@@ -138,19 +321,89 @@ class SaleItemSerializer(serializers.ModelSerializer):
 # ----------------------------
 
 class SaleSerializer(serializers.ModelSerializer):
-    items = SaleItemSerializer(many=True, read_only=True)
-    cashier = UserSerializer(read_only=True)
+    items = OrderItemSerializer(many=True, read_only=True)
+    user = UserSerializer(read_only=True)
     store = StoreSerializer(read_only=True)
     customer = CustomerSerializer(read_only=True)
 
     class Meta:
         model = Sale
         fields = [
-            'id', 'order', 'timestamp', 'cashier',
-            'store', 'customer', 'total', 'payment_method', 'items', 'tenant'
+            'id', 'date', 'user', 'store', 'customer', 'shift',
+            'total_amount', 'items', 'tenant'
         ]
 
 
+class SaleLineSerializer(serializers.Serializer):
+    product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all(), required=False)
+    service = serializers.PrimaryKeyRelatedField(queryset=Service.objects.all(), required=False)
+    quantity = serializers.IntegerField(min_value=1)
+
+    def validate(self, attrs):
+        if ('product' in attrs) == ('service' in attrs):
+            raise serializers.ValidationError("Each line needs either a product or a service.")
+        return attrs
+
+
+class SaleCreateSerializer(serializers.Serializer):
+    store = serializers.PrimaryKeyRelatedField(queryset=Store.objects.all())
+    customer = serializers.PrimaryKeyRelatedField(queryset=Customer.objects.all(), required=False, allow_null=True)
+    lines = SaleLineSerializer(many=True, allow_empty=False)
+
+    def validate(self, attrs):
+        tenant_id = self.context['request'].user.tenant_id
+        related = [attrs['store'], attrs.get('customer')]
+        related += [line.get('product') or line.get('service') for line in attrs['lines']]
+        if any(obj is not None and obj.tenant_id != tenant_id for obj in related):
+            raise serializers.ValidationError("Stores, customers, products and services must belong to your tenant.")
+        return attrs
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        return sales.create_sale(
+            user.tenant,
+            validated_data['store'],
+            validated_data['lines'],
+            user=user,
+            customer=validated_data.get('customer'),
+        )
+
+    def to_representation(self, instance):
+        return SaleSerializer(instance, context=self.context).data
+
+
+class ReturnLineSerializer(serializers.Serializer):
+    order_item = TenantOrderItemField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class ReturnSerializer(serializers.Serializer):
+    lines = ReturnLineSerializer(many=True, allow_empty=False)
+    reason = serializers.CharField()
+    method = serializers.ChoiceField(choices=Payment.PAYMENT_METHODS, default='cash')
+    restock = serializers.BooleanField(default=True)
+
+    def validate_lines(self, value):
+        item_ids = [line['order_item'].pk for line in value]
+        if len(set(item_ids)) != len(item_ids):
+            raise serializers.ValidationError("Each order item may only appear once.")
+        return value
+
+
+class RefundItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RefundItem
+        fields = ['id', 'order_item', 'quantity', 'amount', 'restocked']
+
+
+class RefundSerializer(serializers.ModelSerializer):
+    items = RefundItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Refund
+        fields = ['id', 'sale', 'reason', 'amount', 'created_at', 'created_by', 'items']
+
+
 # ----------------------------
 # Inventory Serializer
 # ----------------------------
@@ -170,41 +423,145 @@ class InventorySerializer(serializers.ModelSerializer):
 
 class InventoryTransactionSerializer(serializers.ModelSerializer):
     inventory = InventorySerializer(read_only=True)
-    user = UserSerializer(read_only=True)
+    created_by = UserSerializer(read_only=True)
 
     class Meta:
         model = InventoryTransaction
-        fields = ['id', 'inventory', 'transaction_type', 'quantity', 'timestamp', 'user', 'tenant']
+        fields = ['id', 'inventory', 'transaction_type', 'quantity', 'timestamp', 'notes', 'transfer', 'created_by', 'tenant']
 
 
 # ----------------------------
-# Market Till Serializer
+# Inventory Batch Serializer
 # ----------------------------
 
-class MarketTillSerializer(serializers.ModelSerializer):
-    store = StoreSerializer(read_only=True)
-    opened_by = UserSerializer(read_only=True)
-    closed_by = UserSerializer(read_only=True)
+class InventoryBatchSerializer(serializers.ModelSerializer):
+    product = serializers.IntegerField(source='inventory.product_id', read_only=True)
+    store = serializers.IntegerField(source='inventory.store_id', read_only=True)
 
     class Meta:
-        model = MarketTill
+        model = InventoryBatch
         fields = [
-            'id', 'store', 'opening_balance', 'closing_balance',
-            'opened_at', 'closed_at', 'is_open',
-            'opened_by', 'closed_by', 'tenant'
+            'id', 'inventory', 'product', 'store', 'lot_number',
+            'quantity', 'expiry_date', 'received_at', 'tenant'
         ]
+        read_only_fields = ['received_at', 'tenant']
+
+    def validate_inventory(self, value):
+        if value.tenant_id != self.context['request'].user.tenant_id:
+            raise serializers.ValidationError("The inventory line must belong to your tenant.")
+        return value
+
+    def create(self, validated_data):
+        # Through the stock service, so the on-hand quantity and the ledger record the delivery
+        return stock.receive_batch(
+            validated_data['inventory'],
+            validated_data['quantity'],
+            expiry_date=validated_data.get('expiry_date'),
+            lot_number=validated_data.get('lot_number', ''),
+            user=self.context['request'].user,
+        )
+
+
+class StockAtQuerySerializer(serializers.Serializer):
+    at = serializers.DateTimeField()
+    store = serializers.IntegerField(required=False)
+    product = serializers.IntegerField(required=False)
+
+
+class ExpiringBatchQuerySerializer(serializers.Serializer):
+    days = serializers.IntegerField(min_value=0, default=7)
+    store = serializers.IntegerField(required=False)
+
+
+class ExpiryMarkdownSerializer(ExpiringBatchQuerySerializer):
+    discount_percent = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0, max_value=100)
 
 
 # ----------------------------
-# Transaction Serializer
+# Stock Transfer Serializers
 # ----------------------------
 
-class TransactionSerializer(serializers.ModelSerializer):
-    sale = SaleSerializer(read_only=True)
+class StockTransferLineSerializer(serializers.ModelSerializer):
+    quantity = serializers.IntegerField(min_value=1)
 
     class Meta:
-        model = Transaction
-        fields = ['id', 'sale', 'transaction_type', 'amount', 'timestamp', 'tenant']
+        model = StockTransferLine
+        fields = ['product', 'quantity', 'lots']
+        read_only_fields = ['lots']
+
+
+class StockTransferSerializer(serializers.ModelSerializer):
+    lines = StockTransferLineSerializer(many=True)
+
+    class Meta:
+        model = StockTransfer
+        fields = [
+            'id', 'source_store', 'destination_store', 'status', 'notes', 'lines',
+            'created_by', 'received_by', 'created_at', 'dispatched_at', 'received_at', 'tenant'
+        ]
+        read_only_fields = [
+            'status', 'created_by', 'received_by', 'created_at',
+            'dispatched_at', 'received_at', 'tenant'
+        ]
+
+    def validate(self, attrs):
+        tenant_id = self.context['request'].user.tenant_id
+        if attrs['source_store'] == attrs['destination_store']:
+            raise serializers.ValidationError("Source and destination store must differ.")
+        if {attrs['source_store'].tenant_id, attrs['destination_store'].tenant_id} != {tenant_id}:
+            raise serializers.ValidationError("Both stores must belong to your tenant.")
+        products = [line['product'].pk for line in attrs['lines']]
+        if not products:
+            raise serializers.ValidationError({'lines': "A transfer needs at least one line."})
+        if len(products) != len(set(products)):
+            raise serializers.ValidationError({'lines': "Each product may appear only once."})
+        return attrs
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        return transfers.create_transfer(
+            user.tenant,
+            validated_data['source_store'],
+            validated_data['destination_store'],
+            {line['product'].pk: line['quantity'] for line in validated_data['lines']},
+            user=user,
+            notes=validated_data.get('notes', ''),
+        )
+
+
+# ----------------------------
+# Valuation Serializers
+# ----------------------------
+
+class GrossMarginQuerySerializer(serializers.Serializer):
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    group_by = serializers.ChoiceField(choices=['product', 'day', 'month'], default='product')
+
+
+# ----------------------------
+# Account Serializer
+# ----------------------------
+
+class AccountSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Account
+        fields = ['id', 'code', 'name', 'account_type', 'balance', 'tenant']
+        read_only_fields = ['balance', 'tenant']
+
+
+# ----------------------------
+# Shift Serializer
+# ----------------------------
+
+class ShiftSerializer(serializers.ModelSerializer):
+    store = TenantStoreField()
+
+    class Meta:
+        model = Shift
+        fields = ['id', 'user', 'store', 'start_time', 'end_time', 'created_at']
+        # The cashier is whoever opens the shift
+        read_only_fields = ['user', 'end_time', 'created_at']
 
 
 # ----------------------------
@@ -212,11 +569,9 @@ class TransactionSerializer(serializers.ModelSerializer):
 # ----------------------------
 
 class PaymentSerializer(serializers.ModelSerializer):
-    transaction = TransactionSerializer(read_only=True)
-
     class Meta:
         model = Payment
-        fields = ['id', 'transaction', 'method', 'reference', 'amount', 'commission_amount', 'tenant']
+        fields = ['id', 'sale', 'method', 'reference', 'amount', 'date', 'created_by', 'tenant']
 
 
 # ----------------------------
@@ -224,11 +579,73 @@ class PaymentSerializer(serializers.ModelSerializer):
 # ----------------------------
 
 class CommissionSerializer(serializers.ModelSerializer):
-    payment = PaymentSerializer(read_only=True)
-
     class Meta:
         model = Commission
-        fields = ['id', 'payment', 'amount', 'tenant']
+        fields = ['id', 'user', 'sale', 'amount', 'rule', 'settlement', 'created_at']
+
+
+# ----------------------------
+# Commission Rule Serializers
+# ----------------------------
+
+class CommissionTierSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CommissionTier
+        fields = ['min_volume', 'percent']
+
+
+class CommissionRuleSerializer(serializers.ModelSerializer):
+    tiers = CommissionTierSerializer(many=True, required=False)
+
+    class Meta:
+        model = CommissionRule
+        fields = [
+            'id', 'name', 'rule_type', 'category', 'service',
+            'percent', 'flat_amount', 'is_active', 'tiers', 'tenant'
+        ]
+        read_only_fields = ['tenant']
+
+    def validate(self, attrs):
+        # A partial update keeps the values it does not send
+        def value(field):
+            return attrs[field] if field in attrs else getattr(self.instance, field, None)
+
+        rule_type = value('rule_type')
+        if rule_type == 'category_percent' and (not value('category') or value('percent') is None):
+            raise serializers.ValidationError("A category rule needs a category and a percentage.")
+        if rule_type == 'service_flat' and (not value('service') or value('flat_amount') is None):
+            raise serializers.ValidationError("A service rule needs a service and a flat amount.")
+        return attrs
+
+    def create(self, validated_data):
+        tiers = validated_data.pop('tiers', [])
+        rule = CommissionRule.objects.create(**validated_data)
+        CommissionTier.objects.bulk_create([CommissionTier(rule=rule, **tier) for tier in tiers])
+        return rule
+
+    def update(self, instance, validated_data):
+        tiers = validated_data.pop('tiers', None)
+        instance = super().update(instance, validated_data)
+        if tiers is not None:
+            instance.tiers.all().delete()
+            CommissionTier.objects.bulk_create([CommissionTier(rule=instance, **tier) for tier in tiers])
+        return instance
+
+
+class CommissionSettlementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CommissionSettlement
+        fields = ['id', 'user', 'period_start', 'period_end', 'total', 'settled_at', 'tenant']
+
+
+class CommissionPeriodSerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+
+    def validate(self, attrs):
+        if attrs['end'] < attrs['start']:
+            raise serializers.ValidationError("The period must end on or after its start.")
+        return attrs
 
 
 # ----------------------------
@@ -236,13 +653,12 @@ class CommissionSerializer(serializers.ModelSerializer):
 # ----------------------------
 
 class DeliverySerializer(serializers.ModelSerializer):
-    order = OrderSerializer(read_only=True)
     delivered_by = UserSerializer(read_only=True)
 
     class Meta:
         model = Delivery
         fields = [
-            'id', 'order', 'delivery_type', 'delivered_by',
+            'id', 'sale', 'delivery_type', 'delivered_by',
             'delivery_date', 'tracking_number', 'delivery_fee', 'tenant'
         ]
 
@@ -258,25 +674,67 @@ class PromotionSerializer(serializers.ModelSerializer):
 
 
 # ----------------------------
-# Tax Serializer
+# Price Change Serializers
 # ----------------------------
 
-class TaxSerializer(serializers.ModelSerializer):
+class PriceChangeSerializer(serializers.ModelSerializer):
+    skus = serializers.ListField(child=serializers.CharField(max_length=50), required=False, allow_empty=True)
+
     class Meta:
-        model = Tax
-        fields = ['id', 'name', 'percentage', 'description', 'active', 'tenant']
+        model = PriceChange
+        fields = [
+            'id', 'name', 'operation', 'value', 'category', 'store', 'skus', 'promotions',
+            'activate_at', 'rollback_at', 'status', 'products_changed', 'products_restored',
+            'created_by', 'created_at', 'applied_at', 'rolled_back_at',
+        ]
+        read_only_fields = [
+            'status', 'products_changed', 'products_restored', 'created_by', 'created_at', 'applied_at', 'rolled_back_at',
+        ]
+
+    def validate(self, attrs):
+        tenant_id = self.context['request'].user.tenant_id
+        related = [attrs.get('category'), attrs.get('store'), *attrs.get('promotions', [])]
+        if any(obj is not None and obj.tenant_id != tenant_id for obj in related):
+            raise serializers.ValidationError("Categories, stores and promotions must belong to your tenant.")
+        return attrs
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        return pricing.create_change(user.tenant, user=user, **validated_data)
+
+
+class PriceHistorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PriceHistory
+        fields = [
+            'id', 'product', 'price_change', 'source', 'price', 'cost_price', 'is_discounted', 'discount_percent',
+            'previous_price', 'previous_cost_price', 'previous_is_discounted', 'previous_discount_percent',
+            'effective_from',
+        ]
+        read_only_fields = fields
+
+
+class PriceLookupSerializer(serializers.Serializer):
+    at = serializers.DateTimeField(required=False)
+    products = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=1000)
+
+
+class PriceAtSerializer(serializers.Serializer):
+    product = serializers.IntegerField()
+    price = serializers.DecimalField(max_digits=12, decimal_places=2)
+    cost_price = serializers.DecimalField(max_digits=12, decimal_places=2)
+    is_discounted = serializers.BooleanField()
+    discount_percent = serializers.DecimalField(max_digits=5, decimal_places=2)
 
 
 # ----------------------------
-# Inventory Alert Serializer
+# Tax Serializer
 # ----------------------------
 
-class InventoryAlertSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
-
+class TaxSerializer(serializers.ModelSerializer):
     class Meta:
-        model = InventoryAlert
-        fields = ['id', 'product', 'created_at', 'resolved', 'tenant']
+        model = Tax
+        fields = ['id', 'name', 'percentage', 'description', 'is_active', 'tenant']
 
 
 # ----------------------------
@@ -288,4 +746,23 @@ class ReceiptSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Receipt
-        fields = ['id', 'sale', 'pdf_file', 'generated_at', 'tenant']
+        fields = ['id', 'sale', 'pdf_file', 'pdf_status', 'pdf_digest', 'generated_at', 'tenant']
+        read_only_fields = ['pdf_file', 'pdf_status', 'pdf_digest', 'generated_at']
+
+
+# ----------------------------
+# Gift Card Serializers
+# ----------------------------
+
+class GiftCardSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GiftCard
+        fields = [
+            'id', 'code', 'initial_amount', 'current_balance', 'issued_to', 'issued_by', 'issued_at',
+            'expires_at', 'is_active', 'tenant',
+        ]
+
+
+class GiftCardRedeemSerializer(serializers.Serializer):
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=Decimal('0.01'))
+    sale = TenantSaleField()
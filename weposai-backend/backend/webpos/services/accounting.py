@@ -0,0 +1,214 @@
+"""
+Double-entry posting of POS documents.
+
+Saving a ``Sale``, ``Payment``, ``Refund``, ``Purchase`` or ``Delivery``
+enqueues a ``PostingQueue`` row (see ``webpos.signals``). ``post_pending``
+drains the queue in batches: each document becomes one balanced
+``JournalEntry`` with its ``JournalLine``s, written with ``bulk_create``,
+and the affected ``Account.balance`` running totals are bumped with a single
+``UPDATE`` per batch. Trial balances are then read straight off the
+accounts.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+
+from ..models import (
+    Account, Delivery, JournalEntry, JournalLine, Payment,
+    PostingQueue, Purchase, Refund, Sale,
+)
+
+CASH = '1000'
+CARD_CLEARING = '1010'
+MOBILE_MONEY = '1020'
+BANK = '1030'
+RECEIVABLE = '1100'
+CUSTOMER_CREDIT = '1110'
+INVENTORY = '1200'
+PAYABLE = '2000'
+SALES = '4000'
+DELIVERY_INCOME = '4100'
+SALES_RETURNS = '4900'
+
+DEFAULT_ACCOUNTS = {
+    CASH: ('Cash on Hand', 'asset'),
+    CARD_CLEARING: ('Card Clearing', 'asset'),
+    MOBILE_MONEY: ('Mobile Money', 'asset'),
+    BANK: ('Bank', 'asset'),
+    RECEIVABLE: ('Accounts Receivable', 'asset'),
+    CUSTOMER_CREDIT: ('Customer Credit Accounts', 'asset'),
+    INVENTORY: ('Inventory', 'asset'),
+    PAYABLE: ('Accounts Payable', 'liability'),
+    SALES: ('Sales', 'revenue'),
+    DELIVERY_INCOME: ('Delivery Income', 'revenue'),
+    SALES_RETURNS: ('Sales Returns', 'revenue'),
+}
+
+PAYMENT_ACCOUNTS = {
+    'cash': CASH,
+    'card': CARD_CLEARING,
+    'mobile': MOBILE_MONEY,
+    'bank_transfer': BANK,
+    'credit': CUSTOMER_CREDIT,
+}
+
+SOURCE_MODELS = {
+    'sale': Sale,
+    'payment': Payment,
+    'refund': Refund,
+    'purchase': Purchase,
+    'delivery': Delivery,
+}
+
+
+def ensure_chart(tenant_id):
+    """Create any missing default accounts for a tenant."""
+    Account.objects.bulk_create(
+        [
+            Account(tenant_id=tenant_id, code=code, name=name, account_type=account_type)
+            for code, (name, account_type) in DEFAULT_ACCOUNTS.items()
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def enqueue(tenant_id, source_type, source_id):
+    PostingQueue.objects.get_or_create(
+        source_type=source_type, source_id=source_id, defaults={'tenant_id': tenant_id},
+    )
+
+
+def _legs(source_type, doc):
+    """Return ``(entry_date, description, [(account_code, debit, credit)])`` for a document."""
+    if source_type == 'sale':
+        return doc.date, f"Sale #{doc.pk}", [
+            (RECEIVABLE, doc.total_amount, 0),
+            (SALES, 0, doc.total_amount),
+        ]
+    if source_type == 'payment':
+        description = f"{doc.get_method_display()} payment for Sale #{doc.sale_id}"
+        if doc.amount < 0:
+            # A reversal pays money back out: credit the tender account, debit receivable.
+            return doc.date, f"{description} (reversal)", [
+                (RECEIVABLE, -doc.amount, 0),
+                (PAYMENT_ACCOUNTS[doc.method], 0, -doc.amount),
+            ]
+        return doc.date, description, [
+            (PAYMENT_ACCOUNTS[doc.method], doc.amount, 0),
+            (RECEIVABLE, 0, doc.amount),
+        ]
+    if source_type == 'refund':
+        # The money itself goes back through a reversal Payment, which credits the
+        # tender account and debits receivable.
+        return doc.created_at, f"Refund for Sale #{doc.sale_id}", [
+            (SALES_RETURNS, doc.amount, 0),
+            (RECEIVABLE, 0, doc.amount),
+        ]
+    if source_type == 'purchase':
+        return doc.purchased_at, f"Purchase #{doc.pk} from vendor #{doc.vendor_id}", [
+            (INVENTORY, doc.total_cost, 0),
+            (PAYABLE, 0, doc.total_cost),
+        ]
+    if source_type == 'delivery':
+        return doc.delivery_date or doc.sale.date, f"Delivery fee for Sale #{doc.sale_id}", [
+            (RECEIVABLE, doc.delivery_fee, 0),
+            (DELIVERY_INCOME, 0, doc.delivery_fee),
+        ]
+    raise ValueError(f"Unknown source type {source_type!r}")
+
+
+def post_pending(batch_size=500):
+    """
+    Post one batch from the queue and return the number of documents taken.
+
+    Documents that were already posted, that have since been deleted or
+    that carry a zero amount are dropped from the queue without an entry.
+    """
+    with transaction.atomic():
+        queued = list(
+            PostingQueue.objects.select_for_update(skip_locked=True).order_by('pk')[:batch_size]
+        )
+        if not queued:
+            return 0
+
+        by_type = defaultdict(list)
+        for item in queued:
+            by_type[item.source_type].append(item.source_id)
+        already_posted = set(
+            JournalEntry.objects.filter(source_id__isnull=False)
+            .filter(source_type__in=by_type, source_id__in={item.source_id for item in queued})
+            .values_list('source_type', 'source_id')
+        )
+        tenant_ids = {item.tenant_id for item in queued}
+        for tenant_id in tenant_ids:
+            ensure_chart(tenant_id)
+        accounts = {
+            (tenant_id, code): pk
+            for pk, tenant_id, code in Account.objects.filter(tenant_id__in=tenant_ids).values_list('pk', 'tenant_id', 'code')
+        }
+
+        entries, entry_legs = [], []
+        for source_type, ids in by_type.items():
+            docs = SOURCE_MODELS[source_type].objects.all()
+            if source_type == 'delivery':
+                docs = docs.select_related('sale')
+            for pk, doc in docs.in_bulk(ids).items():
+                if (source_type, pk) in already_posted:
+                    continue
+                entry_date, description, legs = _legs(source_type, doc)
+                amount = sum(Decimal(debit) for _, debit, _ in legs)
+                if not amount:
+                    continue
+                entries.append(JournalEntry(
+                    tenant_id=doc.tenant_id,
+                    description=description,
+                    amount=amount,
+                    entry_date=entry_date.date() if hasattr(entry_date, 'date') else entry_date,
+                    source_type=source_type,
+                    source_id=pk,
+                ))
+                entry_legs.append(legs)
+
+        JournalEntry.objects.bulk_create(entries)
+        lines = []
+        deltas = defaultdict(Decimal)
+        for entry, legs in zip(entries, entry_legs):
+            for code, debit, credit in legs:
+                account_id = accounts[(entry.tenant_id, code)]
+                lines.append(JournalLine(entry=entry, account_id=account_id, debit=debit, credit=credit))
+                deltas[account_id] += Decimal(debit) - Decimal(credit)
+        JournalLine.objects.bulk_create(lines)
+        if deltas:
+            Account.objects.filter(pk__in=deltas).update(balance=F('balance') + Case(
+                *[When(pk=account_id, then=Value(delta)) for account_id, delta in deltas.items()],
+                default=Value(Decimal(0)),
+            ))
+
+        PostingQueue.objects.filter(pk__in=[item.pk for item in queued]).delete()
+    return len(queued)
+
+
+def post_all(batch_size=500):
+    """Drain the posting queue; returns the number of documents processed."""
+    total = 0
+    while True:
+        posted = post_pending(batch_size)
+        if not posted:
+            return total
+        total += posted
+
+
+def trial_balance(tenant_id):
+    """Debit and credit columns per account, read from the running balances."""
+    rows = []
+    for account in Account.objects.filter(tenant_id=tenant_id).order_by('code'):
+        rows.append({
+            'code': account.code,
+            'name': account.name,
+            'account_type': account.account_type,
+            'debit': account.balance if account.balance > 0 else Decimal(0),
+            'credit': -account.balance if account.balance < 0 else Decimal(0),
+        })
+    return rows
@@ -0,0 +1,137 @@
+"""
+Market-basket analysis: which products are bought together.
+
+``compute_affinities`` streams a tenant's product sale lines, ordered by
+sale, from one ``values_list`` query and cuts the stream into chunks of
+whole baskets. Each chunk becomes a sparse binary basket x product matrix
+``X``, and ``X.T @ X`` adds to a product x product co-occurrence matrix whose
+diagonal counts the baskets holding each product. Memory is bounded by one
+chunk plus the co-occurring pairs, however many lines are read.
+
+From the totals, for every pair seen in at least ``min_baskets`` baskets:
+
+* support: the share of all baskets holding both products;
+* confidence(A -> B): the share of A's baskets that also hold B;
+* lift: confidence over B's own share of baskets. Above 1 they meet more
+  often than chance would have them.
+
+The ``top_k`` partners of each product with a lift above 1, best confidence
+first, replace the tenant's ``ProductAffinity`` rows. The till's "frequently
+bought together" prompt reads them from there.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from scipy import sparse
+
+from ..models import OrderItem, Product, ProductAffinity
+
+CHUNK_LINES = 500_000
+
+
+def _basket_chunks(rows, chunk_lines):
+    """Group ``(sale_id, product_id)`` rows ordered by sale into int64 arrays of whole baskets."""
+    buffer = []
+    last_sale = None
+    for sale_id, product_id in rows:
+        if len(buffer) >= chunk_lines and sale_id != last_sale:
+            yield np.array(buffer, dtype=np.int64)
+            buffer = []
+        buffer.append((sale_id, product_id))
+        last_sale = sale_id
+    if buffer:
+        yield np.array(buffer, dtype=np.int64)
+
+
+def cooccurrence(tenant_id, since=None, chunk_lines=CHUNK_LINES):
+    """Return ``(product_ids, baskets, matrix)``: the co-occurrence counts over the tenant's baskets."""
+    product_ids = np.array(
+        Product.objects.filter(tenant_id=tenant_id).order_by('pk').values_list('pk', flat=True), dtype=np.int64,
+    )
+    n = len(product_ids)
+    matrix = sparse.csr_matrix((n, n), dtype=np.int32)
+    baskets = 0
+    if not n:
+        return product_ids, baskets, matrix
+
+    lines = OrderItem.objects.filter(sale__tenant_id=tenant_id, product__isnull=False)
+    if since is not None:
+        lines = lines.filter(sale__date__gte=since)
+    rows = lines.order_by('sale_id').values_list('sale_id', 'product_id').iterator(chunk_size=20_000)
+
+    for chunk in _basket_chunks(rows, chunk_lines):
+        columns = np.searchsorted(product_ids, chunk[:, 1]).clip(max=n - 1)
+        # Lines for products created after product_ids was read
+        known = product_ids[columns] == chunk[:, 1]
+        sales, basket_rows = np.unique(chunk[known, 0], return_inverse=True)
+        x = sparse.csr_matrix(
+            (np.ones(len(basket_rows), dtype=np.int32), (basket_rows, columns[known])),
+            shape=(len(sales), n),
+        )
+        x.sum_duplicates()
+        x.data[:] = 1  # a product counts once per basket, however many lines it took
+        matrix = matrix + (x.T @ x).tocsr()
+        baskets += len(sales)
+    return product_ids, baskets, matrix
+
+
+def associations(product_ids, baskets, matrix, top_k=10, min_baskets=3):
+    """The ``top_k`` partners of each product, as arrays (product, related, rank, count, support, confidence, lift)."""
+    counts = matrix.diagonal().astype(np.float64)
+    pairs = matrix.tocoo()
+    keep = (pairs.row != pairs.col) & (pairs.data >= min_baskets)
+    row, col, together = pairs.row[keep], pairs.col[keep], pairs.data[keep].astype(np.float64)
+
+    confidence = together / counts[row]
+    lift = confidence * baskets / counts[col]
+    positive = lift > 1
+    row, col, together, confidence, lift = (
+        row[positive], col[positive], together[positive], confidence[positive], lift[positive],
+    )
+
+    order = np.lexsort((-lift, -confidence, row))
+    row, col, together, confidence, lift = row[order], col[order], together[order], confidence[order], lift[order]
+    rank = np.arange(len(row)) - np.searchsorted(row, row, side='left')
+    top = rank < top_k
+    return (
+        product_ids[row[top]], product_ids[col[top]], rank[top], together[top],
+        together[top] / max(baskets, 1), confidence[top], lift[top],
+    )
+
+
+def compute_affinities(tenant_id, since_days=365, top_k=10, min_baskets=3, chunk_lines=CHUNK_LINES):
+    """Recompute the tenant's ``ProductAffinity`` rows; returns how many were written."""
+    now = timezone.now()
+    since = now - timedelta(days=since_days) if since_days else None
+    product_ids, baskets, matrix = cooccurrence(tenant_id, since=since, chunk_lines=chunk_lines)
+    products, related, rank, together, support, confidence, lift = associations(
+        product_ids, baskets, matrix, top_k=top_k, min_baskets=min_baskets,
+    )
+    rows = [
+        ProductAffinity(
+            tenant_id=tenant_id,
+            product_id=int(products[i]),
+            related_product_id=int(related[i]),
+            rank=int(rank[i]),
+            baskets=int(together[i]),
+            support=float(support[i]),
+            confidence=float(confidence[i]),
+            lift=float(lift[i]),
+            computed_at=now,
+        )
+        for i in range(len(products))
+    ]
+    with transaction.atomic():
+        ProductAffinity.objects.filter(tenant_id=tenant_id).delete()
+        ProductAffinity.objects.bulk_create(rows, batch_size=5000)
+    return len(rows)
+
+
+def frequently_bought_together(product, limit=5):
+    return (
+        ProductAffinity.objects.filter(product=product, rank__lt=limit)
+        .select_related('related_product')
+        .order_by('rank')
+    )
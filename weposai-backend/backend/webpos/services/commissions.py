@@ -0,0 +1,201 @@
+"""
+Rule-based staff commissions.
+
+``calculate_commissions`` evaluates every active ``CommissionRule`` of a
+tenant over the sale lines rung up in a date range. The lines are read with
+one joined ``values_list`` query; each rule is then applied to the whole
+period at once with numpy, and the resulting per-(user, sale, rule) amounts
+are written with ``bulk_create``. Lines count net of returned units.
+Re-running a period replaces the unsettled rule-generated commissions it
+produced before and only writes the difference against what was already
+settled, so returns after a settlement come through as negative corrections.
+What was settled under a rule that has since been deactivated is left as it
+is.
+``settle_period`` rolls the unsettled commissions up to the end of a period
+into one ``CommissionSettlement`` per user.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from ..models import Commission, CommissionRule, CommissionSettlement, OrderItem
+
+CENT = Decimal('0.01')
+
+
+def _period_bounds(start, end):
+    """Aware datetimes covering the whole days ``start`` to ``end`` inclusive."""
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+    )
+
+
+def _load_lines(tenant, start, end):
+    since, until = _period_bounds(start, end)
+    rows = list(
+        OrderItem.objects.filter(
+            sale__tenant=tenant, sale__date__gte=since, sale__date__lt=until, sale__user__isnull=False,
+        ).values_list(
+            'sale_id', 'sale__user_id', 'product__category_id', 'service_id',
+            'service__category_id', 'quantity', 'refunded_quantity', 'price',
+        )
+    )
+    if not rows:
+        return None
+    columns = list(zip(*rows))
+    product_category = np.array([c or 0 for c in columns[2]], dtype=np.int64)
+    service_category = np.array([c or 0 for c in columns[4]], dtype=np.int64)
+    quantity = np.array(columns[5], dtype=np.float64) - np.array(columns[6], dtype=np.float64)
+    return {
+        'sale': np.array(columns[0], dtype=np.int64),
+        'user': np.array(columns[1], dtype=np.int64),
+        'category': np.where(product_category > 0, product_category, service_category),
+        'service': np.array([s or 0 for s in columns[3]], dtype=np.int64),
+        'quantity': quantity,
+        'total': quantity * np.array([float(p) for p in columns[7]]),
+    }
+
+
+def _rule_amounts(rule, lines):
+    """Commission earned on each line under ``rule``."""
+    if rule.rule_type == 'category_percent':
+        mask = lines['category'] == rule.category_id
+        return np.where(mask, lines['total'] * float(rule.percent) / 100, 0.0)
+    if rule.rule_type == 'service_flat':
+        mask = lines['service'] == rule.service_id
+        return np.where(mask, lines['quantity'] * float(rule.flat_amount), 0.0)
+
+    tiers = sorted(rule.tiers.all(), key=lambda tier: tier.min_volume)
+    if not tiers:
+        return np.zeros(len(lines['total']))
+    mask = lines['category'] == rule.category_id if rule.category_id else np.ones(len(lines['total']), dtype=bool)
+    users, user_idx = np.unique(lines['user'], return_inverse=True)
+    volume = np.bincount(user_idx, weights=np.where(mask, lines['total'], 0.0), minlength=len(users))
+    thresholds = np.array([float(tier.min_volume) for tier in tiers])
+    rates = np.array([0.0] + [float(tier.percent) for tier in tiers])
+    user_rate = rates[np.searchsorted(thresholds, volume, side='right')]
+    return np.where(mask, lines['total'] * user_rate[user_idx] / 100, 0.0)
+
+
+def calculate_commissions(tenant, start, end):
+    """
+    Compute commissions for sales dated ``start`` to ``end`` (inclusive dates).
+
+    Returns the number of ``Commission`` rows written.
+    """
+    lines = _load_lines(tenant, start, end)
+    rules = list(CommissionRule.objects.filter(tenant=tenant, is_active=True).prefetch_related('tiers'))
+    since, until = _period_bounds(start, end)
+    # Settled amounts of rules since deactivated stand as paid; only active rules are re-evaluated.
+    settled = {
+        (row['user_id'], row['sale_id'], row['rule_id']): row['total']
+        for row in Commission.objects.filter(
+            sale__tenant=tenant, sale__date__gte=since, sale__date__lt=until,
+            rule__is_active=True, settlement__isnull=False,
+        ).order_by().values('user_id', 'sale_id', 'rule_id').annotate(total=Sum('amount'))
+    }
+
+    commissions = []
+    if lines is not None:
+        keys = np.stack([lines['user'], lines['sale']], axis=1)
+        pairs, pair_idx = np.unique(keys, axis=0, return_inverse=True)
+        pair_idx = pair_idx.reshape(-1)
+        for rule in rules:
+            per_pair = np.bincount(pair_idx, weights=_rule_amounts(rule, lines), minlength=len(pairs))
+            for (user_id, sale_id), amount in zip(pairs.tolist(), per_pair.tolist()):
+                amount = Decimal(repr(amount)).quantize(CENT) - settled.pop((user_id, sale_id, rule.pk), 0)
+                if amount:
+                    commissions.append(Commission(user_id=user_id, sale_id=sale_id, rule=rule, amount=amount))
+    # Settled commissions whose lines no longer earn anything are reversed in full.
+    for (user_id, sale_id, rule_id), amount in settled.items():
+        if amount:
+            commissions.append(Commission(user_id=user_id, sale_id=sale_id, rule_id=rule_id, amount=-amount))
+
+    with transaction.atomic():
+        Commission.objects.filter(
+            sale__tenant=tenant,
+            sale__date__gte=since,
+            sale__date__lt=until,
+            rule__isnull=False,
+            settlement__isnull=True,
+        ).delete()
+        Commission.objects.bulk_create(commissions, batch_size=2000)
+    return len(commissions)
+
+
+def reverse_for_return(sale, refunded_amount):
+    """
+    Write negative commissions for the share of ``sale`` that was returned.
+
+    Each rule's commission still standing on the sale is reversed in
+    proportion to the returned share of the value not yet returned, so call
+    this before the lines' ``refunded_quantity`` is bumped. The next
+    ``calculate_commissions`` run over the period replaces these with exact
+    figures from the net lines.
+    """
+    lines_total = sum(
+        (
+            price * (quantity - refunded)
+            for quantity, refunded, price in OrderItem.objects.filter(sale=sale).values_list(
+                'quantity', 'refunded_quantity', 'price',
+            )
+        ),
+        Decimal(0),
+    )
+    if not lines_total:
+        return []
+    share = min(Decimal(refunded_amount) / lines_total, Decimal(1))
+    reversals = [
+        Commission(user_id=row['user_id'], sale=sale, rule_id=row['rule_id'], amount=-(row['total'] * share).quantize(CENT))
+        for row in Commission.objects.filter(sale=sale).order_by().values('user_id', 'rule_id').annotate(total=Sum('amount'))
+        if row['total'] > 0
+    ]
+    return Commission.objects.bulk_create([c for c in reversals if c.amount])
+
+
+def settle_period(tenant, start, end):
+    """
+    Settle every unsettled commission on sales dated up to ``end``.
+
+    Corrections still open from earlier periods (returns after those were
+    settled) are picked up by the next settlement. Creates one
+    ``CommissionSettlement`` per user and attaches the commissions to it with
+    a single ``UPDATE``. Returns the settlements.
+    """
+    _, until = _period_bounds(start, end)
+    with transaction.atomic():
+        if CommissionSettlement.objects.filter(tenant=tenant, period_start=start, period_end=end).exists():
+            raise ValidationError(f"Commissions for {start} - {end} are already settled.")
+        # Lock the rows first: PostgreSQL allows no FOR UPDATE on a grouped query,
+        # and ``of`` keeps the lock off the joined sales.
+        pks = list(
+            Commission.objects.select_for_update(of=('self',))
+            .filter(sale__tenant=tenant, sale__date__lt=until, settlement__isnull=True)
+            .values_list('pk', flat=True)
+        )
+        unsettled = Commission.objects.filter(pk__in=pks)
+        totals = list(unsettled.order_by().values('user_id').annotate(total=Sum('amount')))
+        settlements = CommissionSettlement.objects.bulk_create([
+            CommissionSettlement(
+                tenant_id=getattr(tenant, 'pk', tenant),
+                user_id=row['user_id'],
+                period_start=start,
+                period_end=end,
+                total=row['total'].quantize(CENT),
+            )
+            for row in totals
+        ])
+        unsettled.update(
+            settlement=Subquery(
+                CommissionSettlement.objects.filter(
+                    tenant=tenant, user=OuterRef('user'), period_start=start, period_end=end,
+                ).values('pk')[:1]
+            )
+        )
+    return settlements
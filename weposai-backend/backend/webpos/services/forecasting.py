@@ -0,0 +1,194 @@
+"""
+Demand classification and short-horizon forecasts per SKU and store.
+
+``forecast_tenant`` reads ``history_days`` of the stock ledger as one grouped
+query: units sold per store, product and day, net of customer returns. The
+``sale`` rows are written at checkout (``services.sales``) and the ``return``
+rows by ``services.returns``. It lays them out as a dense series x day
+matrix. Revenue comes from the order lines of the same window. Everything
+after that is vectorised over all series at once:
+
+* ABC: products are ranked by revenue within their store. Those making up
+  the first 80% of the store's revenue are A, the next 15% B, the rest C.
+* XYZ: the coefficient of variation of daily units. Up to 0.5 is X (steady),
+  up to 1.0 Y, above that or without sales Z.
+* Forecast: damped-trend (Holt) exponential smoothing over the daily
+  series, projected ``horizon`` days ahead.
+
+Results replace the tenant's ``DemandClass`` and ``DemandForecast`` rows,
+which the dashboard reads directly. ``run_all`` runs tenants in a process
+pool, one tenant per task, for the nightly ``manage.py run_forecasts``.
+"""
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import connections, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .. import routing
+from ..models import DemandClass, DemandForecast, InventoryTransaction, OrderItem
+
+ABC_SHARES = (0.80, 0.95)
+XYZ_CV = (0.5, 1.0)
+CENT = Decimal('0.01')
+
+
+def _window(history_days, today):
+    start = today - timedelta(days=history_days)
+    tz = timezone.get_current_timezone()
+    return start, datetime.combine(start, time.min, tz), datetime.combine(today, time.min, tz)
+
+
+def _units_by_day(tenant_id, since, until):
+    return (
+        InventoryTransaction.objects.filter(
+            tenant_id=tenant_id, transaction_type__in=('sale', 'return'), timestamp__gte=since, timestamp__lt=until,
+        )
+        .annotate(day=TruncDate('timestamp'))
+        .values('inventory__store_id', 'inventory__product_id', 'day')
+        .annotate(units=Sum('quantity'))
+        .values_list('inventory__store_id', 'inventory__product_id', 'day', 'units')
+        .order_by()
+    )
+
+
+def _revenue(tenant_id, since, until):
+    return (
+        OrderItem.objects.filter(
+            sale__tenant_id=tenant_id, product__isnull=False, sale__date__gte=since, sale__date__lt=until,
+        )
+        .values('sale__store_id', 'product_id')
+        .annotate(revenue=Sum((F('quantity') - F('refunded_quantity')) * F('price')))
+        .values_list('sale__store_id', 'product_id', 'revenue')
+        .order_by()
+    )
+
+
+def abc_classes(stores, revenue):
+    """A/B/C per series from its share of its store's revenue, largest first."""
+    if not len(stores):
+        return np.empty(0, dtype='<U1'), np.empty(0)
+    order = np.lexsort((-revenue, stores))
+    sorted_stores, sorted_revenue = stores[order], revenue[order]
+    starts = np.flatnonzero(np.r_[True, sorted_stores[1:] != sorted_stores[:-1]])
+    lengths = np.diff(np.r_[starts, len(order)])
+    cumulative = np.cumsum(sorted_revenue)
+    before = cumulative - sorted_revenue - np.repeat(cumulative[starts] - sorted_revenue[starts], lengths)
+    totals = np.repeat(np.add.reduceat(sorted_revenue, starts), lengths)
+    # A product is in the class its revenue starts in, so the one crossing 80% is still an A.
+    share_before = np.divide(before, totals, out=np.ones_like(before), where=totals > 0)
+    classes = np.where(share_before < ABC_SHARES[0], 'A', np.where(share_before < ABC_SHARES[1], 'B', 'C'))
+    classes[sorted_revenue <= 0] = 'C'
+    result = np.empty(len(order), dtype='<U1')
+    result[order] = classes
+    share = np.empty(len(order))
+    share[order] = np.divide(sorted_revenue, totals, out=np.zeros_like(sorted_revenue), where=totals > 0)
+    return result, share
+
+
+def xyz_classes(series):
+    """X/Y/Z per row of a series x day matrix, with its mean and coefficient of variation (NaN without sales)."""
+    mean = series.mean(axis=1)
+    cv = np.divide(series.std(axis=1), mean, out=np.full(len(mean), np.nan), where=mean > 0)
+    classes = np.where(cv <= XYZ_CV[0], 'X', np.where(cv <= XYZ_CV[1], 'Y', 'Z'))
+    return classes, mean, cv
+
+
+def damped_holt(series, horizon, alpha=0.3, beta=0.1, phi=0.9):
+    """Forecast ``horizon`` steps past the last column of ``series``, for every row at once."""
+    level = series[:, 0].astype(np.float64)
+    trend = np.zeros(len(series))
+    for t in range(1, series.shape[1]):
+        previous = level
+        level = alpha * series[:, t] + (1 - alpha) * (level + phi * trend)
+        trend = beta * (level - previous) + (1 - beta) * phi * trend
+    damping = np.cumsum(phi ** np.arange(1, horizon + 1))
+    return np.clip(level[:, None] + trend[:, None] * damping[None, :], 0, None)
+
+
+def forecast_tenant(tenant_id, history_days=91, horizon=14, today=None):
+    """Recompute the tenant's demand classes and forecasts; returns counts of rows written."""
+    today = today or timezone.localdate()
+    start, since, until = _window(history_days, today)
+
+    units = list(_units_by_day(tenant_id, since, until))
+    revenue = list(_revenue(tenant_id, since, until))
+    keys = np.array([(store, product) for store, product, *_ in itertools.chain(units, revenue)], dtype=np.int64)
+    if not len(keys):
+        keys = keys.reshape(0, 2)
+    keys, index = np.unique(keys, axis=0, return_inverse=True)
+    index = index.reshape(-1)
+
+    series = np.zeros((len(keys), history_days))
+    if units:
+        days = np.array([(day - start).days for _, _, day, _ in units])
+        sold = -np.array([quantity for *_, quantity in units], dtype=np.float64)
+        np.add.at(series, (index[:len(units)], days), sold)
+        np.clip(series, 0, None, out=series)  # days with more returns than sales
+    totals = np.zeros(len(keys))
+    if revenue:
+        np.add.at(totals, index[len(units):], np.array([float(amount or 0) for *_, amount in revenue]))
+
+    abc, share = abc_classes(keys[:, 0], totals)
+    xyz, mean, cv = xyz_classes(series)
+    active = mean > 0
+    forecast = damped_holt(series[active], horizon) if active.any() else np.zeros((0, horizon))
+
+    now = timezone.now()
+    classes = [
+        DemandClass(
+            tenant_id=tenant_id,
+            store_id=int(store),
+            product_id=int(product),
+            revenue=Decimal(repr(float(totals[i]))).quantize(CENT),
+            revenue_share=float(share[i]),
+            abc=abc[i],
+            mean_daily_units=float(mean[i]),
+            demand_cv=None if np.isnan(cv[i]) else float(cv[i]),
+            xyz=xyz[i],
+            computed_at=now,
+        )
+        for i, (store, product) in enumerate(keys.tolist())
+    ]
+    forecast_days = [today + timedelta(days=h) for h in range(horizon)]
+    forecasts = [
+        DemandForecast(
+            tenant_id=tenant_id, store_id=store, product_id=product, day=day, units=float(value), computed_at=now,
+        )
+        for (store, product), row in zip(keys[active].tolist(), forecast.tolist())
+        for day, value in zip(forecast_days, row)
+    ]
+    with transaction.atomic():
+        DemandForecast.objects.filter(tenant_id=tenant_id).delete()
+        DemandClass.objects.filter(tenant_id=tenant_id).delete()
+        DemandClass.objects.bulk_create(classes, batch_size=5000)
+        DemandForecast.objects.bulk_create(forecasts, batch_size=5000)
+    return {'classes': len(classes), 'forecasts': len(forecasts)}
+
+
+def _run_one(tenant_id, options):
+    with routing.tenant(tenant_id):
+        return tenant_id, forecast_tenant(tenant_id, **options)
+
+
+def run_all(tenant_ids, workers=1, log=print, **options):
+    """``forecast_tenant`` for each tenant; with ``workers`` above 1, one tenant per task in a process pool."""
+    def report(results):
+        for tenant_id, counts in results:
+            log(f"tenant {tenant_id}: {counts['classes']} classes, {counts['forecasts']} forecasts")
+
+    if workers <= 1:
+        report(map(_run_one, tenant_ids, itertools.repeat(options)))
+        return
+    # Forked workers must not share this process's database connections.
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('fork'), initializer=connections.close_all,
+    ) as pool:
+        report(pool.map(_run_one, tenant_ids, itertools.repeat(options)))
@@ -0,0 +1,230 @@
+"""
+Database-backed background jobs.
+
+A ``Job`` row names a registered task and the JSON keyword arguments to call
+it with. Enqueueing is an ``INSERT`` in the caller's transaction, so a job
+exists exactly when the work that asked for it was committed.
+
+Workers (``manage.py run_jobs``) claim jobs with ``SELECT ... FOR UPDATE
+SKIP LOCKED`` over the partial ``job_ready_idx`` index, highest priority and
+oldest first. A tenant may have at most ``JOB_TENANT_CONCURRENCY`` jobs
+running at once; its other jobs are left out of the claim query, not
+waited on, until a slot frees up. Failed attempts are retried with exponential backoff and jitter
+until ``max_attempts``. While a job runs, a heartbeat thread refreshes its
+``locked_at`` every ``JOB_HEARTBEAT_SECONDS``, so only jobs whose worker
+vanished have a lock older than ``JOB_LOCK_TIMEOUT`` seconds and are
+requeued. A worker records the outcome only while the job is still running
+under its lock; if the job was requeued and taken by someone else in the
+meantime, the late result is dropped.
+
+Tasks are plain functions registered by name in ``webpos.tasks``.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .. import routing
+from ..models import Job, Tenant
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+BACKOFF_BASE = 10
+BACKOFF_CAP = 3600
+CLAIM_WINDOW = 50
+
+
+def register(name, func):
+    TASKS[name] = func
+    return func
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue(task, payload=None, tenant=None, priority=0, run_after=None, max_attempts=5, user=None):
+    """Queue ``task`` to be called with ``payload`` as keyword arguments."""
+    if task not in TASKS:
+        raise ValueError(f"Unknown task {task!r}")
+    return Job.objects.create(
+        tenant_id=getattr(tenant, 'pk', tenant),
+        task=task,
+        payload=payload or {},
+        priority=priority,
+        run_after=run_after or timezone.now(),
+        max_attempts=max_attempts,
+        created_by=user,
+    )
+
+
+def backoff(attempts):
+    """Seconds to wait before retry number ``attempts`` (1-based), with jitter."""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_CAP)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim(worker, now=None):
+    """Take the next runnable job for ``worker``, or return ``None``."""
+    now = now or timezone.now()
+    limit = _setting('JOB_TENANT_CONCURRENCY', 2)
+    # Tenants already at their limit are left out of the window, so a backlog
+    # of theirs cannot fill it and starve everyone else.
+    saturated = (
+        Job.objects.filter(status='running', tenant__isnull=False)
+        .order_by()
+        .values('tenant_id')
+        .annotate(n=Count('pk'))
+        .filter(n__gte=limit)
+        .values('tenant_id')
+    )
+    with transaction.atomic():
+        candidates = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='queued', run_after__lte=now)
+            .exclude(tenant_id__in=saturated)
+            .order_by('-priority', 'run_after', 'pk')[:CLAIM_WINDOW]
+        )
+        if not candidates:
+            return None
+        tenant_ids = {job.tenant_id for job in candidates if job.tenant_id is not None}
+        if tenant_ids:
+            # Serialise claims per tenant so two workers cannot both take the last slot.
+            list(Tenant.objects.select_for_update().filter(pk__in=tenant_ids).order_by('pk').values_list('pk'))
+        running = dict(
+            Job.objects.filter(status='running', tenant_id__in=tenant_ids)
+            .order_by()
+            .values('tenant_id')
+            .annotate(n=Count('pk'))
+            .values_list('tenant_id', 'n')
+        )
+        for job in candidates:
+            # A tenant may have filled up between the window query and the lock above
+            if job.tenant_id is not None and running.get(job.tenant_id, 0) >= limit:
+                continue
+            job.status = 'running'
+            job.attempts += 1
+            job.locked_by = worker
+            job.locked_at = now
+            job.started_at = now
+            job.save(update_fields=['status', 'attempts', 'locked_by', 'locked_at', 'started_at'])
+            return job
+    return None
+
+
+def _held(job):
+    return Job.objects.filter(pk=job.pk, locked_by=job.locked_by, status='running')
+
+
+def heartbeat(job):
+    """Refresh the lock of a job this worker is running; False once it has lost it."""
+    return bool(_held(job).update(locked_at=timezone.now()))
+
+
+def _beat(job, stop):
+    interval = _setting('JOB_HEARTBEAT_SECONDS', 60)
+    try:
+        while not stop.wait(interval):
+            if not heartbeat(job):
+                return
+    finally:
+        # This thread's own connections
+        connections.close_all()
+
+
+def _record(job, **outcome):
+    if not _held(job).update(locked_by='', locked_at=None, **outcome):
+        logger.warning("Job #%s (%s) was requeued or cancelled while running; dropping its outcome", job.pk, job.task)
+
+
+def run(job):
+    """Execute a claimed job and record its outcome."""
+    func = TASKS.get(job.task)
+    stop = threading.Event()
+    beat = threading.Thread(target=_beat, args=(job, stop), name=f'job-{job.pk}-heartbeat', daemon=True)
+    beat.start()
+    try:
+        if func is None:
+            raise LookupError(f"Unknown task {job.task!r}")
+        with routing.tenant(job.tenant_id):
+            result = func(**job.payload)
+    except Exception:
+        logger.warning("Job #%s (%s) attempt %s failed", job.pk, job.task, job.attempts)
+        retry = job.attempts < job.max_attempts
+        outcome = dict(
+            status='queued' if retry else 'failed',
+            run_after=timezone.now() + timedelta(seconds=backoff(job.attempts)) if retry else F('run_after'),
+            finished_at=None if retry else timezone.now(),
+            last_error=traceback.format_exc(),
+        )
+    else:
+        outcome = dict(
+            status='succeeded',
+            finished_at=timezone.now(),
+            result=result if isinstance(result, (dict, list, str, int, float, bool)) else None,
+        )
+    finally:
+        stop.set()
+        beat.join()
+    _record(job, **outcome)
+    return outcome['status'] == 'succeeded'
+
+
+def requeue_stale(now=None):
+    """Put jobs whose worker stopped refreshing their lock back in the queue."""
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=_setting('JOB_LOCK_TIMEOUT', 900))
+    return Job.objects.filter(status='running', locked_at__lt=cutoff).update(
+        status='queued', locked_by='', locked_at=None, run_after=now,
+    )
+
+
+def retry(job):
+    """Send a failed or cancelled job round again."""
+    return Job.objects.filter(pk=job.pk, status__in=('failed', 'cancelled')).update(
+        status='queued', attempts=0, run_after=timezone.now(), finished_at=None,
+    )
+
+
+def cancel(job):
+    """Cancel a job that has not started yet."""
+    return Job.objects.filter(pk=job.pk, status='queued').update(status='cancelled', finished_at=timezone.now())
+
+
+def work(worker=None, once=False, poll_interval=1.0, max_jobs=None):
+    """
+    Worker loop: claim and run jobs until the queue is empty (``once``),
+    ``max_jobs`` have run, or forever. Returns the number of jobs run.
+    """
+    worker = worker or worker_name()
+    done = 0
+    last_sweep = 0.0
+    while max_jobs is None or done < max_jobs:
+        close_old_connections()
+        if time.monotonic() - last_sweep > 60:
+            requeue_stale()
+            last_sweep = time.monotonic()
+        job = claim(worker)
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+        run(job)
+        done += 1
+    return done
@@ -0,0 +1,135 @@
+"""
+Point-in-time stock from the inventory ledger.
+
+``Inventory.quantity`` is the running balance of the inventory's ledger rows
+(see ``services.stock``). Daily ``InventorySnapshot`` rows checkpoint that
+balance, so a historical lookup replays only the rows written since the
+nearest snapshot instead of the inventory's whole history.
+"""
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import DateTimeField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import Inventory, InventorySnapshot, InventoryTransaction
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def closing_instant(day):
+    """The moment a day's snapshot is taken: midnight at the start of the next day."""
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def iter_chunks(queryset, chunk_size=2000):
+    """Yield ``(first_pk, last_pk)`` ranges covering ``queryset`` in primary-key order."""
+    last_pk = 0
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not pks:
+            return
+        yield pks[0], pks[-1]
+        last_pk = pks[-1]
+
+
+def annotate_stock_at(inventories, at):
+    """
+    Annotate ``inventories`` with ``stock_at``: the quantity on hand just before ``at``.
+
+    The nearest snapshot taken at or before ``at`` is read from the
+    ``(inventory, as_of)`` index and only the ledger rows between it and
+    ``at`` are summed, all inside the one query.
+    """
+    snapshots = InventorySnapshot.objects.filter(inventory=OuterRef('pk'), as_of__lte=at).order_by('-as_of')
+    replay = (
+        InventoryTransaction.objects.filter(
+            inventory=OuterRef('pk'),
+            timestamp__lt=at,
+            timestamp__gte=Coalesce(OuterRef('snapshot_as_of'), Value(EPOCH, output_field=DateTimeField())),
+        )
+        .order_by()
+        .values('inventory')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    return inventories.annotate(
+        snapshot_quantity=Subquery(snapshots.values('quantity')[:1], output_field=IntegerField()),
+        snapshot_as_of=Subquery(snapshots.values('as_of')[:1], output_field=DateTimeField()),
+    ).annotate(
+        stock_at=Coalesce('snapshot_quantity', 0) + Coalesce(Subquery(replay, output_field=IntegerField()), 0),
+    )
+
+
+def stock_at(inventory_ids, at):
+    """Map each of ``inventory_ids`` to its quantity on hand just before ``at``."""
+    inventories = Inventory.objects.filter(pk__in=inventory_ids)
+    return dict(annotate_stock_at(inventories, at).values_list('pk', 'stock_at'))
+
+
+def take_snapshots(day, tenant=None, chunk_size=2000):
+    """
+    Record the closing quantity of every inventory line for ``day``.
+
+    Each chunk is computed with one ``annotate_stock_at`` query (so it starts
+    from the previous day's snapshot) and written with one upserting
+    ``bulk_create``; re-running a day overwrites its rows. Returns the number
+    of snapshots written.
+    """
+    as_of = closing_instant(day)
+    inventories = Inventory.objects.all()
+    if tenant is not None:
+        inventories = inventories.filter(tenant=tenant)
+
+    written = 0
+    for first_pk, last_pk in iter_chunks(inventories, chunk_size):
+        rows = annotate_stock_at(
+            inventories.filter(pk__range=(first_pk, last_pk)), as_of
+        ).values_list('pk', 'tenant_id', 'stock_at')
+        with transaction.atomic():
+            written += len(InventorySnapshot.objects.bulk_create(
+                [
+                    InventorySnapshot(
+                        tenant_id=tenant_id,
+                        inventory_id=inventory_id,
+                        snapshot_date=day,
+                        as_of=as_of,
+                        quantity=quantity,
+                    )
+                    for inventory_id, tenant_id, quantity in rows
+                ],
+                update_conflicts=True,
+                unique_fields=['inventory', 'snapshot_date'],
+                update_fields=['as_of', 'quantity'],
+            ))
+    return written
+
+
+def ledger_drift(tenant=None, chunk_size=5000):
+    """
+    Yield ``(inventory_id, quantity, ledger_total)`` for every inventory line
+    whose stored quantity disagrees with the sum of its ledger.
+
+    Works through the inventories in primary-key chunks; each chunk costs one
+    grouped ``SUM`` over the ledger and one read of the stored quantities.
+    """
+    inventories = Inventory.objects.all()
+    if tenant is not None:
+        inventories = inventories.filter(tenant=tenant)
+
+    for first_pk, last_pk in iter_chunks(inventories, chunk_size):
+        totals = dict(
+            InventoryTransaction.objects.filter(inventory_id__gte=first_pk, inventory_id__lte=last_pk)
+            .order_by()
+            .values('inventory_id')
+            .annotate(total=Sum('quantity'))
+            .values_list('inventory_id', 'total')
+        )
+        stored = inventories.filter(pk__range=(first_pk, last_pk)).values_list('pk', 'quantity')
+        for inventory_id, quantity in stored:
+            ledger_total = totals.get(inventory_id, 0)
+            if quantity != ledger_total:
+                yield inventory_id, quantity, ledger_total
@@ -0,0 +1,190 @@
+"""
+Customer loyalty points.
+
+``LoyaltyEntry`` is an append-only ledger per customer; ``Customer.loyalty_balance``
+caches its sum and is only ever changed with ``F()`` expressions in the same
+transaction as the entry, so concurrent accruals cannot overwrite each other
+and the till reads the balance with a primary-key lookup. Accruals are lots
+with a ``remaining`` count: redemptions draw down the lots that expire first,
+and ``expire_points`` sweeps whatever is left of lots past their expiry.
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from ..models import Customer, LoyaltyEntry, LoyaltyRule, OrderItem
+
+
+def balance(customer_id):
+    return Customer.objects.filter(pk=customer_id).values_list('loyalty_balance', flat=True).first()
+
+
+def points_for_sale(sale):
+    """Evaluate the tenant's active rules over the sale's lines: ``(points, expiry_days)``."""
+    rules = list(LoyaltyRule.objects.filter(tenant_id=sale.tenant_id, is_active=True))
+    if not rules:
+        return 0, None
+    lines = OrderItem.objects.filter(sale=sale).values_list(
+        'product__category_id', 'service__category_id', 'quantity', 'price',
+    )
+    spend_by_category = defaultdict(Decimal)
+    for product_category, service_category, quantity, price in lines:
+        spend_by_category[product_category or service_category] += price * quantity
+    total_spend = sum(spend_by_category.values(), Decimal(0))
+
+    points = Decimal(0)
+    expiry_days = []
+    for rule in rules:
+        spend = total_spend if rule.category_id is None else spend_by_category.get(rule.category_id, Decimal(0))
+        if spend:
+            points += spend * rule.points_per_unit
+            if rule.expiry_days:
+                expiry_days.append(rule.expiry_days)
+    return math.floor(points), min(expiry_days, default=None)
+
+
+def accrue_for_sale(sale):
+    """Credit the sale's customer once; returns the accrual entry, or ``None``."""
+    if sale.customer_id is None:
+        return None
+    points, expiry_days = points_for_sale(sale)
+    if points <= 0:
+        return None
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            entry = LoyaltyEntry.objects.create(
+                tenant_id=sale.tenant_id,
+                customer_id=sale.customer_id,
+                entry_type='accrual',
+                points=points,
+                remaining=points,
+                expires_at=now + timedelta(days=expiry_days) if expiry_days else None,
+                sale=sale,
+            )
+            Customer.objects.filter(pk=sale.customer_id).update(loyalty_balance=F('loyalty_balance') + points)
+    except IntegrityError:
+        # The sale has already earned its points.
+        return None
+    return entry
+
+
+def _draw_down(customer, points, first=None):
+    """Take ``points`` off the customer's open lots: lot ``first``, then soonest-expiring."""
+    order = [F('expires_at').asc(nulls_last=True), 'created_at', 'pk']
+    if first is not None:
+        order.insert(0, Case(When(pk=first, then=Value(0)), default=Value(1)))
+    lots = LoyaltyEntry.objects.select_for_update().filter(customer=customer, remaining__gt=0).order_by(*order)
+    needed = points
+    touched = []
+    for lot in lots:
+        take = min(needed, lot.remaining)
+        lot.remaining -= take
+        needed -= take
+        touched.append(lot)
+        if not needed:
+            break
+    LoyaltyEntry.objects.bulk_update(touched, ['remaining'])
+
+
+def redeem(customer, points, sale=None):
+    """Spend ``points`` of ``customer``'s balance, soonest-expiring lots first."""
+    if points <= 0:
+        raise ValidationError("Points to redeem must be positive.")
+    with transaction.atomic():
+        locked = Customer.objects.select_for_update().get(pk=customer.pk)
+        if locked.loyalty_balance < points:
+            raise ValidationError(f"Customer has {locked.loyalty_balance} points, cannot redeem {points}.")
+        _draw_down(locked, points)
+        entry = LoyaltyEntry.objects.create(
+            tenant_id=locked.tenant_id,
+            customer=locked,
+            entry_type='redemption',
+            points=-points,
+            sale_id=getattr(sale, 'pk', sale),
+        )
+        Customer.objects.filter(pk=locked.pk).update(loyalty_balance=F('loyalty_balance') - points)
+    return entry
+
+
+def reverse_for_return(sale, refunded_amount):
+    """
+    Take back the share of ``sale``'s accrual that ``refunded_amount`` paid for.
+
+    Points come out of what is left of the sale's own lot first and then the
+    soonest-expiring lots, never taking the balance below zero. Returns the
+    adjustment entry, or ``None`` when there is nothing to take back.
+    """
+    accrual = LoyaltyEntry.objects.filter(sale=sale, entry_type='accrual').first()
+    if accrual is None or not sale.total_amount:
+        return None
+    points = math.floor(accrual.points * min(Decimal(refunded_amount) / sale.total_amount, Decimal(1)))
+    with transaction.atomic():
+        locked = Customer.objects.select_for_update().get(pk=accrual.customer_id)
+        points = min(points, locked.loyalty_balance)
+        if points <= 0:
+            return None
+        _draw_down(locked, points, first=accrual.pk)
+        entry = LoyaltyEntry.objects.create(
+            tenant_id=locked.tenant_id,
+            customer=locked,
+            entry_type='adjustment',
+            points=-points,
+            sale=sale,
+        )
+        Customer.objects.filter(pk=locked.pk).update(loyalty_balance=F('loyalty_balance') - points)
+    return entry
+
+
+def expire_points(now=None, batch_size=1000):
+    """
+    Expire the unredeemed remainder of every lot past its expiry.
+
+    Works in batches off the partial ``(expires_at) WHERE remaining > 0``
+    index. Each batch locks the affected customers (in primary-key order,
+    the same order redemptions take) before the lots, writes the expiry
+    entries with ``bulk_create`` and moves all balances in one ``UPDATE``.
+    Returns the number of points expired.
+    """
+    now = now or timezone.now()
+    expired_points = 0
+    while True:
+        with transaction.atomic():
+            candidates = list(
+                LoyaltyEntry.objects.filter(remaining__gt=0, expires_at__lte=now)
+                .order_by('expires_at')
+                .values_list('pk', 'customer_id')[:batch_size]
+            )
+            if not candidates:
+                return expired_points
+            customer_ids = sorted({customer_id for _, customer_id in candidates})
+            list(Customer.objects.select_for_update().filter(pk__in=customer_ids).order_by('pk').values_list('pk'))
+            lots = list(
+                LoyaltyEntry.objects.select_for_update()
+                .filter(pk__in=[pk for pk, _ in candidates], remaining__gt=0)
+            )
+
+            per_customer = defaultdict(int)
+            expiries = []
+            for lot in lots:
+                per_customer[lot.customer_id] += lot.remaining
+                expiries.append(LoyaltyEntry(
+                    tenant_id=lot.tenant_id,
+                    customer_id=lot.customer_id,
+                    entry_type='expiry',
+                    points=-lot.remaining,
+                ))
+            LoyaltyEntry.objects.bulk_create(expiries)
+            LoyaltyEntry.objects.filter(pk__in=[lot.pk for lot in lots]).update(remaining=0)
+            if per_customer:
+                Customer.objects.filter(pk__in=per_customer).update(loyalty_balance=F('loyalty_balance') - Case(
+                    *[When(pk=customer_id, then=Value(pts)) for customer_id, pts in per_customer.items()],
+                    default=Value(0),
+                ))
+            expired_points += sum(per_customer.values())
@@ -0,0 +1,370 @@
+"""
+Transactional outbox and webhook delivery.
+
+Sales, payments, refunds and stock movements record an ``OutboxEvent`` on the
+same database connection as the row they describe (``record`` from the
+post_save signal, ``record_many`` where the ledger is written with
+``bulk_create``). When the change runs in a transaction, as checkout and the
+stock services do, the event commits or rolls back with it. Checkout pays for
+one more ``INSERT`` and never talks to an integration itself.
+
+Delivery happens in ``manage.py dispatch_webhooks``. Each pass over each
+primary database does three things:
+
+* ``expand`` turns new events into one ``WebhookDelivery`` per subscribed
+  active endpoint.
+* ``claim`` takes due deliveries in batches of the endpoint's
+  ``batch_size``, while keeping no more than ``max_concurrency`` batches in
+  flight per endpoint across all dispatchers.
+* All claimed batches are POSTed concurrently. Each body is signed with the
+  endpoint's secret.
+
+A failed batch is retried with the job runner's exponential backoff. After
+``WEBHOOK_MAX_ATTEMPTS`` it is marked failed. ``replay`` puts a range of
+events back in the queue for one endpoint.
+
+Delivery is at least once and batches to one endpoint may overlap, so
+receivers should de-duplicate on the event ``id``. Each request carries
+``X-Webpos-Signature: t=<unix time>,v1=<hex HMAC-SHA256 of "<t>.<body>">``.
+"""
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import socket
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .. import routing
+from ..models import InventoryTransaction, OutboxEvent, Payment, Refund, Sale, WebhookDelivery, WebhookEndpoint
+from .jobs import backoff
+from .providers import ProviderError, http_json
+
+logger = logging.getLogger(__name__)
+
+EVENT_SOURCES = {
+    Sale: 'sale',
+    Payment: 'payment',
+    Refund: 'refund',
+    InventoryTransaction: 'inventory_transaction',
+}
+EVENT_TYPES = [f"{source}.{action}" for source in EVENT_SOURCES.values() for action in ('created', 'updated')]
+
+EXPAND_BATCH = 1000
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ----------------------------
+# Endpoints
+# ----------------------------
+
+def _public(address):
+    address = ipaddress.ip_address(address)
+    if getattr(address, 'ipv4_mapped', None):
+        address = address.ipv4_mapped
+    return address.is_global and not address.is_multicast
+
+
+def validate_endpoint_url(url):
+    """Reject endpoint URLs that are not https or that reach private, loopback or link-local addresses."""
+    parts = urlsplit(url)
+    if parts.scheme != 'https':
+        raise ValidationError("Webhook endpoints must use https.")
+    host = parts.hostname
+    if not host:
+        raise ValidationError("The URL has no host.")
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parts.port or 443, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError):
+        raise ValidationError(f"{host} could not be resolved.")
+    if not all(_public(address.split('%')[0]) for address in addresses):
+        raise ValidationError(f"{host} resolves to a private, loopback or link-local address.")
+
+
+# ----------------------------
+# Recording events
+# ----------------------------
+
+def _payload(instance):
+    data = {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}
+    if isinstance(instance, InventoryTransaction) and InventoryTransaction.inventory.is_cached(instance):
+        # What a stock sync needs, when the ledger row came with its inventory line
+        data['product_id'] = instance.inventory.product_id
+        data['store_id'] = instance.inventory.store_id
+    return data
+
+
+def _event(instance, action, now):
+    return OutboxEvent(
+        tenant_id=instance.tenant_id,
+        event_type=f"{EVENT_SOURCES[type(instance)]}.{action}",
+        object_id=instance.pk,
+        payload=_payload(instance),
+        created_at=now,
+    )
+
+
+def record(instance, action='created'):
+    """Add an event for a saved ``instance`` on the database it was saved to."""
+    event = _event(instance, action, timezone.now())
+    event.save(using=instance._state.db or DEFAULT_DB_ALIAS)
+    return event
+
+
+def record_many(instances, action='created'):
+    """``record`` for rows written together (e.g. by ``bulk_create``)."""
+    if not instances:
+        return []
+    now = timezone.now()
+    return OutboxEvent.objects.using(instances[0]._state.db or DEFAULT_DB_ALIAS).bulk_create(
+        [_event(instance, action, now) for instance in instances]
+    )
+
+
+# ----------------------------
+# Dispatching
+# ----------------------------
+
+def expand(using=DEFAULT_DB_ALIAS, now=None):
+    """Create the deliveries for up to ``EXPAND_BATCH`` new events; returns how many events were handled."""
+    now = now or timezone.now()
+    with transaction.atomic(using=using):
+        events = list(
+            OutboxEvent.objects.using(using).select_for_update(skip_locked=True)
+            .filter(dispatched_at__isnull=True)
+            .order_by('pk')[:EXPAND_BATCH]
+        )
+        if not events:
+            return 0
+        endpoints = defaultdict(list)
+        for endpoint in WebhookEndpoint.objects.using(using).filter(
+            tenant_id__in={event.tenant_id for event in events}, is_active=True,
+        ):
+            endpoints[endpoint.tenant_id].append(endpoint)
+        WebhookDelivery.objects.using(using).bulk_create(
+            [
+                WebhookDelivery(endpoint=endpoint, event=event, next_attempt_at=now)
+                for event in events
+                for endpoint in endpoints[event.tenant_id]
+                if endpoint.subscribes_to(event.event_type)
+            ],
+            ignore_conflicts=True,
+        )
+        OutboxEvent.objects.using(using).filter(pk__in=[event.pk for event in events]).update(dispatched_at=now)
+    return len(events)
+
+
+def claim(using=DEFAULT_DB_ALIAS, now=None):
+    """Take due deliveries in batches, within each endpoint's concurrency; returns ``[(endpoint, batch_id)]``."""
+    now = now or timezone.now()
+    deliveries = WebhookDelivery.objects.using(using)
+    batches = []
+    with transaction.atomic(using=using):
+        due = deliveries.filter(status='pending', next_attempt_at__lte=now).values('endpoint_id')
+        # Locking the endpoints serialises claims, so dispatchers cannot overshoot a limit together.
+        endpoints = list(
+            WebhookEndpoint.objects.using(using).select_for_update(skip_locked=True)
+            .filter(pk__in=due, is_active=True)
+            .order_by('pk')
+        )
+        if not endpoints:
+            return batches
+        in_flight = dict(
+            deliveries.filter(endpoint__in=endpoints, status='sending')
+            .order_by()
+            .values('endpoint_id')
+            .annotate(n=Count('batch_id', distinct=True))
+            .values_list('endpoint_id', 'n')
+        )
+        for endpoint in endpoints:
+            for _ in range(endpoint.max_concurrency - in_flight.get(endpoint.pk, 0)):
+                pks = list(
+                    deliveries.filter(endpoint=endpoint, status='pending', next_attempt_at__lte=now)
+                    .order_by('pk')
+                    .values_list('pk', flat=True)[:endpoint.batch_size]
+                )
+                if not pks:
+                    break
+                batch_id = uuid.uuid4().hex
+                deliveries.filter(pk__in=pks).update(status='sending', batch_id=batch_id, locked_at=now)
+                batches.append((endpoint, batch_id))
+    return batches
+
+
+def sign(secret, timestamp, body):
+    return hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+
+
+def _body(batch_id, deliveries):
+    return json.dumps(
+        {
+            'batch': batch_id,
+            'events': [
+                {
+                    'id': delivery.event_id,
+                    'type': delivery.event.event_type,
+                    'created_at': delivery.event.created_at,
+                    'data': delivery.event.payload,
+                }
+                for delivery in deliveries
+            ],
+        },
+        cls=DjangoJSONEncoder,
+    ).encode()
+
+
+async def _post(endpoint, batch_id, body, timeout):
+    timestamp = int(time.time())
+    headers = {
+        'X-Webpos-Batch': batch_id,
+        'X-Webpos-Signature': f"t={timestamp},v1={sign(endpoint.secret, timestamp, body)}",
+    }
+    try:
+        status, _ = await http_json('POST', endpoint.url, body, headers, timeout=timeout)
+    except (asyncio.TimeoutError, OSError, ProviderError) as exc:
+        return None, f"{type(exc).__name__}: {exc}"
+    return status, '' if 200 <= status < 300 else f"HTTP {status}"
+
+
+async def _post_all(requests, timeout):
+    return await asyncio.gather(*(_post(endpoint, batch_id, body, timeout) for endpoint, batch_id, body in requests))
+
+
+def _finish(using, batch_id, attempts, status, error, now):
+    """Record the outcome of one batch; ``attempts`` lists the attempts made so far per delivery."""
+    sending = WebhookDelivery.objects.using(using).filter(batch_id=batch_id, status='sending')
+    if not error:
+        return sending.update(
+            status='delivered', attempts=F('attempts') + 1, response_status=status, last_error='',
+            delivered_at=now, batch_id='', locked_at=None,
+        )
+    max_attempts = _setting('WEBHOOK_MAX_ATTEMPTS', 12)
+    for made in sorted(set(attempts)):
+        retry = made + 1 < max_attempts
+        sending.filter(attempts=made).update(
+            status='pending' if retry else 'failed',
+            attempts=made + 1,
+            next_attempt_at=now + timedelta(seconds=backoff(made + 1)) if retry else F('next_attempt_at'),
+            response_status=status,
+            last_error=error,
+            batch_id='',
+            locked_at=None,
+        )
+    return 0
+
+
+def dispatch(using=DEFAULT_DB_ALIAS, now=None):
+    """One dispatcher pass over a database; returns counts of what it did."""
+    expanded = expand(using, now=now)
+    batches = claim(using, now=now)
+    if not batches:
+        return {'events': expanded, 'batches': 0, 'delivered': 0}
+
+    sent = WebhookDelivery.objects.using(using).select_related('event').order_by('pk')
+    requests, attempts = [], {}
+    for endpoint, batch_id in batches:
+        deliveries = list(sent.filter(batch_id=batch_id))
+        attempts[batch_id] = [delivery.attempts for delivery in deliveries]
+        requests.append((endpoint, batch_id, _body(batch_id, deliveries)))
+    outcomes = asyncio.run(_post_all(requests, _setting('WEBHOOK_TIMEOUT', 10)))
+
+    finished = timezone.now()
+    delivered = 0
+    for (endpoint, batch_id, _), (status, error) in zip(requests, outcomes):
+        if error:
+            logger.warning("Webhook batch %s to %s failed: %s", batch_id, endpoint.url, error)
+        delivered += _finish(using, batch_id, attempts[batch_id], status, error, finished)
+    return {'events': expanded, 'batches': len(batches), 'delivered': delivered}
+
+
+def requeue_stale(using=DEFAULT_DB_ALIAS, now=None):
+    """Put batches whose dispatcher went away back in the queue."""
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=_setting('WEBHOOK_LOCK_TIMEOUT', 300))
+    return WebhookDelivery.objects.using(using).filter(status='sending', locked_at__lt=cutoff).update(
+        status='pending', batch_id='', locked_at=None, next_attempt_at=now,
+    )
+
+
+def work(once=False, poll_interval=1.0):
+    """Dispatcher loop over every primary database: until nothing is left (``once``) or forever."""
+    last_sweep = 0.0
+    while True:
+        close_old_connections()
+        sweep = time.monotonic() - last_sweep > 60
+        busy = False
+        for alias in routing.primary_aliases():
+            if sweep:
+                requeue_stale(alias)
+            done = dispatch(alias)
+            busy = busy or bool(done['events'] or done['batches'])
+        if sweep:
+            last_sweep = time.monotonic()
+        if not busy:
+            if once:
+                return
+            time.sleep(poll_interval)
+
+
+# ----------------------------
+# Replay
+# ----------------------------
+
+def replay(endpoint, since=None, until=None, event_types=None, event_ids=None, chunk_size=1000):
+    """
+    Queue the tenant's events again for ``endpoint``: those created in
+    ``[since, until)`` or listed in ``event_ids``, limited to ``event_types``
+    (the endpoint's subscription by default). Earlier deliveries are reset,
+    missing ones created, e.g. for events older than the endpoint. Returns
+    how many deliveries were queued.
+    """
+    if since is None and not event_ids:
+        raise ValidationError("Give a start time or the events to replay.")
+    using = endpoint._state.db or DEFAULT_DB_ALIAS
+    events = OutboxEvent.objects.using(using).filter(tenant_id=endpoint.tenant_id)
+    if since is not None:
+        events = events.filter(created_at__gte=since)
+    if until is not None:
+        events = events.filter(created_at__lt=until)
+    if event_ids:
+        events = events.filter(pk__in=event_ids)
+    event_types = event_types or endpoint.events
+    if event_types:
+        events = events.filter(event_type__in=event_types)
+
+    now = timezone.now()
+    deliveries = WebhookDelivery.objects.using(using)
+    queued = 0
+    pks = events.order_by('pk').values_list('pk', flat=True)
+    last = None
+    while True:
+        chunk = list((pks if last is None else pks.filter(pk__gt=last))[:chunk_size])
+        if not chunk:
+            return queued
+        with transaction.atomic(using=using):
+            # Batches in flight are left alone; they will report their own outcome.
+            deliveries.filter(endpoint=endpoint, event_id__in=chunk).exclude(status='sending').update(
+                status='pending', attempts=0, next_attempt_at=now, response_status=None, last_error='',
+                delivered_at=None,
+            )
+            deliveries.bulk_create(
+                [WebhookDelivery(endpoint=endpoint, event_id=pk, next_attempt_at=now) for pk in chunk],
+                ignore_conflicts=True,
+            )
+        queued += len(chunk)
+        last = chunk[-1]
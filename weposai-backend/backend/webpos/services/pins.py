@@ -0,0 +1,140 @@
+"""
+PIN and serial inventory for virtual products.
+
+Codes are encrypted with Fernet before they reach the database; the key is
+``settings.PIN_ENCRYPTION_KEY`` or, when that is unset, one derived from
+``SECRET_KEY``. ``import_codes`` loads a file's worth of codes with
+``bulk_create``, skipping any code already on file for the product.
+
+``allocate`` is the checkout path. It claims the soonest-expiring available
+PINs with ``SELECT ... FOR UPDATE SKIP LOCKED`` over the partial
+``pin_available_idx`` index, so concurrent tills each take different rows
+without waiting on one another, and nothing else (no stock counter on the
+product) is written. A PIN leaves the pool once it has been issued the
+product's ``max_redemptions`` times (once when unset) or passes its expiry.
+"""
+import base64
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from ..models import PinAllocation, PinCode
+
+
+class InsufficientPins(ValidationError):
+    pass
+
+
+def _fernet():
+    from cryptography.fernet import Fernet
+
+    key = getattr(settings, 'PIN_ENCRYPTION_KEY', None)
+    if not key:
+        key = base64.urlsafe_b64encode(hashlib.sha256(settings.SECRET_KEY.encode()).digest())
+    return Fernet(key)
+
+
+def digest(code):
+    return hashlib.sha256(code.encode()).hexdigest()
+
+
+def reveal(pin, fernet=None):
+    """The clear-text code of ``pin``."""
+    return (fernet or _fernet()).decrypt(pin.encrypted_code.encode()).decode()
+
+
+def import_codes(virtual_product, codes, batch_reference='', expires_at=None, batch_size=1000):
+    """
+    Add ``codes`` (clear-text strings or ``(serial, code)`` pairs) to the pool.
+
+    Without ``expires_at`` the codes expire the product's ``validity_days``
+    (or the virtual product's ``validity_period_days``) after import, if
+    either is set. Returns the number of new codes stored.
+    """
+    product = virtual_product.product
+    validity_days = product.validity_days or virtual_product.validity_period_days
+    if expires_at is None and validity_days:
+        expires_at = timezone.now() + timedelta(days=validity_days)
+    fernet = _fernet()
+    tenant_id = product.tenant_id
+
+    pins = {}
+    for entry in codes:
+        serial, code = entry if isinstance(entry, (tuple, list)) else ('', entry)
+        code = code.strip()
+        if not code:
+            continue
+        key = digest(code)
+        pins[key] = PinCode(
+            tenant_id=tenant_id,
+            virtual_product=virtual_product,
+            serial=serial,
+            encrypted_code=fernet.encrypt(code.encode()).decode(),
+            code_digest=key,
+            batch_reference=batch_reference,
+            expires_at=expires_at,
+        )
+    existing = set(
+        PinCode.objects.filter(virtual_product=virtual_product, code_digest__in=pins)
+        .values_list('code_digest', flat=True)
+    )
+    new = [pin for key, pin in pins.items() if key not in existing]
+    PinCode.objects.bulk_create(new, batch_size=batch_size, ignore_conflicts=True)
+    return len(new)
+
+
+def allocate(virtual_product, quantity=1, sale=None, user=None, now=None):
+    """
+    Claim ``quantity`` distinct PINs for a sale.
+
+    Returns ``[(serial, code), ...]``. Raises ``InsufficientPins`` when fewer
+    than ``quantity`` unlocked, unexpired PINs are left.
+    """
+    now = now or timezone.now()
+    max_redemptions = virtual_product.product.max_redemptions or 1
+    with transaction.atomic():
+        pins = list(
+            PinCode.objects.select_for_update(skip_locked=True)
+            .filter(virtual_product=virtual_product, status='available')
+            .filter(Q(expires_at__isnull=True) | Q(expires_at__gt=now))
+            .filter(redemptions__lt=max_redemptions)
+            .order_by(F('expires_at').asc(nulls_last=True), 'pk')[:quantity]
+        )
+        if len(pins) < quantity:
+            raise InsufficientPins(
+                f"Only {len(pins)} PINs available for {virtual_product}, {quantity} requested."
+            )
+        for pin in pins:
+            pin.redemptions += 1
+            if pin.redemptions >= max_redemptions:
+                pin.status = 'exhausted'
+        PinCode.objects.bulk_update(pins, ['redemptions', 'status'])
+        PinAllocation.objects.bulk_create([
+            PinAllocation(pin=pin, sale_id=getattr(sale, 'pk', sale), allocated_by=user)
+            for pin in pins
+        ])
+    fernet = _fernet()
+    return [(pin.serial, reveal(pin, fernet)) for pin in pins]
+
+
+def expire_pins(now=None):
+    """Retire available PINs past their expiry; returns how many were retired."""
+    return PinCode.objects.filter(status='available', expires_at__lte=now or timezone.now()).update(status='expired')
+
+
+def stock_levels(virtual_products):
+    """Available, unexpired PIN counts keyed by virtual product id."""
+    now = timezone.now()
+    return dict(
+        PinCode.objects.filter(virtual_product__in=virtual_products, status='available')
+        .filter(Q(expires_at__isnull=True) | Q(expires_at__gt=now))
+        .order_by()
+        .values('virtual_product')
+        .annotate(n=Count('pk'))
+        .values_list('virtual_product', 'n')
+    )
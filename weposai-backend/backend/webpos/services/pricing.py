@@ -0,0 +1,269 @@
+"""
+Bulk price and promotion changes.
+
+A ``PriceChange`` names an operation (change prices by a percentage, set a
+price, start or end a discount), its value and the products it covers: a
+category, a store, a list of SKUs, or any combination of them. It may also
+list promotions that go live with it. ``create_change`` queues the
+``pricing.apply`` job for ``activate_at`` and, if the change has a
+``rollback_at``, the ``pricing.rollback`` job for then. Both can also be run
+straight away from the API.
+
+``apply`` reprices every product in scope with a single ``UPDATE`` and
+writes a ``PriceHistory`` row per product with the new values and those they
+replaced. ``rollback`` puts the replaced values back with another single
+``UPDATE``, but only on products still at the price the change set; a
+product repriced in between keeps its newer price. Promotions are switched on
+and off with one ``UPDATE`` each. ``update`` sends no per-row signals, so the
+promotions response cache is invalidated once per batch, after commit.
+
+Saving a single product writes its ``PriceHistory`` row through
+``record_edit`` (see ``webpos.signals``), and ``mark_down`` records the
+expiry markdowns of ``services.stock``, so the history holds every price,
+cost and discount a product has had. ``prices_at`` reads it back for many
+products at a given instant in one query, each product resolved through the
+``(product, effective_from)`` index.
+"""
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Round
+from django.utils import timezone
+
+from .. import caching
+from ..models import PriceChange, PriceHistory, Product, Promotion
+from . import jobs
+
+# What a price change sets and rolls back, and what the history keeps of a product
+PRICE_FIELDS = ('price', 'is_discounted', 'discount_percent')
+HISTORY_FIELDS = ('price', 'cost_price', 'is_discounted', 'discount_percent')
+
+
+def validate_change(operation, value, category=None, store=None, skus=(), promotions=(), activate_at=None, rollback_at=None):
+    if not operation and not promotions:
+        raise ValidationError("A price change needs an operation or promotions to activate.")
+    if operation:
+        if category is None and store is None and not skus:
+            raise ValidationError("Limit the change to a category, a store or a list of SKUs.")
+        if operation != 'end_discount' and value is None:
+            raise ValidationError(f"The {operation} operation needs a value.")
+        if operation == 'percent' and value <= -100:
+            raise ValidationError("A price cannot drop by 100% or more.")
+        if operation == 'set_price' and value < 0:
+            raise ValidationError("A price cannot be negative.")
+        if operation == 'discount' and not 0 < value <= 100:
+            raise ValidationError("A discount must be above 0 and at most 100 percent.")
+    if rollback_at and rollback_at <= (activate_at or timezone.now()):
+        raise ValidationError("The rollback must come after the activation.")
+
+
+def create_change(tenant, user=None, promotions=(), **fields):
+    """Record a price change and queue its activation and rollback jobs."""
+    validate_change(
+        fields.get('operation', ''), fields.get('value'), fields.get('category'), fields.get('store'),
+        fields.get('skus', ()), promotions, fields.get('activate_at'), fields.get('rollback_at'),
+    )
+    with transaction.atomic():
+        change = PriceChange.objects.create(tenant=tenant, created_by=user, **fields)
+        change.promotions.set(promotions)
+        jobs.enqueue('pricing.apply', {'change_id': change.pk}, tenant=tenant, run_after=change.activate_at, user=user)
+        if change.rollback_at:
+            jobs.enqueue('pricing.rollback', {'change_id': change.pk}, tenant=tenant, run_after=change.rollback_at, user=user)
+    return change
+
+
+def _lock(change, expected_status):
+    locked = PriceChange.objects.select_for_update().get(pk=change.pk)
+    if locked.status != expected_status:
+        raise ValidationError(f"Price change #{locked.pk} is {locked.status}, expected {expected_status}.")
+    return locked
+
+
+def products_in_scope(change):
+    products = Product.objects.filter(tenant_id=change.tenant_id)
+    if change.category_id:
+        products = products.filter(category_id=change.category_id)
+    if change.store_id:
+        products = products.filter(store_id=change.store_id)
+    if change.skus:
+        products = products.filter(sku__in=change.skus)
+    return products
+
+
+def _assignments(change):
+    if change.operation == 'percent':
+        factor = Decimal(1) + change.value / 100
+        return {'price': Round(F('price') * Value(factor), 2)}
+    if change.operation == 'set_price':
+        return {'price': change.value}
+    if change.operation == 'discount':
+        return {'is_discounted': True, 'discount_percent': change.value}
+    return {'is_discounted': False, 'discount_percent': Decimal(0)}
+
+
+def _values(products):
+    return {
+        pk: dict(zip(HISTORY_FIELDS, values))
+        for pk, *values in products.order_by('pk').values_list('pk', *HISTORY_FIELDS)
+    }
+
+
+def _history(tenant_id, change, source, before, after, now):
+    return [
+        PriceHistory(
+            tenant_id=tenant_id,
+            product_id=pk,
+            price_change=change,
+            source=source,
+            effective_from=now,
+            **after[pk],
+            **{f'previous_{field}': value for field, value in values.items()},
+        )
+        for pk, values in before.items()
+        if pk in after
+    ]
+
+
+def _switch_promotions(change, active):
+    switched = Promotion.objects.filter(pk__in=change.promotions.values('pk')).update(active=active)
+    if switched:
+        transaction.on_commit(lambda: caching.invalidate('promotions', change.tenant_id))
+
+
+def apply(change):
+    """Reprice the products in scope and activate the change's promotions."""
+    with transaction.atomic():
+        change = _lock(change, 'scheduled')
+        now = timezone.now()
+        rows = []
+        if change.operation:
+            products = products_in_scope(change)
+            before = _values(products.select_for_update())
+            products.update(**_assignments(change), updated_at=now)
+            rows = _history(change.tenant_id, change, 'apply', before, _values(products), now)
+            PriceHistory.objects.bulk_create(rows, batch_size=5000)
+        _switch_promotions(change, True)
+        change.status = 'applied'
+        change.applied_at = now
+        change.products_changed = len(rows)
+        change.save(update_fields=['status', 'applied_at', 'products_changed'])
+    return change
+
+
+def rollback(change):
+    """Restore the prices the change replaced, where nobody has changed them since, and end its promotions."""
+    with transaction.atomic():
+        change = _lock(change, 'applied')
+        now = timezone.now()
+        applied = PriceHistory.objects.filter(price_change=change, source='apply', product=OuterRef('pk'))
+        products = Product.objects.filter(
+            Exists(applied.filter(**{field: OuterRef(field) for field in PRICE_FIELDS}))
+        )
+        before = _values(products.select_for_update())
+        restored = {
+            pk: {**before[pk], **dict(zip(PRICE_FIELDS, values))}
+            for pk, *values in PriceHistory.objects.filter(price_change=change, source='apply')
+            .values_list('product_id', *(f'previous_{field}' for field in PRICE_FIELDS))
+            if pk in before
+        }
+        products.update(
+            updated_at=now,
+            **{field: Subquery(applied.values(f'previous_{field}')[:1]) for field in PRICE_FIELDS},
+        )
+        rows = _history(change.tenant_id, change, 'rollback', before, restored, now)
+        PriceHistory.objects.bulk_create(rows, batch_size=5000)
+        _switch_promotions(change, False)
+        change.status = 'rolled_back'
+        change.rolled_back_at = now
+        change.products_restored = len(rows)
+        change.save(update_fields=['status', 'rolled_back_at', 'products_restored'])
+    return change
+
+
+def cancel(change):
+    """Drop a change that has not been applied; its queued jobs then do nothing."""
+    with transaction.atomic():
+        change = _lock(change, 'scheduled')
+        change.status = 'cancelled'
+        change.save(update_fields=['status'])
+    return change
+
+
+def mark_down(tenant_id, products, discount_percent):
+    """Discount ``products`` by ``discount_percent`` with one ``UPDATE`` and record their history; returns how many changed."""
+    with transaction.atomic():
+        now = timezone.now()
+        before = _values(products.select_for_update())
+        marked = Product.objects.filter(pk__in=list(before))
+        marked.update(is_discounted=True, discount_percent=discount_percent, updated_at=now)
+        rows = _history(tenant_id, None, 'markdown', before, _values(marked), now)
+        PriceHistory.objects.bulk_create(rows, batch_size=5000)
+    return len(rows)
+
+
+# ----------------------------
+# Price history
+# ----------------------------
+
+def record_edit(product, previous=None, created=False):
+    """Append a history row for a saved product whose prices differ from ``previous`` (values in HISTORY_FIELDS order)."""
+    values = {field: Product._meta.get_field(field).to_python(getattr(product, field)) for field in HISTORY_FIELDS}
+    if not created and (previous is None or tuple(previous) == tuple(values.values())):
+        return None
+    return PriceHistory.objects.using(product._state.db).create(
+        tenant_id=product.tenant_id,
+        product=product,
+        source='created' if created else 'edit',
+        effective_from=product.created_at if created else timezone.now(),
+        **values,
+        **({} if created else {f'previous_{field}': value for field, value in zip(HISTORY_FIELDS, previous)}),
+    )
+
+
+def prices_at(tenant_id, product_ids, at):
+    """``{product_id: {field: value}}`` for HISTORY_FIELDS as they stood at ``at``.
+
+    The last history row at or before ``at`` holds them. Failing that, the
+    first later row holds them as its previous values, and a product with no
+    history since has its current ones. Products created after ``at`` are
+    left out.
+    """
+    history = PriceHistory.objects.filter(product=OuterRef('pk'))
+    in_force = history.filter(effective_from__lte=at).order_by('-effective_from', '-pk')
+    replaced = history.filter(effective_from__gt=at).order_by('effective_from', 'pk')
+    rows = (
+        Product.objects.filter(tenant_id=tenant_id, pk__in=product_ids, created_at__lte=at)
+        .annotate(**{
+            f'{field}_at': Coalesce(
+                Subquery(in_force.values(field)[:1]),
+                Subquery(replaced.values(f'previous_{field}')[:1]),
+                F(field),
+            )
+            for field in HISTORY_FIELDS
+        })
+        .values_list('pk', *(f'{field}_at' for field in HISTORY_FIELDS))
+    )
+    return {pk: dict(zip(HISTORY_FIELDS, values)) for pk, *values in rows}
+
+
+# ----------------------------
+# Job runner tasks
+# ----------------------------
+
+def apply_change(change_id):
+    change = PriceChange.objects.get(pk=change_id)
+    if change.status != 'scheduled':
+        return {'skipped': change.status}
+    return {'products_changed': apply(change).products_changed}
+
+
+def rollback_change(change_id):
+    change = PriceChange.objects.get(pk=change_id)
+    if change.status == 'scheduled':
+        # Activation has not run yet; fail this attempt so the job runner retries later.
+        raise ValidationError(f"Price change #{change.pk} has not been applied yet.")
+    if change.status != 'applied':
+        return {'skipped': change.status}
+    return {'products_restored': rollback(change).products_restored}
@@ -0,0 +1,199 @@
+"""
+Top-ups bought from external virtual-product providers.
+
+Providers are configured in ``VIRTUAL_PRODUCT_PROVIDERS`` under the
+``VirtualProduct.provider_name`` they serve, with their endpoint URL, an
+optional bearer token, a timeout and ``concurrency``: the most calls this
+process keeps in flight to that provider. Calls are JSON POSTs written
+straight onto asyncio streams, so an async view waiting on a slow provider
+holds no thread, and ``fan_out`` can run a batch of top-ups at once while
+each provider's semaphore keeps it within its limit.
+
+A ``TopUp`` row is written as pending before the call, with a reference the
+provider treats as an idempotency key, and is marked succeeded or failed by
+the answer. A call that times out or loses its connection stays pending: the
+provider may have applied it, and sending the same reference again
+(``top_up(..., reference=...)``) settles it without charging twice.
+"""
+import asyncio
+import json
+import ssl
+import uuid
+import weakref
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from ..models import TopUp
+
+
+class ProviderError(Exception):
+    pass
+
+
+async def http_json(method, url, payload=None, headers=None, timeout=10.0):
+    """One HTTP/1.1 request with a JSON body; returns (status, decoded JSON or None).
+
+    ``payload`` is encoded as JSON unless it is already ``bytes`` (a signed body, say).
+    """
+    parts = urlsplit(url)
+    secure = parts.scheme == 'https'
+    port = parts.port or (443 if secure else 80)
+    if isinstance(payload, bytes):
+        body = payload
+    else:
+        body = json.dumps(payload, default=str).encode() if payload is not None else b''
+    path = parts.path or '/'
+    if parts.query:
+        path = f"{path}?{parts.query}"
+    lines = [
+        f"{method} {path} HTTP/1.1",
+        f"Host: {parts.hostname}",
+        "Connection: close",
+        "Accept: application/json",
+        f"Content-Length: {len(body)}",
+    ]
+    if payload is not None:
+        lines.append("Content-Type: application/json")
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+
+    async def exchange():
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, port, ssl=ssl.create_default_context() if secure else None,
+        )
+        try:
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+            await writer.drain()
+            status_line = await reader.readline()
+            try:
+                status = int(status_line.split()[1])
+            except (IndexError, ValueError):
+                raise ProviderError(f"Malformed response from {parts.hostname}: {status_line[:80]!r}")
+            response_headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                response_headers[name.strip().lower()] = value.strip()
+            if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+                content = b''
+                while True:
+                    size = int((await reader.readline()).split(b';')[0], 16)
+                    if not size:
+                        break
+                    content += await reader.readexactly(size)
+                    await reader.readline()
+            elif 'content-length' in response_headers:
+                content = await reader.readexactly(int(response_headers['content-length']))
+            else:
+                content = await reader.read()
+        finally:
+            writer.close()
+        try:
+            return status, json.loads(content) if content else None
+        except ValueError:
+            return status, None
+
+    return await asyncio.wait_for(exchange(), timeout)
+
+
+# ----------------------------
+# Provider configuration
+# ----------------------------
+
+# Semaphores belong to the event loop they were created on; under ASGI there is one
+# loop per worker, in tests or async_to_sync there may be several over time.
+_limits = weakref.WeakKeyDictionary()
+
+
+def provider_config(name):
+    config = getattr(settings, 'VIRTUAL_PRODUCT_PROVIDERS', {}).get(name)
+    if not config:
+        raise ValidationError(f"No provider is configured for '{name}'.")
+    return config
+
+
+def _semaphore(name):
+    loop = asyncio.get_running_loop()
+    per_loop = _limits.setdefault(loop, {})
+    if name not in per_loop:
+        per_loop[name] = asyncio.Semaphore(provider_config(name).get('concurrency', 10))
+    return per_loop[name]
+
+
+# ----------------------------
+# Top-ups
+# ----------------------------
+
+async def top_up(virtual_product, recipient, amount=None, user=None, sale=None, reference=None):
+    """Buy ``amount`` (the product's denomination by default) for ``recipient``; returns the TopUp.
+
+    ``virtual_product`` must come with its ``product`` loaded (``select_related``).
+    """
+    config = provider_config(virtual_product.provider_name)
+    amount = virtual_product.denomination if virtual_product.denomination else amount
+    if not amount or amount <= 0:
+        raise ValidationError("A top-up needs a positive amount.")
+    topup = None
+    if reference:
+        topup = await TopUp.objects.filter(reference=reference).afirst()
+        if topup is not None:
+            if topup.virtual_product_id != virtual_product.pk:
+                raise ValidationError(f"Reference {reference} belongs to another top-up.")
+            if topup.status != 'pending':
+                return topup
+    if topup is None:
+        topup = await TopUp.objects.acreate(
+            tenant_id=virtual_product.product.tenant_id,
+            virtual_product=virtual_product,
+            sale=sale,
+            recipient=recipient,
+            amount=amount,
+            reference=reference or uuid.uuid4().hex,
+            created_by=user,
+        )
+
+    headers = {'Authorization': f"Bearer {config['token']}"} if config.get('token') else {}
+    payload = {
+        'reference': topup.reference,
+        'product': virtual_product.virtual_type,
+        'recipient': topup.recipient,
+        'amount': str(topup.amount),
+    }
+    try:
+        async with _semaphore(virtual_product.provider_name):
+            status, data = await http_json('POST', config['url'], payload, headers, timeout=config.get('timeout', 10))
+    except (asyncio.TimeoutError, OSError, ProviderError) as exc:
+        # Outcome unknown: keep it pending for a retry with the same reference.
+        topup.error = f"{type(exc).__name__}: {exc}"
+        await topup.asave(update_fields=['error'])
+        return topup
+
+    data = data or {}
+    if 200 <= status < 300 and data.get('status') == 'ok':
+        topup.status = 'succeeded'
+        topup.provider_reference = str(data.get('reference', ''))[:100]
+        topup.error = ''
+    else:
+        topup.status = 'failed'
+        topup.error = str(data.get('error') or f"HTTP {status}")
+    topup.completed_at = timezone.now()
+    await topup.asave(update_fields=['status', 'provider_reference', 'error', 'completed_at'])
+    return topup
+
+
+async def fan_out(requests, user=None):
+    """Run many top-ups concurrently; ``requests`` are keyword dicts for ``top_up``.
+
+    Returns TopUps, or the ValidationError raised for a request, in input order.
+    """
+    async def one(kwargs):
+        try:
+            return await top_up(user=user, **kwargs)
+        except ValidationError as exc:
+            return exc
+
+    return await asyncio.gather(*(one(kwargs) for kwargs in requests))
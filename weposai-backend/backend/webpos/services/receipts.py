@@ -0,0 +1,183 @@
+"""
+Sale receipts.
+
+Text and HTML receipts are rendered synchronously from the
+``webpos/receipt.txt`` and ``webpos/receipt.html`` templates, which are
+compiled once per process and kept in memory; the sale, its lines and
+payments are loaded in three queries.
+
+PDFs never hold up checkout. ``issue`` records the ``Receipt`` and queues a
+``receipts.build_pdf`` background job in the same transaction; the
+``run_jobs`` workers build it. The PDF is a plain text page written without any
+third-party library, stored under ``RECEIPT_STORAGE_ROOT`` by the SHA-256 of
+its bytes, so identical receipts share one file and a finished file is never
+rewritten. ``pdf_path`` serves a ready PDF or schedules a missing one;
+``render_pending`` sweeps receipts whose PDF never got built.
+"""
+import hashlib
+import logging
+from decimal import Decimal
+from functools import lru_cache
+
+from django.core.files.base import ContentFile
+from django.db.models import Prefetch
+from django.template.loader import get_template
+from django.utils import timezone
+
+from ..models import OrderItem, Receipt, Sale
+from . import jobs
+
+logger = logging.getLogger(__name__)
+
+WIDTH = 40
+
+
+@lru_cache(maxsize=None)
+def _template(kind):
+    return get_template(f'webpos/receipt.{kind}')
+
+
+def _load_sale(sale):
+    return (
+        Sale.objects.select_related('tenant', 'store', 'user', 'customer')
+        .prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('product', 'service').order_by('pk')),
+            'payments',
+        )
+        .get(pk=getattr(sale, 'pk', sale))
+    )
+
+
+def _columns(left, right):
+    return f"{left}{right:>{max(WIDTH - len(left), len(right) + 1)}}"
+
+
+def _item_name(item):
+    # Lines keep their sale after the product or service is deleted
+    line = item.product or item.service
+    return line.name if line is not None else 'Item no longer listed'
+
+
+def _context(sale):
+    lines = []
+    for item in sale.items.all():
+        total = item.price * item.quantity
+        lines.append({
+            'name': _item_name(item)[:WIDTH],
+            'quantity': item.quantity,
+            'price': item.price,
+            'total': total,
+            'detail': _columns(f"  {item.quantity} x {item.price}", f"{total}"),
+        })
+    payments = list(sale.payments.all())
+    paid = sum((payment.amount for payment in payments), Decimal(0))
+    change = paid - sale.total_amount if paid > sale.total_amount else None
+    return {
+        'sale': sale,
+        'header': '\n'.join(
+            text[:WIDTH].center(WIDTH).rstrip()
+            for text in (sale.tenant.name, sale.store.name, sale.store.location)
+        ),
+        'rule': '-' * WIDTH,
+        'lines': lines,
+        'total_line': _columns('TOTAL', f"{sale.total_amount}"),
+        'payments': payments,
+        'payment_lines': [_columns(payment.get_method_display(), f"{payment.amount}") for payment in payments],
+        'change': change,
+        'change_line': _columns('Change', f"{change}") if change else '',
+    }
+
+
+def render(sale, kind='txt'):
+    """Render ``sale``'s receipt as ``'txt'`` or ``'html'``."""
+    return _template(kind).render(_context(_load_sale(sale)))
+
+
+def _pdf_string(text):
+    text = text.encode('latin-1', 'replace').decode('latin-1')
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def text_pdf(text, font_size=8):
+    """A one-page PDF showing ``text`` in Courier, sized to a receipt roll."""
+    rows = text.rstrip('\n').split('\n')
+    leading = font_size + 2
+    width = int(WIDTH * font_size * 0.6) + 24
+    height = leading * len(rows) + 24
+    content = [f"BT /F1 {font_size} Tf {leading} TL 12 {height - 12 - font_size} Td"]
+    content.extend(f"({_pdf_string(row)}) '" if i else f"({_pdf_string(row)}) Tj" for i, row in enumerate(rows))
+    content.append("ET")
+    stream = '\n'.join(content).encode('latin-1')
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width} {height}] "
+            f"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>"
+        ).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def build_pdf(receipt_id):
+    """Render and store the PDF of one receipt; returns its storage name."""
+    receipt = Receipt.objects.get(pk=receipt_id)
+    data = text_pdf(render(receipt.sale_id, 'txt'))
+    digest = hashlib.sha256(data).hexdigest()
+    name = f"{digest[:2]}/{digest}.pdf"
+    storage = receipt.pdf_file.storage
+    if not storage.exists(name):
+        name = storage.save(name, ContentFile(data))
+    Receipt.objects.filter(pk=receipt_id).update(
+        pdf_file=name, pdf_digest=digest, pdf_status='ready', pdf_generated_at=timezone.now(),
+    )
+    return name
+
+
+def schedule_pdf(receipt):
+    """Queue a background job building the PDF of ``receipt``."""
+    jobs.enqueue('receipts.build_pdf', {'receipt_id': receipt.pk}, tenant=receipt.tenant_id, priority=-1)
+
+
+def issue(sale):
+    """Record the receipt of ``sale`` and queue its PDF. Idempotent."""
+    receipt, created = Receipt.objects.get_or_create(sale=sale, defaults={'tenant_id': sale.tenant_id})
+    if created:
+        schedule_pdf(receipt)
+    return receipt
+
+
+def pdf_path(receipt):
+    """Filesystem path of a ready PDF, or ``None`` after scheduling a missing one."""
+    if receipt.pdf_status == 'ready' and receipt.pdf_file and receipt.pdf_file.storage.exists(receipt.pdf_file.name):
+        return receipt.pdf_file.path
+    if receipt.pdf_status != 'pending':
+        Receipt.objects.filter(pk=receipt.pk).update(pdf_status='pending')
+        schedule_pdf(receipt)
+    return None
+
+
+def render_pending(limit=500):
+    """Build PDFs still pending, in this process; returns how many were built."""
+    built = 0
+    for receipt_id in Receipt.objects.filter(pdf_status='pending').order_by('pk').values_list('pk', flat=True)[:limit]:
+        try:
+            build_pdf(receipt_id)
+        except Exception:
+            logger.exception("Receipt PDF for receipt #%s failed", receipt_id)
+            Receipt.objects.filter(pk=receipt_id).update(pdf_status='failed')
+        else:
+            built += 1
+    return built
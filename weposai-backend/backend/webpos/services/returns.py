@@ -0,0 +1,119 @@
+"""
+Line-level customer returns.
+
+``process_return`` takes back units of individual sale lines. The lines are
+locked by primary key and checked against ``quantity - refunded_quantity``,
+so two tills returning the same receipt cannot give back more than was sold.
+Everything the return touches happens in one transaction: the ``Refund`` and
+its ``RefundItem`` rows, returned product units going back on the shelf
+through the inventory ledger (virtual products such as airtime and PINs
+hold no stock and are not restocked), a negative ``Payment`` handing the money back,
+and the reversal of the sale's commissions and loyalty points.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+
+from ..models import Inventory, OrderItem, Payment, Product, Refund, RefundItem
+from . import commissions, loyalty, stock
+
+CENT = Decimal('0.01')
+
+
+def process_return(sale, lines, reason, user=None, method='cash', restock=True):
+    """
+    Return ``lines`` (``{order_item_id: quantity}``) of ``sale``.
+
+    ``restock=False`` records the return without putting the products back
+    on the shelf (damaged goods). Returns the ``Refund``.
+    """
+    lines = {item_id: qty for item_id, qty in lines.items() if qty}
+    if not lines:
+        raise ValidationError("Nothing to return.")
+    if any(qty < 0 for qty in lines.values()):
+        raise ValidationError("Returned quantities must be positive.")
+
+    with transaction.atomic():
+        items = list(
+            OrderItem.objects.select_for_update().filter(sale=sale, pk__in=lines).order_by('pk')
+        )
+        if len(items) != len(lines):
+            missing = set(lines) - {item.pk for item in items}
+            raise ValidationError(f"Order items {sorted(missing)} are not part of sale #{sale.pk}.")
+        for item in items:
+            returnable = item.quantity - item.refunded_quantity
+            if lines[item.pk] > returnable:
+                raise ValidationError(
+                    f"Order item #{item.pk}: {lines[item.pk]} returned but only {returnable} left to return."
+                )
+
+        amounts = {item.pk: (item.price * lines[item.pk]).quantize(CENT) for item in items}
+        total = sum(amounts.values(), Decimal(0))
+        refund = Refund.objects.create(
+            tenant_id=sale.tenant_id, sale=sale, reason=reason, amount=total, created_by=user,
+        )
+        RefundItem.objects.bulk_create([
+            RefundItem(
+                refund=refund,
+                order_item=item,
+                quantity=lines[item.pk],
+                amount=amounts[item.pk],
+                restocked=restock and item.product_id is not None,
+            )
+            for item in items
+        ])
+
+        # Reversed against the value still standing, before the lines change.
+        commissions.reverse_for_return(sale, total)
+        for item in items:
+            item.refunded_quantity += lines[item.pk]
+        OrderItem.objects.bulk_update(items, ['refunded_quantity'])
+
+        if restock:
+            _restock(sale, items, lines, user, refund)
+
+        Payment.objects.create(
+            tenant_id=sale.tenant_id,
+            sale=sale,
+            method=method,
+            amount=-total,
+            reference=f"Refund #{refund.pk}",
+            created_by=user,
+        )
+        loyalty.reverse_for_return(sale, total)
+    return refund
+
+
+def _restock(sale, items, lines, user, refund):
+    per_product = defaultdict(int)
+    for item in items:
+        if item.product_id is not None:
+            per_product[item.product_id] += lines[item.pk]
+    virtual = Product.objects.filter(
+        Q(is_virtual=True) | Q(virtual_details__isnull=False), pk__in=per_product,
+    ).values_list('pk', flat=True)
+    for product_id in virtual:
+        del per_product[product_id]
+    if not per_product:
+        return
+    Inventory.objects.bulk_create(
+        [
+            Inventory(tenant_id=sale.tenant_id, store_id=sale.store_id, product_id=product_id, quantity=0)
+            for product_id in per_product
+        ],
+        ignore_conflicts=True,
+    )
+    inventory_ids = dict(
+        Inventory.objects.filter(
+            tenant_id=sale.tenant_id, store_id=sale.store_id, product_id__in=per_product,
+        ).values_list('product_id', 'pk')
+    )
+    stock.add_stock(
+        {inventory_ids[product_id]: qty for product_id, qty in per_product.items()},
+        user=user,
+        transaction_type='return',
+        notes=f"Refund #{refund.pk} for Sale #{sale.pk}",
+    )
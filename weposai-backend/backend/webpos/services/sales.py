@@ -0,0 +1,72 @@
+"""
+Checkout.
+
+``create_sale`` writes a ``Sale``, its ``OrderItem`` lines and the stock
+they take off the shelf in one transaction. Products are charged at their
+current price, after any discount, and services at their list price. The
+products' units leave the sale's store first-expired-first-out through
+``stock.consume_fefo``, whose ``sale`` ledger rows are what valuation,
+stock-at-a-point-in-time and forecasting read. Virtual products and services
+hold no stock. If the store cannot cover a line, nothing is written.
+"""
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from ..models import Inventory, OrderItem, Sale
+from . import stock
+
+CENT = Decimal('0.01')
+
+
+def create_sale(tenant, store, lines, user=None, customer=None):
+    """
+    Record a sale at ``store``. ``lines`` are dicts with a ``product`` or a
+    ``service`` and a ``quantity``. Returns the ``Sale``.
+    """
+    if not lines:
+        raise ValidationError("A sale needs at least one line.")
+    items = []
+    units = defaultdict(int)
+    for line in lines:
+        product, service = line.get('product'), line.get('service')
+        if (product is None) == (service is None):
+            raise ValidationError("Each line needs either a product or a service.")
+        if line['quantity'] <= 0:
+            raise ValidationError("Quantities must be positive.")
+        price = product.discounted_price() if product is not None else service.price
+        items.append(OrderItem(
+            product=product,
+            service=service,
+            quantity=line['quantity'],
+            price=Decimal(price).quantize(CENT, ROUND_HALF_UP),
+        ))
+        if product is not None and not product.is_virtual:
+            units[product.pk] += line['quantity']
+
+    with transaction.atomic():
+        inventory_ids = dict(
+            Inventory.objects.filter(tenant_id=tenant.pk, store_id=store.pk, product_id__in=units)
+            .values_list('product_id', 'pk')
+        )
+        missing = set(units) - set(inventory_ids)
+        if missing:
+            raise stock.InsufficientStock(f"No stock of product ids {sorted(missing)} at store #{store.pk}.")
+        sale = Sale.objects.create(
+            tenant=tenant,
+            store=store,
+            user=user,
+            customer=customer,
+            total_amount=sum(item.price * item.quantity for item in items),
+        )
+        for item in items:
+            item.sale = sale
+        OrderItem.objects.bulk_create(items)
+        stock.consume_fefo(
+            {inventory_ids[product_id]: qty for product_id, qty in units.items()},
+            user=user,
+            notes=f"Sale #{sale.pk}",
+        )
+    return sale
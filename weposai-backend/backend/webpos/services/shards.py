@@ -0,0 +1,158 @@
+"""
+Moving a tenant between database shards.
+
+``move_tenant`` first marks the tenant ``moving`` in the shard map, so the
+router refuses its writes, and waits for every process to pick that up
+(``SHARD_MAP_CACHE_SECONDS``). It then mirrors the tenant and its users onto
+the target and copies each tenant-owned table, including the link tables of
+many-to-many fields such as ``PriceChange.promotions``, in foreign-key order, in
+primary-key chunks of ``chunk_size`` rows, each chunk in its own
+transaction. Rows that already exist on the target for the same tenant (left
+by an interrupted run) are updated rather than duplicated, so a failed move
+can simply be run again. Only after everything is copied does the map point
+at the target; the source rows are deleted, child tables first, when
+``delete_source`` is set.
+
+Rows are copied with their primary keys, so the shards must use disjoint id
+ranges. A key that already belongs to another tenant on the target stops the
+move before anything is overwritten.
+"""
+import time
+from collections import deque
+from graphlib import TopologicalSorter
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .. import routing
+from ..models import Tenant, TenantShard, User
+
+
+def tenant_path(model):
+    """Lookup from ``model`` to its tenant id (``'sale__tenant'``), or None for shared tables."""
+    queue = deque([(model, '')])
+    seen = {model}
+    while queue:
+        current, prefix = queue.popleft()
+        for field in current._meta.concrete_fields:
+            if not field.is_relation:
+                continue
+            if field.related_model is Tenant:
+                return f"{prefix}{field.name}"
+            if field.related_model not in seen:
+                seen.add(field.related_model)
+                queue.append((field.related_model, f"{prefix}{field.name}__"))
+    return None
+
+
+def _with_through_tables(models):
+    # get_models() leaves out the tables Django creates for plain ManyToManyFields
+    through = [
+        field.remote_field.through
+        for model in models
+        for field in model._meta.local_many_to_many
+        if field.remote_field.through._meta.auto_created
+    ]
+    return models + through
+
+
+def copy_order():
+    """Tenant-owned models and their many-to-many tables, parents before the tables referencing them."""
+    models = [model for model in _with_through_tables(routing.sharded_models()) if tenant_path(model)]
+    graph = {
+        model: {
+            field.related_model for field in model._meta.concrete_fields
+            if field.is_relation and field.related_model in models and field.related_model is not model
+        }
+        for model in models
+    }
+    return list(TopologicalSorter(graph).static_order())
+
+
+def _copy_model(model, tenant_id, source, target, chunk_size):
+    path = tenant_path(model)
+    manager = model._base_manager
+    fields = [field.attname for field in model._meta.concrete_fields if not field.primary_key]
+    rows = manager.using(source).filter(**{path: tenant_id}).order_by('pk')
+    copied, last = 0, None
+    while True:
+        chunk = list((rows if last is None else rows.filter(pk__gt=last))[:chunk_size])
+        if not chunk:
+            return copied
+        pks = [row.pk for row in chunk]
+        existing = set(manager.using(target).filter(pk__in=pks).values_list('pk', flat=True))
+        if existing and manager.using(target).filter(pk__in=existing, **{path: tenant_id}).count() != len(existing):
+            raise ValidationError(
+                f"{model._meta.label}: ids {min(existing)}..{max(existing)} are used by another tenant on "
+                f"'{target}'; shards need disjoint id ranges."
+            )
+        with transaction.atomic(using=target):
+            manager.using(target).bulk_create([row for row in chunk if row.pk not in existing])
+            if existing:
+                manager.using(target).bulk_update([row for row in chunk if row.pk in existing], fields)
+        copied += len(chunk)
+        last = pks[-1]
+
+
+def _delete_model(model, tenant_id, alias, chunk_size):
+    path = tenant_path(model)
+    manager = model._base_manager
+    deleted = 0
+    while True:
+        pks = list(manager.using(alias).filter(**{path: tenant_id}).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return deleted
+        with transaction.atomic(using=alias):
+            manager.using(alias).filter(pk__in=pks).delete()
+        deleted += len(pks)
+
+
+def _settle(seconds):
+    if seconds is None:
+        seconds = getattr(settings, 'SHARD_MAP_CACHE_SECONDS', 30)
+    time.sleep(seconds)
+
+
+def move_tenant(tenant_id, target, chunk_size=1000, delete_source=False, settle_seconds=None, log=print):
+    """Move every row of a tenant to the ``target`` database; returns rows copied per model."""
+    replicas = {alias for aliases in getattr(settings, 'DATABASE_REPLICAS', {}).values() for alias in aliases}
+    if target not in settings.DATABASES or target in replicas:
+        raise ValidationError(f"'{target}' is not a primary database alias.")
+    tenant = Tenant.objects.using(DEFAULT_DB_ALIAS).get(pk=tenant_id)
+    routing.reload_shard_map()
+    source = routing.shard_for(tenant.pk)
+    if source == target:
+        raise ValidationError(f"Tenant {tenant.pk} is already on '{target}'.")
+
+    TenantShard.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+        tenant=tenant, defaults={'alias': source, 'status': 'moving'},
+    )
+    log(f"tenant {tenant.pk}: writes frozen on '{source}', waiting for the shard map to settle")
+    _settle(settle_seconds)
+
+    copied = {}
+    try:
+        if target != DEFAULT_DB_ALIAS:
+            routing.mirror(tenant, alias=target)
+            for user in User.objects.using(DEFAULT_DB_ALIAS).filter(tenant=tenant):
+                routing.mirror(user, alias=target)
+        for model in copy_order():
+            copied[model._meta.label] = _copy_model(model, tenant.pk, source, target, chunk_size)
+            log(f"{model._meta.label}: {copied[model._meta.label]} rows")
+    except Exception:
+        TenantShard.objects.using(DEFAULT_DB_ALIAS).filter(tenant=tenant).update(status='active')
+        raise
+    TenantShard.objects.using(DEFAULT_DB_ALIAS).filter(tenant=tenant).update(alias=target, status='active')
+    routing.reload_shard_map()
+    log(f"tenant {tenant.pk}: now on '{target}'")
+
+    if delete_source:
+        # Processes still holding the old map read from the source until they refresh.
+        _settle(settle_seconds)
+        for model in reversed(copy_order()):
+            _delete_model(model, tenant.pk, source, chunk_size)
+        if source != DEFAULT_DB_ALIAS:
+            Tenant._base_manager.using(source).filter(pk=tenant.pk).delete()
+        log(f"tenant {tenant.pk}: removed from '{source}'")
+    return copied
@@ -0,0 +1,103 @@
+"""
+Per-shift till counters.
+
+Each open ``Shift`` has a ``ShiftTotals`` row that checkout keeps current:
+sales, payments per method, refunds and gift card redemptions are added with
+``F()`` expressions (see ``webpos.signals`` and ``GiftCard.redeem``). Each
+update runs in a transaction of its own, or in the caller's when there is
+one, so a counter commits or rolls back together with the sale, payment,
+refund or redemption it counts.
+Closing a shift stamps its end time, freezes the counters and returns the
+Z-report straight from that row, without touching ``Payment``.
+"""
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import Shift, ShiftTotals
+
+PAYMENT_COUNTERS = {
+    'cash': 'cash_total',
+    'card': 'card_total',
+    'mobile': 'mobile_total',
+    'bank_transfer': 'bank_transfer_total',
+    'credit': 'credit_total',
+}
+
+
+def open_shift_id(user_id, store_id):
+    """The open shift of a cashier at a store, if any (served by ``shift_open_idx``)."""
+    if user_id is None or store_id is None:
+        return None
+    return (
+        Shift.objects.filter(user_id=user_id, store_id=store_id, end_time__isnull=True)
+        .order_by('-start_time')
+        .values_list('pk', flat=True)
+        .first()
+    )
+
+
+def _bump(shift_id, **deltas):
+    if shift_id is None:
+        return
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    with transaction.atomic():
+        if not ShiftTotals.objects.filter(shift_id=shift_id, closed=False).update(**changes):
+            # Shifts created before counters existed get their row on first use.
+            _, created = ShiftTotals.objects.get_or_create(shift_id=shift_id)
+            if created:
+                ShiftTotals.objects.filter(shift_id=shift_id, closed=False).update(**changes)
+
+
+def record_sale(sale):
+    _bump(sale.shift_id, sale_count=1, sales_amount=sale.total_amount)
+
+
+def record_payment(payment, shift_id):
+    _bump(shift_id, **{PAYMENT_COUNTERS[payment.method]: payment.amount})
+
+
+def record_refund(refund, shift_id):
+    _bump(shift_id, refund_count=1, refund_total=refund.amount)
+
+
+def record_giftcard_redemption(shift, amount):
+    _bump(getattr(shift, 'pk', shift), giftcard_total=amount)
+
+
+def z_report(shift):
+    totals, _ = ShiftTotals.objects.get_or_create(shift=shift)
+    payments = {method: getattr(totals, field) for method, field in PAYMENT_COUNTERS.items()}
+    return {
+        'shift': shift.pk,
+        'user': shift.user_id,
+        'store': shift.store_id,
+        'start_time': shift.start_time,
+        'end_time': shift.end_time,
+        'closed': totals.closed,
+        'sale_count': totals.sale_count,
+        'sales_amount': totals.sales_amount,
+        'payments': payments,
+        'payments_total': sum(payments.values(), Decimal(0)),
+        'refund_count': totals.refund_count,
+        'refund_total': totals.refund_total,
+        'giftcard_total': totals.giftcard_total,
+        # Cash handed back on returns is a negative cash payment, already netted in.
+        'expected_cash': totals.cash_total,
+    }
+
+
+def close_shift(shift, end_time=None):
+    """End ``shift``, freeze its counters and return the Z-report."""
+    with transaction.atomic():
+        shift = Shift.objects.select_for_update().get(pk=shift.pk)
+        if shift.end_time is not None:
+            raise ValidationError(f"Shift #{shift.pk} is already closed.")
+        shift.end_time = end_time or timezone.now()
+        shift.save(update_fields=['end_time'])
+        ShiftTotals.objects.get_or_create(shift=shift)
+        ShiftTotals.objects.filter(shift=shift).update(closed=True)
+        return z_report(shift)
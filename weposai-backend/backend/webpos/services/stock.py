@@ -0,0 +1,232 @@
+"""
+Stock movements for inventory lines.
+
+Every movement changes ``Inventory.quantity`` and is recorded as an
+``InventoryTransaction`` whose ``quantity`` is the signed delta (negative for
+stock leaving the shelf). Batches (``InventoryBatch``) break the on-hand
+quantity down by expiry date; stock that was never received as a batch is
+treated as untracked and is only consumed once the tracked lots run out.
+Ledger rows are announced to webhooks through ``services.outbox`` in the
+same transaction.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ..models import Inventory, InventoryBatch, InventoryTransaction, Product
+from . import outbox, pricing
+
+
+class InsufficientStock(ValidationError):
+    pass
+
+
+def receive_batch(inventory, quantity, expiry_date=None, lot_number='', user=None, notes=None):
+    """Add a delivered lot to ``inventory`` and record the restock."""
+    with transaction.atomic():
+        batch = InventoryBatch.objects.create(
+            tenant_id=inventory.tenant_id,
+            inventory=inventory,
+            lot_number=lot_number,
+            quantity=quantity,
+            expiry_date=expiry_date,
+        )
+        Inventory.objects.filter(pk=inventory.pk).update(
+            quantity=F('quantity') + quantity,
+            updated_by=user,
+            updated_at=timezone.now(),
+            last_updated=timezone.now(),
+        )
+        InventoryTransaction.objects.create(
+            tenant_id=inventory.tenant_id,
+            inventory=inventory,
+            transaction_type='restock',
+            quantity=quantity,
+            notes=notes,
+            created_by=user,
+        )
+    return batch
+
+
+def consume_fefo(lines, user=None, transaction_type='sale', notes=None, transfer=None):
+    """
+    Take stock out of several inventory lines, first-expired-first-out.
+
+    ``lines`` maps inventory ids to the (positive) quantity to remove. The
+    inventories and their open batches are each read with a single locked
+    query, in primary-key order so concurrent tills always lock in the same
+    sequence. Returns the ledger rows that were written; each carries the
+    batches it drew on as ``lots``, ``(lot_number, expiry_date, quantity)``
+    tuples, with any untracked units left out.
+    """
+    lines = {inv_id: qty for inv_id, qty in lines.items() if qty > 0}
+    if not lines:
+        return []
+
+    now = timezone.now()
+    with transaction.atomic():
+        inventories = list(
+            Inventory.objects.select_for_update().filter(pk__in=lines).order_by('pk')
+        )
+        if len(inventories) != len(lines):
+            missing = set(lines) - {inv.pk for inv in inventories}
+            raise ValidationError(f"Unknown inventory ids: {sorted(missing)}")
+        short = [inv.pk for inv in inventories if inv.quantity < lines[inv.pk]]
+        if short:
+            raise InsufficientStock(f"Insufficient stock for inventory ids: {short}")
+
+        remaining = dict(lines)
+        lots = {inv_id: [] for inv_id in lines}
+        touched = []
+        batches = (
+            InventoryBatch.objects.select_for_update()
+            .filter(inventory_id__in=lines, quantity__gt=0)
+            .order_by('inventory_id', F('expiry_date').asc(nulls_last=True), 'received_at', 'pk')
+        )
+        for batch in batches:
+            need = remaining[batch.inventory_id]
+            if not need:
+                continue
+            take = min(need, batch.quantity)
+            batch.quantity -= take
+            remaining[batch.inventory_id] = need - take
+            lots[batch.inventory_id].append((batch.lot_number, batch.expiry_date, take))
+            touched.append(batch)
+        InventoryBatch.objects.bulk_update(touched, ['quantity'])
+
+        for inv in inventories:
+            inv.quantity -= lines[inv.pk]
+            inv.updated_by = user
+            inv.updated_at = now
+            inv.last_updated = now
+        Inventory.objects.bulk_update(inventories, ['quantity', 'updated_by', 'updated_at', 'last_updated'])
+
+        entries = InventoryTransaction.objects.bulk_create([
+            InventoryTransaction(
+                tenant_id=inv.tenant_id,
+                inventory=inv,
+                transaction_type=transaction_type,
+                quantity=-lines[inv.pk],
+                notes=notes,
+                created_by=user,
+                transfer=transfer,
+            )
+            for inv in inventories
+        ])
+        for entry in entries:
+            entry.lots = lots[entry.inventory_id]
+        # bulk_create sends no post_save, so the webhook events are written here
+        outbox.record_many(entries)
+        return entries
+
+
+def _book_in(lines, user, transaction_type, notes, transfer):
+    inventories = list(
+        Inventory.objects.select_for_update().filter(pk__in=lines).order_by('pk')
+    )
+    if len(inventories) != len(lines):
+        missing = set(lines) - {inv.pk for inv in inventories}
+        raise ValidationError(f"Unknown inventory ids: {sorted(missing)}")
+    now = timezone.now()
+    for inv in inventories:
+        inv.quantity += lines[inv.pk]
+        inv.updated_by = user
+        inv.updated_at = now
+        inv.last_updated = now
+    Inventory.objects.bulk_update(inventories, ['quantity', 'updated_by', 'updated_at', 'last_updated'])
+
+    entries = InventoryTransaction.objects.bulk_create([
+        InventoryTransaction(
+            tenant_id=inv.tenant_id,
+            inventory=inv,
+            transaction_type=transaction_type,
+            quantity=lines[inv.pk],
+            notes=notes,
+            created_by=user,
+            transfer=transfer,
+        )
+        for inv in inventories
+    ])
+    # bulk_create sends no post_save, so the webhook events are written here
+    outbox.record_many(entries)
+    return entries
+
+
+def add_stock(lines, user=None, transaction_type='restock', notes=None, transfer=None):
+    """
+    Put untracked stock back on several inventory lines at once.
+
+    The counterpart of ``consume_fefo`` for inbound movements that do not
+    arrive as a dated lot (returns, positive adjustments, the untracked part
+    of a transfer).
+    """
+    lines = {inv_id: qty for inv_id, qty in lines.items() if qty > 0}
+    if not lines:
+        return []
+    with transaction.atomic():
+        return _book_in(lines, user, transaction_type, notes, transfer)
+
+
+def receive_batches(batches, user=None, transaction_type='restock', notes=None, transfer=None):
+    """
+    Add several dated lots at once; ``batches`` are ``(inventory_id,
+    quantity, expiry_date, lot_number)`` tuples.
+
+    The bulk counterpart of ``receive_batch``: the lots are inserted in one
+    statement and each inventory line gets one update and one ledger row for
+    all its lots. Returns the ledger rows that were written.
+    """
+    batches = [batch for batch in batches if batch[1] > 0]
+    if not batches:
+        return []
+    lines = defaultdict(int)
+    for inv_id, qty, _, _ in batches:
+        lines[inv_id] += qty
+    with transaction.atomic():
+        entries = _book_in(lines, user, transaction_type, notes, transfer)
+        tenants = {entry.inventory_id: entry.tenant_id for entry in entries}
+        InventoryBatch.objects.bulk_create([
+            InventoryBatch(
+                tenant_id=tenants[inv_id],
+                inventory_id=inv_id,
+                lot_number=lot_number or '',
+                quantity=qty,
+                expiry_date=expiry_date,
+            )
+            for inv_id, qty, expiry_date, lot_number in batches
+        ])
+        return entries
+
+
+def expiring_batches(tenant, days, store=None, today=None):
+    """Open batches of ``tenant`` whose expiry falls within the next ``days`` days."""
+    today = today or timezone.localdate()
+    qs = InventoryBatch.objects.filter(
+        tenant=tenant,
+        quantity__gt=0,
+        expiry_date__range=(today, today + timedelta(days=days)),
+    )
+    if store is not None:
+        qs = qs.filter(inventory__store=store)
+    return qs.order_by('expiry_date', 'pk')
+
+
+def mark_down_expiring(tenant, days, discount_percent, store=None, today=None):
+    """
+    Discount every product with a lot expiring within ``days`` days.
+
+    Runs as one ``UPDATE`` over a subquery on the expiry index, through
+    ``pricing.mark_down`` so each product gets its ``PriceHistory`` row in
+    the same transaction. Products that already carry a deeper discount are
+    left alone. Returns the number of products changed.
+    """
+    product_ids = expiring_batches(tenant, days, store=store, today=today).values('inventory__product_id')
+    products = (
+        Product.objects.filter(pk__in=product_ids)
+        .filter(Q(is_discounted=False) | Q(discount_percent__lt=discount_percent))
+    )
+    return pricing.mark_down(getattr(tenant, 'pk', tenant), products, discount_percent)
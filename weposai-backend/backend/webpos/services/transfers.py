@@ -0,0 +1,180 @@
+"""
+Store-to-store stock transfers.
+
+A transfer is written in two phases. ``dispatch`` takes the stock out of the
+source store and writes one ``transfer_out`` ledger leg per line, noting on
+the line which batches the units came from; ``receive`` books it into the
+destination store with matching ``transfer_in`` legs, re-creating those
+batches with their lot numbers and expiry dates (``stock.receive_batches``)
+and adding any untracked units as untracked stock. Both phases write their
+ledger legs in bulk.
+Both phases lock the transfer row first and then the inventory rows in
+primary-key order, so two transfers touching the same SKUs cannot deadlock.
+"""
+from datetime import date, timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from ..models import Inventory, InventoryTransaction, StockTransfer, StockTransferLine
+from . import stock
+
+
+def create_transfer(tenant, source_store, destination_store, lines, user=None, notes=''):
+    """Create a draft transfer; ``lines`` maps product ids to quantities."""
+    if source_store.pk == destination_store.pk:
+        raise ValidationError("Source and destination store must differ.")
+    with transaction.atomic():
+        transfer = StockTransfer.objects.create(
+            tenant=tenant,
+            source_store=source_store,
+            destination_store=destination_store,
+            notes=notes,
+            created_by=user,
+        )
+        StockTransferLine.objects.bulk_create([
+            StockTransferLine(transfer=transfer, product_id=product_id, quantity=qty)
+            for product_id, qty in lines.items()
+        ])
+    return transfer
+
+
+def _lock(transfer, expected_status):
+    locked = StockTransfer.objects.select_for_update().get(pk=transfer.pk)
+    if locked.status != expected_status:
+        raise ValidationError(f"Transfer #{locked.pk} is {locked.status}, expected {expected_status}.")
+    return locked
+
+
+def dispatch(transfer, user=None):
+    """Take the goods out of the source store and mark the transfer in transit."""
+    with transaction.atomic():
+        transfer = _lock(transfer, 'draft')
+        lines = list(transfer.lines.all())
+        quantities = {line.product_id: line.quantity for line in lines}
+        inventory_ids = dict(
+            Inventory.objects.filter(
+                tenant_id=transfer.tenant_id,
+                store_id=transfer.source_store_id,
+                product_id__in=quantities,
+            ).values_list('product_id', 'pk')
+        )
+        missing = set(quantities) - set(inventory_ids)
+        if missing:
+            raise ValidationError(f"Source store holds no inventory for products: {sorted(missing)}")
+        entries = stock.consume_fefo(
+            {inventory_ids[product_id]: qty for product_id, qty in quantities.items()},
+            user=user,
+            transaction_type='transfer_out',
+            notes=f"Transfer #{transfer.pk}",
+            transfer=transfer,
+        )
+        lots = {entry.inventory_id: entry.lots for entry in entries}
+        for line in lines:
+            line.lots = [
+                {'lot_number': lot_number, 'expiry_date': expiry_date, 'quantity': qty}
+                for lot_number, expiry_date, qty in lots.get(inventory_ids[line.product_id], ())
+            ]
+        StockTransferLine.objects.bulk_update(lines, ['lots'])
+        transfer.status = 'in_transit'
+        transfer.dispatched_at = timezone.now()
+        transfer.save(update_fields=['status', 'dispatched_at'])
+    return transfer
+
+
+def receive(transfer, user=None):
+    """Book the goods into the destination store and close the transfer."""
+    with transaction.atomic():
+        transfer = _lock(transfer, 'in_transit')
+        lines = list(transfer.lines.all())
+        Inventory.objects.bulk_create(
+            [
+                Inventory(
+                    tenant_id=transfer.tenant_id,
+                    store_id=transfer.destination_store_id,
+                    product_id=line.product_id,
+                    quantity=0,
+                    created_by=user,
+                )
+                for line in lines
+            ],
+            ignore_conflicts=True,
+        )
+        inventory_ids = dict(
+            Inventory.objects.filter(
+                tenant_id=transfer.tenant_id,
+                store_id=transfer.destination_store_id,
+                product_id__in=[line.product_id for line in lines],
+            ).values_list('product_id', 'pk')
+        )
+        batches = [
+            (
+                inventory_ids[line.product_id],
+                lot['quantity'],
+                lot['expiry_date'] and date.fromisoformat(lot['expiry_date']),
+                lot['lot_number'],
+            )
+            for line in lines
+            for lot in line.lots
+        ]
+        untracked = {
+            inventory_ids[line.product_id]: line.quantity - sum(lot['quantity'] for lot in line.lots)
+            for line in lines
+        }
+        legs = dict(user=user, transaction_type='transfer_in', notes=f"Transfer #{transfer.pk}", transfer=transfer)
+        stock.receive_batches(batches, **legs)
+        stock.add_stock(untracked, **legs)
+        transfer.status = 'received'
+        transfer.received_by = user
+        transfer.received_at = timezone.now()
+        transfer.save(update_fields=['status', 'received_by', 'received_at'])
+    return transfer
+
+
+def cancel(transfer):
+    """Cancel a transfer that has not been dispatched yet."""
+    with transaction.atomic():
+        transfer = _lock(transfer, 'draft')
+        transfer.status = 'cancelled'
+        transfer.save(update_fields=['status'])
+    return transfer
+
+
+def find_orphaned_legs(tenant=None, stale_after=timedelta(days=3)):
+    """
+    Return the inconsistencies a reconciliation run should report.
+
+    * ``unpaired``: transfer legs written outside a transfer document.
+    * ``incomplete``: transfers whose leg counts disagree with their status
+      (a received transfer missing in-legs, a draft that already has out-legs).
+    * ``stale``: transfers still in transit after ``stale_after``.
+    """
+    legs = InventoryTransaction.objects.filter(transaction_type__in=('transfer_in', 'transfer_out'))
+    transfers = StockTransfer.objects.all()
+    if tenant is not None:
+        legs = legs.filter(tenant=tenant)
+        transfers = transfers.filter(tenant=tenant)
+
+    counted = transfers.annotate(
+        line_count=Count('lines', distinct=True),
+        out_legs=Count('ledger_entries', filter=Q(ledger_entries__transaction_type='transfer_out'), distinct=True),
+        # A line received as several batches has one in-leg per batch, so count products
+        in_legs=Count(
+            'ledger_entries__inventory__product',
+            filter=Q(ledger_entries__transaction_type='transfer_in'),
+            distinct=True,
+        ),
+    )
+    incomplete = counted.filter(
+        Q(status__in=('draft', 'cancelled'), out_legs__gt=0)
+        | Q(status__in=('draft', 'cancelled', 'in_transit'), in_legs__gt=0)
+        | Q(status__in=('in_transit', 'received')) & ~Q(out_legs=F('line_count'))
+        | Q(status='received') & ~Q(in_legs=F('line_count'))
+    )
+    return {
+        'unpaired': legs.filter(transfer__isnull=True),
+        'incomplete': incomplete,
+        'stale': transfers.filter(status='in_transit', dispatched_at__lt=timezone.now() - stale_after),
+    }
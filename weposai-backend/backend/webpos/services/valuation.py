@@ -0,0 +1,291 @@
+"""
+Cost of goods sold from purchase history.
+
+``run_valuation`` values every product sale line of a tenant that has not
+been costed yet, using the tenant's ``valuation_method``:
+
+* ``fifo``: each ``Purchase`` opens a ``CostLayer`` and sales consume the
+  oldest layers first.
+* ``weighted_average``: sales are costed at the moving average cost, which
+  only changes when a purchase arrives.
+
+A ``ValuationCursor`` remembers the last purchase and order item processed,
+so each run only reads what arrived since the previous one. All lines of a
+run are costed together with numpy over flat arrays sorted by product, and
+results are written with bulk operations. Quantities sold beyond the known
+layers (opening stock, missing purchases) are costed at the product's last
+known unit cost, or its ``cost_price``.
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, Sum
+from django.db.models.functions import TruncDay, TruncMonth
+
+from ..models import (
+    CostLayer, OrderItem, Product, ProductValuation, Purchase,
+    SaleLineCost, Tenant, ValuationCursor,
+)
+
+CENT = Decimal('0.01')
+UNIT_COST = Decimal('0.0001')
+
+
+def _money(value, quantum=CENT):
+    return Decimal(repr(float(value))).quantize(quantum)
+
+
+def _group_starts(keys):
+    """Boolean mask marking the first element of each run of equal ``keys``."""
+    starts = np.ones(len(keys), dtype=bool)
+    starts[1:] = keys[1:] != keys[:-1]
+    return starts
+
+
+def _cumsum_within(values, keys):
+    """Inclusive cumulative sum of ``values`` restarting at every change of ``keys``."""
+    total = np.cumsum(values)
+    starts = np.flatnonzero(_group_starts(keys))
+    offsets = np.repeat(total[starts] - values[starts], np.diff(np.append(starts, len(values))))
+    return total - offsets
+
+
+def _load_sales(tenant, after_id, upto_id):
+    return list(
+        OrderItem.objects.filter(
+            sale__tenant=tenant, product__isnull=False, pk__gt=after_id, pk__lte=upto_id,
+        )
+        .order_by('product_id', 'sale__date', 'pk')
+        .values_list('pk', 'product_id', 'sale__date', 'quantity', 'price')
+    )
+
+
+def _fallback_costs(product_ids):
+    return {
+        pk: float(cost)
+        for pk, cost in Product.objects.filter(pk__in=product_ids).values_list('pk', 'cost_price')
+    }
+
+
+def _cost_fifo(tenant, purchases, sales):
+    """Return per-sale costs and persist the updated cost layers."""
+    open_layers = list(
+        CostLayer.objects.select_for_update()
+        .filter(tenant=tenant, remaining_quantity__gt=0)
+        .order_by('product_id', 'received_at', 'pk')
+    )
+    new_layers = [
+        CostLayer(
+            tenant=tenant,
+            product_id=product_id,
+            purchase_id=purchase_id,
+            received_at=purchased_at,
+            quantity=quantity,
+            remaining_quantity=quantity,
+            unit_cost=(total_cost / quantity).quantize(UNIT_COST),
+        )
+        for purchase_id, product_id, purchased_at, quantity, total_cost in purchases
+        if quantity
+    ]
+    layers = sorted(open_layers + new_layers, key=lambda layer: (layer.product_id, layer.received_at))
+
+    layer_product = np.array([layer.product_id for layer in layers], dtype=np.int64)
+    layer_qty = np.array([layer.remaining_quantity for layer in layers], dtype=np.float64)
+    layer_cost = np.array([float(layer.unit_cost) for layer in layers], dtype=np.float64)
+    layer_end = np.cumsum(layer_qty)
+    layer_start = layer_end - layer_qty
+    # Piecewise-linear cumulative cost over the concatenated layers.
+    xp = np.concatenate(([0.0], layer_end))
+    fp = np.concatenate(([0.0], np.cumsum(layer_qty * layer_cost)))
+
+    products = np.unique(np.concatenate((layer_product, [row[1] for row in sales]))).astype(np.int64)
+    first = np.searchsorted(layer_product, products, side='left')
+    last = np.searchsorted(layer_product, products, side='right')
+    has_layers = last > first
+    product_offset = np.zeros(len(products))
+    product_capacity = np.zeros(len(products))
+    product_offset[has_layers] = layer_start[first[has_layers]]
+    product_capacity[has_layers] = layer_end[last[has_layers] - 1] - product_offset[has_layers]
+    fallback = _fallback_costs(products.tolist())
+    last_unit_cost = np.array([
+        layer_cost[hi - 1] if hi > lo else fallback.get(int(pk), 0.0)
+        for pk, lo, hi in zip(products, first, last)
+    ])
+
+    sale_product = np.array([row[1] for row in sales], dtype=np.int64)
+    sale_qty = np.array([row[3] for row in sales], dtype=np.float64)
+    idx = np.searchsorted(products, sale_product)
+    sold_end = _cumsum_within(sale_qty, sale_product) if len(sales) else sale_qty
+    sold_start = sold_end - sale_qty
+    capacity = product_capacity[idx]
+    pos_start = product_offset[idx] + np.minimum(sold_start, capacity)
+    pos_end = product_offset[idx] + np.minimum(sold_end, capacity)
+    excess = sale_qty - (pos_end - pos_start)
+    costs = np.interp(pos_end, xp, fp) - np.interp(pos_start, xp, fp) + excess * last_unit_cost[idx]
+
+    # Layers are consumed up to each product's sold total.
+    consumed_to = product_offset + np.minimum(
+        np.bincount(idx, weights=sale_qty, minlength=len(products)) if len(sales) else 0.0,
+        product_capacity,
+    )
+    layer_consumed_to = consumed_to[np.searchsorted(products, layer_product)] if len(layers) else layer_end
+    remaining = np.clip(layer_end - np.maximum(layer_start, layer_consumed_to), 0, layer_qty)
+
+    changed = []
+    for layer, left in zip(layers, remaining.astype(np.int64).tolist()):
+        if layer.pk is None:
+            layer.remaining_quantity = left
+        elif layer.remaining_quantity != left:
+            layer.remaining_quantity = left
+            changed.append(layer)
+    CostLayer.objects.bulk_update(changed, ['remaining_quantity'])
+    CostLayer.objects.bulk_create(new_layers)
+    return costs
+
+
+def _cost_weighted_average(tenant, purchases, sales):
+    """Return per-sale costs and persist each product's running quantity and average."""
+    states = {
+        state.product_id: state
+        for state in ProductValuation.objects.select_for_update().filter(tenant=tenant)
+    }
+    # One event stream per product: purchases (+qty) and sales (-qty) in time order,
+    # a purchase sorting before a sale at the same instant. Purchases of no units
+    # carry no unit cost and are left out, as in FIFO.
+    events = sorted(
+        [(p[1], p[2], 0, p[3], float(p[4])) for p in purchases if p[3]]
+        + [(s[1], s[2], 1, s[3], 0.0) for s in sales],
+        key=lambda event: event[:3],
+    )
+    if not events:
+        return np.zeros(0)
+    ev_product = np.array([e[0] for e in events], dtype=np.int64)
+    ev_is_sale = np.array([e[2] for e in events], dtype=bool)
+    ev_qty = np.array([e[3] for e in events], dtype=np.float64)
+    ev_cost = np.array([e[4] for e in events], dtype=np.float64)
+    signed = np.where(ev_is_sale, -ev_qty, ev_qty)
+
+    products = np.unique(ev_product)
+    idx = np.searchsorted(products, ev_product)
+    fallback = _fallback_costs(products.tolist())
+    start_qty = np.array([states[pk].on_hand if pk in states else 0 for pk in products.tolist()], dtype=np.float64)
+    start_avg = np.array([
+        float(states[pk].average_cost) if pk in states and states[pk].average_cost is not None
+        else fallback.get(pk, 0.0)
+        for pk in products.tolist()
+    ])
+    qty_after = start_qty[idx] + _cumsum_within(signed, ev_product)
+    qty_before = qty_after - signed
+
+    # The average only moves on purchases, so the recurrence runs over purchases alone.
+    avg_after = np.full(len(events), np.nan)
+    running = dict(zip(products.tolist(), start_avg.tolist()))
+    for i in np.flatnonzero(~ev_is_sale).tolist():
+        pk = int(ev_product[i])
+        before = qty_before[i]
+        if before <= 0:
+            running[pk] = ev_cost[i] / ev_qty[i]
+        else:
+            running[pk] = (before * running[pk] + ev_cost[i]) / (before + ev_qty[i])
+        avg_after[i] = running[pk]
+
+    # Forward-fill the latest purchase average onto following sales of the same product.
+    last_purchase = np.where(~ev_is_sale, np.arange(len(events)), -1)
+    last_purchase = np.maximum.accumulate(last_purchase)
+    same_product = (last_purchase >= 0) & (ev_product[np.maximum(last_purchase, 0)] == ev_product)
+    unit = np.where(same_product, avg_after[np.maximum(last_purchase, 0)], start_avg[idx])
+    costs = (unit * ev_qty)[ev_is_sale]
+
+    ends = np.append(np.flatnonzero(_group_starts(ev_product))[1:], len(events)) - 1
+    final = {}
+    for pk, end in zip(products.tolist(), ends.tolist()):
+        final[pk] = (int(qty_after[end]), running[pk])
+    touched = []
+    for pk, (on_hand, average) in final.items():
+        state = states.get(pk) or ProductValuation(tenant=tenant, product_id=pk)
+        state.on_hand = on_hand
+        state.average_cost = _money(average, UNIT_COST)
+        touched.append(state)
+    ProductValuation.objects.bulk_create(
+        touched,
+        update_conflicts=True,
+        unique_fields=['product'],
+        update_fields=['on_hand', 'average_cost', 'updated_at'],
+    )
+    # Costs come back in event order; sales are already in (product, date, pk) order,
+    # which the stable sort above preserves.
+    return costs
+
+
+def run_valuation(tenant):
+    """
+    Cost every new sale line of ``tenant`` and advance its cursor.
+
+    Returns the number of sale lines costed.
+    """
+    tenant = tenant if isinstance(tenant, Tenant) else Tenant.objects.get(pk=tenant)
+    with transaction.atomic():
+        cursor, _ = ValuationCursor.objects.select_for_update().get_or_create(tenant=tenant)
+        upto_purchase = Purchase.objects.filter(tenant=tenant).order_by('-pk').values_list('pk', flat=True).first() or 0
+        upto_item = (
+            OrderItem.objects.filter(sale__tenant=tenant).order_by('-pk').values_list('pk', flat=True).first() or 0
+        )
+        purchases = list(
+            Purchase.objects.filter(tenant=tenant, pk__gt=cursor.last_purchase_id, pk__lte=upto_purchase)
+            .order_by('product_id', 'purchased_at', 'pk')
+            .values_list('pk', 'product_id', 'purchased_at', 'quantity', 'total_cost')
+        )
+        sales = _load_sales(tenant, cursor.last_order_item_id, upto_item)
+
+        if tenant.valuation_method == 'fifo':
+            costs = _cost_fifo(tenant, purchases, sales)
+        else:
+            costs = _cost_weighted_average(tenant, purchases, sales)
+
+        SaleLineCost.objects.bulk_create([
+            SaleLineCost(
+                tenant=tenant,
+                order_item_id=item_id,
+                product_id=product_id,
+                sold_at=sold_at,
+                quantity=quantity,
+                revenue=(price * quantity).quantize(CENT),
+                cost=_money(cost),
+                method=tenant.valuation_method,
+            )
+            for (item_id, product_id, sold_at, quantity, price), cost in zip(sales, costs.tolist())
+        ], batch_size=2000)
+
+        cursor.last_purchase_id = max(cursor.last_purchase_id, upto_purchase)
+        cursor.last_order_item_id = max(cursor.last_order_item_id, upto_item)
+        cursor.save(update_fields=['last_purchase_id', 'last_order_item_id', 'updated_at'])
+    return len(sales)
+
+
+def gross_margin(tenant, start, end, group_by='product'):
+    """
+    Revenue, COGS and gross margin for ``tenant`` between ``start`` and ``end``.
+
+    Reads only ``SaleLineCost`` through its ``(tenant, sold_at)`` index.
+    ``group_by`` is ``'product'``, ``'day'`` or ``'month'``.
+    """
+    qs = SaleLineCost.objects.filter(tenant=tenant, sold_at__gte=start, sold_at__lt=end).order_by()
+    if group_by == 'product':
+        group = ['product']
+    else:
+        qs = qs.annotate(period={'day': TruncDay, 'month': TruncMonth}[group_by]('sold_at'))
+        group = ['period']
+    return (
+        qs.values(*group)
+        .annotate(
+            units=Sum('quantity'),
+            total_revenue=Sum('revenue'),
+            total_cost=Sum('cost'),
+            gross_margin=ExpressionWrapper(
+                Sum('revenue') - Sum('cost'),
+                output_field=DecimalField(max_digits=16, decimal_places=2),
+            ),
+        )
+        .order_by(*group)
+    )
@@ -0,0 +1,158 @@
+from django.db.models import Sum
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import caching, routing
+from .models import (
+    Category, Delivery, InventoryTransaction, Payment, Product, Promotion, Purchase, Refund, Sale, Shift, ShiftTotals,
+    Store, Tax, Tenant, User,
+)
+from .services import accounting, loyalty, outbox, pricing, receipts, shifts
+
+
+@receiver(post_save, sender=Sale)
+@receiver(post_save, sender=Payment)
+@receiver(post_save, sender=Refund)
+@receiver(post_save, sender=Purchase)
+def enqueue_journal_posting(sender, instance, created, **kwargs):
+    if created:
+        accounting.enqueue(instance.tenant_id, sender._meta.model_name, instance.pk)
+
+
+@receiver(post_save, sender=Delivery)
+def enqueue_delivery_fee_posting(sender, instance, created, **kwargs):
+    if created and instance.delivery_fee:
+        accounting.enqueue(instance.tenant_id, 'delivery', instance.pk)
+
+
+# ----------------------------
+# Outbox events for webhooks
+# ----------------------------
+
+@receiver(post_save, sender=Sale)
+@receiver(post_save, sender=Payment)
+@receiver(post_save, sender=Refund)
+@receiver(post_save, sender=InventoryTransaction)
+def record_outbox_event(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        outbox.record(instance, 'created' if created else 'updated')
+
+
+# ----------------------------
+# Shift counters
+# ----------------------------
+
+@receiver(post_save, sender=Shift)
+def create_shift_totals(sender, instance, created, **kwargs):
+    if created:
+        ShiftTotals.objects.get_or_create(shift=instance)
+
+
+@receiver(pre_save, sender=Sale)
+def assign_sale_shift(sender, instance, **kwargs):
+    if instance._state.adding and instance.shift_id is None:
+        instance.shift_id = shifts.open_shift_id(instance.user_id, instance.store_id)
+
+
+@receiver(post_save, sender=Sale)
+def count_sale(sender, instance, created, **kwargs):
+    if created:
+        shifts.record_sale(instance)
+
+
+@receiver(post_save, sender=Payment)
+def count_payment(sender, instance, created, **kwargs):
+    if created:
+        sale = instance.sale
+        shift_id = shifts.open_shift_id(instance.created_by_id, sale.store_id) or sale.shift_id
+        shifts.record_payment(instance, shift_id)
+
+
+@receiver(post_save, sender=Refund)
+def count_refund(sender, instance, created, **kwargs):
+    if created:
+        sale = instance.sale
+        shift_id = shifts.open_shift_id(instance.created_by_id, sale.store_id) or sale.shift_id
+        shifts.record_refund(instance, shift_id)
+
+
+# ----------------------------
+# Paid sales: loyalty points and receipt
+# ----------------------------
+
+@receiver(post_save, sender=Payment)
+def complete_paid_sale(sender, instance, created, **kwargs):
+    if not created or instance.amount <= 0:
+        return
+    sale = instance.sale
+    paid = sale.payments.aggregate(total=Sum('amount'))['total'] or 0
+    if paid < sale.total_amount:
+        return
+    if sale.customer_id is not None:
+        loyalty.accrue_for_sale(sale)
+    receipts.issue(sale)
+
+
+# ----------------------------
+# Price history
+# ----------------------------
+
+@receiver(pre_save, sender=Product)
+def remember_previous_prices(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(pricing.HISTORY_FIELDS):
+        return
+    instance._previous_prices = (
+        Product.objects.using(using).filter(pk=instance.pk).values_list(*pricing.HISTORY_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=Product)
+def record_price_history(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = instance.__dict__.pop('_previous_prices', None)
+    if created or previous is not None:
+        pricing.record_edit(instance, previous, created=created)
+
+
+# ----------------------------
+# Response cache invalidation
+# ----------------------------
+
+CACHED_RESOURCES = {
+    Store: 'stores',
+    Category: 'categories',
+    Tax: 'taxes',
+    Promotion: 'promotions',
+}
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def invalidate_tenant_cache(sender, instance, **kwargs):
+    caching.invalidate('tenants', caching.GLOBAL)
+
+
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tax)
+@receiver(post_delete, sender=Tax)
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+def invalidate_reference_cache(sender, instance, **kwargs):
+    caching.invalidate(CACHED_RESOURCES[sender], instance.tenant_id)
+
+
+# ----------------------------
+# Shard mirrors
+# ----------------------------
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_save, sender=User)
+def mirror_directory_row(sender, instance, raw=False, **kwargs):
+    if not raw:
+        routing.mirror(instance)
@@ -0,0 +1,17 @@
+'use strict';
+{
+    // Reload the changelist filtered on the row picked in an AutocompleteFilter, back on the first page.
+    const $ = django.jQuery;
+    $(function() {
+        $('select[data-autocomplete-filter]').on('change', function() {
+            const url = new URL(window.location.href);
+            url.searchParams.delete('p');
+            if (this.value) {
+                url.searchParams.set(this.dataset.autocompleteFilter, this.value);
+            } else {
+                url.searchParams.delete(this.dataset.autocompleteFilter);
+            }
+            window.location.href = url.toString();
+        });
+    });
+}
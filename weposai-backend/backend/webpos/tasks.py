@@ -0,0 +1,17 @@
+"""
+Background tasks runnable through ``services.jobs``.
+
+Each entry maps a task name to the function a worker calls with the job's
+JSON payload as keyword arguments.
+"""
+from .services import accounting, affinity, forecasting, jobs, loyalty, pins, pricing, receipts, valuation
+
+jobs.register('receipts.build_pdf', receipts.build_pdf)
+jobs.register('valuation.run', valuation.run_valuation)
+jobs.register('accounting.post_all', accounting.post_all)
+jobs.register('loyalty.expire_points', loyalty.expire_points)
+jobs.register('pins.expire', pins.expire_pins)
+jobs.register('affinity.compute', affinity.compute_affinities)
+jobs.register('forecasting.run', forecasting.forecast_tenant)
+jobs.register('pricing.apply', pricing.apply_change)
+jobs.register('pricing.rollback', pricing.rollback_change)
@@ -0,0 +1,70 @@
+from decimal import Decimal
+
+from django.core.cache import caches
+from rest_framework.test import APITestCase
+
+from .. import throttling
+from ..models import Category, Inventory, Product, Sale, OrderItem, Store, Tenant, User
+
+API = '/api/api/v1'
+
+
+class TenantTestCase(APITestCase):
+    """A tenant with a store, a category and one stocked product, and its signed-in admin."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name='Corner Shop')
+        cls.user = User.objects.create_user('manager', password='secret', tenant=cls.tenant, role='admin')
+        cls.store = Store.objects.create(tenant=cls.tenant, name='Main', location='High Street')
+        cls.category = Category.objects.create(tenant=cls.tenant, name='Dairy')
+        cls.product = cls.make_product('MILK-1', price='2.50', cost_price='1.20')
+        cls.inventory = Inventory.objects.create(tenant=cls.tenant, product=cls.product, store=cls.store)
+
+    def setUp(self):
+        # Response cache entries and throttle buckets live in the process, keyed by ids
+        # the next test may reuse
+        for cache in caches.all():
+            cache.clear()
+        throttling._buckets = None
+        for state in (throttling._usage, throttling._plans, throttling._daily):
+            state.clear()
+        self.client.force_authenticate(self.user)
+
+    @classmethod
+    def make_product(cls, sku, price='10.00', cost_price='6.00', tenant=None, store=None, **fields):
+        return Product.objects.create(
+            tenant=tenant or cls.tenant,
+            store=store or cls.store,
+            category=fields.pop('category', cls.category),
+            name=fields.pop('name', sku.title()),
+            sku=sku,
+            barcode=f'BC-{sku}',
+            price=Decimal(price),
+            cost_price=Decimal(cost_price),
+            **fields,
+        )
+
+    @classmethod
+    def make_sale(cls, lines, user=None, store=None, customer=None, tenant=None, **fields):
+        """A sale of ``lines`` (product, quantity) pairs at their current prices, written straight to the tables."""
+        sale = Sale.objects.create(
+            tenant=tenant or cls.tenant,
+            store=store or cls.store,
+            user=user or cls.user,
+            customer=customer,
+            total_amount=sum((product.price * quantity for product, quantity in lines), Decimal(0)),
+            **fields,
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(sale=sale, product=product, quantity=quantity, price=product.price)
+            for product, quantity in lines
+        ])
+        return sale
+
+    @classmethod
+    def other_tenant(cls, name='Rival'):
+        tenant = Tenant.objects.create(name=name)
+        user = User.objects.create_user(f'{name.lower()}-admin', password='secret', tenant=tenant, role='admin')
+        store = Store.objects.create(tenant=tenant, name=name, location='Elsewhere')
+        return tenant, user, store
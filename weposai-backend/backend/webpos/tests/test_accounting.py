@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+from ..models import Account, JournalEntry, Payment, PostingQueue
+from ..services import accounting
+from .base import API, TenantTestCase
+
+
+class PostingTests(TenantTestCase):
+    def balances(self):
+        return dict(Account.objects.filter(tenant=self.tenant).exclude(balance=0).values_list('code', 'balance'))
+
+    def test_sale_and_payment_post_balanced_entries(self):
+        sale = self.make_sale([(self.product, 4)])
+        Payment.objects.create(tenant=self.tenant, sale=sale, method='card', amount=Decimal('10.00'))
+        self.assertEqual(PostingQueue.objects.count(), 2)
+
+        self.assertEqual(accounting.post_all(), 2)
+        self.assertEqual(self.balances(), {
+            accounting.CARD_CLEARING: Decimal('10.00'),
+            accounting.SALES: Decimal('-10.00'),
+        })
+        for entry in JournalEntry.objects.prefetch_related('lines'):
+            self.assertEqual(sum(line.debit for line in entry.lines.all()), sum(line.credit for line in entry.lines.all()))
+
+    def test_reversal_payment_posts_positive_legs(self):
+        sale = self.make_sale([(self.product, 2)])
+        Payment.objects.create(tenant=self.tenant, sale=sale, method='cash', amount=Decimal('5.00'))
+        Payment.objects.create(tenant=self.tenant, sale=sale, method='cash', amount=Decimal('-2.50'))
+        accounting.post_all()
+        reversal = JournalEntry.objects.get(description__endswith='(reversal)')
+        self.assertEqual(
+            sorted(reversal.lines.values_list('account__code', 'debit', 'credit')),
+            [(accounting.CASH, Decimal('0'), Decimal('2.50')), (accounting.RECEIVABLE, Decimal('2.50'), Decimal('0'))],
+        )
+        self.assertEqual(self.balances(), {
+            accounting.CASH: Decimal('2.50'),
+            accounting.RECEIVABLE: Decimal('2.50'),
+            accounting.SALES: Decimal('-5.00'),
+        })
+
+    def test_documents_are_posted_once(self):
+        sale = self.make_sale([(self.product, 1)])
+        accounting.post_all()
+        accounting.enqueue(self.tenant.pk, 'sale', sale.pk)
+        accounting.post_all()
+        self.assertEqual(JournalEntry.objects.filter(source_type='sale', source_id=sale.pk).count(), 1)
+
+    def test_trial_balance_endpoint(self):
+        self.make_sale([(self.product, 2)])
+        accounting.post_all()
+        response = self.client.get(f'{API}/accounts/trial-balance/', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        rows = {row['code']: row for row in response.json()}
+        self.assertEqual(Decimal(str(rows[accounting.RECEIVABLE]['debit'])), Decimal('5.00'))
+        self.assertEqual(Decimal(str(rows[accounting.SALES]['credit'])), Decimal('5.00'))
@@ -0,0 +1,32 @@
+from django.test import override_settings
+
+from ..models import Sale, User
+from .base import TenantTestCase
+
+
+# Templates load static files, which have no collected manifest under test
+@override_settings(ADMIN_COUNT_LIMIT=3, STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class LargeChangelistTests(TenantTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.staff = User.objects.create_superuser('root', 'root@example.com', 'secret', tenant=cls.tenant)
+        for _ in range(5):
+            cls.make_sale([(cls.product, 1)])
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.staff)
+
+    def test_unfiltered_count_comes_from_table_statistics(self):
+        response = self.client.get('/admin/webpos/sale/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, Sale.objects.latest('pk').pk)
+
+    def test_filtered_count_stops_at_the_limit(self):
+        response = self.client.get('/admin/webpos/sale/', {'store__id__exact': self.store.pk})
+        self.assertEqual(response.context['cl'].result_count, 3)
+        self.assertContains(response, 'data-autocomplete-filter="store__id__exact"')
@@ -0,0 +1,48 @@
+from ..models import ProductAffinity
+from ..services import affinity
+from .base import API, TenantTestCase
+
+
+class AffinityTests(TenantTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.bread = cls.make_product('BREAD-1', price='1.80')
+        cls.soap = cls.make_product('SOAP-1', price='3.00')
+        cls.tea = cls.make_product('TEA-1', price='2.20')
+        for _ in range(4):
+            cls.make_sale([(cls.product, 1), (cls.bread, 1)])
+        for _ in range(4):
+            cls.make_sale([(cls.soap, 1), (cls.tea, 1)])
+
+    def test_products_bought_together_are_paired(self):
+        self.assertEqual(affinity.compute_affinities(self.tenant.pk), 4)
+        pair = ProductAffinity.objects.get(product=self.product)
+        self.assertEqual(pair.related_product_id, self.bread.pk)
+        self.assertEqual((pair.baskets, pair.confidence), (4, 1.0))
+        self.assertAlmostEqual(pair.lift, 2.0)
+        self.assertAlmostEqual(pair.support, 0.5)
+
+    def test_chunks_keep_baskets_whole(self):
+        affinity.compute_affinities(self.tenant.pk, chunk_lines=3)
+        self.assertEqual(
+            ProductAffinity.objects.get(product=self.soap).related_product_id, self.tea.pk,
+        )
+
+    def test_rare_pairs_are_left_out(self):
+        self.assertEqual(affinity.compute_affinities(self.tenant.pk, min_baskets=5), 0)
+
+    def test_endpoint_lists_partners(self):
+        affinity.compute_affinities(self.tenant.pk)
+        response = self.client.get(f'{API}/products/{self.product.pk}/frequently-bought-together/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['related_product'] for row in response.json()], [self.bread.pk])
+
+    def test_endpoint_is_limited_to_the_callers_tenant(self):
+        affinity.compute_affinities(self.tenant.pk)
+        url = f'{API}/products/{self.product.pk}/frequently-bought-together/'
+        _, rival, _ = self.other_tenant()
+        self.client.force_authenticate(rival)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(url).status_code, 401)
@@ -0,0 +1,28 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..benchmarks.scenarios import SCENARIOS
+
+
+# A loaded test machine would otherwise log slow-request warnings with their SQL and stack
+@override_settings(PERF_SLOW_REQUEST_MS=60_000)
+class BenchRunTests(TestCase):
+    """Every scenario runs against a small seeded dataset, so bench_run keeps working as the API changes."""
+
+    def test_seed_and_run_every_scenario(self):
+        call_command('bench_seed', tenants=1, stores=2, products=30, customers=5, sales=40, days=10, stdout=io.StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command('bench_run', iterations=2, warmup=0, output=output, stdout=io.StringIO())
+            with open(output) as fh:
+                results = json.load(fh)
+        self.assertEqual(set(results['scenarios']), {name for name, (_, transports) in SCENARIOS.items() if 'client' in transports})
+        for name, summary in results['scenarios'].items():
+            self.assertEqual(summary['errors'], 0, name)
+        # The checkout scenario adds a sale per call
+        self.assertEqual(results['meta']['dataset']['sales'], 40 + results['scenarios']['checkout']['calls'])
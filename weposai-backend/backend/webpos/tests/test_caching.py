@@ -0,0 +1,46 @@
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+
+from .. import caching
+from ..models import Store
+from .base import API, TenantTestCase
+
+
+class ResponseCacheTests(TenantTestCase):
+    def get_stores(self):
+        response = self.client.get(f'{API}/stores/', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        return [store['name'] for store in response.json()]
+
+    def test_second_read_is_served_without_queries(self):
+        self.get_stores()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get_stores(), ['Main'])
+        self.assertFalse([q for q in queries.captured_queries if 'webpos_store' in q['sql']])
+
+    def test_saving_a_row_invalidates_its_tenant_only(self):
+        _, rival, rival_store = self.other_tenant()
+        self.assertEqual(self.get_stores(), ['Main'])
+        self.client.force_authenticate(rival)
+        self.assertEqual(self.get_stores(), ['Rival'])
+
+        Store.objects.create(tenant=self.tenant, name='Branch', location='Square')
+        self.client.force_authenticate(self.user)
+        self.assertEqual(sorted(self.get_stores()), ['Branch', 'Main'])
+        generation = caching.generation('stores', rival_store.tenant_id)
+        self.client.force_authenticate(rival)
+        self.assertEqual(self.get_stores(), ['Rival'])
+        self.assertEqual(caching.generation('stores', rival_store.tenant_id), generation)
+
+    def test_anonymous_reads_are_empty(self):
+        self.get_stores()
+        self.client.force_authenticate(None)
+        self.assertEqual(self.get_stores(), [])
+
+    def test_stats_count_hits_and_misses(self):
+        before = caching.stats().get('stores', {'hits': 0, 'misses': 0})
+        self.get_stores()
+        self.get_stores()
+        after = caching.stats()['stores']
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertEqual(after['hits'] - before['hits'], 1)
@@ -0,0 +1,102 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from ..models import Commission, CommissionRule, CommissionSettlement, CommissionTier, User
+from ..services import commissions
+from .base import API, TenantTestCase
+
+
+class CommissionTests(TenantTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.rule = CommissionRule.objects.create(
+            tenant=cls.tenant, name='Dairy 10%', rule_type='category_percent', category=cls.category, percent=Decimal('10'),
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+
+    def test_category_percent(self):
+        sale = self.make_sale([(self.product, 4)])
+        self.assertEqual(commissions.calculate_commissions(self.tenant, self.today, self.today), 1)
+        commission = Commission.objects.get()
+        self.assertEqual((commission.sale_id, commission.amount), (sale.pk, Decimal('1.00')))
+
+    def test_volume_tiers_pay_the_rate_reached(self):
+        rule = CommissionRule.objects.create(tenant=self.tenant, name='Volume', rule_type='volume_tier')
+        CommissionTier.objects.bulk_create([
+            CommissionTier(rule=rule, min_volume=Decimal('5'), percent=Decimal('2')),
+            CommissionTier(rule=rule, min_volume=Decimal('20'), percent=Decimal('5')),
+        ])
+        self.make_sale([(self.product, 4)])
+        commissions.calculate_commissions(self.tenant, self.today, self.today)
+        self.assertEqual(Commission.objects.get(rule=rule).amount, Decimal('0.20'))
+
+    def test_recalculation_replaces_unsettled_rows(self):
+        self.make_sale([(self.product, 4)])
+        commissions.calculate_commissions(self.tenant, self.today, self.today)
+        commissions.calculate_commissions(self.tenant, self.today, self.today)
+        self.assertEqual(Commission.objects.count(), 1)
+
+    def test_settle_endpoint(self):
+        self.make_sale([(self.product, 4)])
+        self.make_sale([(self.product, 8)])
+        response = self.client.post(f'{API}/commission-rules/calculate/', {
+            'start': self.today.isoformat(), 'end': self.today.isoformat(),
+        }, format='json')
+        self.assertEqual(response.json(), {'commissions': 2})
+
+        response = self.client.post(f'{API}/commission-settlements/settle/', {
+            'start': self.today.isoformat(), 'end': self.today.isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        settlement = CommissionSettlement.objects.get()
+        self.assertEqual(settlement.total, Decimal('3.00'))
+        self.assertFalse(Commission.objects.filter(settlement__isnull=True).exists())
+
+        again = self.client.post(f'{API}/commission-settlements/settle/', {
+            'start': self.today.isoformat(), 'end': self.today.isoformat(),
+        }, format='json')
+        self.assertEqual(again.status_code, 400)
+
+    def test_settlement_per_user_leaves_settled_rows_alone(self):
+        clerk = User.objects.create_user('clerk', password='secret', tenant=self.tenant, role='cashier')
+        self.make_sale([(self.product, 4)])
+        commissions.calculate_commissions(self.tenant, self.today, self.today)
+        first, = commissions.settle_period(self.tenant, self.today - timedelta(days=1), self.today)
+
+        self.make_sale([(self.product, 8)], user=clerk)
+        self.make_sale([(self.product, 12)])
+        commissions.calculate_commissions(self.tenant, self.today, self.today)
+        totals = {
+            settlement.user_id: settlement.total
+            for settlement in commissions.settle_period(self.tenant, self.today, self.today)
+        }
+        self.assertEqual(totals, {clerk.pk: Decimal('2.00'), self.user.pk: Decimal('3.00')})
+        self.assertEqual(first.commissions.get().amount, Decimal('1.00'))
+
+    def test_partial_update_keeps_the_rule_fields_it_does_not_send(self):
+        url = f'{API}/commission-rules/{self.rule.pk}/'
+        response = self.client.patch(url, {'name': 'Dairy 12%', 'percent': '12'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['category'], self.category.pk)
+        response = self.client.patch(url, {'category': None}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_rules_are_scoped_to_the_tenant(self):
+        _, rival, _ = self.other_tenant()
+        self.client.force_authenticate(rival)
+        self.assertEqual(self.client.get(f'{API}/commission-rules/', HTTP_ACCEPT='application/json').json(), [])
+
+    def test_recalculation_leaves_settled_rows_of_deactivated_rules_alone(self):
+        self.make_sale([(self.product, 4)])
+        commissions.calculate_commissions(self.tenant, self.today, self.today)
+        commissions.settle_period(self.tenant, self.today, self.today)
+
+        CommissionRule.objects.filter(pk=self.rule.pk).update(is_active=False)
+        self.assertEqual(commissions.calculate_commissions(self.tenant, self.today, self.today), 0)
+        self.assertEqual(list(Commission.objects.values_list('amount', flat=True)), [Decimal('1.00')])
@@ -0,0 +1,60 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from ..models import DemandClass, DemandForecast, Inventory, InventoryTransaction, OrderItem, Sale
+from ..services import forecasting, returns, sales, stock
+from .base import API, TenantTestCase
+
+
+class ForecastTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        self.slow = self.make_product('JAM-1', price='3.00')
+        self.slow_inventory = Inventory.objects.create(tenant=self.tenant, product=self.slow, store=self.store)
+        stock.add_stock({self.inventory.pk: 100, self.slow_inventory.pk: 100})
+        # Two units of milk on each of the last 14 days; jam once, on one of them
+        for days_ago in range(1, 15):
+            lines = [{'product': self.product, 'quantity': 2}]
+            if days_ago == 3:
+                lines.append({'product': self.slow, 'quantity': 1})
+            self.sell(lines, days_ago)
+
+    def sell(self, lines, days_ago):
+        """Check out through the sale service, then move the sale and its ledger rows back in time."""
+        sale = sales.create_sale(self.tenant, self.store, lines, user=self.user)
+        when = datetime.combine(self.today - timedelta(days=days_ago), time(12), timezone.get_current_timezone())
+        Sale.objects.filter(pk=sale.pk).update(date=when)
+        InventoryTransaction.objects.filter(notes=f"Sale #{sale.pk}").update(timestamp=when)
+        return sale
+
+    def test_series_come_from_checkout_sales(self):
+        result = forecasting.forecast_tenant(self.tenant.pk, history_days=14, horizon=7, today=self.today)
+        self.assertEqual(result, {'classes': 2, 'forecasts': 14})
+
+        milk = DemandClass.objects.get(product=self.product)
+        self.assertEqual((milk.abc, milk.xyz), ('A', 'X'))
+        self.assertAlmostEqual(milk.mean_daily_units, 2.0)
+        self.assertEqual(str(milk.revenue), '70.00')
+        jam = DemandClass.objects.get(product=self.slow)
+        self.assertEqual((jam.abc, jam.xyz), ('C', 'Z'))
+        forecast = DemandForecast.objects.filter(product=self.product).order_by('day')
+        self.assertEqual([row.day for row in forecast], [self.today + timedelta(days=h) for h in range(7)])
+        self.assertAlmostEqual(forecast[0].units, 2.0, places=3)
+
+    def test_returns_are_netted_out(self):
+        item = OrderItem.objects.filter(product=self.product).order_by('-sale__date').first()
+        returns.process_return(item.sale, {item.pk: 2}, 'Sour', user=self.user)
+        InventoryTransaction.objects.filter(transaction_type='return').update(timestamp=item.sale.date)
+
+        forecasting.forecast_tenant(self.tenant.pk, history_days=14, horizon=7, today=self.today)
+        self.assertAlmostEqual(DemandClass.objects.get(product=self.product).mean_daily_units, 26 / 14)
+
+    def test_endpoints_list_the_results(self):
+        forecasting.forecast_tenant(self.tenant.pk, history_days=14, horizon=7, today=self.today)
+        response = self.client.get(f'{API}/demand-classes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+        response = self.client.get(f'{API}/demand-forecasts/')
+        self.assertEqual(len(response.json()), 14)
@@ -0,0 +1,120 @@
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.test import override_settings
+from django.utils import timezone
+
+from ..models import Job
+from ..services import jobs
+from .base import API, TenantTestCase
+
+CALLS = []
+
+
+def record(value):
+    CALLS.append(value)
+    return {'value': value}
+
+
+def explode():
+    raise RuntimeError('boom')
+
+
+def nap(seconds):
+    time.sleep(seconds)
+
+
+jobs.register('tests.record', record)
+jobs.register('tests.nap', nap)
+jobs.register('tests.explode', explode)
+
+
+class JobQueueTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        CALLS.clear()
+
+    def test_higher_priority_runs_first(self):
+        jobs.enqueue('tests.record', {'value': 'low'}, tenant=self.tenant)
+        jobs.enqueue('tests.record', {'value': 'high'}, tenant=self.tenant, priority=5)
+        self.assertEqual(jobs.work(once=True), 2)
+        self.assertEqual(CALLS, ['high', 'low'])
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {'succeeded'})
+
+    def test_future_jobs_wait(self):
+        jobs.enqueue('tests.record', {'value': 1}, run_after=timezone.now() + timedelta(hours=1))
+        self.assertIsNone(jobs.claim('worker'))
+
+    def test_failures_are_retried_with_backoff_then_fail(self):
+        job = jobs.enqueue('tests.explode', max_attempts=2)
+        with self.assertLogs('webpos.services.jobs', 'WARNING'):
+            self.assertFalse(jobs.run(jobs.claim('worker')))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertGreater(job.run_after, timezone.now())
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        with self.assertLogs('webpos.services.jobs', 'WARNING'):
+            jobs.run(jobs.claim('worker'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('RuntimeError: boom', job.last_error)
+
+    @override_settings(JOB_TENANT_CONCURRENCY=1)
+    def test_a_busy_tenant_does_not_block_others(self):
+        other, _, _ = self.other_tenant()
+        jobs.enqueue('tests.record', {'value': 'a'}, tenant=self.tenant)
+        jobs.enqueue('tests.record', {'value': 'b'}, tenant=self.tenant)
+        jobs.enqueue('tests.record', {'value': 'c'}, tenant=other)
+        first = jobs.claim('w1')
+        second = jobs.claim('w2')
+        self.assertEqual(first.tenant_id, self.tenant.pk)
+        self.assertEqual(second.tenant_id, other.pk)
+        self.assertIsNone(jobs.claim('w3'))
+
+    @override_settings(JOB_TENANT_CONCURRENCY=1)
+    def test_a_tenant_backlog_larger_than_the_window_does_not_starve_others(self):
+        other, _, _ = self.other_tenant()
+        for value in range(jobs.CLAIM_WINDOW + 5):
+            jobs.enqueue('tests.record', {'value': value}, tenant=self.tenant, priority=5)
+        jobs.enqueue('tests.record', {'value': 'other'}, tenant=other)
+        self.assertEqual(jobs.claim('w1').tenant_id, self.tenant.pk)
+        self.assertEqual(jobs.claim('w2').tenant_id, other.pk)
+
+    def test_stale_jobs_are_requeued(self):
+        jobs.enqueue('tests.record', {'value': 1})
+        job = jobs.claim('gone')
+        self.assertEqual(jobs.requeue_stale(now=timezone.now() + timedelta(hours=1)), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+
+    def test_retry_and_cancel_endpoints(self):
+        job = jobs.enqueue('tests.record', {'value': 1}, tenant=self.tenant)
+        response = self.client.post(f'{API}/jobs/{job.pk}/cancel/')
+        self.assertEqual(response.json()['status'], 'cancelled')
+        self.assertEqual(self.client.post(f'{API}/jobs/{job.pk}/cancel/').status_code, 400)
+        self.assertEqual(self.client.post(f'{API}/jobs/{job.pk}/retry/').json()['status'], 'queued')
+
+    def test_heartbeat_keeps_a_long_job_from_being_requeued(self):
+        jobs.enqueue('tests.record', {'value': 1})
+        job = jobs.claim('busy')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertTrue(jobs.heartbeat(job))
+        self.assertEqual(jobs.requeue_stale(), 0)
+
+    @override_settings(JOB_HEARTBEAT_SECONDS=0.01)
+    def test_running_jobs_heartbeat(self):
+        jobs.enqueue('tests.nap', {'seconds': 0.2})
+        with mock.patch.object(jobs, 'heartbeat', return_value=True) as beat:
+            self.assertTrue(jobs.run(jobs.claim('busy')))
+        self.assertGreater(beat.call_count, 1)
+
+    def test_a_requeued_job_keeps_the_new_runs_outcome(self):
+        job = jobs.enqueue('tests.record', {'value': 1})
+        first = jobs.claim('slow')
+        Job.objects.filter(pk=job.pk).update(status='running', locked_by='fast', finished_at=None)
+        with self.assertLogs('webpos.services.jobs', 'WARNING'):
+            self.assertTrue(jobs.run(first))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), ('running', 'fast'))
@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from ..models import Inventory, InventorySnapshot, InventoryTransaction
+from ..services import ledger, stock
+from .base import API, TenantTestCase
+
+
+class PointInTimeStockTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        stock.add_stock({self.inventory.pk: 10})
+        stock.consume_fefo({self.inventory.pk: 3})
+        now = timezone.now()
+        # Backdate the ledger: ten units two days ago, three sold yesterday
+        restock, sale = InventoryTransaction.objects.order_by('pk')
+        InventoryTransaction.objects.filter(pk=restock.pk).update(timestamp=now - timedelta(days=2))
+        InventoryTransaction.objects.filter(pk=sale.pk).update(timestamp=now - timedelta(days=1))
+        self.now = now
+
+    def test_stock_at_replays_the_ledger(self):
+        self.assertEqual(ledger.stock_at([self.inventory.pk], self.now - timedelta(days=3)), {self.inventory.pk: 0})
+        self.assertEqual(ledger.stock_at([self.inventory.pk], self.now - timedelta(hours=36)), {self.inventory.pk: 10})
+        self.assertEqual(ledger.stock_at([self.inventory.pk], self.now), {self.inventory.pk: 7})
+
+    def test_snapshots_checkpoint_the_balance(self):
+        day = timezone.localdate() - timedelta(days=1)
+        self.assertEqual(ledger.take_snapshots(day, tenant=self.tenant), 1)
+        snapshot = InventorySnapshot.objects.get()
+        self.assertEqual(snapshot.as_of, ledger.closing_instant(day))
+        # A later lookup starts from the snapshot and agrees with the full replay
+        self.assertEqual(ledger.stock_at([self.inventory.pk], self.now + timedelta(days=1)), {self.inventory.pk: 7})
+        self.assertEqual(list(ledger.ledger_drift(self.tenant)), [])
+
+    def test_stock_at_endpoint(self):
+        response = self.client.get(f'{API}/inventories/stock-at/', {'at': self.now.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [
+            {'id': self.inventory.pk, 'product': self.product.pk, 'store': self.store.pk, 'stock_at': 7},
+        ])
+
+    def test_stock_at_endpoint_shows_only_the_callers_tenant(self):
+        rival, rival_admin, rival_store = self.other_tenant()
+        product = self.make_product('X-1', tenant=rival, store=rival_store)
+        Inventory.objects.create(tenant=rival, product=product, store=rival_store)
+        self.client.force_authenticate(rival_admin)
+        response = self.client.get(f'{API}/inventories/stock-at/', {'at': self.now.isoformat(), 'product': self.product.pk})
+        self.assertEqual(response.json(), [])
+        response = self.client.get(f'{API}/inventories/stock-at/', {'at': self.now.isoformat()})
+        self.assertEqual([row['product'] for row in response.json()], [product.pk])
+
+    def test_stock_at_endpoint_requires_sign_in(self):
+        self.client.force_authenticate(None)
+        response = self.client.get(f'{API}/inventories/stock-at/', {'at': self.now.isoformat()})
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,65 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from ..models import Customer, LoyaltyEntry, LoyaltyRule, Payment
+from ..services import loyalty
+from .base import API, TenantTestCase
+
+
+class LoyaltyTests(TenantTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        LoyaltyRule.objects.create(tenant=cls.tenant, name='1 per unit', points_per_unit=Decimal('1'), expiry_days=30)
+        cls.customer = Customer.objects.create(tenant=cls.tenant, name='Ada')
+
+    def pay(self, sale):
+        Payment.objects.create(tenant=self.tenant, sale=sale, method='cash', amount=sale.total_amount)
+
+    def test_paid_sale_accrues_once(self):
+        sale = self.make_sale([(self.product, 8)], customer=self.customer)
+        self.pay(sale)
+        self.assertIsNone(loyalty.accrue_for_sale(sale))
+        self.assertEqual(loyalty.balance(self.customer.pk), 20)
+
+    def test_redeem_draws_down_the_soonest_expiring_lot(self):
+        first = self.make_sale([(self.product, 4)], customer=self.customer)
+        second = self.make_sale([(self.product, 4)], customer=self.customer)
+        self.pay(first)
+        self.pay(second)
+        LoyaltyEntry.objects.filter(sale=second).update(expires_at=timezone.now() + timedelta(days=1))
+
+        response = self.client.post(f'{API}/customers/{self.customer.pk}/redeem-points/', {'points': 12}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        remaining = dict(LoyaltyEntry.objects.filter(entry_type='accrual').values_list('sale_id', 'remaining'))
+        self.assertEqual(remaining, {first.pk: 8, second.pk: 0})
+        self.assertEqual(self.client.get(f'{API}/customers/{self.customer.pk}/loyalty/').json()['balance'], 8)
+
+    def test_cannot_redeem_more_than_the_balance(self):
+        response = self.client.post(f'{API}/customers/{self.customer.pk}/redeem-points/', {'points': 1}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_expiry_sweep(self):
+        sale = self.make_sale([(self.product, 4)], customer=self.customer)
+        self.pay(sale)
+        self.assertEqual(loyalty.expire_points(now=timezone.now() + timedelta(days=31)), 10)
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.loyalty_balance, 0)
+        self.assertEqual(LoyaltyEntry.objects.filter(entry_type='expiry').get().points, -10)
+
+    def test_other_tenants_customers_and_sales_are_not_found(self):
+        rival, rival_admin, rival_store = self.other_tenant()
+        theirs = self.make_sale([(self.make_product('X-1', tenant=rival, store=rival_store), 1)], user=rival_admin, store=rival_store, tenant=rival)
+        self.pay(self.make_sale([(self.product, 4)], customer=self.customer))
+        response = self.client.post(
+            f'{API}/customers/{self.customer.pk}/redeem-points/', {'points': 1, 'sale': theirs.pk}, format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('sale', response.json())
+
+        self.client.force_authenticate(rival_admin)
+        self.assertEqual(self.client.get(f'{API}/customers/{self.customer.pk}/loyalty/').status_code, 404)
+        response = self.client.post(f'{API}/customers/{self.customer.pk}/redeem-points/', {'points': 1}, format='json')
+        self.assertEqual(response.status_code, 404)
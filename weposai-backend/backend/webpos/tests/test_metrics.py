@@ -0,0 +1,17 @@
+from django.test import override_settings
+
+from .. import metrics
+from .base import API, TenantTestCase
+
+
+@override_settings(PERF_SAMPLE_RATE=1.0)
+class MetricsTests(TenantTestCase):
+    def test_sampled_requests_are_exported(self):
+        self.client.get(f'{API}/stores/')
+        body = metrics.render()
+        self.assertIn('webpos_requests_total{view="StoreViewSet.list",method="GET",status="200"}', body)
+        self.assertIn('webpos_request_queries_bucket{view="StoreViewSet.list",method="GET",le="+Inf"}', body)
+
+    def test_metrics_endpoint_is_limited_to_allowed_addresses(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.9').status_code, 403)
@@ -0,0 +1,125 @@
+import json
+import socket
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.utils import timezone
+
+from ..models import OutboxEvent, Payment, User, WebhookDelivery, WebhookEndpoint
+from ..services import outbox
+from .base import API, TenantTestCase
+
+
+class OutboxTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.endpoint = WebhookEndpoint.objects.create(
+            tenant=self.tenant, url='https://hooks.example.com/pos', secret='s3cret', events=['sale.created'],
+        )
+        self.posted = []
+        self.status = 200
+
+        async def receive(method, url, body, headers, timeout):
+            self.posted.append((url, body, headers))
+            return self.status, None
+
+        patcher = mock.patch.object(outbox, 'http_json', receive)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_saved_rows_record_events(self):
+        sale = self.make_sale([(self.product, 2)])
+        Payment.objects.create(tenant=self.tenant, sale=sale, method='cash', amount=Decimal('5.00'))
+        self.assertEqual(
+            sorted(OutboxEvent.objects.values_list('event_type', flat=True)),
+            ['payment.created', 'sale.created'],
+        )
+
+    def test_subscribed_events_are_delivered_signed(self):
+        sale = self.make_sale([(self.product, 1)])
+        self.assertEqual(outbox.dispatch(), {'events': 1, 'batches': 1, 'delivered': 1})
+
+        url, body, headers = self.posted[0]
+        self.assertEqual(url, self.endpoint.url)
+        self.assertEqual([event['data']['id'] for event in json.loads(body)['events']], [sale.pk])
+        timestamp, signature = (part.split('=', 1)[1] for part in headers['X-Webpos-Signature'].split(','))
+        self.assertEqual(signature, outbox.sign('s3cret', timestamp, body))
+        self.assertEqual(WebhookDelivery.objects.get().status, 'delivered')
+
+    def test_failed_batches_back_off_then_fail(self):
+        self.make_sale([(self.product, 1)])
+        self.status = 500
+        with self.assertLogs('webpos.services.outbox', 'WARNING'), self.settings(WEBHOOK_MAX_ATTEMPTS=2):
+            outbox.dispatch()
+            delivery = WebhookDelivery.objects.get()
+            self.assertEqual((delivery.status, delivery.attempts, delivery.last_error), ('pending', 1, 'HTTP 500'))
+            self.assertEqual(outbox.dispatch()['batches'], 0)
+            outbox.dispatch(now=delivery.next_attempt_at + timedelta(seconds=1))
+        self.assertEqual(WebhookDelivery.objects.get().status, 'failed')
+
+    def test_claim_keeps_within_the_endpoint_concurrency(self):
+        self.endpoint.batch_size = 1
+        self.endpoint.max_concurrency = 2
+        self.endpoint.save()
+        for _ in range(3):
+            self.make_sale([(self.product, 1)])
+        outbox.expand()
+        self.assertEqual(len(outbox.claim()), 2)
+        self.assertEqual(outbox.claim(), [])
+
+    def test_replay_queues_delivered_events_again(self):
+        self.make_sale([(self.product, 1)])
+        outbox.dispatch()
+        response = self.client.post(
+            f'{API}/webhook-endpoints/{self.endpoint.pk}/replay/',
+            {'since': (timezone.now() - timedelta(hours=1)).isoformat()}, format='json',
+        )
+        self.assertEqual(response.json(), {'queued': 1})
+        self.assertEqual(outbox.dispatch()['delivered'], 1)
+        self.assertEqual(len(self.posted), 2)
+
+
+class EndpointTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        addresses = {'hooks.example.com': '93.184.216.34', 'intranet.example.com': '10.0.0.7'}
+
+        def resolve(host, port, *args, **kwargs):
+            address = addresses.get(host, host)
+            return [(socket.AF_INET6 if ':' in address else socket.AF_INET, socket.SOCK_STREAM, 6, '', (address, port))]
+
+        patcher = mock.patch.object(socket, 'getaddrinfo', resolve)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create(self, url):
+        return self.client.post(f'{API}/webhook-endpoints/', {'url': url, 'events': ['sale.created']}, format='json')
+
+    def test_public_https_endpoint_is_created_with_a_secret(self):
+        response = self.create('https://hooks.example.com/pos')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(len(response.json()['secret']), 64)
+
+    def test_plain_http_and_internal_addresses_are_rejected(self):
+        for url in (
+            'http://hooks.example.com/pos',
+            'https://intranet.example.com/pos',
+            'https://127.0.0.1/pos',
+            'https://169.254.169.254/latest/meta-data',
+            'https://[::ffff:192.168.1.1]/pos',
+            'https://[fe80::1]/pos',
+        ):
+            with self.subTest(url=url):
+                response = self.create(url)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('url', response.json())
+        self.assertFalse(WebhookEndpoint.objects.exists())
+
+    def test_only_tenant_admins_manage_endpoints(self):
+        cashier = User.objects.create_user('till', password='secret', tenant=self.tenant, role='cashier')
+        self.client.force_authenticate(cashier)
+        self.assertEqual(self.client.get(f'{API}/webhook-endpoints/').status_code, 403)
+        self.assertEqual(self.create('https://hooks.example.com/pos').status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(f'{API}/webhook-endpoints/').status_code, 401)
@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from ..models import PinAllocation, PinCode, VirtualProduct
+from ..services import pins
+from .base import API, TenantTestCase
+
+
+class PinTests(TenantTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        product = cls.make_product('AIR-10', price='10.00', is_virtual=True)
+        cls.virtual = VirtualProduct.objects.create(product=product, virtual_type='airtime', provider_name='mock')
+
+    def import_codes(self, codes, **extra):
+        return self.client.post(f'{API}/pins/import/', {
+            'virtual_product': self.virtual.pk,
+            'codes': [{'serial': f'S{i}', 'code': code} for i, code in enumerate(codes)],
+            **extra,
+        }, format='json')
+
+    def test_codes_are_stored_encrypted_and_deduplicated(self):
+        self.assertEqual(self.import_codes(['1111', '2222']).json(), {'imported': 2})
+        self.assertEqual(self.import_codes(['2222', '3333']).json(), {'imported': 1})
+        pin = PinCode.objects.get(serial='S0', code_digest=pins.digest('1111'))
+        self.assertNotIn('1111', pin.encrypted_code)
+        self.assertEqual(pins.reveal(pin), '1111')
+
+    def test_allocate_hands_out_the_soonest_expiring_codes_once(self):
+        self.import_codes(['late'], expires_at=(timezone.now() + timedelta(days=30)).isoformat())
+        self.import_codes(['soon'], expires_at=(timezone.now() + timedelta(days=1)).isoformat())
+
+        response = self.client.post(f'{API}/pins/allocate/', {'virtual_product': self.virtual.pk}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([pin['code'] for pin in response.json()['pins']], ['soon'])
+        self.assertEqual(PinCode.objects.get(code_digest=pins.digest('soon')).status, 'exhausted')
+        self.assertEqual(PinAllocation.objects.count(), 1)
+
+        response = self.client.post(f'{API}/pins/allocate/', {'virtual_product': self.virtual.pk, 'quantity': 2}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_stock_counts_available_unexpired_codes(self):
+        self.import_codes(['a', 'b'])
+        self.import_codes(['c'], expires_at=(timezone.now() - timedelta(days=1)).isoformat())
+        self.assertEqual(self.client.get(f'{API}/pins/stock/').json(), {str(self.virtual.pk): 2})
+        self.assertEqual(pins.expire_pins(), 1)
+
+    def test_other_tenants_products_are_not_found(self):
+        _, rival, _ = self.other_tenant()
+        self.client.force_authenticate(rival)
+        self.assertEqual(self.import_codes(['x']).status_code, 404)
+
+    def test_allocation_only_attaches_the_callers_sales(self):
+        self.import_codes(['1111'])
+        rival, rival_admin, rival_store = self.other_tenant()
+        theirs = self.make_sale([(self.make_product('X-1', tenant=rival, store=rival_store), 1)],
+                                user=rival_admin, store=rival_store, tenant=rival)
+        allocate = {'virtual_product': self.virtual.pk, 'sale': theirs.pk}
+        response = self.client.post(f'{API}/pins/allocate/', allocate, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('sale', response.json())
+
+        ours = self.make_sale([(self.virtual.product, 1)])
+        response = self.client.post(f'{API}/pins/allocate/', {**allocate, 'sale': ours.pk}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(PinAllocation.objects.get().sale_id, ours.pk)
@@ -0,0 +1,74 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from ..models import Job, PriceHistory, Product, Promotion
+from .base import API, TenantTestCase
+
+
+class PriceChangeTests(TenantTestCase):
+    def create_change(self, **data):
+        response = self.client.post(f'{API}/price-changes/', {'name': 'Dairy up', **data}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def test_change_is_scheduled_with_its_rollback(self):
+        rollback_at = timezone.now() + timedelta(days=7)
+        change = self.create_change(operation='percent', value='10', category=self.category.pk, rollback_at=rollback_at.isoformat())
+        self.assertEqual(change['status'], 'scheduled')
+        self.assertEqual(
+            sorted(Job.objects.values_list('task', flat=True)), ['pricing.apply', 'pricing.rollback'],
+        )
+
+    def test_apply_and_rollback_restore_untouched_products(self):
+        other = self.make_product('CHEESE-1', price='4.00')
+        change = self.create_change(operation='percent', value='10', category=self.category.pk)
+        response = self.client.post(f'{API}/price-changes/{change["id"]}/apply/')
+        self.assertEqual(response.json()['products_changed'], 2)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).price, Decimal('2.75'))
+
+        other.refresh_from_db()
+        other.price = Decimal('5.00')
+        other.save()
+        response = self.client.post(f'{API}/price-changes/{change["id"]}/rollback/')
+        self.assertEqual(response.json()['products_restored'], 1)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).price, Decimal('2.50'))
+        self.assertEqual(Product.objects.get(pk=other.pk).price, Decimal('5.00'))
+
+    def test_promotions_follow_the_change(self):
+        promotion = Promotion.objects.create(
+            tenant=self.tenant, code='SUMMER', discount_percent=5,
+            start_date=timezone.localdate(), end_date=timezone.localdate() + timedelta(days=30), active=False,
+        )
+        change = self.create_change(promotions=[promotion.pk])
+        self.client.post(f'{API}/price-changes/{change["id"]}/apply/')
+        promotion.refresh_from_db()
+        self.assertTrue(promotion.active)
+
+    def test_scope_is_required_and_tenant_checked(self):
+        response = self.client.post(f'{API}/price-changes/', {'name': 'All', 'operation': 'percent', 'value': '5'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        _, _, rival_store = self.other_tenant()
+        response = self.client.post(
+            f'{API}/price-changes/', {'name': 'Theirs', 'operation': 'percent', 'value': '5', 'store': rival_store.pk}, format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class PriceHistoryTests(TenantTestCase):
+    def test_edits_are_recorded_and_read_back_at_an_instant(self):
+        self.assertEqual(PriceHistory.objects.get(product=self.product).source, 'created')
+        before = timezone.now()
+        product = Product.objects.get(pk=self.product.pk)
+        product.price = Decimal('3.00')
+        product.save()
+        product.name = 'Whole milk'
+        product.save()
+        self.assertEqual(PriceHistory.objects.filter(product=product).count(), 2)
+
+        response = self.client.get(f'{API}/price-history/at/', {'products': [product.pk], 'at': before.isoformat()})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['prices'][0]['price'], '2.50')
+        response = self.client.get(f'{API}/price-history/at/', {'products': [product.pk]})
+        self.assertEqual(response.json()['prices'][0]['price'], '3.00')
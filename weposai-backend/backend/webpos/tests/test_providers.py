@@ -0,0 +1,91 @@
+import time
+
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ..benchmarks.mock_provider import MockProvider
+from ..models import TopUp, VirtualProduct
+from .base import API, TenantTestCase
+
+
+class ProviderTests(TenantTestCase):
+    """Top-ups against ``MockProvider`` on a local port, through the async endpoints."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        product = cls.make_product('AIR-5', price='5.00', is_virtual=True)
+        cls.virtual = VirtualProduct.objects.create(
+            product=product, virtual_type='airtime', provider_name='mock', denomination='5.00',
+        )
+
+    def setUp(self):
+        super().setUp()
+        # The async views authenticate with the API's JWT classes, not the test client's shortcut
+        self.client.force_authenticate(None)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    def serve(self, concurrency=10, timeout=5, **options):
+        provider = MockProvider(latency=0.01, **options).__enter__()
+        self.addCleanup(provider.__exit__, None, None, None)
+        settings = override_settings(VIRTUAL_PRODUCT_PROVIDERS={
+            'mock': {'url': provider.url, 'concurrency': concurrency, 'timeout': timeout},
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+        return provider
+
+    def top_up(self, **data):
+        return self.client.post(f'{API}/async/top-ups/', {'virtual_product': self.virtual.pk, 'recipient': '0700000001', **data},
+                                format='json', **self.auth)
+
+    def test_accepted_top_up_succeeds(self):
+        self.serve()
+        response = self.top_up()
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['status'], 'succeeded')
+        self.assertEqual(response.json()['provider_reference'], 'MOCK-00000001')
+        self.assertEqual(response.json()['amount'], '5.00')
+
+    def test_declined_top_up_fails(self):
+        self.serve(failure_rate=1.0)
+        response = self.top_up()
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(TopUp.objects.get().error, 'Provider declined the top-up')
+
+    def test_timed_out_top_up_stays_pending_and_settles_on_retry(self):
+        provider = self.serve(timeout=0.05)
+        provider.latency = 0.5
+        first = self.top_up(reference='till-1-0001').json()
+        self.assertEqual(first['status'], 'pending')
+        self.assertIn('TimeoutError', first['error'])
+
+        provider.latency = 0.01
+        retried = self.top_up(reference='till-1-0001').json()
+        self.assertEqual((retried['id'], retried['status']), (first['id'], 'succeeded'))
+        self.assertEqual(len(provider.accepted), 1)
+        # Let the abandoned first call finish before the server stops
+        while provider.in_flight:
+            time.sleep(0.05)
+
+    def test_batch_stays_within_the_provider_limit(self):
+        provider = self.serve(concurrency=2)
+        provider.latency = 0.05
+        response = self.client.post(f'{API}/async/top-ups/batch/', {
+            'top_ups': [{'virtual_product': self.virtual.pk, 'recipient': f'07000000{i:02d}'} for i in range(6)],
+        }, format='json', **self.auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual({row['status'] for row in response.json()}, {'succeeded'})
+        self.assertEqual(provider.requests, 6)
+        self.assertLessEqual(provider.max_in_flight, 2)
+
+    def test_unconfigured_provider_and_foreign_products_are_rejected(self):
+        self.assertEqual(self.top_up().status_code, 400)
+        _, rival, _ = self.other_tenant()
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(rival)}'}
+        self.serve()
+        self.assertEqual(self.top_up().status_code, 404)
+
+    def test_requires_authentication(self):
+        self.auth = {}
+        self.assertEqual(self.top_up().status_code, 401)
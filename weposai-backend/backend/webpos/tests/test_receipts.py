@@ -0,0 +1,63 @@
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.core.files.storage import FileSystemStorage
+
+from ..models import Job, Payment, Receipt
+from ..services import jobs, receipts
+from .base import API, TenantTestCase
+
+
+class ReceiptTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        field = Receipt._meta.get_field('pdf_file')
+        patcher = mock.patch.object(field, 'storage', FileSystemStorage(location=root))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.sale = self.make_sale([(self.product, 4)])
+        Payment.objects.create(tenant=self.tenant, sale=self.sale, method='cash', amount=Decimal('20.00'))
+
+    def test_paying_in_full_issues_the_receipt_and_queues_its_pdf(self):
+        receipt = Receipt.objects.get(sale=self.sale)
+        self.assertEqual(receipt.pdf_status, 'pending')
+        job = Job.objects.get(task='receipts.build_pdf')
+        self.assertEqual(job.payload, {'receipt_id': receipt.pk})
+
+    def test_text_receipt(self):
+        text = receipts.render(self.sale)
+        self.assertIn('Corner Shop', text)
+        self.assertIn('Milk-1', text)
+        self.assertIn('10.00', text)
+        self.assertIn('Change', text)
+
+    def test_reading_a_sale_receipt_writes_nothing(self):
+        unpaid = self.make_sale([(self.product, 1)])
+        response = self.client.get(f'{API}/sales/{unpaid.pk}/receipt/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Receipt.objects.filter(sale=unpaid).exists())
+
+    def test_lines_of_deleted_products_still_render(self):
+        self.product.delete()
+        self.assertIn('Item no longer listed', receipts.render(self.sale))
+
+    def test_pdf_is_built_by_the_worker_and_served(self):
+        receipt = Receipt.objects.get(sale=self.sale)
+        self.assertEqual(self.client.get(f'{API}/receipts/{receipt.pk}/pdf/').status_code, 202)
+
+        self.assertEqual(jobs.work(once=True), 1)
+        receipt.refresh_from_db()
+        self.assertEqual(receipt.pdf_status, 'ready')
+        response = self.client.get(f'{API}/receipts/{receipt.pk}/pdf/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF-1.4'))
+
+    def test_receipts_are_scoped_to_the_tenant(self):
+        _, rival, _ = self.other_tenant()
+        self.client.force_authenticate(rival)
+        receipt = Receipt.objects.get(sale=self.sale)
+        self.assertEqual(self.client.get(f'{API}/receipts/{receipt.pk}/text/').status_code, 404)
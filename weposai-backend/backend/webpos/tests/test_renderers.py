@@ -0,0 +1,32 @@
+import gzip
+import json
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from ..renderers import ORJSONRenderer
+from .base import API, TenantTestCase
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    def test_matches_the_stdlib_renderer(self):
+        data = {'when': timezone.now(), 'amount': Decimal('1.50'), 'items': [1, 'two', None]}
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+
+
+class CompressionTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(40):
+            self.make_product(f'SKU-{i}')
+
+    def test_large_responses_are_compressed(self):
+        response = self.client.get(f'{API}/products/', HTTP_ACCEPT='application/json', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 41)
+
+    def test_small_responses_are_not(self):
+        response = self.client.get(f'{API}/stores/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertFalse(response.has_header('Content-Encoding'))
@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+from django.utils import timezone
+
+from ..models import Commission, CommissionRule, Customer, Inventory, LoyaltyRule, Payment, RefundItem, VirtualProduct
+from ..services import commissions, loyalty, returns
+from .base import API, TenantTestCase
+
+
+class ReturnTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sale = self.make_sale([(self.product, 4)])
+        self.item = self.sale.items.get()
+
+    def post_return(self, quantity, **extra):
+        return self.client.post(f'{API}/sales/{self.sale.pk}/return/', {
+            'lines': [{'order_item': self.item.pk, 'quantity': quantity}], 'reason': 'Sour', **extra,
+        }, format='json')
+
+    def test_return_restocks_and_pays_back(self):
+        response = self.post_return(3)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Decimal(response.json()['amount']), Decimal('7.50'))
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.refunded_quantity, 3)
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity, 3)
+        self.assertEqual(Payment.objects.get(sale=self.sale).amount, Decimal('-7.50'))
+
+    def test_cannot_return_more_than_was_sold(self):
+        self.assertEqual(self.post_return(3).status_code, 201)
+        self.assertEqual(self.post_return(2).status_code, 400)
+        self.assertEqual(RefundItem.objects.count(), 1)
+
+    def test_virtual_products_are_not_restocked(self):
+        airtime = self.make_product('AIR-5', price='5.00')
+        VirtualProduct.objects.create(product=airtime, virtual_type='airtime', denomination=Decimal('5.00'))
+        sale = self.make_sale([(airtime, 2)])
+        returns.process_return(sale, {sale.items.get().pk: 1}, 'Wrong number', user=self.user)
+        self.assertFalse(Inventory.objects.filter(product=airtime).exists())
+
+    def test_damaged_goods_stay_off_the_shelf(self):
+        self.post_return(1, restock=False)
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity, 0)
+
+    def test_commission_and_loyalty_are_clawed_back(self):
+        CommissionRule.objects.create(
+            tenant=self.tenant, name='All', rule_type='category_percent', category=self.category, percent=Decimal('10'),
+        )
+        today = timezone.localdate()
+        commissions.calculate_commissions(self.tenant, today, today)
+        LoyaltyRule.objects.create(tenant=self.tenant, name='Points', points_per_unit=Decimal('2'))
+        customer = Customer.objects.create(tenant=self.tenant, name='Ada')
+        self.sale.customer = customer
+        self.sale.save(update_fields=['customer'])
+        loyalty.accrue_for_sale(self.sale)
+
+        self.post_return(2)
+        self.assertEqual(sum(c.amount for c in Commission.objects.all()), Decimal('0.50'))
+        self.assertEqual(loyalty.balance(customer.pk), 10)
+
+    def test_other_tenants_cannot_return_the_sale(self):
+        rival, rival_admin, rival_store = self.other_tenant()
+        self.client.force_authenticate(rival_admin)
+        self.assertEqual(self.post_return(1).status_code, 404)
+
+        theirs = self.make_sale([(self.make_product('X-1', tenant=rival, store=rival_store), 2)],
+                                user=rival_admin, store=rival_store, tenant=rival)
+        response = self.client.post(f'{API}/sales/{theirs.pk}/return/', {
+            'lines': [{'order_item': self.item.pk, 'quantity': 1}], 'reason': 'Sour',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(RefundItem.objects.exists())
@@ -0,0 +1,54 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from ..models import Inventory, InventoryBatch, InventoryTransaction, Sale, Service
+from ..services import stock
+from .base import API, TenantTestCase
+
+
+class CheckoutTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        today = timezone.localdate()
+        stock.receive_batch(self.inventory, 3, expiry_date=today + timedelta(days=20), lot_number='LATE')
+        stock.receive_batch(self.inventory, 3, expiry_date=today + timedelta(days=2), lot_number='SOON')
+
+    def checkout(self, lines, **data):
+        return self.client.post(f'{API}/sales/', {'store': self.store.pk, 'lines': lines, **data}, format='json')
+
+    def test_sale_takes_stock_first_expired_first_out(self):
+        service = Service.objects.create(tenant=self.tenant, category=self.category, name='Delivery', price='4.00')
+        response = self.checkout([{'product': self.product.pk, 'quantity': 4}, {'service': service.pk, 'quantity': 1}])
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['total_amount'], '14.00')
+        self.assertEqual(len(response.json()['items']), 2)
+
+        self.assertEqual(dict(InventoryBatch.objects.values_list('lot_number', 'quantity')), {'SOON': 0, 'LATE': 2})
+        self.assertEqual(Inventory.objects.get(pk=self.inventory.pk).quantity, 2)
+        sold = InventoryTransaction.objects.get(transaction_type='sale')
+        self.assertEqual((sold.quantity, sold.notes), (-4, f"Sale #{response.json()['id']}"))
+
+    def test_discounted_price_is_charged(self):
+        self.product.is_discounted = True
+        self.product.discount_percent = Decimal('10')
+        self.product.save()
+        response = self.checkout([{'product': self.product.pk, 'quantity': 1}])
+        self.assertEqual(response.json()['items'][0]['price'], '2.25')
+
+    def test_short_stock_writes_nothing(self):
+        other = self.make_product('BUTTER-1')
+        response = self.checkout([{'product': self.product.pk, 'quantity': 7}])
+        self.assertEqual(response.status_code, 400)
+        response = self.checkout([{'product': other.pk, 'quantity': 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Sale.objects.exists())
+        self.assertFalse(InventoryTransaction.objects.filter(transaction_type='sale').exists())
+
+    def test_lines_must_belong_to_the_tenant(self):
+        rival, _, rival_store = self.other_tenant()
+        self.assertEqual(self.checkout([{'product': self.product.pk, 'quantity': 1}], store=rival_store.pk).status_code, 400)
+        theirs = self.make_product('X-1', tenant=rival, store=rival_store)
+        self.assertEqual(self.checkout([{'product': theirs.pk, 'quantity': 1}]).status_code, 400)
+        self.assertEqual(self.checkout([{'quantity': 1}]).status_code, 400)
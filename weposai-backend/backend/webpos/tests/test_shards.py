@@ -0,0 +1,18 @@
+from django.test import SimpleTestCase
+
+from ..models import PriceChange, Promotion
+from ..services import shards
+
+
+class CopyOrderTests(SimpleTestCase):
+    def test_many_to_many_tables_follow_both_sides(self):
+        order = shards.copy_order()
+        through = PriceChange.promotions.through
+        self.assertIn(through, order)
+        self.assertGreater(order.index(through), order.index(PriceChange))
+        self.assertGreater(order.index(through), order.index(Promotion))
+        self.assertEqual(shards.tenant_path(through), 'pricechange__tenant')
+
+    def test_user_groups_stay_with_the_directory(self):
+        self.assertFalse([model for model in shards.copy_order() if model._meta.label.startswith('auth.')])
+        self.assertFalse([model for model in shards.copy_order() if model._meta.model_name.startswith('user_')])
@@ -0,0 +1,63 @@
+from decimal import Decimal
+
+from django.utils import timezone
+
+from ..models import GiftCard, Payment, Shift
+from ..services import returns
+from .base import API, TenantTestCase
+
+
+class ShiftCounterTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.shift = Shift.objects.create(user=self.user, store=self.store, start_time=timezone.now())
+
+    def test_sales_payments_and_refunds_move_the_counters(self):
+        sale = self.make_sale([(self.product, 4)])
+        self.assertEqual(sale.shift_id, self.shift.pk)
+        Payment.objects.create(tenant=self.tenant, sale=sale, method='cash', amount=Decimal('10.00'), created_by=self.user)
+        item = sale.items.get()
+        returns.process_return(sale, {item.pk: 1}, 'Sour', user=self.user, restock=False)
+
+        report = self.client.get(f'{API}/shifts/{self.shift.pk}/z-report/', HTTP_ACCEPT='application/json').json()
+        self.assertEqual(report['sale_count'], 1)
+        self.assertEqual(Decimal(str(report['sales_amount'])), Decimal('10.00'))
+        self.assertEqual(report['refund_count'], 1)
+        self.assertEqual(Decimal(str(report['expected_cash'])), Decimal('7.50'))
+
+    def test_close_freezes_the_counters(self):
+        response = self.client.post(f'{API}/shifts/{self.shift.pk}/close/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['closed'])
+        self.assertEqual(self.client.post(f'{API}/shifts/{self.shift.pk}/close/').status_code, 400)
+
+        sale = self.make_sale([(self.product, 1)], shift=self.shift)
+        self.assertEqual(self.shift.totals.sale_count, 0)
+        self.assertEqual(sale.shift_id, self.shift.pk)
+
+    def test_gift_card_redemption_counts_on_the_cashiers_shift(self):
+        sale = self.make_sale([(self.product, 4)])
+        card = GiftCard.objects.create(
+            tenant=self.tenant, code='GC-1', initial_amount=Decimal('20.00'), current_balance=Decimal('20.00'),
+        )
+        response = self.client.post(f'{API}/gift-cards/{card.pk}/redeem/', {'amount': '6.00', 'sale': sale.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(response.json()['current_balance']), Decimal('14.00'))
+        self.shift.totals.refresh_from_db()
+        self.assertEqual(self.shift.totals.giftcard_total, Decimal('6.00'))
+
+        response = self.client.post(f'{API}/gift-cards/{card.pk}/redeem/', {'amount': '15.00', 'sale': sale.pk})
+        self.assertEqual(response.status_code, 400)
+        self.shift.totals.refresh_from_db()
+        self.assertEqual(self.shift.totals.giftcard_total, Decimal('6.00'))
+
+    def test_shifts_open_for_the_caller_at_their_own_stores(self):
+        _, rival, rival_store = self.other_tenant()
+        now = timezone.now().isoformat()
+        response = self.client.post(f'{API}/shifts/', {'user': rival.pk, 'store': rival_store.pk, 'start_time': now})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Shift.objects.filter(store=rival_store).exists())
+
+        response = self.client.post(f'{API}/shifts/', {'user': rival.pk, 'store': self.store.pk, 'start_time': now})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Shift.objects.get(pk=response.json()['id']).user_id, self.user.pk)
@@ -0,0 +1,115 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from ..models import Inventory, InventoryBatch, InventoryTransaction, OutboxEvent, PriceHistory
+from ..services import stock
+from .base import API, TenantTestCase
+
+
+class FefoTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        today = timezone.localdate()
+        self.late = stock.receive_batch(self.inventory, 5, expiry_date=today + timedelta(days=30), lot_number='L2')
+        self.early = stock.receive_batch(self.inventory, 4, expiry_date=today + timedelta(days=3), lot_number='L1')
+        self.undated = stock.receive_batch(self.inventory, 2, lot_number='L3')
+
+    def test_receive_batch_restocks_and_records_the_ledger_row(self):
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity, 11)
+        self.assertEqual(
+            list(self.inventory.transactions.values_list('transaction_type', 'quantity')),
+            [('restock', 5), ('restock', 4), ('restock', 2)],
+        )
+
+    def test_consume_takes_the_earliest_expiry_first(self):
+        entries = stock.consume_fefo({self.inventory.pk: 6}, user=self.user)
+
+        self.assertEqual([entry.quantity for entry in entries], [-6])
+        quantities = dict(InventoryBatch.objects.values_list('lot_number', 'quantity'))
+        self.assertEqual(quantities, {'L1': 0, 'L2': 3, 'L3': 2})
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity, 5)
+        self.assertTrue(OutboxEvent.objects.filter(event_type='inventory_transaction.created').exists())
+
+    def test_undated_lots_go_last(self):
+        stock.consume_fefo({self.inventory.pk: 10})
+        quantities = dict(InventoryBatch.objects.values_list('lot_number', 'quantity'))
+        self.assertEqual(quantities, {'L1': 0, 'L2': 0, 'L3': 1})
+
+    def test_insufficient_stock_changes_nothing(self):
+        with self.assertRaises(stock.InsufficientStock):
+            stock.consume_fefo({self.inventory.pk: 12})
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity, 11)
+        self.assertFalse(InventoryTransaction.objects.filter(transaction_type='sale').exists())
+
+    def test_expiring_endpoint_lists_lots_within_the_window(self):
+        response = self.client.get(f'{API}/inventory-batches/expiring/', {'days': 7})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['lot_number'] for row in response.json()], ['L1'])
+
+    def test_markdown_discounts_products_with_expiring_lots(self):
+        response = self.client.post(
+            f'{API}/inventory-batches/markdown/', {'days': 7, 'discount_percent': '30'}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'updated': 1})
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.is_discounted)
+        self.assertEqual(self.product.discount_percent, Decimal('30'))
+
+        markdown = PriceHistory.objects.get(product=self.product, source='markdown')
+        self.assertEqual((markdown.is_discounted, markdown.discount_percent), (True, Decimal('30')))
+        self.assertEqual((markdown.previous_is_discounted, markdown.previous_discount_percent), (False, Decimal('0')))
+        self.assertEqual(stock.mark_down_expiring(self.tenant, 7, Decimal('20')), 0)
+        self.assertEqual(PriceHistory.objects.filter(source='markdown').count(), 1)
+
+
+class AddStockTests(TenantTestCase):
+    def test_add_stock_writes_signed_ledger_rows(self):
+        stock.add_stock({self.inventory.pk: 3}, transaction_type='return')
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity, 3)
+        self.assertEqual(
+            list(InventoryTransaction.objects.values_list('transaction_type', 'quantity')), [('return', 3)],
+        )
+
+    def test_unknown_inventory_is_rejected(self):
+        with self.assertRaisesMessage(Exception, 'Unknown inventory ids'):
+            stock.add_stock({self.inventory.pk + 100: 1})
+        self.assertEqual(Inventory.objects.get(pk=self.inventory.pk).quantity, 0)
+
+    def test_receive_batches_books_lots_in_bulk(self):
+        soon = timezone.localdate() + timedelta(days=3)
+        # lock, one update, ledger, outbox and batch inserts, inside a savepoint
+        with self.assertNumQueries(7):
+            stock.receive_batches([(self.inventory.pk, 4, soon, 'A'), (self.inventory.pk, 2, None, 'B')])
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity, 6)
+        self.assertCountEqual(
+            InventoryBatch.objects.values_list('lot_number', 'expiry_date', 'quantity'), [('A', soon, 4), ('B', None, 2)],
+        )
+        self.assertEqual(list(InventoryTransaction.objects.values_list('transaction_type', 'quantity')), [('restock', 6)])
+
+
+class BatchEndpointTests(TenantTestCase):
+    def test_created_batches_are_received_into_stock(self):
+        response = self.client.post(f'{API}/inventory-batches/', {
+            'inventory': self.inventory.pk, 'quantity': 8, 'lot_number': 'L9', 'expiry_date': '2030-01-31',
+            'tenant': self.tenant.pk + 1,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['tenant'], self.tenant.pk)
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity, 8)
+        self.assertEqual(list(InventoryTransaction.objects.values_list('transaction_type', 'quantity')), [('restock', 8)])
+
+    def test_other_tenants_inventory_is_rejected(self):
+        rival, _, rival_store = self.other_tenant()
+        rival_inventory = Inventory.objects.create(tenant=rival, product=self.make_product('X-1', tenant=rival, store=rival_store), store=rival_store)
+        response = self.client.post(f'{API}/inventory-batches/', {'inventory': rival_inventory.pk, 'quantity': 1}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(InventoryBatch.objects.exists())
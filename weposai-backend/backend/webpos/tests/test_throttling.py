@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.test import override_settings
+
+from .. import throttling
+from ..models import TenantUsage
+from .base import API, TenantTestCase
+
+RATES = {
+    'tenant.read': '100/min', 'tenant.write': '100/min', 'tenant.bulk': '100/min',
+    'user.read': '3/min', 'user.write': '100/min', 'user.bulk': '1/min',
+    'till.read': '2/min', 'till.write': '100/min', 'till.bulk': '100/min',
+}
+
+
+class ThrottleTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = self.settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': RATES})
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+
+    def get(self, **headers):
+        return self.client.get(f'{API}/stores/', **headers)
+
+    def test_bucket_empties_and_reports_retry_after(self):
+        statuses = [self.get().status_code for _ in range(4)]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        self.assertIn('Retry-After', self.get())
+
+    def test_tills_have_their_own_buckets(self):
+        statuses = [self.get(HTTP_X_TILL_ID='till-1').status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    def test_bulk_actions_spend_the_bulk_budget(self):
+        url = f'{API}/valuation/run/'
+        self.assertNotEqual(self.client.post(url).status_code, 429)
+        self.assertEqual(self.client.post(url).status_code, 429)
+
+    @override_settings(SUBSCRIPTION_PLAN_LIMITS={'default': {'requests_per_day': 2}})
+    def test_daily_quota_and_usage_counters(self):
+        self.assertEqual([self.get().status_code for _ in range(3)], [200, 200, 429])
+        throttling.flush()
+        usage = TenantUsage.objects.get(tenant=self.tenant, budget='read')
+        self.assertEqual((usage.requests, usage.throttled), (2, 1))
@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from ..models import Inventory, InventoryBatch, StockTransfer, Store
+from ..services import stock, transfers
+from .base import API, TenantTestCase
+
+
+class StockTransferTests(TenantTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.branch = Store.objects.create(tenant=cls.tenant, name='Branch', location='Market Square')
+
+    def setUp(self):
+        super().setUp()
+        stock.receive_batch(self.inventory, 10, expiry_date=timezone.localdate() + timedelta(days=5), lot_number='A')
+
+    def create(self, quantity=4):
+        response = self.client.post(f'{API}/stock-transfers/', {
+            'source_store': self.store.pk,
+            'destination_store': self.branch.pk,
+            'lines': [{'product': self.product.pk, 'quantity': quantity}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['id']
+
+    def test_dispatch_and_receive_move_the_stock(self):
+        pk = self.create()
+        self.assertEqual(self.client.post(f'{API}/stock-transfers/{pk}/dispatch/').json()['status'], 'in_transit')
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity, 6)
+
+        self.assertEqual(self.client.post(f'{API}/stock-transfers/{pk}/receive/').json()['status'], 'received')
+        destination = Inventory.objects.get(store=self.branch, product=self.product)
+        self.assertEqual(destination.quantity, 4)
+        legs = StockTransfer.objects.get(pk=pk).ledger_entries.values_list('transaction_type', 'quantity')
+        self.assertCountEqual(legs, [('transfer_out', -4), ('transfer_in', 4)])
+        self.assertEqual({key: list(qs) for key, qs in transfers.find_orphaned_legs(self.tenant).items()},
+                         {'unpaired': [], 'incomplete': [], 'stale': []})
+
+    def test_batches_arrive_with_their_lots_and_expiry(self):
+        stock.add_stock({self.inventory.pk: 3})
+        pk = self.create(quantity=12)
+        self.client.post(f'{API}/stock-transfers/{pk}/dispatch/')
+        self.client.post(f'{API}/stock-transfers/{pk}/receive/')
+
+        destination = Inventory.objects.get(store=self.branch, product=self.product)
+        self.assertEqual(destination.quantity, 12)
+        batches = InventoryBatch.objects.filter(inventory=destination).values_list('lot_number', 'expiry_date', 'quantity')
+        self.assertEqual(list(batches), [('A', timezone.localdate() + timedelta(days=5), 10)])
+        legs = StockTransfer.objects.get(pk=pk).ledger_entries.filter(transaction_type='transfer_in')
+        self.assertCountEqual(legs.values_list('quantity', flat=True), [10, 2])
+        self.assertEqual(list(transfers.find_orphaned_legs(self.tenant)['incomplete']), [])
+
+    def test_receive_requires_dispatch(self):
+        pk = self.create()
+        response = self.client.post(f'{API}/stock-transfers/{pk}/receive/')
+        self.assertEqual(response.status_code, 400)
+
+    def test_dispatch_fails_without_enough_stock(self):
+        pk = self.create(quantity=11)
+        response = self.client.post(f'{API}/stock-transfers/{pk}/dispatch/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(StockTransfer.objects.get(pk=pk).status, 'draft')
+
+    def test_lines_need_a_quantity(self):
+        response = self.client.post(f'{API}/stock-transfers/', {
+            'source_store': self.store.pk,
+            'destination_store': self.branch.pk,
+            'lines': [{'product': self.product.pk, 'quantity': 0}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_stores_of_another_tenant_are_rejected(self):
+        _, _, foreign = self.other_tenant()
+        response = self.client.post(f'{API}/stock-transfers/', {
+            'source_store': self.store.pk,
+            'destination_store': foreign.pk,
+            'lines': [{'product': self.product.pk, 'quantity': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
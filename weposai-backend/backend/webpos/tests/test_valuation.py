@@ -0,0 +1,85 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from ..models import Job, Purchase, SaleLineCost, Vendor
+from ..services import jobs, valuation
+from .base import API, TenantTestCase
+
+
+class ValuationTests(TenantTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.vendor = Vendor.objects.create(tenant=cls.tenant, name='Dairy Co', phone='1', email='a@b.c')
+
+    def purchase(self, quantity, total_cost):
+        return Purchase.objects.create(
+            tenant=self.tenant, vendor=self.vendor, product=self.product,
+            quantity=quantity, total_cost=Decimal(total_cost),
+        )
+
+    def costs(self):
+        return list(SaleLineCost.objects.order_by('pk').values_list('quantity', 'cost'))
+
+    def test_fifo_consumes_the_oldest_layer_first(self):
+        self.tenant.valuation_method = 'fifo'
+        self.tenant.save()
+        self.purchase(10, '10.00')
+        self.purchase(10, '20.00')
+        self.make_sale([(self.product, 12)])
+
+        self.assertEqual(valuation.run_valuation(self.tenant), 1)
+        self.assertEqual(self.costs(), [(12, Decimal('14.00'))])
+
+    def test_weighted_average(self):
+        self.purchase(10, '10.00')
+        self.purchase(10, '20.00')
+        self.make_sale([(self.product, 4)])
+
+        valuation.run_valuation(self.tenant)
+        self.assertEqual(self.costs(), [(4, Decimal('6.00'))])
+
+    def test_weighted_average_ignores_purchases_of_no_units(self):
+        self.purchase(10, '10.00')
+        self.purchase(0, '5.00')
+        self.make_sale([(self.product, 4)])
+
+        valuation.run_valuation(self.tenant)
+        self.assertEqual(self.costs(), [(4, Decimal('4.00'))])
+
+    def test_runs_are_incremental(self):
+        self.purchase(10, '10.00')
+        self.make_sale([(self.product, 1)])
+        self.assertEqual(valuation.run_valuation(self.tenant), 1)
+        self.assertEqual(valuation.run_valuation(self.tenant), 0)
+        self.make_sale([(self.product, 2)])
+        self.assertEqual(valuation.run_valuation(self.tenant), 1)
+
+    def test_gross_margin_endpoint(self):
+        self.purchase(10, '10.00')
+        self.make_sale([(self.product, 2)])
+        valuation.run_valuation(self.tenant)
+        now = timezone.now()
+        response = self.client.get(f'{API}/valuation/gross-margin/', {
+            'start': (now - timedelta(days=1)).isoformat(), 'end': (now + timedelta(days=1)).isoformat(),
+        }, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        row, = response.json()
+        self.assertEqual(row['product'], self.product.pk)
+        self.assertEqual(Decimal(str(row['total_revenue'])), Decimal('5.00'))
+        self.assertEqual(Decimal(str(row['gross_margin'])), Decimal('3.00'))
+
+    def test_run_endpoint_queues_a_job(self):
+        self.purchase(10, '10.00')
+        self.make_sale([(self.product, 4)])
+        response = self.client.post(f'{API}/valuation/run/')
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(SaleLineCost.objects.exists())
+
+        job = Job.objects.get(pk=response.json()['job'])
+        self.assertEqual((job.task, job.tenant_id), ('valuation.run', self.tenant.pk))
+        self.assertEqual(jobs.work(once=True), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), ('succeeded', 1))
@@ -0,0 +1,281 @@
+"""
+Token-bucket API throttling by tenant, user and till.
+
+Each request spends one token from three buckets: its tenant's, its user's
+(the client IP for anonymous requests) and, when the client sends the
+``THROTTLE_TILL_HEADER``, its till's. Every key has separate ``read``,
+``write`` and ``bulk`` budgets: safe methods are reads, other methods are
+writes, and a viewset marks its heavy actions with
+``throttle_budgets = {'action_name': 'bulk'}``. Rates come from DRF's
+``DEFAULT_THROTTLE_RATES`` as ``'<kind>.<budget>': '<n>/<period>'``; a
+bucket holds ``n`` tokens and refills at ``n`` per period, so short bursts
+pass and sustained floods do not. A refused request gets 429 with
+``Retry-After`` set to the time until the next token.
+
+Buckets live in process memory by default. With ``THROTTLE_CACHE_ALIAS``
+pointing at a shared cache they are kept there instead, as one theoretical
+arrival time per key (GCRA, which admits exactly what a token bucket does).
+The read-modify-write is not atomic, so concurrent processes can let a few
+extra requests through under contention; that is the price of working with
+any Django cache backend.
+
+The tenant throttle also counts served and refused requests per tenant, day
+and budget. The counters are flushed to ``TenantUsage`` every
+``THROTTLE_USAGE_FLUSH_SECONDS`` and feed the daily quota of the tenant's
+``subscription_plan`` (``SUBSCRIPTION_PLAN_LIMITS``), which can also scale
+its rates.
+"""
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F, Sum
+from django.utils import timezone
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .models import Tenant, TenantUsage
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+BUDGETS = ('read', 'write', 'bulk')
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+PLAN_CACHE_SECONDS = 300
+
+
+def budget_for(request, view):
+    budget = getattr(view, 'throttle_budgets', {}).get(getattr(view, 'action', None))
+    if budget:
+        return budget
+    return 'read' if request.method in SAFE_METHODS else 'write'
+
+
+def parse_rate(rate):
+    """``'600/min'`` -> (capacity 600, refill 10.0 tokens per second)."""
+    if rate is None:
+        return None
+    count, period = rate.split('/')
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+# ----------------------------
+# Bucket stores
+# ----------------------------
+
+class LocalBuckets:
+    """Exact buckets in this process's memory."""
+
+    max_keys = 100_000
+
+    def __init__(self):
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        """Spend a token; return 0 when granted, else seconds until one is available."""
+        with self._lock:
+            tokens, stamp = self._state.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - stamp) * rate)
+            if tokens >= 1:
+                self._state[key] = (tokens - 1, now)
+                if len(self._state) > self.max_keys:
+                    self._prune(now)
+                return 0.0
+            self._state[key] = (tokens, now)
+            return (1 - tokens) / rate
+
+    def _prune(self, now):
+        # Drop buckets idle long enough to be full again; they start full anyway.
+        idle = [key for key, (_, stamp) in self._state.items() if now - stamp > 3600]
+        for key in idle:
+            del self._state[key]
+
+
+class CacheBuckets:
+    """GCRA in a shared Django cache: the value is the key's theoretical arrival time."""
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def take(self, key, capacity, rate, now):
+        interval = 1 / rate
+        burst = capacity * interval
+        arrival = max(self.cache.get(key) or now, now) + interval
+        if arrival - now > burst:
+            return arrival - now - burst
+        self.cache.set(key, arrival, timeout=int(burst) + 1)
+        return 0.0
+
+
+_buckets = None
+_buckets_lock = threading.Lock()
+
+
+def buckets():
+    global _buckets
+    if _buckets is None:
+        with _buckets_lock:
+            if _buckets is None:
+                alias = getattr(settings, 'THROTTLE_CACHE_ALIAS', None)
+                _buckets = CacheBuckets(alias) if alias else LocalBuckets()
+    return _buckets
+
+
+# ----------------------------
+# Usage counters and plan limits
+# ----------------------------
+
+_usage = defaultdict(lambda: [0, 0])
+_usage_lock = threading.Lock()
+_last_flush = time.monotonic()
+_plans = {}
+_daily = {}
+
+
+def record(tenant_id, budget, throttled=False):
+    global _last_flush
+    key = (tenant_id, timezone.localdate(), budget)
+    with _usage_lock:
+        counts = _usage[key]
+        counts[1 if throttled else 0] += 1
+        due = time.monotonic() - _last_flush >= getattr(settings, 'THROTTLE_USAGE_FLUSH_SECONDS', 60)
+        if due:
+            _last_flush = time.monotonic()
+    if due:
+        flush()
+
+
+def flush():
+    """Add this process's counters to ``TenantUsage``; returns the rows touched."""
+    with _usage_lock:
+        pending = dict(_usage)
+        _usage.clear()
+    if not pending:
+        return 0
+    TenantUsage.objects.bulk_create(
+        [TenantUsage(tenant_id=tenant_id, day=day, budget=budget) for tenant_id, day, budget in pending],
+        ignore_conflicts=True,
+    )
+    for (tenant_id, day, budget), (requests, throttled) in pending.items():
+        TenantUsage.objects.filter(tenant_id=tenant_id, day=day, budget=budget).update(
+            requests=F('requests') + requests, throttled=F('throttled') + throttled,
+        )
+    _daily.clear()
+    return len(pending)
+
+
+def plan_limits(tenant_id):
+    """The ``SUBSCRIPTION_PLAN_LIMITS`` entry of the tenant's plan, cached for a few minutes."""
+    now = time.monotonic()
+    cached = _plans.get(tenant_id)
+    if cached is None or cached[1] < now:
+        plan = Tenant.objects.filter(pk=tenant_id).values_list('subscription_plan', flat=True).first() or ''
+        cached = _plans[tenant_id] = (plan, now + PLAN_CACHE_SECONDS)
+    limits = getattr(settings, 'SUBSCRIPTION_PLAN_LIMITS', {})
+    return limits.get(cached[0]) or limits.get('default') or {}
+
+
+def requests_today(tenant_id):
+    """Flushed usage of every process plus this process's unflushed counts."""
+    today = timezone.localdate()
+    stored = _daily.get((tenant_id, today))
+    if stored is None:
+        stored = _daily[(tenant_id, today)] = TenantUsage.objects.filter(
+            tenant_id=tenant_id, day=today,
+        ).aggregate(total=Sum('requests'))['total'] or 0
+    with _usage_lock:
+        pending = sum(_usage[(tenant_id, today, budget)][0] for budget in BUDGETS if (tenant_id, today, budget) in _usage)
+    return stored + pending
+
+
+def _seconds_to_midnight():
+    now = timezone.localtime()
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (midnight - now).total_seconds()
+
+
+# ----------------------------
+# Throttles
+# ----------------------------
+
+class BucketThrottle(BaseThrottle):
+    kind = None
+
+    def ident(self, request):
+        raise NotImplementedError
+
+    def rate(self, request, budget):
+        return parse_rate(api_settings.DEFAULT_THROTTLE_RATES.get(f"{self.kind}.{budget}"))
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        ident = self.ident(request)
+        if ident is None:
+            return True
+        budget = budget_for(request, view)
+        rate = self.rate(request, budget)
+        if rate is None:
+            return True
+        wait = buckets().take(f"throttle:{self.kind}:{budget}:{ident}", *rate, time.time())
+        if wait:
+            self.wait_seconds = wait
+            return False
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class TenantRateThrottle(BucketThrottle):
+    """Per-tenant budgets, scaled by the plan's ``rate_multiplier`` and capped by its daily quota."""
+
+    kind = 'tenant'
+
+    def ident(self, request):
+        return getattr(request.user, 'tenant_id', None)
+
+    def rate(self, request, budget):
+        rate = super().rate(request, budget)
+        multiplier = plan_limits(request.user.tenant_id).get('rate_multiplier', 1)
+        if rate is None or multiplier == 1:
+            return rate
+        return max(1, int(rate[0] * multiplier)), rate[1] * multiplier
+
+    def allow_request(self, request, view):
+        tenant_id = self.ident(request)
+        if tenant_id is None:
+            return True
+        budget = budget_for(request, view)
+        quota = plan_limits(tenant_id).get('requests_per_day')
+        if quota is not None and requests_today(tenant_id) >= quota:
+            self.wait_seconds = _seconds_to_midnight()
+            allowed = False
+        else:
+            allowed = super().allow_request(request, view)
+        record(tenant_id, budget, throttled=not allowed)
+        return allowed
+
+
+class UserRateThrottle(BucketThrottle):
+    kind = 'user'
+
+    def ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return self.get_ident(request)
+
+
+class TillRateThrottle(BucketThrottle):
+    """Keyed by the till id the client sends; requests without one are not till-throttled."""
+
+    kind = 'till'
+
+    def ident(self, request):
+        header = 'HTTP_' + getattr(settings, 'THROTTLE_TILL_HEADER', 'X-Till-ID').upper().replace('-', '_')
+        till = request.META.get(header, '').strip()[:64]
+        if not till:
+            return None
+        return f"{getattr(request.user, 'tenant_id', None)}:{till}"
@@ -2,6 +2,7 @@ from django.contrib import admin  # type: ignore
 from django.urls import path, include  # type: ignore
 from rest_framework import routers  # type: ignore
 from .views import *
+from . import async_views
 
 # ----------------------------
 # DRF Router setup
@@ -16,42 +17,69 @@ router.register(r'tenants', TenantViewSet)
 router.register(r'stores', StoreViewSet)
 
 # Product & Service Categories
-router.register(r'product-categories', ProductCategoryViewSet)
-router.register(r'service-categories', ServiceCategoryViewSet)
+router.register(r'categories', CategoryViewSet)
 
 # Products & Services
 router.register(r'products', ProductViewSet)
 router.register(r'services', ServiceViewSet)
+router.register(r'pins', PinCodeViewSet)
 
-# Customers & Orders
+# Customers
 router.register(r'customers', CustomerViewSet)
-router.register(r'orders', OrderViewSet)
+router.register(r'loyalty-rules', LoyaltyRuleViewSet)
 
-# Sales & Sale Items
+# Sales & Order Items
 router.register(r'sales', SaleViewSet)
-router.register(r'sale-items', SaleItemViewSet)
+router.register(r'order-items', OrderItemViewSet)
 
 # Inventory & Transactions
 router.register(r'inventories', InventoryViewSet)
 router.register(r'inventory-transactions', InventoryTransactionViewSet)
+router.register(r'inventory-batches', InventoryBatchViewSet)
+router.register(r'stock-transfers', StockTransferViewSet)
 
-# Market Tills
-router.register(r'market-tills', MarketTillViewSet)
+# Shifts
+router.register(r'shifts', ShiftViewSet)
 
 # Financial Transactions
-router.register(r'transactions', TransactionViewSet)
 router.register(r'payments', PaymentViewSet)
 router.register(r'commissions', CommissionViewSet)
+router.register(r'commission-rules', CommissionRuleViewSet)
+router.register(r'commission-settlements', CommissionSettlementViewSet)
+router.register(r'valuation', ValuationViewSet, basename='valuation')
+router.register(r'accounts', AccountViewSet)
 
 # Delivery, Promotions, Taxes
 router.register(r'deliveries', DeliveryViewSet)
 router.register(r'promotions', PromotionViewSet)
 router.register(r'taxes', TaxViewSet)
 
-# Alerts & Receipts
-router.register(r'inventory-alerts', InventoryAlertViewSet)
+# Receipts
 router.register(r'receipts', ReceiptViewSet)
 
+# Gift cards
+router.register(r'gift-cards', GiftCardViewSet)
+
+# Background jobs
+router.register(r'jobs', JobViewSet)
+
+# Response cache
+router.register(r'response-cache', ResponseCacheViewSet, basename='response-cache')
+
+# API usage
+router.register(r'usage', TenantUsageViewSet)
+
+# Webhooks
+router.register(r'webhook-endpoints', WebhookEndpointViewSet)
+
+# Demand analytics
+router.register(r'demand-classes', DemandClassViewSet)
+router.register(r'demand-forecasts', DemandForecastViewSet)
+
+# Bulk price and promotion changes
+router.register(r'price-changes', PriceChangeViewSet)
+router.register(r'price-history', PriceHistoryViewSet)
+
 # ----------------------------
 # URL patterns
 # ----------------------------
@@ -62,6 +90,14 @@ urlpatterns = [
     # API v1 routes
     path('api/v1/', include(router.urls)),
 
+    # Async endpoints (see webpos.async_views)
+    path('api/v1/async/products/lookup/', async_views.product_lookup, name='async-product-lookup'),
+    path('api/v1/async/sales/<int:pk>/', async_views.sale_detail, name='async-sale-detail'),
+    path('api/v1/async/jobs/<int:pk>/wait/', async_views.job_wait, name='async-job-wait'),
+    path('api/v1/async/inventory-transactions/export/', async_views.inventory_export, name='async-inventory-export'),
+    path('api/v1/async/top-ups/', async_views.top_up, name='async-top-up'),
+    path('api/v1/async/top-ups/batch/', async_views.top_up_batch, name='async-top-up-batch'),
+
     # DRF login/logout views for browsable API
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
 ]
@@ -1,6 +1,38 @@
+import secrets
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.conf import settings
+from django.db.models import Count, Sum
+from django.http import FileResponse, HttpResponse, HttpResponseForbidden
+from django.utils import timezone
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import BasePermission, IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from . import caching, metrics
+from .caching import CachedResponseMixin
 from .models import *
 from .serializers import *
+from .services import (
+    accounting, affinity, commissions, jobs, ledger, loyalty, outbox, pins, pricing, receipts, returns, shifts, stock, transfers, valuation,
+)
+
+
+def run_service(func, *args, **kwargs):
+    """Call a service function, reporting its validation errors as HTTP 400s."""
+    try:
+        return func(*args, **kwargs)
+    except DjangoValidationError as exc:
+        raise ValidationError(exc.messages)
+
+
+class IsTenantAdmin(BasePermission):
+    """Signed-in users with the admin role in their tenant."""
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and request.user.role == 'admin')
+
 
 # ----------------------------
 # 1. User ViewSet
@@ -9,152 +41,772 @@ from .serializers import *
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+
 # ----------------------------
 # 2. Tenant ViewSet
 # ----------------------------
 
-class TenantViewSet(viewsets.ModelViewSet):
+class TenantViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Tenant.objects.all()
     serializer_class = TenantSerializer
+    cache_resource = 'tenants'
+    cache_per_tenant = False
+
 # ----------------------------
 # 3. Store ViewSet
 # ----------------------------
 
-class StoreViewSet(viewsets.ModelViewSet):
+class StoreViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Store.objects.all()
     serializer_class = StoreSerializer
-# ----------------------------
-# 4. Product Category ViewSet
-# ----------------------------
+    cache_resource = 'stores'
 
-class ProductCategoryViewSet(viewsets.ModelViewSet):
-    queryset = ProductCategory.objects.all()
-    serializer_class = ProductCategorySerializer
 # ----------------------------
-# 5. Service Category ViewSet
+# 4. Category ViewSet
 # ----------------------------
 
-class ServiceCategoryViewSet(viewsets.ModelViewSet):
-    queryset = ServiceCategory.objects.all()
-    serializer_class = ServiceCategorySerializer
+class CategoryViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+    queryset = Category.objects.all()
+    serializer_class = CategorySerializer
+    cache_resource = 'categories'
+
 # ----------------------------
-# 6. Product ViewSet
+# 5. Product ViewSet
 # ----------------------------
 
 class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action == 'frequently_bought_together':
+            qs = qs.filter(tenant_id=self.request.user.tenant_id)
+        return qs
+
+    @action(detail=True, url_path='frequently-bought-together', permission_classes=[IsAuthenticated])
+    def frequently_bought_together(self, request, pk=None):
+        try:
+            limit = min(int(request.query_params.get('limit', 5)), 20)
+        except ValueError:
+            raise ValidationError({'limit': "A whole number."})
+        affinities = affinity.frequently_bought_together(self.get_object(), limit=limit)
+        return Response(ProductAffinitySerializer(affinities, many=True).data)
+
 # ----------------------------
-# 7. Service ViewSet
+# 6. Service ViewSet
 # ----------------------------
 
 class ServiceViewSet(viewsets.ModelViewSet):
     queryset = Service.objects.all()
     serializer_class = ServiceSerializer
+
 # ----------------------------
-# 8. Customer ViewSet
+# 7. Customer ViewSet
 # ----------------------------
 
 class CustomerViewSet(viewsets.ModelViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
-# ----------------------------
-# 9. Order ViewSet
-# ----------------------------
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return super().get_queryset().filter(tenant_id=self.request.user.tenant_id)
+
+    @action(detail=True)
+    def loyalty(self, request, pk=None):
+        customer = self.get_object()
+        return Response({'customer': customer.pk, 'balance': customer.loyalty_balance})
+
+    @action(detail=True, methods=['post'], url_path='redeem-points')
+    def redeem_points(self, request, pk=None):
+        params = LoyaltyRedeemSerializer(data=request.data, context=self.get_serializer_context())
+        params.is_valid(raise_exception=True)
+        entry = run_service(
+            loyalty.redeem,
+            self.get_object(),
+            params.validated_data['points'],
+            sale=params.validated_data.get('sale'),
+        )
+        return Response(LoyaltyEntrySerializer(entry).data)
 
-class OrderViewSet(viewsets.ModelViewSet):
-    queryset = Order.objects.all()
-    serializer_class = OrderSerializer
 # ----------------------------
-# 10. Sale ViewSet
+# 8. Sale ViewSet
 # ----------------------------
 
 class SaleViewSet(viewsets.ModelViewSet):
     queryset = Sale.objects.all()
     serializer_class = SaleSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return super().get_queryset().filter(tenant_id=self.request.user.tenant_id)
+
+    def get_serializer_class(self):
+        return SaleCreateSerializer if self.action == 'create' else super().get_serializer_class()
+
+    def perform_create(self, serializer):
+        run_service(serializer.save)
+
+    @action(detail=True, methods=['post'], url_path='return')
+    def return_items(self, request, pk=None):
+        sale = self.get_object()
+        params = ReturnSerializer(data=request.data, context=self.get_serializer_context())
+        params.is_valid(raise_exception=True)
+        refund = run_service(
+            returns.process_return,
+            sale,
+            {line['order_item'].pk: line['quantity'] for line in params.validated_data['lines']},
+            params.validated_data['reason'],
+            user=request.user,
+            method=params.validated_data['method'],
+            restock=params.validated_data['restock'],
+        )
+        return Response(RefundSerializer(refund).data, status=201)
+
+    @action(detail=True)
+    def receipt(self, request, pk=None):
+        sale = self.get_object()
+        kind = 'html' if request.query_params.get('as') == 'html' else 'txt'
+        content_type = 'text/html' if kind == 'html' else 'text/plain'
+        return HttpResponse(receipts.render(sale, kind), content_type=f'{content_type}; charset=utf-8')
+
 # ----------------------------
-# 11. Sale Item ViewSet
+# 9. Order Item ViewSet
 # ----------------------------
 
-class SaleItemViewSet(viewsets.ModelViewSet):
-    queryset = SaleItem.objects.all()
-    serializer_class = SaleItemSerializer
+class OrderItemViewSet(viewsets.ModelViewSet):
+    queryset = OrderItem.objects.all()
+    serializer_class = OrderItemSerializer
+
 # ----------------------------
-# 12. Inventory ViewSet
+# 10. Inventory ViewSet
 # ----------------------------
 
 class InventoryViewSet(viewsets.ModelViewSet):
     queryset = Inventory.objects.all()
     serializer_class = InventorySerializer
+    permission_classes = [IsAuthenticated]
+
+    @action(detail=False, url_path='stock-at')
+    def stock_at(self, request):
+        params = StockAtQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        inventories = Inventory.objects.filter(tenant_id=request.user.tenant_id)
+        for field in ('store', 'product'):
+            if field in params.validated_data:
+                inventories = inventories.filter(**{field: params.validated_data[field]})
+        rows = ledger.annotate_stock_at(inventories, params.validated_data['at']).values(
+            'id', 'product', 'store', 'stock_at'
+        )
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(list(rows))
+
 # ----------------------------
-# 13. Inventory Transaction ViewSet
+# 11. Inventory Transaction ViewSet
 # ----------------------------
 
 class InventoryTransactionViewSet(viewsets.ModelViewSet):
     queryset = InventoryTransaction.objects.all()
     serializer_class = InventoryTransactionSerializer
-# ----------------------------
-# 14. Market Till ViewSet
-# ----------------------------
-
-class MarketTillViewSet(viewsets.ModelViewSet):
-    queryset = MarketTill.objects.all()
-    serializer_class = MarketTillSerializer
-# ----------------------------
-# 15. Transaction ViewSet
-# ----------------------------
 
-class TransactionViewSet(viewsets.ModelViewSet):
-    queryset = Transaction.objects.all()
-    serializer_class = TransactionSerializer
 # ----------------------------
-# 16. Payment ViewSet
+# 12. Payment ViewSet
 # ----------------------------
 
 class PaymentViewSet(viewsets.ModelViewSet):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
+
 # ----------------------------
-# 17. Commission ViewSet
+# 13. Commission ViewSet
 # ----------------------------
 
 class CommissionViewSet(viewsets.ModelViewSet):
     queryset = Commission.objects.all()
     serializer_class = CommissionSerializer
+
 # ----------------------------
-# 18. Delivery ViewSet
+# 14. Delivery ViewSet
 # ----------------------------
 
 class DeliveryViewSet(viewsets.ModelViewSet):
     queryset = Delivery.objects.all()
     serializer_class = DeliverySerializer
+
 # ----------------------------
-# 19. Promotion ViewSet
+# 15. Promotion ViewSet
 # ----------------------------
 
-class PromotionViewSet(viewsets.ModelViewSet):
+class PromotionViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Promotion.objects.all()
     serializer_class = PromotionSerializer
+    cache_resource = 'promotions'
 
 # ----------------------------
-# 20. Tax ViewSet
+# 16. Tax ViewSet
 # ----------------------------
 
-class TaxViewSet(viewsets.ModelViewSet):
+class TaxViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Tax.objects.all()
     serializer_class = TaxSerializer
+    cache_resource = 'taxes'
 
 # ----------------------------
-# 21. Inventory Alert ViewSet
-# ----------------------------
-
-class InventoryAlertViewSet(viewsets.ModelViewSet):
-    queryset = InventoryAlert.objects.all()
-    serializer_class = InventoryAlertSerializer
-# ----------------------------
-# 22. Receipt ViewSet
+# 17. Receipt ViewSet
 # ----------------------------
 
 class ReceiptViewSet(viewsets.ModelViewSet):
     queryset = Receipt.objects.all()
     serializer_class = ReceiptSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return super().get_queryset().filter(tenant_id=self.request.user.tenant_id)
+
+    @action(detail=True)
+    def text(self, request, pk=None):
+        receipt = self.get_object()
+        return HttpResponse(receipts.render(receipt.sale_id, 'txt'), content_type='text/plain; charset=utf-8')
+
+    @action(detail=True)
+    def html(self, request, pk=None):
+        receipt = self.get_object()
+        return HttpResponse(receipts.render(receipt.sale_id, 'html'), content_type='text/html; charset=utf-8')
+
+    @action(detail=True)
+    def pdf(self, request, pk=None):
+        receipt = self.get_object()
+        path = receipts.pdf_path(receipt)
+        if path is None:
+            return Response({'pdf_status': 'pending'}, status=202)
+        return FileResponse(open(path, 'rb'), content_type='application/pdf', filename=f"receipt-{receipt.sale_id}.pdf")
+
+# ----------------------------
+# 18. Inventory Batch ViewSet
+# ----------------------------
+
+class InventoryBatchViewSet(viewsets.ModelViewSet):
+    queryset = InventoryBatch.objects.select_related('inventory')
+    serializer_class = InventoryBatchSerializer
+    permission_classes = [IsAuthenticated]
+    throttle_budgets = {'markdown': 'bulk'}
+
+    def get_queryset(self):
+        return super().get_queryset().filter(tenant_id=self.request.user.tenant_id)
+
+    def perform_create(self, serializer):
+        run_service(serializer.save)
+
+    @action(detail=False)
+    def expiring(self, request):
+        params = ExpiringBatchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        batches = stock.expiring_batches(
+            request.user.tenant_id,
+            params.validated_data['days'],
+            store=params.validated_data.get('store'),
+        ).select_related('inventory')
+        page = self.paginate_queryset(batches)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(batches, many=True).data)
+
+    @action(detail=False, methods=['post'])
+    def markdown(self, request):
+        params = ExpiryMarkdownSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        updated = stock.mark_down_expiring(
+            request.user.tenant_id,
+            params.validated_data['days'],
+            params.validated_data['discount_percent'],
+            store=params.validated_data.get('store'),
+        )
+        return Response({'updated': updated})
+
+# ----------------------------
+# 19. Stock Transfer ViewSet
+# ----------------------------
+
+class StockTransferViewSet(viewsets.ModelViewSet):
+    queryset = StockTransfer.objects.prefetch_related('lines')
+    serializer_class = StockTransferSerializer
+    permission_classes = [IsAuthenticated]
+    http_method_names = ['get', 'post', 'head', 'options']
+
+    def get_queryset(self):
+        return super().get_queryset().filter(tenant_id=self.request.user.tenant_id)
+
+    def _transition(self, func, **kwargs):
+        transfer = run_service(func, self.get_object(), **kwargs)
+        return Response(self.get_serializer(transfer).data)
+
+    @action(detail=True, methods=['post'], url_path='dispatch')
+    def dispatch_goods(self, request, pk=None):
+        return self._transition(transfers.dispatch, user=request.user)
+
+    @action(detail=True, methods=['post'])
+    def receive(self, request, pk=None):
+        return self._transition(transfers.receive, user=request.user)
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        return self._transition(transfers.cancel)
+
+# ----------------------------
+# 20. Valuation ViewSet
+# ----------------------------
+
+class ValuationViewSet(viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
+    throttle_budgets = {'run': 'bulk'}
+
+    @action(detail=False, url_path='gross-margin')
+    def gross_margin(self, request):
+        params = GrossMarginQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        rows = valuation.gross_margin(
+            request.user.tenant_id,
+            params.validated_data['start'],
+            params.validated_data['end'],
+            group_by=params.validated_data['group_by'],
+        )
+        return Response(list(rows))
+
+    @action(detail=False, methods=['post'])
+    def run(self, request):
+        """Queue a valuation run; poll ``jobs/<job>/`` for the number of lines costed."""
+        job = jobs.enqueue(
+            'valuation.run', {'tenant': request.user.tenant_id}, tenant=request.user.tenant_id, user=request.user,
+        )
+        return Response({'job': job.pk, 'status': job.status}, status=202)
+
+# ----------------------------
+# 21. Account ViewSet
+# ----------------------------
+
+class AccountViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Account.objects.all()
+    serializer_class = AccountSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return super().get_queryset().filter(tenant_id=self.request.user.tenant_id).order_by('code')
+
+    @action(detail=False, url_path='trial-balance')
+    def trial_balance(self, request):
+        return Response(accounting.trial_balance(request.user.tenant_id))
+
+# ----------------------------
+# 22. Shift ViewSet
+# ----------------------------
+
+class ShiftViewSet(viewsets.ModelViewSet):
+    queryset = Shift.objects.all()
+    serializer_class = ShiftSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return super().get_queryset().filter(store__tenant_id=self.request.user.tenant_id)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @action(detail=True, url_path='z-report')
+    def z_report(self, request, pk=None):
+        return Response(shifts.z_report(self.get_object()))
+
+    @action(detail=True, methods=['post'])
+    def close(self, request, pk=None):
+        return Response(run_service(shifts.close_shift, self.get_object()))
+
+# ----------------------------
+# 23. Commission Rule ViewSet
+# ----------------------------
+
+class CommissionRuleViewSet(viewsets.ModelViewSet):
+    queryset = CommissionRule.objects.prefetch_related('tiers')
+    serializer_class = CommissionRuleSerializer
+    permission_classes = [IsAuthenticated]
+    throttle_budgets = {'calculate': 'bulk'}
+
+    def get_queryset(self):
+        return super().get_queryset().filter(tenant_id=self.request.user.tenant_id)
+
+    def perform_create(self, serializer):
+        serializer.save(tenant_id=self.request.user.tenant_id)
+
+    @action(detail=False, methods=['post'])
+    def calculate(self, request):
+        params = CommissionPeriodSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        written = commissions.calculate_commissions(
+            request.user.tenant_id, params.validated_data['start'], params.validated_data['end'],
+        )
+        return Response({'commissions': written})
+
+
+# ----------------------------
+# 24. Commission Settlement ViewSet
+# ----------------------------
+
+class CommissionSettlementViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = CommissionSettlement.objects.all()
+    serializer_class = CommissionSettlementSerializer
+    permission_classes = [IsAuthenticated]
+    throttle_budgets = {'settle': 'bulk'}
+
+    def get_queryset(self):
+        return super().get_queryset().filter(tenant_id=self.request.user.tenant_id)
+
+    @action(detail=False, methods=['post'])
+    def settle(self, request):
+        params = CommissionPeriodSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        settlements = run_service(
+            commissions.settle_period,
+            request.user.tenant_id, params.validated_data['start'], params.validated_data['end'],
+        )
+        return Response(self.get_serializer(settlements, many=True).data)
+
+# ----------------------------
+# 25. Loyalty Rule ViewSet
+# ----------------------------
+
+class LoyaltyRuleViewSet(viewsets.ModelViewSet):
+    queryset = LoyaltyRule.objects.all()
+    serializer_class = LoyaltyRuleSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return super().get_queryset().filter(tenant_id=self.request.user.tenant_id)
+
+    def perform_create(self, serializer):
+        serializer.save(tenant_id=self.request.user.tenant_id)
+
+
+# ----------------------------
+# 26. PIN ViewSet
+# ----------------------------
+
+class PinCodeViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = PinCode.objects.all()
+    serializer_class = PinCodeSerializer
+    permission_classes = [IsAuthenticated]
+    throttle_budgets = {'import_codes': 'bulk'}
+
+    def get_queryset(self):
+        qs = super().get_queryset().filter(tenant_id=self.request.user.tenant_id)
+        virtual_product = self.request.query_params.get('virtual_product')
+        if virtual_product:
+            qs = qs.filter(virtual_product_id=virtual_product)
+        return qs.order_by('pk')
+
+    def _virtual_product(self, pk):
+        try:
+            return VirtualProduct.objects.select_related('product').get(
+                pk=pk, product__tenant_id=self.request.user.tenant_id,
+            )
+        except VirtualProduct.DoesNotExist:
+            raise NotFound()
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_codes(self, request):
+        params = PinImportSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        imported = pins.import_codes(
+            self._virtual_product(params.validated_data['virtual_product']),
+            [(entry['serial'], entry['code']) for entry in params.validated_data['codes']],
+            batch_reference=params.validated_data['batch_reference'],
+            expires_at=params.validated_data.get('expires_at'),
+        )
+        return Response({'imported': imported}, status=201)
+
+    @action(detail=False, methods=['post'])
+    def allocate(self, request):
+        params = PinAllocateSerializer(data=request.data, context=self.get_serializer_context())
+        params.is_valid(raise_exception=True)
+        issued = run_service(
+            pins.allocate,
+            self._virtual_product(params.validated_data['virtual_product']),
+            params.validated_data['quantity'],
+            sale=params.validated_data.get('sale'),
+            user=request.user,
+        )
+        return Response({'pins': [{'serial': serial, 'code': code} for serial, code in issued]})
+
+    @action(detail=False)
+    def stock(self, request):
+        virtual_products = VirtualProduct.objects.filter(product__tenant_id=request.user.tenant_id)
+        return Response({str(pk): count for pk, count in pins.stock_levels(virtual_products).items()})
+
+
+# ----------------------------
+# 27. Job ViewSet
+# ----------------------------
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        qs = super().get_queryset().filter(tenant_id=self.request.user.tenant_id)
+        for field in ('status', 'task'):
+            value = self.request.query_params.get(field)
+            if value:
+                qs = qs.filter(**{field: value})
+        return qs.order_by('-created_at')
+
+    @action(detail=True, methods=['post'])
+    def retry(self, request, pk=None):
+        job = self.get_object()
+        if not jobs.retry(job):
+            raise ValidationError(f"Job #{job.pk} is {job.status}; only failed or cancelled jobs can be retried.")
+        job.refresh_from_db()
+        return Response(self.get_serializer(job).data)
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        job = self.get_object()
+        if not jobs.cancel(job):
+            raise ValidationError(f"Job #{job.pk} is {job.status}; only queued jobs can be cancelled.")
+        job.refresh_from_db()
+        return Response(self.get_serializer(job).data)
+
+
+# ----------------------------
+# 28. Response Cache Stats ViewSet
+# ----------------------------
+
+class ResponseCacheViewSet(viewsets.ViewSet):
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        return Response(caching.stats())
+
+
+# ----------------------------
+# 29. API Usage ViewSet
+# ----------------------------
+
+class TenantUsageViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = TenantUsage.objects.all()
+    serializer_class = TenantUsageSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        qs = super().get_queryset().filter(tenant_id=self.request.user.tenant_id)
+        start = self.request.query_params.get('start')
+        end = self.request.query_params.get('end')
+        if start:
+            qs = qs.filter(day__gte=start)
+        if end:
+            qs = qs.filter(day__lte=end)
+        return qs.order_by('-day', 'budget')
+
+
+# ----------------------------
+# 30. Webhook Endpoint ViewSet
+# ----------------------------
+
+class WebhookEndpointViewSet(viewsets.ModelViewSet):
+    queryset = WebhookEndpoint.objects.all()
+    serializer_class = WebhookEndpointSerializer
+    # Endpoints receive every sale and payment of the tenant
+    permission_classes = [IsTenantAdmin]
+    throttle_budgets = {'replay': 'bulk'}
+
+    def get_queryset(self):
+        return super().get_queryset().filter(tenant_id=self.request.user.tenant_id).order_by('pk')
+
+    def perform_create(self, serializer):
+        serializer.save(tenant_id=self.request.user.tenant_id, secret=secrets.token_hex(32))
+
+    @action(detail=True)
+    def deliveries(self, request, pk=None):
+        qs = self.get_object().deliveries.select_related('event').order_by('-pk')
+        status = request.query_params.get('status')
+        if status:
+            qs = qs.filter(status=status)
+        page = self.paginate_queryset(qs)
+        serializer = WebhookDeliverySerializer(page if page is not None else qs, many=True)
+        return self.get_paginated_response(serializer.data) if page is not None else Response(serializer.data)
+
+    @action(detail=True, methods=['post'])
+    def replay(self, request, pk=None):
+        params = WebhookReplaySerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        queued = run_service(
+            outbox.replay,
+            self.get_object(),
+            since=params.validated_data.get('since'),
+            until=params.validated_data.get('until'),
+            event_types=params.validated_data.get('event_types'),
+            event_ids=params.validated_data.get('events'),
+        )
+        return Response({'queued': queued})
+
+    @action(detail=True, methods=['post'], url_path='rotate-secret')
+    def rotate_secret(self, request, pk=None):
+        endpoint = self.get_object()
+        endpoint.secret = secrets.token_hex(32)
+        endpoint.save(update_fields=['secret'])
+        return Response(self.get_serializer(endpoint).data)
+
+
+# ----------------------------
+# 31. Demand Class ViewSet
+# ----------------------------
+
+class DemandClassViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = DemandClass.objects.select_related('product')
+    serializer_class = DemandClassSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        qs = super().get_queryset().filter(tenant_id=self.request.user.tenant_id)
+        for field in ('store', 'abc', 'xyz'):
+            value = self.request.query_params.get(field)
+            if value:
+                qs = qs.filter(**{field: value})
+        return qs.order_by('store_id', '-revenue', 'product_id')
+
+    @action(detail=False)
+    def matrix(self, request):
+        """SKU counts and revenue per ABC/XYZ cell, e.g. for the dashboard's 3x3 grid."""
+        cells = (
+            self.get_queryset().order_by()
+            .values('abc', 'xyz')
+            .annotate(products=Count('pk'), revenue=Sum('revenue'))
+            .order_by('abc', 'xyz')
+        )
+        return Response(list(cells))
+
+
+# ----------------------------
+# 32. Demand Forecast ViewSet
+# ----------------------------
+
+class DemandForecastViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = DemandForecast.objects.all()
+    serializer_class = DemandForecastSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        qs = super().get_queryset().filter(tenant_id=self.request.user.tenant_id)
+        for param, lookup in (('store', 'store'), ('product', 'product'), ('start', 'day__gte'), ('end', 'day__lte')):
+            value = self.request.query_params.get(param)
+            if value:
+                qs = qs.filter(**{lookup: value})
+        return qs.order_by('store_id', 'product_id', 'day')
+
+
+# ----------------------------
+# 33. Price Change ViewSet
+# ----------------------------
+
+class PriceChangeViewSet(viewsets.ModelViewSet):
+    queryset = PriceChange.objects.prefetch_related('promotions')
+    serializer_class = PriceChangeSerializer
+    permission_classes = [IsAuthenticated]
+    http_method_names = ['get', 'post', 'head', 'options']
+    throttle_budgets = {'apply': 'bulk', 'rollback': 'bulk'}
+
+    def get_queryset(self):
+        return super().get_queryset().filter(tenant_id=self.request.user.tenant_id).order_by('-pk')
+
+    def perform_create(self, serializer):
+        run_service(serializer.save)
+
+    def _transition(self, func):
+        change = run_service(func, self.get_object())
+        return Response(self.get_serializer(change).data)
+
+    @action(detail=True, methods=['post'])
+    def apply(self, request, pk=None):
+        return self._transition(pricing.apply)
+
+    @action(detail=True, methods=['post'])
+    def rollback(self, request, pk=None):
+        return self._transition(pricing.rollback)
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        return self._transition(pricing.cancel)
+
+    @action(detail=True)
+    def history(self, request, pk=None):
+        qs = self.get_object().history.order_by('pk')
+        page = self.paginate_queryset(qs)
+        serializer = PriceHistorySerializer(page if page is not None else qs, many=True)
+        return self.get_paginated_response(serializer.data) if page is not None else Response(serializer.data)
+
+
+# ----------------------------
+# 34. Price History ViewSet
+# ----------------------------
+
+class PriceHistoryViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = PriceHistory.objects.all()
+    serializer_class = PriceHistorySerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        qs = super().get_queryset().filter(tenant_id=self.request.user.tenant_id)
+        for param, lookup in (('product', 'product'), ('start', 'effective_from__gte'), ('end', 'effective_from__lte')):
+            value = self.request.query_params.get(param)
+            if value:
+                qs = qs.filter(**{lookup: value})
+        return qs.order_by('-effective_from', '-pk')
+
+    @action(detail=False)
+    def at(self, request):
+        """Price, cost and discount of ``?products=1&products=2...`` as they stood at ``?at=`` (default now)."""
+        params = PriceLookupSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        at = params.validated_data.get('at') or timezone.now()
+        prices = pricing.prices_at(request.user.tenant_id, params.validated_data['products'], at)
+        rows = [{'product': pk, **values} for pk, values in prices.items()]
+        return Response({'at': at, 'prices': PriceAtSerializer(rows, many=True).data})
+
+
+# ----------------------------
+# 35. Gift Card ViewSet
+# ----------------------------
+
+class GiftCardViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = GiftCard.objects.all()
+    serializer_class = GiftCardSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return super().get_queryset().filter(tenant_id=self.request.user.tenant_id)
+
+    @action(detail=True, methods=['post'])
+    def redeem(self, request, pk=None):
+        """Take ``amount`` off the card towards ``sale``, counted on the cashier's open shift."""
+        card = self.get_object()
+        params = GiftCardRedeemSerializer(data=request.data, context=self.get_serializer_context())
+        params.is_valid(raise_exception=True)
+        sale = params.validated_data['sale']
+        if not card.is_active or (card.expires_at and card.expires_at <= timezone.now()):
+            raise ValidationError(f"Gift card {card.code} is not active.")
+        # Same shift as the sale's payments (see webpos.signals)
+        shift_id = shifts.open_shift_id(request.user.pk, sale.store_id) or sale.shift_id
+        if not card.redeem(params.validated_data['amount'], shift=shift_id):
+            raise ValidationError(f"Gift card {card.code} does not cover {params.validated_data['amount']}.")
+        return Response(GiftCardSerializer(card).data)
+
+
+# ----------------------------
+# Prometheus metrics
+# ----------------------------
+
+def metrics_view(request):
+    """Request and cache metrics of this process, for Prometheus to scrape."""
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICS_ALLOWED_IPS', ('127.0.0.1',)):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')